@@ -3,13 +3,16 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Optional
 from pydantic import BaseModel
 from pathlib import Path
+import asyncio
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.brand import Brand
 from app.models.analysis_task import AnalysisTask
 from app.models.crawl_task import TaskStatus
@@ -27,18 +30,24 @@ class AnalysisTaskCreate(BaseModel):
     include_topics: bool = True
     include_keywords: bool = True
     include_insights: bool = True
+    rebuild: bool = False  # 全量重新分析（默认只分析上次分析之后的新数据）
 
 
 @router.get("/analysis/recent", response_model=dict)
-async def get_recent_analysis_tasks(limit: int = 5, db: Session = Depends(get_db)):
+async def get_recent_analysis_tasks(limit: int = 5, db: AsyncSession = Depends(get_async_db)):
     """获取最近完成的分析任务"""
-    tasks = db.query(AnalysisTask).filter(
-        AnalysisTask.status == TaskStatus.COMPLETED
-    ).order_by(AnalysisTask.completed_at.desc()).limit(limit).all()
+    # 品牌随任务一次加载（异步会话中不能懒加载关系）
+    tasks = (await db.execute(
+        select(AnalysisTask)
+        .options(selectinload(AnalysisTask.brand))
+        .where(AnalysisTask.status == TaskStatus.COMPLETED)
+        .order_by(AnalysisTask.completed_at.desc())
+        .limit(limit)
+    )).scalars().all()
     
     result = []
     for task in tasks:
-        brand = db.query(Brand).filter(Brand.id == task.brand_id).first()
+        brand = task.brand
         if brand:
             result.append({
                 "task_id": task.id,
@@ -59,11 +68,11 @@ async def get_recent_analysis_tasks(limit: int = 5, db: Session = Depends(get_db
 async def start_analysis(
     brand_id: int,
     task_data: AnalysisTaskCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """启动分析任务"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
@@ -79,12 +88,11 @@ async def start_analysis(
     )
     
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await db.commit()
     
     # 异步启动分析任务（使用Celery）
     from app.tasks.analysis_tasks import analyze_brand_task
-    analyze_brand_task.delay(task.id)
+    analyze_brand_task.delay(task.id, rebuild=task_data.rebuild)
     
     return {
         "code": 200,
@@ -93,19 +101,29 @@ async def start_analysis(
             "task_id": task.id,
             "brand_id": brand_id,
             "analysis_type": task_data.analysis_type,
+            "rebuild": task_data.rebuild,
             "status": "pending"
         }
     }
 
 
 @router.get("/brands/{brand_id}/analysis")
-async def get_analysis(brand_id: int, include_charts: bool = True, db: Session = Depends(get_db)):
-    """获取分析结果"""
+async def get_analysis(
+    brand_id: int,
+    include_charts: bool = True,
+    chart_format: str = Query("png", regex="^(png|svg|echarts)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    获取分析结果
+    
+    chart_format 为 png/svg 时 charts 返回图表URL，为 echarts 时返回 ECharts 配置由前端渲染
+    """
     from loguru import logger
     
     try:
         # 检查品牌是否存在
-        brand = db.query(Brand).filter(Brand.id == brand_id).first()
+        brand = await db.get(Brand, brand_id)
         if not brand:
             logger.warning(f"品牌不存在: {brand_id}")
             return JSONResponse(
@@ -121,17 +139,21 @@ async def get_analysis(brand_id: int, include_charts: bool = True, db: Session =
             )
         
         # 获取最新的分析任务（包括进行中的任务）
-        task = db.query(AnalysisTask).filter(
-            AnalysisTask.brand_id == brand_id,
-            AnalysisTask.status == TaskStatus.COMPLETED
-        ).order_by(AnalysisTask.completed_at.desc()).first()
+        task = (await db.execute(
+            select(AnalysisTask).where(
+                AnalysisTask.brand_id == brand_id,
+                AnalysisTask.status == TaskStatus.COMPLETED
+            ).order_by(AnalysisTask.completed_at.desc()).limit(1)
+        )).scalars().first()
         
         # 如果没有完成的任务，检查是否有进行中的任务
         if not task:
-            pending_task = db.query(AnalysisTask).filter(
-                AnalysisTask.brand_id == brand_id,
-                AnalysisTask.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
-            ).order_by(AnalysisTask.created_at.desc()).first()
+            pending_task = (await db.execute(
+                select(AnalysisTask).where(
+                    AnalysisTask.brand_id == brand_id,
+                    AnalysisTask.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
+                ).order_by(AnalysisTask.created_at.desc()).limit(1)
+            )).scalars().first()
             
             if pending_task:
                 logger.info(f"品牌 {brand_id} 有进行中的分析任务: {pending_task.id}")
@@ -167,19 +189,24 @@ async def get_analysis(brand_id: int, include_charts: bool = True, db: Session =
         
         # 从MongoDB获取详细分析结果
         try:
-            from app.core.database import get_mongodb
-            mongodb = get_mongodb()
-            result = mongodb.analysis_results.find_one({"analysis_task_id": task.id})
+            from app.core.database import get_async_mongodb
+            mongodb = get_async_mongodb()
+            result = await mongodb.analysis_results.find_one({"analysis_task_id": task.id}, {"aggregates": 0})
             
             if result:
                 analysis_result = result.get("result", {})
                 
-                # 如果需要图表，生成图表数据
+                # 如果需要图表，返回图表URL（每个分析任务只绘制一次）或 ECharts 配置
                 charts = {}
                 if include_charts:
                     try:
+                        from app.services.chart_cache import chart_cache
                         from app.services.report_service import report_service
-                        charts = report_service.generate_charts(analysis_result)
+                        if chart_format == "echarts":
+                            charts = report_service.chart_options(analysis_result)
+                        else:
+                            names = await asyncio.to_thread(chart_cache.ensure, task.id, analysis_result, chart_format)
+                            charts = chart_cache.chart_urls(task.id, names, chart_format)
                     except Exception as e:
                         logger.error(f"生成图表失败: {e}", exc_info=True)
                         charts = {}  # 即使图表生成失败，也返回其他数据
@@ -248,29 +275,32 @@ async def get_analysis(brand_id: int, include_charts: bool = True, db: Session =
 
 
 @router.get("/brands/{brand_id}/analysis/preview", response_model=dict)
-async def get_analysis_preview(brand_id: int, db: Session = Depends(get_db)):
+async def get_analysis_preview(brand_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取分析结果预览（HTML格式，用于页面展示）"""
     from fastapi.responses import HTMLResponse
-    from app.core.database import get_mongodb
+    from app.core.database import get_async_mongodb
     from app.services.report_service import report_service
+    from app.services.chart_cache import chart_cache
     
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
     # 获取最新的分析任务
-    task = db.query(AnalysisTask).filter(
-        AnalysisTask.brand_id == brand_id,
-        AnalysisTask.status == TaskStatus.COMPLETED
-    ).order_by(AnalysisTask.completed_at.desc()).first()
+    task = (await db.execute(
+        select(AnalysisTask).where(
+            AnalysisTask.brand_id == brand_id,
+            AnalysisTask.status == TaskStatus.COMPLETED
+        ).order_by(AnalysisTask.completed_at.desc()).limit(1)
+    )).scalars().first()
     
     if not task:
         raise HTTPException(status_code=404, detail="暂无分析结果")
     
     # 从MongoDB获取详细分析结果
-    mongodb = get_mongodb()
-    result = mongodb.analysis_results.find_one({"analysis_task_id": task.id})
+    mongodb = get_async_mongodb()
+    result = await mongodb.analysis_results.find_one({"analysis_task_id": task.id}, {"aggregates": 0})
     
     if not result:
         raise HTTPException(status_code=404, detail="分析结果不存在")
@@ -290,8 +320,8 @@ async def get_analysis_preview(brand_id: int, db: Session = Depends(get_db)):
         brand_info=brand_info
     )
     
-    # 生成图表
-    charts = report_service.generate_charts(analysis_result)
+    # 生成图表（读取缓存的图表）
+    charts = await asyncio.to_thread(chart_cache.get_base64, task.id, analysis_result)
     
     # 渲染HTML报表
     html_content = report_service.render_html_report(
@@ -303,15 +333,49 @@ async def get_analysis_preview(brand_id: int, db: Session = Depends(get_db)):
     return HTMLResponse(content=html_content)
 
 
+@router.get("/analysis-tasks/{analysis_task_id}/charts/{name}.{fmt}")
+async def get_analysis_chart(analysis_task_id: int, name: str, fmt: str, request: Request):
+    """获取分析任务的图表（缓存的PNG/SVG图片，内容不变，浏览器可长期缓存）"""
+    from app.core.database import get_async_mongodb
+    from app.services.chart_cache import chart_cache
+    from app.services.chart_renderer import IMAGE_FORMATS
+    
+    if fmt not in IMAGE_FORMATS:
+        raise HTTPException(status_code=404, detail="图表不存在")
+    
+    headers = {
+        "ETag": chart_cache.etag(analysis_task_id, name, fmt),
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    
+    path = chart_cache.chart_path(analysis_task_id, name, fmt)
+    if path is None:
+        # 缓存被清理或还没有生成，重新绘制
+        result = await get_async_mongodb().analysis_results.find_one(
+            {"analysis_task_id": analysis_task_id}, {"aggregates": 0}
+        )
+        if not result:
+            raise HTTPException(status_code=404, detail="分析结果不存在")
+        await asyncio.to_thread(chart_cache.ensure, analysis_task_id, result.get("result", {}), fmt)
+        path = chart_cache.chart_path(analysis_task_id, name, fmt)
+        if path is None:
+            raise HTTPException(status_code=404, detail="图表不存在")
+    
+    media_type = "image/svg+xml" if fmt == "svg" else "image/png"
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
 @router.get("/brands/{brand_id}/analysis/view")
 async def view_brand_analysis(
     brand_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """查看品牌分析报告页面"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
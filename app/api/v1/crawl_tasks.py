@@ -2,13 +2,14 @@
 数据采集API
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from loguru import logger
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.brand import Brand
 from app.models.crawl_task import CrawlTask, TaskStatus, CrawlType
 
@@ -49,11 +50,11 @@ class CrawlTaskResponse(BaseModel):
 async def start_crawl(
     brand_id: int,
     task_data: CrawlTaskCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """启动爬虫任务"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
@@ -98,11 +99,8 @@ async def start_crawl(
              db.add(task)
              tasks.append(task)
     
-    db.commit()
-    
-    # 刷新任务以获取ID
-    for task in tasks:
-        db.refresh(task)
+    # 提交后任务已有ID（会话 expire_on_commit=False，不需要再刷新）
+    await db.commit()
     
     # 异步启动爬虫任务（使用Celery）
     try:
@@ -132,18 +130,21 @@ async def get_crawl_tasks(
     status: Optional[TaskStatus] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取爬虫任务列表"""
-    query = db.query(CrawlTask)
+    query = select(CrawlTask)
     
     if brand_id:
-        query = query.filter(CrawlTask.brand_id == brand_id)
+        query = query.where(CrawlTask.brand_id == brand_id)
     if status:
-        query = query.filter(CrawlTask.status == status)
+        query = query.where(CrawlTask.status == status)
     
-    total = query.count()
-    items = query.order_by(CrawlTask.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+    total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar() or 0
+    result = await db.execute(
+        query.order_by(CrawlTask.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
+    )
+    items = result.scalars().all()
     
     return {
         "code": 200,
@@ -175,9 +176,9 @@ async def get_crawl_tasks(
 
 
 @router.get("/crawl-tasks/{task_id}", response_model=dict)
-async def get_crawl_task(task_id: int, db: Session = Depends(get_db)):
+async def get_crawl_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取爬虫任务详情"""
-    task = db.query(CrawlTask).filter(CrawlTask.id == task_id).first()
+    task = await db.get(CrawlTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
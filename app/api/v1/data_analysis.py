@@ -2,23 +2,31 @@
 数据分析API
 提供数据整理和AI分析功能
 """
-from fastapi import APIRouter, Request, Form, Query, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Request, Form, Query, HTTPException, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List
 from pathlib import Path
 from loguru import logger
+import asyncio
+import json
 import sys
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # 添加项目根目录到路径
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from app.services.data_processor import data_processor
 from app.services.ai_service import ai_service
-from app.tasks.analysis_tasks import analyze_brand_task
-from app.core.database import get_mongodb
+from app.services import file_analysis
+from app.services.llm_cache import llm_cache
+from app.tasks.analysis_tasks import analyze_brand_task, process_data_files_task
+from app.tasks.media_tasks import analyze_media_batch_task
+from app.core.database import get_async_db, get_async_mongodb, redis_client
+from app.models.media_analysis_task import MediaAnalysisTask
+from app.models.crawl_task import TaskStatus
+from config import settings
 
 router = APIRouter()
 
@@ -173,6 +181,7 @@ async def process_data(request: Request):
     include_comments_str = form_data.get("include_comments", "true")
     analysis_type = form_data.get("analysis_type", "comprehensive")
     cross_platform_str = form_data.get("cross_platform", "false")
+    use_cache_str = form_data.get("use_cache", "true")
     
     # 处理可能为None的值
     if platform is not None:
@@ -193,6 +202,7 @@ async def process_data(request: Request):
     # 转换字符串为布尔值
     include_comments_bool = include_comments_str.lower() in ("true", "1", "yes", "on") if include_comments_str else True
     cross_platform_bool = cross_platform_str.lower() in ("true", "1", "yes", "on") if cross_platform_str else False
+    use_cache_bool = str(use_cache_str).strip().lower() in ("true", "1", "yes", "on") if use_cache_str else True
     
     # 记录接收到的参数（用于调试）
     logger.info(f"接收到的参数: platform={platform}, filenames={filenames}, files_json={files_json[:100] if files_json else None}, cross_platform={cross_platform_str}")
@@ -207,7 +217,6 @@ async def process_data(request: Request):
                     "error": "跨平台分析需要提供files_json参数"
                 }, status_code=400)
             # 跨平台分析
-            import json
             try:
                 files_by_platform = json.loads(files_json)
             except json.JSONDecodeError as e:
@@ -249,15 +258,10 @@ async def process_data(request: Request):
                     "error": "没有找到有效的文件"
                 })
             
-            # 处理跨平台数据
-            logger.info(f"开始跨平台处理数据: platforms={list(file_paths_by_platform.keys())}, total_files={sum(len(files) for files in file_paths_by_platform.values())}")
-            processed_data = data_processor.process_cross_platform_files(
-                file_paths_by_platform,
-                include_comments_bool
-            )
-            
-            platform_names = [PLATFORM_MAP.get(p, p) for p in processed_data["platforms"]]
+            logger.info(f"提交跨平台分析作业: platforms={list(file_paths_by_platform.keys())}, total_files={sum(len(files) for files in file_paths_by_platform.values())}")
+            platform_names = [PLATFORM_MAP.get(p, p) for p in file_paths_by_platform]
             brand_name = f"跨平台综合分析（{', '.join(platform_names)}）"
+            file_paths = []
             
         else:
             # 单平台分析（原有逻辑）
@@ -303,153 +307,52 @@ async def process_data(request: Request):
                     "error": "没有找到有效的文件"
                 })
             
-            # 处理数据
-            logger.info(f"开始处理数据: platform={platform}, files={len(file_paths)}")
-            processed_data = data_processor.process_multiple_files(
-                file_paths,
-                platform,
-                include_comments_bool
-            )
-            
+            logger.info(f"提交分析作业: platform={platform}, files={len(file_paths)}")
             brand_name = f"{PLATFORM_MAP.get(platform, platform)}数据"
+            file_paths_by_platform = {}
         
-        if not processed_data["all_texts"]:
-            return JSONResponse({
-                "success": False,
-                "error": "没有提取到可分析的文本数据"
-            })
-        
-        # 执行AI分析
-        logger.info(f"开始AI分析: {len(processed_data['all_texts'])}条文本")
-        
-        # 1. 情感分析
-        sentiment_result = ai_service.batch_analyze_sentiment(processed_data["all_texts"])
-        
-        # 2. 关键词提取
-        all_text = " ".join(processed_data["all_texts"])
-        keywords = ai_service.extract_keywords(all_text, top_k=20, with_weight=True)
-        
-        # 3. 文本统计
-        text_stats = ai_service.analyze_text_statistics(processed_data["all_texts"])
-        
-        # 3.5 互动数据统计
-        interaction_stats = {
-            "total_likes": 0,
-            "total_comments": 0,
-            "total_shares": 0,
-            "by_platform": {}
-        }
-        
-        raw_items = processed_data.get("raw_items", [])
-        for item in raw_items:
-            platform_code = item.get("platform", "unknown")
-            likes = item.get("likes", 0) or 0
-            comments = item.get("comments_count", 0) or 0
-            shares = item.get("shares", 0) or 0
-            
-            # 总计
-            interaction_stats["total_likes"] += likes
-            interaction_stats["total_comments"] += comments
-            interaction_stats["total_shares"] += shares
-            
-            # 按平台
-            if platform_code not in interaction_stats["by_platform"]:
-                interaction_stats["by_platform"][platform_code] = {
-                    "likes": 0,
-                    "comments": 0,
-                    "shares": 0,
-                    "count": 0
-                }
-            
-            p_stats = interaction_stats["by_platform"][platform_code]
-            p_stats["likes"] += likes
-            p_stats["comments"] += comments
-            p_stats["shares"] += shares
-            p_stats["count"] += 1
-        
-        # 4. LLM深度分析
-        data_summary = {
-            "total_count": len(processed_data["all_texts"]),
-            "sentiment_distribution": sentiment_result.get("distribution", {}),
-            "avg_sentiment_score": sentiment_result.get("avg_score", 0.5),
-            "keywords": keywords
+        # 分析在Celery分析worker（Redis不可用时在本地进程池）中执行，进度通过作业接口查询
+        params = {
+            "cross_platform": cross_platform_bool,
+            "platform": platform,
+            "file_paths": [str(f) for f in file_paths],
+            "file_paths_by_platform": {p: [str(f) for f in files] for p, files in file_paths_by_platform.items()},
+            "include_comments": include_comments_bool,
+            "analysis_type": analysis_type,
+            "use_cache": use_cache_bool,
+            "brand_name": brand_name,
+            "platform_names": PLATFORM_MAP
         }
+        mongodb = get_async_mongodb()
+        job_id = await file_analysis.create_job(mongodb, params)
         
-        # 如果是跨平台分析，添加平台统计信息
-        if cross_platform_bool and "platform_stats" in processed_data:
-            data_summary["platform_stats"] = processed_data["platform_stats"]
-        
-        # 调用LLM分析
-        import asyncio
-        llm_result = await ai_service.analyze_with_llm(
-            brand_name=brand_name,
-            data_summary=data_summary,
-            analysis_type=analysis_type
-        )
-        
-        # 组装分析结果
-        if cross_platform_bool:
-            analysis_result = {
-                "platforms": processed_data["platforms"],
-                "platform_names": [PLATFORM_MAP.get(p, p) for p in processed_data["platforms"]],
-                "is_cross_platform": True,
-                "processed_data": {
-                    "total_items": processed_data["total_items"],
-                    "total_texts": len(processed_data["texts"]),
-                    "total_comments": len(processed_data["comments"]),
-                    "file_count": processed_data["file_count"],
-                    "platform_stats": processed_data.get("platform_stats", {})
-                },
-                "sentiment_analysis": sentiment_result,
-                "keywords": keywords,
-                "text_statistics": text_stats,
-                "interaction_statistics": interaction_stats,
-                "llm_insights": llm_result,
-                "processed_at": processed_data["processed_at"]
-            }
-        else:
-            analysis_result = {
-                "platform": platform,
-                "platform_name": PLATFORM_MAP.get(platform, platform),
-                "is_cross_platform": False,
-                "processed_data": {
-                    "total_items": processed_data["total_items"],
-                    "total_texts": len(processed_data["texts"]),
-                    "total_comments": len(processed_data["comments"]),
-                    "file_count": processed_data["file_count"]
-                },
-                "sentiment_analysis": sentiment_result,
-                "keywords": keywords,
-                "text_statistics": text_stats,
-                "interaction_statistics": interaction_stats,
-                "llm_insights": llm_result,
-                "processed_at": processed_data["processed_at"]
-            }
-        
-        # 保存到MongoDB（可选）
         try:
-            mongodb = get_mongodb()
-            result_doc = {
-                "platform": platform if not cross_platform_bool else "cross_platform",
-                "platforms": processed_data.get("platforms", [platform] if platform else []),
-                "is_cross_platform": cross_platform_bool,
-                "analysis_type": analysis_type,
-                "result": analysis_result,
-                "created_at": processed_data["processed_at"]
-            }
-            insert_result = mongodb.data_analysis_results.insert_one(result_doc)
-            result_id = str(insert_result.inserted_id)
-            logger.info(f"分析结果已保存到MongoDB, ID: {result_id}")
+            submitted = False
+            if redis_client is not None:
+                try:
+                    process_data_files_task.delay(job_id)
+                    submitted = True
+                except Exception as e:
+                    logger.warning(f"提交Celery任务失败，分析作业在本地进程池中执行: {e}")
+            else:
+                logger.warning("Redis不可用，分析作业在本地进程池中执行")
+            if not submitted:
+                file_analysis.submit_local_job(job_id)
         except Exception as e:
-            logger.warning(f"保存到MongoDB失败: {e}")
-            result_id = None
+            # 作业记录已创建，标记为失败，避免轮询一直等待
+            await file_analysis.fail_job(mongodb, job_id, f"提交分析作业失败: {e}")
+            raise
         
+        logger.info(f"分析作业已提交, ID: {job_id}")
         return JSONResponse({
             "success": True,
-            "result": analysis_result,
-            "result_id": result_id
-        })
+            "job_id": job_id,
+            "result_id": job_id,
+            "status": file_analysis.JOB_PENDING
+        }, status_code=202)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"处理数据失败: {e}", exc_info=True)
         return JSONResponse({
@@ -480,7 +383,7 @@ async def list_analysis_results(
 ):
     """获取分析结果列表"""
     try:
-        mongodb = get_mongodb()
+        mongodb = get_async_mongodb()
         
         query = {}
         
@@ -500,12 +403,16 @@ async def list_analysis_results(
                 {"platform": platform},
                 {"platforms": platform}
             ]
+        if not result_id:
+            # 不显示未完成或失败的分析作业
+            query["status"] = {"$nin": file_analysis.UNFINISHED_STATUSES}
             
         logger.info(f"查询分析结果: query={query}")
         
-        results = list(mongodb.data_analysis_results.find(query)
-                      .sort("created_at", -1)
-                      .limit(50))
+        results = await (mongodb.data_analysis_results.find(query)
+                         .sort("created_at", -1)
+                         .limit(50)
+                         .to_list())
         
         logger.info(f"查询到 {len(results)} 条分析结果")
         
@@ -538,11 +445,62 @@ async def list_analysis_results(
         }, status_code=500)
 
 
+async def _find_analysis_job(job_id: str) -> Optional[dict]:
+    """按作业ID查询分析作业，ID格式无效时返回None"""
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    try:
+        return await get_async_mongodb().data_analysis_results.find_one({"_id": ObjectId(job_id)})
+    except InvalidId:
+        return None
+
+
+@router.get("/data-analysis/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """查询分析作业状态和进度，完成后返回分析结果"""
+    job = await _find_analysis_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="分析作业不存在")
+    return JSONResponse({"success": True, **file_analysis.job_payload(job)})
+
+
+@router.get("/data-analysis/jobs/{job_id}/events")
+async def stream_analysis_job(request: Request, job_id: str):
+    """以SSE推送分析作业进度，作业完成或失败后结束"""
+    job = await _find_analysis_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="分析作业不存在")
+
+    async def _events():
+        last = None
+        current = job
+        while True:
+            payload = file_analysis.job_payload(current, include_result=False)
+            if payload != last:
+                last = payload
+                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            if payload["status"] in (file_analysis.JOB_COMPLETED, file_analysis.JOB_FAILED):
+                break
+            if await request.is_disconnected():
+                break
+            await asyncio.sleep(settings.DATA_ANALYSIS_POLL_INTERVAL)
+            current = await _find_analysis_job(job_id)
+            if not current:
+                break
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 class VideoAnalysisRequest(BaseModel):
     video_url: str
     item_id: Optional[str] = None
     platform: Optional[str] = None
     prompt: Optional[str] = None
+    use_cache: bool = True  # False时跳过LLM响应缓存重新分析
 
 @router.post("/data-analysis/video")
 async def analyze_video(request: VideoAnalysisRequest):
@@ -551,6 +509,7 @@ async def analyze_video(request: VideoAnalysisRequest):
         return JSONResponse({"success": False, "error": "视频URL不能为空"}, status_code=400)
     
     video_source = request.video_url
+    download_path = None
     
     # 尝试查找本地视频文件，避免下载
     if request.item_id and request.platform:
@@ -582,6 +541,8 @@ async def analyze_video(request: VideoAnalysisRequest):
                 video_source = str(local_file)
             else:
                 logger.debug(f"本地视频文件不存在: {project_data_file} 或 {mc_data_file}")
+                # 远程视频下载到内容目录，之后的分析和批量任务直接复用
+                download_path = str(project_data_file)
                 # 尝试查找图片序列（针对图文笔记）
                 # 同样检查两个位置
                 folder_paths = [
@@ -598,10 +559,103 @@ async def analyze_video(request: VideoAnalysisRequest):
                             images.sort(key=lambda x: x.name)
                             image_paths = [str(img) for img in images]
                             # 直接进行图片分析并返回
-                            result = await ai_service.analyze_image_sequence(image_paths, request.prompt)
+                            result = await ai_service.analyze_image_sequence(image_paths, request.prompt, request.use_cache)
                             return JSONResponse(result)
         except Exception as e:
             logger.warning(f"查找本地视频失败: {e}")
     
-    result = await ai_service.analyze_video_content(video_source, request.prompt)
+    result = await ai_service.analyze_video_content(video_source, request.prompt, request.use_cache, download_path)
     return JSONResponse(result)
+
+
+class VideoBatchRequest(BaseModel):
+    brand_id: Optional[int] = None
+    item_ids: Optional[List[str]] = None  # 内容ID列表，为空表示品牌全部数据
+    platform: Optional[str] = None
+    prompt: Optional[str] = None
+    use_cache: bool = True  # False时跳过LLM响应缓存重新分析
+    reanalyze: bool = False  # True时重新分析已有结果的数据
+
+
+def _media_task_payload(task: MediaAnalysisTask) -> dict:
+    return {
+        "job_id": task.id,
+        "brand_id": task.brand_id,
+        "platform": task.platform,
+        "status": task.status.value if hasattr(task.status, "value") else str(task.status),
+        "total_items": task.total_items or 0,
+        "processed_items": task.processed_items or 0,
+        "succeeded_items": task.succeeded_items or 0,
+        "failed_items": task.failed_items or 0,
+        "progress": round((task.processed_items or 0) / task.total_items * 100, 1) if task.total_items else 0,
+        "error_message": task.error_message,
+        "created_at": task.created_at.isoformat() if task.created_at else None,
+        "started_at": task.started_at.isoformat() if task.started_at else None,
+        "completed_at": task.completed_at.isoformat() if task.completed_at else None
+    }
+
+
+@router.post("/data-analysis/video/batch")
+async def analyze_video_batch(request: VideoBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    提交批量视频/图片分析任务
+
+    按品牌或内容ID选择已爬取的数据，在后台任务中并行抽帧并调用模型，
+    结果写回 raw_data 的 media_analysis 字段（需要Celery，Redis不可用时返回503）
+    """
+    if not request.brand_id and not request.item_ids:
+        return JSONResponse({"success": False, "error": "请指定品牌ID或内容ID列表"}, status_code=400)
+    if redis_client is None:
+        return JSONResponse(
+            {"success": False, "error": "Redis不可用，无法提交批量媒体分析任务，请启动Redis和Celery worker"},
+            status_code=503
+        )
+
+    try:
+        task = MediaAnalysisTask(
+            brand_id=request.brand_id,
+            platform=request.platform,
+            item_ids=request.item_ids,
+            prompt=request.prompt,
+            use_cache=request.use_cache,
+            reanalyze=request.reanalyze,
+            status=TaskStatus.PENDING
+        )
+        db.add(task)
+        # 提交后任务已有ID（会话 expire_on_commit=False，不需要再刷新）
+        await db.commit()
+
+        task_result = analyze_media_batch_task.delay(task.id)
+        task.celery_task_id = task_result.id
+        await db.commit()
+
+        return JSONResponse({"success": True, "data": _media_task_payload(task)})
+    except Exception as e:
+        logger.error(f"提交批量媒体分析任务失败: {e}")
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
+
+
+@router.get("/data-analysis/video/batch/{job_id}")
+async def get_video_batch(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """查询批量视频/图片分析任务进度"""
+    task = await db.get(MediaAnalysisTask, job_id)
+    if not task:
+        return JSONResponse({"success": False, "error": "任务不存在"}, status_code=404)
+    return JSONResponse({"success": True, "data": _media_task_payload(task)})
+
+
+@router.get("/data-analysis/llm-cache/stats")
+async def get_llm_cache_stats():
+    """LLM响应缓存统计（条数、命中率、跳过次数）"""
+    return JSONResponse({"success": True, "data": llm_cache.stats()})
+
+
+@router.delete("/data-analysis/llm-cache")
+async def clear_llm_cache():
+    """清空LLM响应缓存"""
+    try:
+        llm_cache.clear()
+        return JSONResponse({"success": True})
+    except Exception as e:
+        logger.error(f"清空LLM缓存失败: {e}")
+        return JSONResponse({"success": False, "error": str(e)}, status_code=500)
@@ -6,11 +6,17 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional, List
 from pathlib import Path
+import asyncio
 from loguru import logger
+from bson.objectid import ObjectId
 
-from app.core.database import get_mongodb, get_db
+from app.core.database import get_mongodb, get_async_mongodb, get_async_db
+from app.core.mongo_pagination import (
+    KEYSET_SORT, build_projection, decode_cursor, encode_cursor, fetch_page, serialize_items
+)
 from app.models.brand import Brand
-from sqlalchemy.orm import Session
+from app.services import brand_stats
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
@@ -22,11 +28,11 @@ templates = Jinja2Templates(directory=str(Path(__file__).parent.parent.parent.pa
 async def view_brand_data_page(
     request: Request,
     brand_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """数据查看页面"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
@@ -41,43 +47,53 @@ async def view_brand_data_page(
 async def get_brand_data(
     brand_id: int,
     platform: Optional[str] = Query(None, description="平台筛选"),
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，默认不含 raw_data"),
+    page: int = Query(1, ge=1, description="页码（未提供游标时使用，翻页请使用游标）"),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    mongodb=Depends(get_async_mongodb)
 ):
-    """获取品牌爬取的数据"""
+    """
+    获取品牌爬取的数据
+
+    按 (crawled_at, _id) 游标分页，返回的 next_cursor 用于获取下一页；
+    总数读取 brand_stats，不扫描 raw_data
+    """
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
+
+    try:
+        projection = build_projection(fields)
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # 获取MongoDB数据
     try:
-        mongodb = get_mongodb()
-        
-        # 构建查询条件（兼容历史数据：brand_id 可能被存成 str）
-        query = {"brand_id": {"$in": [brand_id, str(brand_id)]}}
+        # 构建查询条件（brand_id 已统一为 int，见 scripts/migrate_brand_id_to_int.py）
+        query = {"brand_id": brand_id}
         if platform:
             query["platform"] = platform
             
-        logger.info(f"查询品牌数据: brand_id={brand_id}, query={query}")
+        logger.info(f"查询品牌数据: brand_id={brand_id}, query={query}, cursor={cursor}")
         
-        # 获取总数
-        total = mongodb.raw_data.count_documents(query)
-        logger.info(f"查询到数据总数: {total}")
-        
-        # 分页查询
-        skip = (page - 1) * page_size
-        items = list(mongodb.raw_data.find(query)
-                    .sort("crawled_at", -1)
-                    .skip(skip)
-                    .limit(page_size))
-        
-        # 转换ObjectId为字符串
-        for item in items:
-            item["_id"] = str(item["_id"])
-            if "crawled_at" in item and hasattr(item["crawled_at"], "isoformat"):
-                item["crawled_at"] = item["crawled_at"].isoformat()
+        total = await brand_stats.count_items(mongodb, brand_id, platform)
+
+        if cursor or page == 1:
+            items, next_cursor = await fetch_page(mongodb.raw_data, query, projection, page_size, cursor)
+        else:
+            # 兼容按页码访问（深分页会变慢）
+            items = await (mongodb.raw_data.find(query, projection)
+                           .sort(KEYSET_SORT)
+                           .skip((page - 1) * page_size)
+                           .limit(page_size + 1)
+                           .to_list())
+            next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+            items = items[:page_size]
         
         return {
             "code": 200,
@@ -85,10 +101,11 @@ async def get_brand_data(
             "data": {
                 "brand_id": brand_id,
                 "brand_name": brand.name,
-                "items": items,
+                "items": serialize_items(items),
                 "total": total,
-                "page": page,
+                "page": page if not cursor else None,
                 "page_size": page_size,
+                "next_cursor": next_cursor,
                 "platform": platform
             }
         }
@@ -97,53 +114,52 @@ async def get_brand_data(
         raise HTTPException(status_code=500, detail=f"获取数据失败: {str(e)}")
 
 
+@router.get("/brands/{brand_id}/data/{item_id}/raw", response_model=dict)
+async def get_brand_data_raw(
+    brand_id: int,
+    item_id: str,
+    mongodb=Depends(get_async_mongodb)
+):
+    """获取单条数据的原始数据（列表接口默认不返回 raw_data）"""
+    doc_id = ObjectId(item_id) if ObjectId.is_valid(item_id) else item_id
+
+    try:
+        item = await mongodb.raw_data.find_one({"_id": doc_id, "brand_id": brand_id}, {"raw_data": 1})
+    except Exception as e:
+        logger.error(f"获取原始数据失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取原始数据失败: {str(e)}")
+
+    if not item:
+        raise HTTPException(status_code=404, detail="数据不存在")
+
+    return {
+        "code": 200,
+        "message": "success",
+        "data": {
+            "id": item_id,
+            "raw_data": item.get("raw_data")
+        }
+    }
+
+
 @router.get("/brands/{brand_id}/data/stats", response_model=dict)
 async def get_brand_data_stats(
     brand_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    mongodb=Depends(get_async_mongodb)
 ):
     """获取品牌数据统计"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
     try:
-        mongodb = get_mongodb()
-        
-        # 调试：检查raw_data集合中是否有任何数据
-        any_doc = mongodb.raw_data.find_one()
-        if any_doc:
-            logger.info(f"MongoDB raw_data 集合首条数据示例: {any_doc.get('_id')}, brand_id字段存在: {'brand_id' in any_doc}, brand_id类型: {type(any_doc.get('brand_id'))}")
-        else:
-            logger.info("MongoDB raw_data 集合为空")
-
-        # 检查所有存在的brand_id
-        distinct_brands = mongodb.raw_data.distinct("brand_id")
-        logger.info(f"MongoDB中存在的品牌ID列表: {distinct_brands}, 当前查询ID: {brand_id} (类型: {type(brand_id)})")
-
-        # 按平台统计（兼容 brand_id 类型）
-        pipeline = [
-            {"$match": {"brand_id": {"$in": [brand_id, str(brand_id)]}}},
-            {"$group": {
-                "_id": "$platform",
-                "count": {"$sum": 1},
-                "latest_crawl": {"$max": "$crawled_at"}
-            }},
-            {"$sort": {"count": -1}}
-        ]
-        
-        logger.info(f"执行统计聚合查询: brand_id={brand_id}")
-        platform_stats = list(mongodb.raw_data.aggregate(pipeline))
-        logger.info(f"统计结果: {platform_stats}")
-        
-        # 转换日期
-        for stat in platform_stats:
-            if "latest_crawl" in stat and hasattr(stat["latest_crawl"], "isoformat"):
-                stat["latest_crawl"] = stat["latest_crawl"].isoformat()
+        # 按平台统计（写入/删除数据时维护的 brand_stats，按品牌读取）
+        platform_stats = await brand_stats.get_brand_stats(mongodb, brand_id)
         
         # 总数据量
-        total = mongodb.raw_data.count_documents({"brand_id": {"$in": [brand_id, str(brand_id)]}})
+        total = sum(stat["count"] for stat in platform_stats)
         
         return {
             "code": 200,
@@ -169,11 +185,11 @@ class DeleteDataRequest(BaseModel):
 async def delete_brand_data_batch(
     brand_id: int,
     request: DeleteDataRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """批量删除品牌数据"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
@@ -206,8 +222,8 @@ async def delete_brand_data_batch(
              # 现在的逻辑是前端拿到的item["_id"]是str(ObjectId)，所以应该能转换回去
              pass
 
-        # 删除数据
-        result = mongodb.raw_data.delete_many({
+        # 删除数据（同时扣减品牌统计，包含多次查询，在线程中执行避免阻塞事件循环）
+        deleted_count = await asyncio.to_thread(brand_stats.delete_raw_data, mongodb, {
             "brand_id": brand_id,
             "_id": {"$in": object_ids}
         })
@@ -217,7 +233,7 @@ async def delete_brand_data_batch(
             "message": "success",
             "data": {
                 "brand_id": brand_id,
-                "deleted_count": result.deleted_count
+                "deleted_count": deleted_count
             }
         }
     except Exception as e:
@@ -229,11 +245,11 @@ async def delete_brand_data_batch(
 async def delete_brand_data(
     brand_id: int,
     platform: Optional[str] = Query(None, description="平台筛选，不指定则删除所有"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除品牌数据"""
     # 检查品牌是否存在
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+    brand = await db.get(Brand, brand_id)
     if not brand:
         raise HTTPException(status_code=404, detail="品牌不存在")
     
@@ -245,18 +261,59 @@ async def delete_brand_data(
         if platform:
             query["platform"] = platform
         
-        # 删除数据
-        result = mongodb.raw_data.delete_many(query)
+        # 删除数据（同时扣减品牌统计，在线程中执行避免阻塞事件循环）
+        deleted_count = await asyncio.to_thread(brand_stats.delete_raw_data, mongodb, query)
         
         return {
             "code": 200,
             "message": "success",
             "data": {
                 "brand_id": brand_id,
-                "deleted_count": result.deleted_count,
+                "deleted_count": deleted_count,
                 "platform": platform or "all"
             }
         }
     except Exception as e:
         logger.error(f"删除数据失败: {e}")
         raise HTTPException(status_code=500, detail=f"删除数据失败: {str(e)}")
+
+
+def _collect_diagnostics(brand_id: Optional[int], platform: Optional[str], limit: int) -> dict:
+    """收集诊断信息（explain、profiler 等同步管理命令，在线程中执行）"""
+    from app.core.mongo_indexes import count_string_brand_ids, explain_queries, slow_queries
+
+    mongodb = get_mongodb()
+    if brand_id is None:
+        sample = mongodb.raw_data.find_one({}, {"brand_id": 1})
+        brand_id = sample.get("brand_id") if sample else 0
+
+    try:
+        profiler = slow_queries(mongodb, limit)
+    except Exception as e:
+        # 没有 profile 命令权限时只返回执行计划
+        profiler = {"error": str(e)}
+
+    return {
+        "indexes": mongodb.raw_data.index_information(),
+        "string_brand_ids": count_string_brand_ids(mongodb),
+        "query_plans": explain_queries(mongodb, brand_id, platform),
+        "slow_queries": profiler
+    }
+
+
+@router.get("/data/diagnostics", response_model=dict)
+async def get_data_diagnostics(
+    brand_id: Optional[int] = Query(None, description="用于检查查询计划的品牌ID，默认取任意一条数据的品牌"),
+    platform: Optional[str] = Query(None, description="用于检查查询计划的平台"),
+    limit: int = Query(20, ge=1, le=100, description="慢查询记录数")
+):
+    """raw_data 索引和查询诊断（索引列表、主要查询的执行计划、慢查询记录、未迁移的字符串 brand_id 数）"""
+    try:
+        return {
+            "code": 200,
+            "message": "success",
+            "data": await asyncio.to_thread(_collect_diagnostics, brand_id, platform, limit)
+        }
+    except Exception as e:
+        logger.error(f"获取诊断信息失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取诊断信息失败: {str(e)}")
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from loguru import logger
 import asyncio
 
-from app.core.database import get_db, get_mongodb
+from app.core.database import get_db, get_async_mongodb
 from app.services.media_downloader import media_downloader
 from app.models.brand import Brand
 
@@ -31,7 +31,7 @@ async def download_media(
         # If successful, update MongoDB
         if result.get("success"):
             try:
-                mongodb = get_mongodb()
+                mongodb = get_async_mongodb()
                 # Determine platform code for DB query
                 p_code = plat
                 if plat == "dy": p_code = "douyin"
@@ -55,7 +55,7 @@ async def download_media(
                     }
                 }
                 
-                res = mongodb.raw_data.update_one(query, update)
+                res = await mongodb.raw_data.update_one(query, update)
                 logger.info(f"Updated MongoDB document: {res.modified_count}")
                 
             except Exception as e:
@@ -76,12 +76,12 @@ async def download_media(
 async def batch_download_missing(
     background_tasks: BackgroundTasks,
     platform: str = "douyin",
-    limit: int = 10
+    limit: int = 10,
+    mongodb=Depends(get_async_mongodb)
 ):
     """
     Scan database for items missing media and queue downloads.
     """
-    mongodb = get_mongodb()
     query = {
         "platform": platform,
         "video_path": None, # or check existence? 
@@ -90,8 +90,10 @@ async def batch_download_missing(
         "raw_data": {"$exists": True}
     }
     
-    cursor = mongodb.raw_data.find(query).limit(limit)
-    items = list(cursor)
+    items = await mongodb.raw_data.find(
+        query,
+        {"content_id": 1, "aweme_id": 1, "video_id": 1, "raw_data.video_download_url": 1, "raw_data.video": 1}
+    ).limit(limit).to_list()
     
     tasks_created = 0
     for item in items:
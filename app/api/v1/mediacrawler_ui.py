@@ -19,6 +19,7 @@ from pathlib import Path
 from datetime import datetime
 from loguru import logger
 from app.services.script_generator import ScriptGenerator
+from app.services.json_stream import iter_json_items
 from config import settings
 
 # 添加项目根目录到路径
@@ -1077,30 +1078,19 @@ async def get_json_file_content(
         }, status_code=404)
     
     try:
-        # 读取JSON文件
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 确保是列表
-        if not isinstance(data, list):
-            data = [data]
-        
-        # 关键词筛选
-        if keyword:
-            keyword_lower = keyword.lower()
-            filtered_data = []
-            for item in data:
-                # 将整个item转换为字符串进行搜索
-                item_str = json.dumps(item, ensure_ascii=False).lower()
-                if keyword_lower in item_str:
-                    filtered_data.append(item)
-            data = filtered_data
-        
-        # 分页
-        total = len(data)
+        # 流式读取JSON文件，只保留当前页的数据
+        keyword_lower = keyword.lower() if keyword else None
         start = (page - 1) * page_size
         end = start + page_size
-        items = data[start:end]
+        total = 0
+        items = []
+        for item in iter_json_items(file_path):
+            # 关键词筛选：将整个item转换为字符串进行搜索
+            if keyword_lower and keyword_lower not in json.dumps(item, ensure_ascii=False).lower():
+                continue
+            if start <= total < end:
+                items.append(item)
+            total += 1
         
         return JSONResponse({
             "success": True,
@@ -26,7 +26,7 @@ engine = create_engine(
     pool_size=5,
     max_overflow=10,
     pool_pre_ping=True,
-    echo=settings.DEBUG
+    echo=settings.MYSQL_ECHO
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -42,9 +42,9 @@ SQLALCHEMY_ASYNC_DATABASE_URL = (
 async_engine = create_async_engine(
     SQLALCHEMY_ASYNC_DATABASE_URL,
     pool_pre_ping=True,
-    echo=settings.DEBUG,
-    pool_size=20,     # 增加异步池大小
-    max_overflow=20
+    echo=settings.MYSQL_ECHO,
+    pool_size=settings.MYSQL_ASYNC_POOL_SIZE,
+    max_overflow=settings.MYSQL_ASYNC_MAX_OVERFLOW
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -68,6 +68,10 @@ try:
 except Exception as e:
     logger.warning(f"MongoDB连接失败（可选服务）: {e}")
 
+# MongoDB异步客户端（FastAPI接口使用，在应用 lifespan 中创建；Celery任务和脚本使用上面的同步客户端）
+async_mongo_client = None
+async_mongodb = None
+
 # Redis连接（可选，连接失败不影响应用启动）
 redis_client = None
 try:
@@ -112,6 +116,19 @@ async def init_db():
             logger.info("MongoDB连接成功")
         except Exception as e:
             logger.warning(f"MongoDB连接失败（可选服务，不影响应用启动）: {e}")
+        else:
+            # 按实际查询方式创建 raw_data 索引
+            try:
+                from app.core.mongo_indexes import ensure_indexes, enable_profiling, count_string_brand_ids
+                ensure_indexes(mongodb)
+                enable_profiling(mongodb)
+                string_ids = count_string_brand_ids(mongodb)
+                if string_ids:
+                    logger.warning(f"raw_data中有 {string_ids} 条数据的brand_id为字符串，请运行 scripts/migrate_brand_id_to_int.py")
+                if not mongodb.brand_stats.estimated_document_count() and mongodb.raw_data.estimated_document_count():
+                    logger.warning("品牌统计 brand_stats 为空，请运行 scripts/rebuild_brand_stats.py 从 raw_data 生成")
+            except Exception as e:
+                logger.warning(f"初始化MongoDB索引失败: {e}")
     else:
         logger.warning("MongoDB未配置或连接失败，部分功能可能不可用")
     
@@ -127,7 +144,7 @@ async def init_db():
     
     # 创建表（同步方式）
     try:
-        from app.models import brand, crawl_task, analysis_task, report, data_import_task
+        from app.models import brand, crawl_task, analysis_task, report, data_import_task, media_analysis_task
         Base.metadata.create_all(bind=engine)
         logger.info("数据库表创建完成")
     except Exception as e:
@@ -154,12 +171,114 @@ async def get_async_db():
 
 
 def get_mongodb():
-    """获取MongoDB数据库"""
+    """获取MongoDB数据库（同步，用于Celery任务和脚本；FastAPI接口请使用 get_async_mongodb）"""
     if mongodb is None:
         raise RuntimeError("MongoDB未连接，请启动MongoDB服务")
     return mongodb
 
 
+async def init_async_mongodb():
+    """创建MongoDB异步客户端（连接失败不影响应用启动）"""
+    global async_mongo_client, async_mongodb
+    try:
+        from pymongo import AsyncMongoClient
+        async_mongo_client = AsyncMongoClient(
+            host=settings.MONGODB_HOST,
+            port=settings.MONGODB_PORT,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=2000
+        )
+        async_mongodb = async_mongo_client[settings.MONGODB_DATABASE]
+        await async_mongo_client.admin.command("ping")
+        logger.info("MongoDB异步连接成功")
+    except Exception as e:
+        logger.warning(f"MongoDB异步连接失败（可选服务，不影响应用启动）: {e}")
+
+
+async def close_async_mongodb():
+    """关闭MongoDB异步客户端"""
+    global async_mongo_client, async_mongodb
+    if async_mongo_client is not None:
+        await async_mongo_client.close()
+        async_mongo_client = None
+        async_mongodb = None
+
+
+def get_async_mongodb():
+    """
+    获取MongoDB异步数据库（FastAPI接口依赖，查询不阻塞事件循环）
+    
+    Raises:
+        HTTPException: MongoDB未连接（503）
+    """
+    if async_mongodb is None:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=503, detail="MongoDB未连接，请启动MongoDB服务")
+    return async_mongodb
+
+
+# raw_data 唯一索引：同一品牌、同一平台下 content_id 唯一
+RAW_DATA_UNIQUE_INDEX = [("brand_id", 1), ("platform", 1), ("content_id", 1)]
+RAW_DATA_UNIQUE_INDEX_NAME = "uniq_brand_platform_content"
+_raw_data_index_ready = False
+
+
+def ensure_raw_data_unique_index(db=None) -> bool:
+    """
+    创建 raw_data 唯一索引（每个进程只创建一次）
+    
+    Args:
+        db: MongoDB数据库，默认使用全局连接
+        
+    Returns:
+        唯一索引是否可用
+    """
+    global _raw_data_index_ready
+    if _raw_data_index_ready:
+        return True
+    
+    db = db if db is not None else get_mongodb()
+    try:
+        db.raw_data.create_index(
+            RAW_DATA_UNIQUE_INDEX,
+            name=RAW_DATA_UNIQUE_INDEX_NAME,
+            unique=True,
+            background=True
+        )
+        _raw_data_index_ready = True
+    except Exception as e:
+        # 已有重复数据或存在同名非唯一索引时创建失败，写入仍可使用upsert，但不能保证唯一
+        logger.warning(f"创建raw_data唯一索引失败（请先清理重复数据）: {e}")
+    return _raw_data_index_ready
+
+
+# raw_data 写入时间（MongoDB服务端时间）：ingested_at 为首次写入时间，updated_at 为最后一次写入时间，
+# 增量分析据此判断新增和被更新的数据（客户端生成的 _id 在并行写入时不能反映写入顺序）
+RAW_DATA_TOUCH = {"$currentDate": {"updated_at": True}}
+
+
+def mark_raw_data_ingested(collection, ids: list):
+    """
+    记录新写入 raw_data 文档的服务端写入时间
+
+    Args:
+        collection: raw_data 集合
+        ids: 新写入文档的 _id
+    """
+    if not ids:
+        return
+    try:
+        collection.update_many(
+            {"_id": {"$in": list(ids)}},
+            {"$currentDate": {"ingested_at": True, "updated_at": True}}
+        )
+    except Exception as e:
+        # 没有写入时间的数据在下次分析时会触发全量分析
+        logger.warning(f"记录raw_data写入时间失败: {e}")
+
+
 def get_redis():
     """获取Redis客户端"""
     if redis_client is None:
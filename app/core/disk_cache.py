@@ -0,0 +1,116 @@
+"""
+磁盘缓存目录清理
+按最近使用时间（修改时间）淘汰缓存目录下的条目：先删除超过保留时间的条目，
+总大小仍超过上限时从最久未使用的条目开始删除
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import os
+import shutil
+import threading
+import time
+
+from loguru import logger
+
+
+# 同一目录两次清理的最小间隔（秒），避免每次写入缓存都扫描目录
+PRUNE_INTERVAL = 300.0
+
+_last_pruned: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _entry_usage(path: Path) -> Tuple[int, float]:
+    """条目的大小（字节）和最近使用时间"""
+    stat = path.stat()
+    if not path.is_dir():
+        return stat.st_size, stat.st_mtime
+    size = 0
+    for child in path.rglob("*"):
+        try:
+            if child.is_file():
+                size += child.stat().st_size
+        except OSError:
+            pass
+    return size, stat.st_mtime
+
+
+def _remove(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def touch(path: Path):
+    """命中缓存时更新条目的最近使用时间"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache_dir(
+    root: Path,
+    max_bytes: int,
+    ttl: float,
+    keep: Iterable[Path] = (),
+    exclude: Iterable[str] = (),
+    interval: Optional[float] = None
+) -> int:
+    """
+    清理缓存目录
+
+    以 . 开头或以 .part 结尾的条目是正在写入的临时文件，只在超过保留时间后删除，不参与大小淘汰
+
+    Args:
+        root: 缓存目录（按其下一级文件/目录淘汰）
+        max_bytes: 总大小上限（字节），0表示不限制
+        ttl: 保留时间（秒），0表示不限制
+        keep: 正在使用、不能删除的条目
+        exclude: 不清理的条目名称
+        interval: 距离上次清理不足该秒数时跳过，默认使用 PRUNE_INTERVAL
+
+    Returns:
+        删除的条目数
+    """
+    root = Path(root)
+    if not root.is_dir() or (not max_bytes and not ttl):
+        return 0
+    key = str(root.resolve())
+    interval = PRUNE_INTERVAL if interval is None else interval
+    now = time.time()
+    with _lock:
+        if now - _last_pruned.get(key, 0.0) < interval:
+            return 0
+        _last_pruned[key] = now
+
+    keep = {Path(path).resolve() for path in keep}
+    exclude = set(exclude)
+    entries: List[Tuple[float, int, Path]] = []
+    removed = 0
+    for path in root.iterdir():
+        if path.name in exclude or path.resolve() in keep:
+            continue
+        try:
+            size, used_at = _entry_usage(path)
+        except OSError:
+            continue
+        if ttl and now - used_at > ttl:
+            _remove(path)
+            removed += 1
+        elif not (path.name.startswith(".") or path.name.endswith(".part")):
+            entries.append((used_at, size, path))
+
+    if max_bytes:
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+
+    if removed:
+        logger.info(f"已清理缓存目录 {root}: 删除 {removed} 项")
+    return removed
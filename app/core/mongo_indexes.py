@@ -0,0 +1,279 @@
+"""
+MongoDB 索引管理
+启动时按实际查询方式创建 raw_data 复合索引，提供 brand_id 类型统一迁移和查询计划诊断
+"""
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from pymongo import ASCENDING, DESCENDING, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+
+from config import settings
+from app.core.mongo_pagination import KEYSET_SORT
+
+
+# raw_data 复合索引（唯一索引 brand_id+platform+content_id 由 ensure_raw_data_unique_index 创建）
+RAW_DATA_INDEXES = [
+    # 按品牌（和平台）分页查看数据，按 (爬取时间, _id) 倒序游标分页（见 mongo_pagination）
+    {"keys": [("brand_id", ASCENDING), ("platform", ASCENDING), ("crawled_at", DESCENDING), ("_id", DESCENDING)],
+     "name": "brand_platform_crawled_at_id"},
+    {"keys": [("brand_id", ASCENDING), ("crawled_at", DESCENDING), ("_id", DESCENDING)],
+     "name": "brand_crawled_at_id"},
+    # 按平台查找本地视频（批量视频分析、媒体文件同步）
+    {"keys": [("platform", ASCENDING), ("video_path", ASCENDING)],
+     "name": "platform_video_path"},
+]
+
+# brand_stats 每个 (品牌, 平台) 一条统计（见 app/services/brand_stats.py）
+BRAND_STATS_INDEXES = [
+    {"keys": [("brand_id", ASCENDING), ("platform", ASCENDING)], "name": "brand_platform", "unique": True},
+]
+
+# analysis_aggregates 每个分析任务一条增量分析聚合状态（见 app/tasks/analysis_tasks.py）
+ANALYSIS_AGGREGATE_INDEXES = [
+    {"keys": [("analysis_task_id", ASCENDING)], "name": "analysis_task_id", "unique": True},
+    {"keys": [("brand_id", ASCENDING)], "name": "brand_id"},
+]
+
+# 已被上面的索引取代的旧索引（前缀相同，保留只会增加写入开销）
+SUPERSEDED_INDEXES = ["brand_platform_crawled_at", "brand_crawled_at"]
+
+# 迁移时每批更新的文档数
+MIGRATION_BATCH_SIZE = 1000
+
+
+def ensure_indexes(db) -> Dict[str, Any]:
+    """
+    创建 raw_data、brand_stats 和 analysis_aggregates 的索引（已存在的索引不会重复创建）
+
+    Args:
+        db: MongoDB数据库
+
+    Returns:
+        {"created": 创建成功的索引名称, "failed": {索引名称: 错误信息}, "unique_index": 唯一索引是否可用}
+    """
+    from app.core.database import ensure_raw_data_unique_index
+
+    report = {"created": [], "failed": {}}
+    for collection, indexes in (
+        ("raw_data", RAW_DATA_INDEXES),
+        ("brand_stats", BRAND_STATS_INDEXES),
+        ("analysis_aggregates", ANALYSIS_AGGREGATE_INDEXES)
+    ):
+        for index in indexes:
+            try:
+                db[collection].create_index(
+                    index["keys"], name=index["name"], unique=index.get("unique", False), background=True
+                )
+                report["created"].append(index["name"])
+            except Exception as e:
+                logger.warning(f"创建{collection}索引 {index['name']} 失败: {e}")
+                report["failed"][index["name"]] = str(e)
+
+    # 新索引都创建成功后再删除被取代的旧索引
+    if not report["failed"]:
+        try:
+            existing = set(db.raw_data.index_information())
+            for name in SUPERSEDED_INDEXES:
+                if name in existing:
+                    db.raw_data.drop_index(name)
+                    logger.info(f"已删除旧索引 raw_data.{name}")
+        except Exception as e:
+            logger.warning(f"删除旧索引失败: {e}")
+
+    report["unique_index"] = ensure_raw_data_unique_index(db)
+    logger.info(f"MongoDB索引已就绪: {report['created']}")
+    return report
+
+
+def count_string_brand_ids(db) -> int:
+    """brand_id 仍为字符串的 raw_data 文档数"""
+    return db.raw_data.count_documents({"brand_id": {"$type": "string"}})
+
+
+def normalize_brand_ids(db, batch_size: int = MIGRATION_BATCH_SIZE) -> Dict[str, int]:
+    """
+    把 raw_data 中字符串类型的 brand_id 转为 int（一次性迁移，可重复执行）
+
+    转换后与已有的 int 文档（或同一批中已转换的文档）重复（同一品牌、平台、content_id）时，
+    删除字符串版本的文档。转换前要求 raw_data 唯一索引已创建，
+    保证迁移期间并发写入的重复数据也会被拒绝，而不是留下重复文档
+
+    Args:
+        db: MongoDB数据库
+        batch_size: 每批更新的文档数
+
+    Returns:
+        {"converted": 转换数, "duplicates_removed": 删除的重复文档数, "skipped": 无法转换的文档数}
+
+    Raises:
+        RuntimeError: raw_data 唯一索引不可用
+    """
+    from app.core.database import ensure_raw_data_unique_index
+
+    if not ensure_raw_data_unique_index(db):
+        raise RuntimeError(
+            "raw_data 唯一索引 (brand_id, platform, content_id) 不可用，"
+            "请先清理同类型 brand_id 的重复数据再迁移"
+        )
+
+    stats = {"converted": 0, "duplicates_removed": 0, "skipped": 0}
+    cursor = db.raw_data.find({"brand_id": {"$type": "string"}}, {"brand_id": 1, "platform": 1, "content_id": 1})
+    batch: List[Dict[str, Any]] = []
+
+    def _key(doc: Dict[str, Any]):
+        return doc["brand_id"], doc.get("platform"), doc.get("content_id")
+
+    def _flush():
+        # 已存在的 int 版本文档
+        existing = {
+            _key(doc) for doc in db.raw_data.find(
+                {
+                    "brand_id": {"$in": list({doc["brand_id"] for doc in batch})},
+                    "content_id": {"$in": list({doc.get("content_id") for doc in batch})}
+                },
+                {"brand_id": 1, "platform": 1, "content_id": 1}
+            )
+        }
+        to_convert, duplicates = [], []
+        for doc in batch:
+            key = _key(doc)
+            if key in existing:
+                duplicates.append(DeleteOne({"_id": doc["_id"]}))
+                continue
+            existing.add(key)
+            to_convert.append(doc)
+        updates = [UpdateOne({"_id": doc["_id"]}, {"$set": {"brand_id": doc["brand_id"]}}) for doc in to_convert]
+
+        if updates:
+            try:
+                stats["converted"] += db.raw_data.bulk_write(updates, ordered=False).modified_count
+            except BulkWriteError as e:
+                # 迁移期间并发写入的重复数据由唯一索引拒绝
+                stats["converted"] += e.details.get("nModified", 0)
+                duplicates.extend(
+                    DeleteOne({"_id": to_convert[error["index"]]["_id"]})
+                    for error in e.details.get("writeErrors", []) if error.get("code") == 11000
+                )
+        if duplicates:
+            stats["duplicates_removed"] += db.raw_data.bulk_write(duplicates, ordered=False).deleted_count
+        batch.clear()
+
+    for doc in cursor:
+        try:
+            doc["brand_id"] = int(doc["brand_id"].strip())
+        except ValueError:
+            logger.warning(f"无法转换的brand_id: {doc['_id']} -> {doc['brand_id']!r}")
+            stats["skipped"] += 1
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            _flush()
+    if batch:
+        _flush()
+
+    logger.info(f"brand_id类型迁移完成: {stats}")
+    return stats
+
+
+def _plan_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """从 explain 结果中提取查询计划摘要"""
+    planner = explain.get("queryPlanner", {})
+    execution = explain.get("executionStats", {})
+
+    stages = []
+    plan = planner.get("winningPlan", {})
+    # 新版本的查询引擎把计划放在 queryPlan 下
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stage = {"stage": plan.get("stage")}
+        if plan.get("indexName"):
+            stage["index"] = plan["indexName"]
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+
+    stage_names = [stage["stage"] for stage in stages]
+    return {
+        "stages": stages,
+        "collection_scan": "COLLSCAN" in stage_names,
+        "in_memory_sort": "SORT" in stage_names,
+        "keys_examined": execution.get("totalKeysExamined"),
+        "docs_examined": execution.get("totalDocsExamined"),
+        "returned": execution.get("nReturned"),
+        "millis": execution.get("executionTimeMillis")
+    }
+
+
+def explain_queries(db, brand_id: int, platform: Optional[str] = None) -> Dict[str, Any]:
+    """
+    对 raw_data 的主要查询执行 explain，检查是否使用索引、是否在内存中排序
+
+    Args:
+        db: MongoDB数据库
+        brand_id: 品牌ID
+        platform: 平台（可选，默认取该品牌任意一条数据的平台）
+
+    Returns:
+        查询名称到查询计划摘要的映射
+    """
+    if platform is None:
+        sample = db.raw_data.find_one({"brand_id": brand_id}, {"platform": 1})
+        platform = sample.get("platform") if sample else "xhs"
+
+    queries = {
+        "brand_data_page": {"filter": {"brand_id": brand_id}, "sort": KEYSET_SORT, "limit": 20},
+        "brand_platform_page": {
+            "filter": {"brand_id": brand_id, "platform": platform}, "sort": KEYSET_SORT, "limit": 20
+        },
+        "content_lookup": {"filter": {"brand_id": brand_id, "platform": platform, "content_id": ""}, "limit": 1},
+        "platform_videos": {"filter": {"platform": platform, "video_path": {"$exists": True, "$ne": None}}, "limit": 20},
+    }
+
+    plans = {}
+    for name, query in queries.items():
+        try:
+            cursor = db.raw_data.find(query["filter"]).limit(query["limit"])
+            if query.get("sort"):
+                cursor = cursor.sort(query["sort"])
+            plans[name] = _plan_summary(cursor.explain())
+        except Exception as e:
+            plans[name] = {"error": str(e)}
+    return plans
+
+
+def slow_queries(db, limit: int = 20) -> Dict[str, Any]:
+    """
+    读取 MongoDB profiler 记录的 raw_data 慢查询（需要开启 profiling，见 MONGODB_PROFILE_SLOW_MS）
+
+    Args:
+        db: MongoDB数据库
+        limit: 最多返回的记录数
+
+    Returns:
+        {"profiling_level": profiler级别, "slow_ms": 慢查询阈值, "queries": 慢查询记录}
+    """
+    status = db.command("profile", -1)
+    result = {"profiling_level": status.get("was", 0), "slow_ms": status.get("slowms"), "queries": []}
+    if not result["profiling_level"]:
+        return result
+
+    entries = db.system.profile.find(
+        {"ns": f"{db.name}.raw_data"},
+        {"op": 1, "command": 1, "millis": 1, "planSummary": 1, "keysExamined": 1, "docsExamined": 1,
+         "nreturned": 1, "hasSortStage": 1, "ts": 1}
+    ).sort("ts", -1).limit(limit)
+    for entry in entries:
+        entry.pop("_id", None)
+        entry["ts"] = entry["ts"].isoformat() if entry.get("ts") else None
+        entry["command"] = str(entry.get("command", ""))[:500]
+        result["queries"].append(entry)
+    return result
+
+
+def enable_profiling(db):
+    """按配置开启慢查询profiler（MONGODB_PROFILE_SLOW_MS 为0时不开启）"""
+    if settings.MONGODB_PROFILE_SLOW_MS > 0:
+        try:
+            db.command("profile", 1, slowms=settings.MONGODB_PROFILE_SLOW_MS)
+        except Exception as e:
+            logger.warning(f"开启MongoDB慢查询记录失败: {e}")
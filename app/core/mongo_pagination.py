@@ -0,0 +1,164 @@
+"""
+MongoDB 游标分页
+按 (crawled_at, _id) 倒序做 keyset 分页：下一页从上一页最后一条数据之后开始，
+借助 (brand_id, [platform,] crawled_at, _id) 索引直接定位，不需要 skip，翻到多深都是同样的开销
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from bson import ObjectId
+
+
+# 分页排序：爬取时间倒序，_id 作为同一时间的次序
+KEYSET_SORT = [("crawled_at", -1), ("_id", -1)]
+
+# 列表默认返回的字段（不含 raw_data 原始数据，原始数据通过单条接口按需加载）
+DEFAULT_LIST_FIELDS = (
+    "platform", "content_id", "task_id", "title", "content", "author", "engagement",
+    "media", "url", "publish_time", "crawled_at", "video_path", "image_path",
+    # 列表中需要的少量原始字段（原文链接、发布时间）
+    "raw_data.url", "raw_data.share_url", "raw_data.create_time"
+)
+
+# fields 参数允许选择的字段（raw_data 需要显式指定）
+SELECTABLE_FIELDS = frozenset(
+    {field.split(".")[0] for field in DEFAULT_LIST_FIELDS}
+    | {"brand_id", "content_type", "media_analysis", "raw_data"}
+)
+
+
+def build_projection(fields: Optional[str] = None) -> Dict[str, int]:
+    """
+    根据 fields 参数生成查询投影
+
+    Args:
+        fields: 逗号分隔的字段列表，为空时使用默认的精简字段
+
+    Returns:
+        MongoDB投影
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    if not fields:
+        return {field: 1 for field in DEFAULT_LIST_FIELDS}
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field.split(".")[0] not in SELECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+    # 分页依赖 crawled_at 生成下一页游标
+    return {field: 1 for field in [*selected, "crawled_at"]}
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """
+    用一页最后一条数据生成下一页游标（对调用方不透明）
+
+    Args:
+        doc: 本页最后一条数据（包含 _id 和 crawled_at）
+
+    Returns:
+        base64url 编码的游标
+    """
+    crawled_at = doc.get("crawled_at")
+    doc_id = doc["_id"]
+    payload = {
+        "t": crawled_at.isoformat() if isinstance(crawled_at, datetime) else None,
+        "i": str(doc_id),
+        "o": isinstance(doc_id, ObjectId)
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """
+    解析游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+
+    Returns:
+        (crawled_at, _id)
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        crawled_at = datetime.fromisoformat(payload["t"]) if payload["t"] else None
+        doc_id = ObjectId(payload["i"]) if payload["o"] else payload["i"]
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+    return crawled_at, doc_id
+
+
+def keyset_filter(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    在查询条件上追加游标位置之后的条件（按 KEYSET_SORT 排序）
+
+    Args:
+        query: 原查询条件
+        cursor: 上一页返回的游标，为空时返回原查询条件
+
+    Returns:
+        查询条件
+    """
+    if not cursor:
+        return query
+
+    crawled_at, doc_id = decode_cursor(cursor)
+    if crawled_at is None:
+        # 倒序时没有 crawled_at 的数据排在最后，只需要比较 _id
+        after = {"crawled_at": None, "_id": {"$lt": doc_id}}
+    else:
+        after = {"$or": [
+            {"crawled_at": {"$lt": crawled_at}},
+            {"crawled_at": crawled_at, "_id": {"$lt": doc_id}},
+            {"crawled_at": None}
+        ]}
+    return {**query, **after}
+
+
+async def fetch_page(collection, query: Dict[str, Any], projection: Dict[str, int],
+                     page_size: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    查询一页数据
+
+    多取一条用来判断是否还有下一页
+
+    Args:
+        collection: MongoDB集合（异步客户端）
+        query: 查询条件
+        projection: 投影
+        page_size: 每页数量
+        cursor: 上一页返回的游标
+
+    Returns:
+        (本页数据, 下一页游标，没有下一页时为None)
+    """
+    items = await (
+        collection.find(keyset_filter(query, cursor), projection)
+        .sort(KEYSET_SORT)
+        .limit(page_size + 1)
+        .to_list()
+    )
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, encode_cursor(items[-1])
+
+
+def serialize_items(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """把 ObjectId 和时间转换为 JSON 可序列化的值"""
+    result = []
+    for item in items:
+        item["_id"] = str(item["_id"])
+        if "crawled_at" in item and hasattr(item["crawled_at"], "isoformat"):
+            item["crawled_at"] = item["crawled_at"].isoformat()
+        result.append(item)
+    return result
@@ -0,0 +1,31 @@
+"""
+进程池
+"""
+import multiprocessing
+import os
+from typing import Optional
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """进程数，0或None表示使用CPU核数"""
+    return workers or os.cpu_count() or 1
+
+
+def create_process_pool(processes: int, start_method: Optional[str] = None, task_timeout: Optional[float] = None):
+    """
+    创建进程池
+
+    Celery prefork 的子进程是守护进程，标准库 multiprocessing 不允许其再创建子进程，
+    因此优先使用 Celery 自带的 billiard
+
+    Args:
+        processes: 进程数
+        start_method: 进程启动方式（fork/spawn），默认使用平台默认值；
+            在多线程的API进程中创建时应使用 spawn，避免 fork 复制其他线程持有的锁
+        task_timeout: 单个任务的硬超时（秒），超时的工作进程被终止并替换（仅 billiard 支持）
+    """
+    try:
+        from billiard import get_context
+        return get_context(start_method).Pool(processes=processes, timeout=task_timeout)
+    except ImportError:
+        return multiprocessing.get_context(start_method).Pool(processes=processes)
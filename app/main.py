@@ -53,6 +53,10 @@ async def lifespan(app: FastAPI):
         # 根据实际情况决定是否抛出异常
         # raise
     
+    # 创建MongoDB异步客户端（FastAPI接口使用）
+    from app.core.database import init_async_mongodb, close_async_mongodb
+    await init_async_mongodb()
+    
     logger.info("应用启动完成")
     
     yield  # 服务运行中...
@@ -110,6 +114,27 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"清理进程时出错: {e}")
     
+    # 关闭LLM长连接客户端
+    try:
+        from app.services.llm_client import llm_clients
+        await llm_clients.aclose()
+    except Exception as e:
+        logger.warning(f"关闭LLM客户端时出错: {e}")
+
+    # 关闭本地分析作业进程池
+    try:
+        from app.services.file_analysis import shutdown_local_jobs
+        shutdown_local_jobs()
+    except Exception as e:
+        logger.warning(f"关闭分析作业进程池时出错: {e}")
+
+    # 关闭绘图进程池
+    try:
+        from app.services.report_service import report_service
+        report_service.close()
+    except Exception as e:
+        logger.warning(f"关闭绘图进程池时出错: {e}")
+
     # 关闭数据库连接池、Redis连接等
     try:
         from app.core.database import engine, async_engine, mongo_client, redis_client
@@ -127,6 +152,7 @@ async def lifespan(app: FastAPI):
         if mongo_client:
             mongo_client.close()
             logger.info("MongoDB连接已关闭")
+        await close_async_mongodb()
         if redis_client:
             redis_client.close()
             logger.info("Redis连接已关闭")
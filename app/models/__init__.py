@@ -6,5 +6,6 @@ from app.models.crawl_task import CrawlTask
 from app.models.analysis_task import AnalysisTask
 from app.models.report import Report
 from app.models.data_import_task import DataImportTask
+from app.models.media_analysis_task import MediaAnalysisTask
 
-__all__ = ["Brand", "CrawlTask", "AnalysisTask", "Report", "DataImportTask"]
+__all__ = ["Brand", "CrawlTask", "AnalysisTask", "Report", "DataImportTask", "MediaAnalysisTask"]
@@ -0,0 +1,50 @@
+"""
+批量视频/图片分析任务模型
+"""
+from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, JSON, Boolean, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+
+from app.core.database import Base
+from app.models.crawl_task import TaskStatus
+
+
+class MediaAnalysisTask(Base):
+    """批量视频/图片分析任务表"""
+    __tablename__ = "media_analysis_tasks"
+
+    id = Column(Integer, primary_key=True, index=True, comment="任务ID")
+    brand_id = Column(
+        Integer,
+        ForeignKey("brands.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+        comment="品牌ID（为空时只按内容ID选择数据）"
+    )
+    celery_task_id = Column(String(50), index=True, comment="Celery任务ID")
+    status = Column(
+        Enum(TaskStatus),
+        default=TaskStatus.PENDING,
+        index=True,
+        comment="任务状态"
+    )
+    platform = Column(String(20), comment="平台（为空表示全部平台）")
+    item_ids = Column(JSON, comment="内容ID列表（为空表示品牌全部数据）")
+    prompt = Column(Text, comment="分析提示词（为空使用默认提示词）")
+    use_cache = Column(Boolean, default=True, comment="是否读取LLM响应缓存")
+    reanalyze = Column(Boolean, default=False, comment="是否重新分析已有结果的数据")
+    total_items = Column(Integer, default=0, comment="待分析数据条数")
+    processed_items = Column(Integer, default=0, comment="已处理数据条数")
+    succeeded_items = Column(Integer, default=0, comment="分析成功条数")
+    failed_items = Column(Integer, default=0, comment="分析失败条数")
+    error_message = Column(Text, comment="错误信息")
+
+    created_at = Column(DateTime, server_default=func.now(), index=True, comment="创建时间")
+    started_at = Column(DateTime, comment="开始时间")
+    completed_at = Column(DateTime, comment="完成时间")
+
+    # 关系
+    brand = relationship("Brand", backref="media_analysis_tasks")
+
+    def __repr__(self):
+        return f"<MediaAnalysisTask(id={self.id}, brand_id={self.brand_id}, status='{self.status}')>"
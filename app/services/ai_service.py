@@ -3,19 +3,29 @@ AI分析服务
 提供情感分析、关键词提取、主题分析、LLM深度分析等功能
 """
 from typing import List, Dict, Optional, Any
-from collections import Counter
+from functools import partial
 import jieba
 import jieba.analyse
 from snownlp import SnowNLP
 from loguru import logger
-import tempfile
+from pathlib import Path
 import os
 import time
-import httpx
 import json
 import re
 
 from config import settings
+from app.services.sentiment_engine import sentiment_engine, empty_sentiment_summary
+from app.services.nlp_cache import NLPResultCache, nlp_cache
+from app.services.llm_cache import LLMResponseCache, llm_cache
+from app.services.media_frames import IMAGE_LIMIT, extract_video_frames, load_image_frames
+from app.services.video_fetcher import VideoFetchError, fetch_video
+from app.services.term_matrix import TermMatrix
+from app.services.topic_engine import TopicModel, create_topic_model
+from app.services.llm_client import (
+    llm_clients, estimate_tokens, IMAGE_TOKENS,
+    PROVIDER_GATEWAY, PROVIDER_OPENAI, PROVIDER_GEMINI, PROVIDER_CLAUDE, PROVIDER_LOCAL
+)
 
 
 class AIService:
@@ -95,12 +105,17 @@ class AIService:
             logger.error(f"关键词提取失败: {e}")
             return []
     
-    def analyze_text_statistics(self, texts: List[str]) -> Dict[str, Any]:
+    def analyze_text_statistics(
+        self,
+        texts: List[str],
+        term_matrix: Optional[TermMatrix] = None
+    ) -> Dict[str, Any]:
         """
         文本统计分析
         
         Args:
             texts: 文本列表
+            term_matrix: 已构建的文档-词矩阵（可选，避免重复分词）
             
         Returns:
             统计结果，包含：
@@ -115,22 +130,14 @@ class AIService:
             avg_length = total_length / total_count if total_count > 0 else 0
             
             # 词频统计
-            all_words = []
-            for text in texts:
-                words = jieba.cut(text)
-                all_words.extend([w for w in words if len(w.strip()) > 1])
-            
-            word_freq = Counter(all_words)
-            top_words = word_freq.most_common(20)
+            if term_matrix is None:
+                term_matrix = self.build_term_matrix(texts)
             
             return {
                 "total_count": total_count,
                 "total_length": total_length,
                 "avg_length": round(avg_length, 2),
-                "word_frequency": [
-                    {"word": word, "count": count}
-                    for word, count in top_words
-                ]
+                "word_frequency": term_matrix.word_frequency(top_k=20)
             }
         except Exception as e:
             logger.error(f"文本统计分析失败: {e}")
@@ -142,6 +149,42 @@ class AIService:
                 "error": str(e)
             }
     
+    def tokenize_texts(self, texts: List[str]) -> List[List[str]]:
+        """
+        批量分词（相同文本只分词一次，结果写入文本分析缓存）
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            与输入顺序一致的分词结果列表
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        tokens_map = nlp_cache.get_many(NLPResultCache.TOKENS, unique_texts)
+        
+        missing_tokens = {
+            text: jieba.lcut(text)
+            for text in unique_texts
+            if text not in tokens_map
+        }
+        if missing_tokens:
+            nlp_cache.set_many(NLPResultCache.TOKENS, missing_tokens)
+            tokens_map.update(missing_tokens)
+        
+        return [tokens_map[text] for text in texts]
+    
+    def build_term_matrix(self, texts: List[str]) -> TermMatrix:
+        """
+        分词并构建文档-词矩阵，供关键词、词频、主题提取共用
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            文档-词矩阵（行与texts一一对应）
+        """
+        return TermMatrix.from_tokens(self.tokenize_texts(texts))
+    
     def batch_analyze_sentiment(self, texts: List[str]) -> Dict[str, Any]:
         """
         批量情感分析
@@ -159,26 +202,7 @@ class AIService:
             - distribution: 情感分布
         """
         try:
-            results = [self.analyze_sentiment(text) for text in texts]
-            
-            total = len(results)
-            positive_count = sum(1 for r in results if r["sentiment"] == "positive")
-            negative_count = sum(1 for r in results if r["sentiment"] == "negative")
-            neutral_count = sum(1 for r in results if r["sentiment"] == "neutral")
-            avg_score = sum(r["score"] for r in results) / total if total > 0 else 0.5
-            
-            return {
-                "total": total,
-                "positive_count": positive_count,
-                "negative_count": negative_count,
-                "neutral_count": neutral_count,
-                "avg_score": round(avg_score, 4),
-                "distribution": {
-                    "positive": round(positive_count / total * 100, 2) if total > 0 else 0,
-                    "negative": round(negative_count / total * 100, 2) if total > 0 else 0,
-                    "neutral": round(neutral_count / total * 100, 2) if total > 0 else 0
-                }
-            }
+            return sentiment_engine.summarize(sentiment_engine.score_texts(texts))
         except Exception as e:
             logger.error(f"批量情感分析失败: {e}")
             return {
@@ -205,19 +229,17 @@ class AIService:
             按平台的情感分析结果
         """
         try:
-            platform_results = {}
-            for platform, texts in texts_by_platform.items():
-                if texts:
-                    platform_results[platform] = self.batch_analyze_sentiment(texts)
-                else:
-                    platform_results[platform] = {
-                        "total": 0,
-                        "positive_count": 0,
-                        "negative_count": 0,
-                        "neutral_count": 0,
-                        "avg_score": 0.5,
-                        "distribution": {"positive": 0, "negative": 0, "neutral": 0}
-                    }
+            texts = []
+            platforms = []
+            for platform, platform_texts in texts_by_platform.items():
+                texts.extend(platform_texts)
+                platforms.extend([platform] * len(platform_texts))
+            
+            platform_results = sentiment_engine.analyze(texts, platforms=platforms)["by_platform"]
+            # 没有文本的平台也返回空统计
+            for platform in texts_by_platform:
+                if platform not in platform_results:
+                    platform_results[platform] = empty_sentiment_summary()
             return platform_results
         except Exception as e:
             logger.error(f"按平台情感分析失败: {e}")
@@ -237,97 +259,47 @@ class AIService:
             按时间分布的情感分析结果
         """
         try:
-            from collections import defaultdict
-            from datetime import datetime
-            
-            # 按日期分组
-            texts_by_date = defaultdict(list)
-            for item in texts_with_dates:
-                date_str = item.get("date")
-                if date_str:
-                    # 标准化日期格式（只保留日期部分）
-                    try:
-                        if isinstance(date_str, str):
-                            # 尝试解析日期
-                            dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                            date_key = dt.strftime("%Y-%m-%d")
-                        else:
-                            date_key = str(date_str)[:10]
-                        texts_by_date[date_key].append(item["text"])
-                    except:
-                        # 如果日期解析失败，使用原始字符串的前10个字符
-                        date_key = str(date_str)[:10] if date_str else "unknown"
-                        texts_by_date[date_key].append(item["text"])
-            
-            # 对每个日期进行情感分析
-            time_distribution = []
-            for date_key in sorted(texts_by_date.keys()):
-                texts = texts_by_date[date_key]
-                sentiment_result = self.batch_analyze_sentiment(texts)
-                time_distribution.append({
-                    "date": date_key,
-                    "positive": sentiment_result["distribution"].get("positive", 0),
-                    "negative": sentiment_result["distribution"].get("negative", 0),
-                    "neutral": sentiment_result["distribution"].get("neutral", 0),
-                    "total": sentiment_result["total"]
-                })
-            
-            return {
-                "distribution": time_distribution,
-                "total_days": len(time_distribution)
-            }
+            texts = [item["text"] for item in texts_with_dates]
+            dates = [item.get("date") for item in texts_with_dates]
+            return sentiment_engine.analyze(texts, dates=dates)["by_time"]
         except Exception as e:
             logger.error(f"按时间情感分析失败: {e}")
             return {"distribution": [], "total_days": 0, "error": str(e)}
     
-    def extract_topics(self, texts: List[str], num_topics: int = 5) -> List[Dict[str, Any]]:
+    def extract_topics(
+        self,
+        texts: List[str],
+        num_topics: int = 5,
+        term_matrix: Optional[TermMatrix] = None
+    ) -> List[Dict[str, Any]]:
         """
-        主题提取（使用关键词聚类模拟主题）
+        主题提取（NMF主题模型，文本较少时以TF-IDF最高的词作为主题）
         
         Args:
             texts: 文本列表
             num_topics: 主题数量
+            term_matrix: 已构建的文档-词矩阵（可选，避免重复分词）
             
         Returns:
             主题列表，每个主题包含：
-            - topic: 主题名称（关键词）
-            - weight: 权重
+            - topic: 主题名称（主题权重最高的词）
+            - weight: 权重（主题在全部文本中的占比）
             - keywords: 相关关键词
-            - sample_count: 样本数量
+            - sample_count: 样本数量（归属该主题的文本数）
         """
         try:
-            # 合并所有文本
-            all_text = " ".join(texts)
+            if term_matrix is None:
+                term_matrix = self.build_term_matrix(texts)
             
-            # 提取更多关键词作为主题候选
-            keywords = jieba.analyse.extract_tags(all_text, topK=num_topics * 3, withWeight=True)
+            # 文本较少时主题模型不稳定，使用关键词共现
+            topic_model = None
+            if term_matrix.n_docs >= TopicModel.MIN_DOCS:
+                topic_model = create_topic_model(num_topics=num_topics)
+            if topic_model is None:
+                return term_matrix.topics(num_topics=num_topics)
             
-            # 对每个关键词，分析包含该关键词的文本
-            topics = []
-            for keyword, weight in keywords[:num_topics]:
-                # 统计包含该关键词的文本数量
-                sample_count = sum(1 for text in texts if keyword in text)
-                
-                # 获取相关关键词（包含该关键词的文本中的其他高频词）
-                related_texts = [text for text in texts if keyword in text]
-                if related_texts:
-                    related_text = " ".join(related_texts)
-                    related_keywords = jieba.analyse.extract_tags(
-                        related_text, topK=5, withWeight=False
-                    )
-                    # 移除主关键词
-                    related_keywords = [kw for kw in related_keywords if kw != keyword]
-                else:
-                    related_keywords = []
-                
-                topics.append({
-                    "topic": keyword,
-                    "weight": round(weight, 4),
-                    "keywords": related_keywords[:5],
-                    "sample_count": sample_count
-                })
-            
-            return topics
+            topic_model.fit(term_matrix)
+            return topic_model.topics()
         except Exception as e:
             logger.error(f"主题提取失败: {e}")
             return []
@@ -382,7 +354,8 @@ class AIService:
         self,
         brand_name: str,
         data_summary: Dict[str, Any],
-        analysis_type: str = "comprehensive"
+        analysis_type: str = "comprehensive",
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         使用LLM进行深度分析
@@ -391,38 +364,38 @@ class AIService:
             brand_name: 品牌名称
             data_summary: 数据摘要（包含情感分析、关键词、热门帖子等）
             analysis_type: 分析类型 (comprehensive, marketing_strategy, product_feedback, crisis_detection)
+            use_cache: 是否读取LLM响应缓存（False时重新调用LLM并刷新缓存）
             
         Returns:
-            LLM分析结果 (结构化 JSON)
+            LLM分析结果 (结构化 JSON)，命中缓存时包含 cached=True
         """
         try:
             # 构建Prompt
             prompt = self._build_analysis_prompt(brand_name, data_summary, analysis_type)
             
+            # 相同模型、提示词和分析类型直接返回缓存结果
+            model = self._get_llm_model()
+            cache_key = llm_cache.make_key(
+                LLMResponseCache.INSIGHTS,
+                model=model, prompt=prompt, temperature=0.7, analysis_type=analysis_type
+            )
+            if use_cache:
+                cached = llm_cache.get(LLMResponseCache.INSIGHTS, cache_key)
+                if cached is not None:
+                    logger.info(f"LLM分析命中缓存: {brand_name}, {analysis_type}")
+                    return {**cached, "cached": True}
+            else:
+                llm_cache.record_bypass(LLMResponseCache.INSIGHTS)
+            
             # 调用LLM
             raw_result = await self._call_llm(prompt)
             
             # 尝试解析JSON
-            import json
-            import re
-            
-            # 简单的清洗，提取 ```json ... ``` 内容
-            # 优化正则：支持 ```json, ```JSON, 或无语言标记的 ```
-            json_match = re.search(r'```(?:json|JSON)?\s*([\s\S]*?)\s*```', raw_result)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 如果没有代码块，尝试查找第一个 { 和最后一个 }
-                first_brace = raw_result.find('{')
-                last_brace = raw_result.rfind('}')
-                if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
-                    json_str = raw_result[first_brace:last_brace+1]
-                else:
-                    json_str = raw_result
-                
+            parsed = True
             try:
-                result_json = json.loads(json_str)
+                result_json = self.extract_json(raw_result)
             except:
+                parsed = False
                 # 如果解析失败，返回原始文本作为 summary
                 logger.warning(f"LLM输出非JSON格式，回退到纯文本. Raw result prefix: {raw_result[:100] if raw_result else 'EMPTY'}")
                 result_json = {
@@ -439,11 +412,15 @@ class AIService:
                     "marketing_suggestions": []
                 }
             
-            return {
+            result = {
                 "analysis_type": analysis_type,
                 "insights": result_json,
-                "model": self._get_llm_model()
+                "model": model
             }
+            # 只缓存解析成功的结果
+            if parsed and model:
+                llm_cache.set(LLMResponseCache.INSIGHTS, cache_key, result)
+            return result
         except Exception as e:
             logger.error(f"LLM分析失败: {e}")
             return {
@@ -457,6 +434,29 @@ class AIService:
                 "error": str(e)
             }
     
+    @staticmethod
+    def extract_json(raw_result: str) -> Any:
+        """
+        从LLM输出中提取JSON
+        
+        Raises:
+            ValueError: 输出中没有合法的JSON
+        """
+        # 简单的清洗，提取 ```json ... ``` 内容
+        # 优化正则：支持 ```json, ```JSON, 或无语言标记的 ```
+        json_match = re.search(r'```(?:json|JSON)?\s*([\s\S]*?)\s*```', raw_result)
+        if json_match:
+            json_str = json_match.group(1)
+        else:
+            # 如果没有代码块，尝试查找第一个 { 和最后一个 }
+            first_brace = raw_result.find('{')
+            last_brace = raw_result.rfind('}')
+            if first_brace != -1 and last_brace != -1 and last_brace > first_brace:
+                json_str = raw_result[first_brace:last_brace+1]
+            else:
+                json_str = raw_result
+        return json.loads(json_str)
+    
     def _build_analysis_prompt(
         self,
         brand_name: str,
@@ -474,6 +474,16 @@ class AIService:
 - 关键词: {', '.join([kw.get('keyword', '') for kw in data_summary.get('keywords', [])[:20]])}
 """
 
+        # 添加用户内容分块总结 (map-reduce 洞察的 map 阶段结果)
+        corpus_insights = data_summary.get('corpus_insights')
+        if corpus_insights:
+            coverage = data_summary.get('corpus_coverage', {})
+            base_data_info += (
+                f"\n## 用户内容分块总结 (从{coverage.get('total_texts', 0)}条文本中按平台和主题选取"
+                f"{coverage.get('summarized_texts', 0)}条代表性文本，分{coverage.get('chunks', 0)}块总结)\n"
+                f"{corpus_insights}\n"
+            )
+
         # 添加热门帖子信息 (如果有)
         top_posts = data_summary.get('top_posts', [])
         if top_posts:
@@ -587,166 +597,139 @@ class AIService:
 
 {specific_instructions}
 
-请确保分析深入且具体，不要使用通用套话。请结合提供的关键词、情感分布和热门内容进行推断。
+请确保分析深入且具体，不要使用通用套话。请结合提供的关键词、情感分布、热门内容{'和用户内容分块总结' if corpus_insights else ''}进行推断。
 """
         return final_prompt
     
-    async def _call_llm(self, prompt: str) -> str:
-        """调用LLM API"""
-        # 优先使用LLM聚合网关（如果配置）
-        if settings.LLM_API_KEY and settings.LLM_API_BASE:
-            return await self._call_llm_gateway(prompt)
-        # 其次使用OpenAI（直接调用）
-        elif settings.OPENAI_API_KEY:
-            return await self._call_openai(prompt)
-        # 再次使用Gemini
-        elif settings.GEMINI_API_KEY:
-            return await self._call_gemini(prompt)
-        # 再次使用Claude
-        elif settings.ANTHROPIC_API_KEY:
-            return await self._call_claude(prompt)
-        # 最后使用本地LLM
-        elif settings.LOCAL_LLM_URL:
-            return await self._call_local_llm(prompt)
-        else:
+    async def complete(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """
+        调用LLM生成文本（故障转移、限流、重试和熔断由LLM客户端注册表处理）
+        
+        Args:
+            prompt: 提示词
+            max_tokens: 最大输出Token数，默认使用各服务的默认值
+            
+        Returns:
+            LLM输出文本
+        """
+        return await self._call_llm(prompt, max_tokens)
+    
+    @property
+    def llm_model(self) -> Optional[str]:
+        """当前使用的LLM模型（未配置时为None）"""
+        return self._get_llm_model()
+    
+    async def _call_llm(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """调用LLM API（按 网关 → OpenAI → Gemini → Claude → 本地LLM 的顺序故障转移）"""
+        handlers = {
+            PROVIDER_GATEWAY: self._call_llm_gateway,
+            PROVIDER_OPENAI: self._call_openai,
+            PROVIDER_GEMINI: self._call_gemini,
+            PROVIDER_CLAUDE: self._call_claude,
+            PROVIDER_LOCAL: self._call_local_llm,
+        }
+        providers = llm_clients.configured_providers()
+        if not providers:
             logger.warning("未配置LLM API，返回模拟结果")
             return "未配置LLM API，请配置LLM聚合网关、OpenAI、Gemini、Claude或本地LLM服务。"
+        
+        return await llm_clients.execute_with_failover(
+            {provider: partial(handlers[provider], prompt, max_tokens) for provider in providers},
+            estimated_tokens=estimate_tokens(prompt, max_tokens or 4000)
+        )
     
-    async def _call_llm_gateway(self, prompt: str) -> str:
+    async def _call_llm_gateway(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """调用LLM聚合网关（OneAPI/NewAPI）"""
-        try:
-            from openai import AsyncOpenAI
-            
-            # 使用聚合网关的Base URL和API Key
-            model_name = settings.LLM_MODEL_NAME or "gpt-4o-mini"
-            
-            client = AsyncOpenAI(
-                api_key=settings.LLM_API_KEY,
-                base_url=settings.LLM_API_BASE
-            )
-            
-            logger.info(f"使用LLM聚合网关: {settings.LLM_API_BASE}, 模型: {model_name}")
-            
-            response = await client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000,
-                timeout=60.0  # 添加60秒超时设置
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"LLM聚合网关调用失败: {e}")
-            # 如果聚合网关失败，尝试降级到直接调用
-            logger.info("尝试降级到直接调用OpenAI...")
-            if settings.OPENAI_API_KEY:
-                return await self._call_openai(prompt)
-            raise
+        # 使用聚合网关的Base URL和API Key
+        model_name = settings.LLM_MODEL_NAME or "gpt-4o-mini"
+        client = llm_clients.openai_client(PROVIDER_GATEWAY)
+        
+        logger.info(f"使用LLM聚合网关: {settings.LLM_API_BASE}, 模型: {model_name}")
+        
+        response = await client.chat.completions.create(
+            model=model_name,
+            messages=[
+                {"role": "system", "content": "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens or 4000
+        )
+        
+        return response.choices[0].message.content
     
-    async def _call_openai(self, prompt: str) -> str:
+    async def _call_openai(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """调用OpenAI API（直接调用）"""
-        try:
-            from openai import AsyncOpenAI
-            
-            client = AsyncOpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                base_url=settings.OPENAI_BASE_URL
-            )
-            
-            response = await client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000,
-                timeout=60.0  # 添加60秒超时设置
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"OpenAI API调用失败: {e}")
-            raise
+        client = llm_clients.openai_client(PROVIDER_OPENAI)
+        
+        response = await client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens or 2000
+        )
+        
+        return response.choices[0].message.content
     
-    async def _call_gemini(self, prompt: str) -> str:
+    async def _call_gemini(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """调用Gemini API"""
-        try:
-            import asyncio
-            import google.generativeai as genai
-            
-            # 配置API密钥
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-            
-            # 创建模型实例
-            model = genai.GenerativeModel(settings.GEMINI_MODEL)
-            
-            # 构建系统提示
-            system_prompt = "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"
-            full_prompt = f"{system_prompt}\n\n{prompt}"
-            
-            # 使用asyncio.to_thread包装同步调用（google-generativeai可能不支持原生异步）
-            def _generate():
-                response = model.generate_content(
-                    full_prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.7,
-                        max_output_tokens=4000,
-                    )
-                )
-                return response.text
-            
-            # 在线程池中执行同步调用
-            result = await asyncio.to_thread(_generate)
-            return result
-        except Exception as e:
-            logger.error(f"Gemini API调用失败: {e}")
-            raise
+        import asyncio
+        
+        genai = llm_clients.configure_gemini()
+        
+        # 创建模型实例
+        model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        
+        # 构建系统提示
+        system_prompt = "你是一位专业的品牌分析师，擅长分析品牌形象、用户反馈和市场趋势。"
+        full_prompt = f"{system_prompt}\n\n{prompt}"
+        
+        # 使用asyncio.to_thread包装同步调用（google-generativeai可能不支持原生异步）
+        def _generate():
+            response = model.generate_content(
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    max_output_tokens=max_tokens or 4000,
+                ),
+                request_options={"timeout": settings.LLM_REQUEST_TIMEOUT}
+            )
+            return response.text
+        
+        # 在线程池中执行同步调用
+        return await asyncio.to_thread(_generate)
     
-    async def _call_claude(self, prompt: str) -> str:
+    async def _call_claude(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """调用Claude API"""
-        try:
-            from anthropic import AsyncAnthropic
-            
-            client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
-            
-            message = await client.messages.create(
-                model=settings.ANTHROPIC_MODEL,
-                max_tokens=4000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            return message.content[0].text
-        except Exception as e:
-            logger.error(f"Claude API调用失败: {e}")
-            raise
+        client = llm_clients.anthropic_client()
+        
+        message = await client.messages.create(
+            model=settings.ANTHROPIC_MODEL,
+            max_tokens=max_tokens or 4000,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        
+        return message.content[0].text
     
-    async def _call_local_llm(self, prompt: str) -> str:
+    async def _call_local_llm(self, prompt: str, max_tokens: Optional[int] = None) -> str:
         """调用本地LLM"""
-        try:
-            import httpx
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    settings.LOCAL_LLM_URL,
-                    json={
-                        "model": settings.LOCAL_LLM_MODEL,
-                        "prompt": prompt,
-                        "max_tokens": 4000
-                    },
-                    timeout=60.0
-                )
-                response.raise_for_status()
-                return response.json().get("text", "分析完成")
-        except Exception as e:
-            logger.error(f"本地LLM调用失败: {e}")
-            raise
+        client = llm_clients.http_client(PROVIDER_LOCAL)
+        
+        response = await client.post(
+            settings.LOCAL_LLM_URL,
+            json={
+                "model": settings.LOCAL_LLM_MODEL,
+                "prompt": prompt,
+                "max_tokens": max_tokens or 4000
+            }
+        )
+        response.raise_for_status()
+        return response.json().get("text", "分析完成")
     
     def _get_llm_model(self) -> Optional[str]:
         """获取当前使用的LLM模型"""
@@ -764,66 +747,45 @@ class AIService:
         else:
             return None
 
-    async def analyze_image_sequence(self, image_paths: List[str], prompt: str = None) -> Dict[str, Any]:
-        """分析图片序列（用于图文笔记）"""
+    async def analyze_image_sequence(
+        self,
+        image_paths: List[str],
+        prompt: str = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """分析图片序列（用于图文笔记），相同图片、提示词和模型的结果从LLM响应缓存读取"""
         try:
-            import base64
-            import cv2
-            import numpy as np
-            from openai import AsyncOpenAI
-            
+            import asyncio
+
             if not image_paths:
                 return {"success": False, "error": "图片列表为空"}
-                
-            # 读取图片并转base64
-            base64_frames = []
-            # 限制图片数量，避免API报错 (例如 max allowed 16)
-            # 将限制降低到 5 张，并压缩图片
-            limit_count = 5
 
-            logger.info(f"开始处理图片序列，共 {len(image_paths)} 张，选取前 {limit_count} 张处理")
-            
-            # 使用均匀采样策略，而不是简单的 [:limit_count]
-            selected_paths = []
-            if len(image_paths) <= limit_count:
-                selected_paths = image_paths
-            else:
-                # 总是保留第一张和最后一张
-                step = (len(image_paths) - 1) / (limit_count - 1)
-                selected_indices = [int(i * step) for i in range(limit_count)]
-                selected_indices = sorted(list(set(selected_indices))) # 去重并排序
-                selected_paths = [image_paths[i] for i in selected_indices]
-            
-            for img_path in selected_paths:
-                if os.path.exists(img_path):
-                    try:
-                        # 使用 cv2 读取以支持图片压缩
-                        # 注意：Windows路径包含中文时 cv2.imread 可能失败，使用 imdecode
-                        img_array = np.fromfile(img_path, np.uint8)
-                        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-                        
-                        if img is None:
-                            logger.warning(f"无法读取图片: {img_path}")
-                            continue
-                            
-                        # 调整尺寸以减少 Token 消耗 (最大边长 1024)
-                        h, w = img.shape[:2]
-                        max_size = 1024
-                        if max(h, w) > max_size:
-                            scale = max_size / max(h, w)
-                            img = cv2.resize(img, (int(w * scale), int(h * scale)))
-                        
-                        # 压缩质量 80
-                        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 80]
-                        _, buffer = cv2.imencode(".jpg", img, encode_param)
-                        base64_frames.append(base64.b64encode(buffer).decode("utf-8"))
-                        
-                    except Exception as img_err:
-                        logger.warning(f"处理图片失败 {img_path}: {img_err}")
-                        # Fallback to direct read if cv2 fails
-                        with open(img_path, "rb") as f:
-                            base64_frames.append(base64.b64encode(f.read()).decode("utf-8"))
-            
+            logger.info(f"开始处理图片序列，共 {len(image_paths)} 张，最多选取 {IMAGE_LIMIT} 张处理")
+            base64_frames = await asyncio.to_thread(load_image_frames, image_paths)
+        except Exception as e:
+            logger.error(f"图片序列分析失败: {e}")
+            return {"success": False, "error": str(e)}
+
+        return await self.analyze_image_frames(base64_frames, prompt, use_cache)
+
+    async def analyze_image_frames(
+        self,
+        base64_frames: List[str],
+        prompt: str = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        分析已压缩的图片序列（批量任务在进程池中读取图片后调用）
+
+        Args:
+            base64_frames: base64编码的JPEG图片
+            prompt: 分析提示词
+            use_cache: 是否读取LLM响应缓存
+
+        Returns:
+            分析结果
+        """
+        try:
             if not base64_frames:
                 return {"success": False, "error": "未能读取到有效图片"}
 
@@ -833,57 +795,90 @@ class AIService:
             if not (settings.LLM_API_KEY and settings.LLM_API_BASE):
                  return {"success": False, "error": "未配置 LLM_API_KEY/LLM_API_BASE，无法分析图片"}
 
-            # 调用 OpenAI 兼容接口
-            client = AsyncOpenAI(
-                api_key=settings.LLM_API_KEY,
-                base_url=settings.LLM_API_BASE
+            return await self._analyze_frames(
+                LLMResponseCache.IMAGES,
+                base64_frames,
+                prompt or self._get_default_image_prompt(),
+                "Image-Sequence",
+                use_cache
             )
-            
-            if not prompt:
-                # 稍微修改一下提示词以适应图片
-                prompt = """
-                请详细分析这一系列图片的内容（这是一篇图文笔记的图片）。包含以下几个方面：
-                1. 图片的主要画面描述（发生了什么，场景，人物等）。
-                2. 图片中的文字信息（如果可见，非常重要）。
-                3. 整体的情感倾向和氛围。
-                4. 总结内容的核心主题。
-                
-                请以 JSON 格式输出，包含以下字段：
-                - summary: 内容综述
-                - visual_description: 视觉画面描述
-                - text_content: 图片中的文字内容提取
-                - sentiment: 情感分析
-                - key_information: 关键信息提取
-                """
-
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        *map(lambda x: {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{x}"}}, base64_frames),
-                    ],
-                }
-            ]
 
-            model_name = settings.LLM_MODEL_NAME or "gpt-4o-mini"
-            logger.info(f"正在调用 LLM ({model_name}) 分析图片序列...")
+        except Exception as e:
+            logger.error(f"图片序列分析失败: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _analyze_frames(
+        self,
+        kind: str,
+        base64_frames: List[str],
+        prompt: str,
+        label: str,
+        use_cache: bool
+    ) -> Dict[str, Any]:
+        """调用 OpenAI 兼容接口分析图片/视频帧（复用网关长连接客户端），结果写入LLM响应缓存"""
+        client = llm_clients.openai_client(PROVIDER_GATEWAY)
 
-            response = await client.chat.completions.create(
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    *map(lambda x: {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{x}"}}, base64_frames),
+                ],
+            }
+        ]
+
+        model_name = settings.LLM_MODEL_NAME or "gpt-4o-mini" # 确保模型支持 Vision
+        cache_key = llm_cache.make_key(
+            kind,
+            model=model_name, prompt=prompt, temperature=0.7,
+            frames=[llm_cache.hash_bytes([frame.encode("ascii")]) for frame in base64_frames]
+        )
+        cached = self._get_cached_media_result(kind, cache_key, use_cache)
+        if cached is not None:
+            return cached
+
+        logger.info(f"正在调用 LLM ({model_name}) 分析 {len(base64_frames)} 帧...")
+
+        response = await llm_clients.execute(
+            PROVIDER_GATEWAY,
+            lambda: client.chat.completions.create(
                 model=model_name,
                 messages=messages,
                 max_tokens=2000,
-                temperature=0.7
-            )
-            
-            result_text = response.choices[0].message.content
-            return self._parse_video_analysis_result(result_text, f"Image-Sequence ({model_name})")
+                temperature=0.7,
+                timeout=settings.LLM_VISION_TIMEOUT
+            ),
+            estimated_tokens=estimate_tokens(prompt, 2000) + IMAGE_TOKENS * len(base64_frames)
+        )
 
-        except Exception as e:
-            logger.error(f"图片序列分析失败: {e}")
-            return {"success": False, "error": str(e)}
+        result_text = response.choices[0].message.content
+        result = self._parse_video_analysis_result(result_text, f"{label} ({model_name})")
+        llm_cache.set(kind, cache_key, result)
+        return result
 
-    async def analyze_video_content(self, video_source: str, prompt: str = None) -> Dict[str, Any]:
+    def video_mode(self) -> Optional[str]:
+        """
+        视频分析模式（Gemini 熔断时切换到 OpenAI 兼容模式）
+
+        Returns:
+            "gemini"、"openai"，未配置时返回None
+        """
+        gateway_configured = bool(settings.LLM_API_KEY and settings.LLM_API_BASE)
+        gemini_open = llm_clients.breaker(PROVIDER_GEMINI).state == "open"
+        if settings.GEMINI_API_KEY and not (gemini_open and gateway_configured):
+            return "gemini"
+        if gateway_configured:
+            return "openai"
+        return None
+
+    async def analyze_video_content(
+        self,
+        video_source: str,
+        prompt: str = None,
+        use_cache: bool = True,
+        download_path: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         分析视频内容（包括画面和语音）
         支持两种模式：
@@ -893,28 +888,118 @@ class AIService:
         Args:
             video_source: 视频URL或本地路径
             prompt: 分析提示词
+            use_cache: 是否读取LLM响应缓存（按视频内容/视频帧哈希）
+            download_path: 远程视频的保存路径（如 data/crawled_data/{platform}/{id}/video.mp4），
+                默认保存到 VIDEO_DOWNLOAD_DIR
 
         Returns:
             分析结果
         """
-        # 模式选择逻辑
-        if settings.GEMINI_API_KEY:
-            return await self._analyze_video_with_gemini(video_source, prompt)
-        elif settings.LLM_API_KEY and settings.LLM_API_BASE:
-            return await self._analyze_video_with_openai_compatible(video_source, prompt)
+        mode = self.video_mode()
+        if mode == "gemini":
+            return await self._analyze_video_with_gemini(video_source, prompt, use_cache, download_path)
+        elif mode == "openai":
+            return await self._analyze_video_with_openai_compatible(video_source, prompt, use_cache, download_path)
         else:
             return {
                 "success": False,
                 "error": "未配置 AI API Key。请配置 GEMINI_API_KEY (推荐) 或 LLM_API_KEY/LLM_API_BASE。"
             }
 
+    async def analyze_video_frames(
+        self,
+        base64_frames: List[str],
+        prompt: str = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        使用 OpenAI 兼容接口分析已抽取的视频帧（批量任务在进程池中抽帧后调用）
+
+        Args:
+            base64_frames: base64编码的JPEG帧
+            prompt: 分析提示词
+            use_cache: 是否读取LLM响应缓存
+
+        Returns:
+            分析结果
+        """
+        if not base64_frames:
+            return {"success": False, "error": "未能提取到视频帧"}
+        try:
+            return await self._analyze_frames(
+                LLMResponseCache.VIDEO,
+                base64_frames,
+                prompt or self._get_default_video_prompt(),
+                "OpenAI-Compatible",
+                use_cache
+            )
+        except Exception as e:
+            logger.error(f"OpenAI兼容模式视频分析失败: {e}")
+            return {"success": False, "error": str(e)}
+
+    def _get_cached_media_result(self, kind: str, cache_key: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+        """读取图片/视频分析的缓存结果，跳过缓存时记录一次 bypass"""
+        if not use_cache:
+            llm_cache.record_bypass(kind)
+            return None
+        cached = llm_cache.get(kind, cache_key)
+        if cached is not None:
+            logger.info(f"媒体分析命中LLM缓存: {kind}")
+            return {**cached, "cached": True}
+        return None
+
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """按块计算文件内容哈希"""
+        def _chunks():
+            with open(file_path, "rb") as f:
+                while True:
+                    chunk = f.read(1 << 20)
+                    if not chunk:
+                        return
+                    yield chunk
+        return llm_cache.hash_bytes(_chunks())
+
+    async def _fetch_video(self, video_source: str, download_path: Optional[str] = None) -> str:
+        """
+        流式下载远程视频到本地（已下载的文件直接复用）
+
+        Raises:
+            VideoFetchError: 下载失败或超过大小上限
+        """
+        try:
+            path = await fetch_video(
+                video_source,
+                dest=Path(download_path) if download_path else None,
+                headers=self._get_common_headers()
+            )
+        except VideoFetchError as e:
+            raise VideoFetchError(f"下载视频失败: {e}") from e
+        return str(path)
+
+    @staticmethod
+    def _discard_downloaded_video(video_source: str, file_path: Optional[str], download_path: Optional[str]):
+        """不保留下载的视频时，分析完成后删除默认下载目录中的文件"""
+        if (file_path and not download_path and not settings.VIDEO_DOWNLOAD_KEEP
+                and video_source.startswith(('http://', 'https://'))):
+            try:
+                os.unlink(file_path)
+            except OSError:
+                pass
+
     def _get_common_headers(self) -> Dict[str, str]:
         return {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Referer": "https://www.douyin.com/",
         }
 
-    async def _analyze_video_with_gemini(self, video_source: str, prompt: str = None) -> Dict[str, Any]:
+    async def _analyze_video_with_gemini(
+        self,
+        video_source: str,
+        prompt: str = None,
+        use_cache: bool = True,
+        download_path: Optional[str] = None
+    ) -> Dict[str, Any]:
         """使用 Gemini 原生 File API 分析视频"""
         temp_file_path = None
         try:
@@ -922,36 +1007,32 @@ class AIService:
             import asyncio
             
             # 配置API密钥
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+            llm_clients.configure_gemini()
 
             # 1. 获取视频文件
             if video_source.startswith(('http://', 'https://')):
-                # 下载视频
+                # 下载视频（流式写入磁盘）
                 logger.info(f"正在下载视频(Gemini模式): {video_source}")
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-                temp_file.close()
-                temp_file_path = temp_file.name
-                
-                async with httpx.AsyncClient(verify=False) as client:
-                    # 增加超时时间，视频下载可能较慢
-                    # 添加 Headers 解决 403 问题
-                    resp = await client.get(
-                        video_source, 
-                        timeout=300.0, 
-                        follow_redirects=True,
-                        headers=self._get_common_headers()
-                    )
-                    if resp.status_code != 200:
-                         return {"success": False, "error": f"下载视频失败: HTTP {resp.status_code}"}
-                    
-                    with open(temp_file_path, "wb") as f:
-                        f.write(resp.content)
+                temp_file_path = await self._fetch_video(video_source, download_path)
             else:
                 # 本地文件
                 temp_file_path = video_source
                 if not os.path.exists(temp_file_path):
                      return {"success": False, "error": f"本地视频文件不存在: {temp_file_path}"}
 
+            # 相同视频内容、提示词和模型直接返回缓存结果（跳过上传）
+            if not prompt:
+                prompt = self._get_default_video_prompt()
+            model_name = settings.GEMINI_MODEL or "gemini-1.5-flash"
+            cache_key = llm_cache.make_key(
+                LLMResponseCache.VIDEO,
+                model=model_name, prompt=prompt, temperature=0.7,
+                video=await asyncio.to_thread(self._hash_file, temp_file_path)
+            )
+            cached = self._get_cached_media_result(LLMResponseCache.VIDEO, cache_key, use_cache)
+            if cached is not None:
+                return cached
+
             # 2. 上传到 Gemini
             logger.info(f"正在上传视频到 Gemini: {temp_file_path}")
             
@@ -972,10 +1053,6 @@ class AIService:
             logger.info(f"视频上传完成: {video_file.name}")
 
             # 3. 生成分析内容
-            if not prompt:
-                prompt = self._get_default_video_prompt()
-
-            model_name = settings.GEMINI_MODEL or "gemini-1.5-flash"
             model = genai.GenerativeModel(model_name)
             
             logger.info(f"正在使用模型 {model_name} 分析视频...")
@@ -989,97 +1066,43 @@ class AIService:
                 )
                 return response.text
 
-            result_text = await asyncio.to_thread(_generate)
+            result_text = await llm_clients.execute(PROVIDER_GEMINI, lambda: asyncio.to_thread(_generate))
             
-            return self._parse_video_analysis_result(result_text, model_name)
+            result = self._parse_video_analysis_result(result_text, model_name)
+            llm_cache.set(LLMResponseCache.VIDEO, cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"Gemini视频分析失败: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            if temp_file_path and video_source.startswith(('http://', 'https://')):
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            self._discard_downloaded_video(video_source, temp_file_path, download_path)
 
-    async def _analyze_video_with_openai_compatible(self, video_source: str, prompt: str = None) -> Dict[str, Any]:
+    async def _analyze_video_with_openai_compatible(
+        self,
+        video_source: str,
+        prompt: str = None,
+        use_cache: bool = True,
+        download_path: Optional[str] = None
+    ) -> Dict[str, Any]:
         """使用 OpenAI 兼容接口 (Vision) 分析视频 - 采用均匀抽帧策略"""
         temp_file_path = None
         try:
-            import cv2
-            import base64
             import asyncio
-            from openai import AsyncOpenAI
 
-            # 1. 下载视频
+            # 1. 下载视频（流式写入磁盘）
             if video_source.startswith(('http://', 'https://')):
                 logger.info(f"正在下载视频(OpenAI兼容模式): {video_source}")
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-                temp_file.close()
-                temp_file_path = temp_file.name
-                
-                async with httpx.AsyncClient(verify=False) as client:
-                    resp = await client.get(
-                        video_source, 
-                        timeout=300.0, 
-                        follow_redirects=True,
-                        headers=self._get_common_headers()
-                    )
-                    if resp.status_code != 200:
-                         return {"success": False, "error": f"下载视频失败: HTTP {resp.status_code}"}
-                    
-                    with open(temp_file_path, "wb") as f:
-                        f.write(resp.content)
+                temp_file_path = await self._fetch_video(video_source, download_path)
             else:
                 temp_file_path = video_source
                 if not os.path.exists(temp_file_path):
                      return {"success": False, "error": f"本地视频文件不存在: {temp_file_path}"}
 
-            # 2. 均匀抽帧 (高密度模式)
-            logger.info(f"正在对视频进行高密度抽帧处理: {temp_file_path}")
-            
-            def _extract_frames(video_path, max_frames=8): # 降低到8帧，避免 Error code: 500 - too many images
-                cap = cv2.VideoCapture(video_path)
-                if not cap.isOpened():
-                    raise Exception("无法打开视频文件")
-                
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                if total_frames <= 0:
-                    # 尝试读取一些帧来估算或直接按顺序读取
-                    total_frames = 1000 # Fallback
-                
-                frames = []
-                # 计算步长，确保均匀覆盖整个视频
-                # 即使视频很短，也尽量多采几帧；如果视频很长，则均匀稀疏采样
-                step = max(1, total_frames // max_frames)
-                
-                for i in range(max_frames):
-                    frame_idx = i * step
-                    if frame_idx >= total_frames:
-                        break
-                        
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                    ret, frame = cap.read()
-                    if ret:
-                        # 调整尺寸以减少 Token 消耗 (例如最大边长 512)
-                        h, w = frame.shape[:2]
-                        if max(h, w) > 512:
-                            scale = 512 / max(h, w)
-                            frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
-                        
-                        _, buffer = cv2.imencode(".jpg", frame)
-                        base64_frame = base64.b64encode(buffer).decode("utf-8")
-                        frames.append(base64_frame)
-                    else:
-                        break
-                
-                cap.release()
-                return frames
-
-            # 在线程池中运行抽帧，避免阻塞
+            # 2. 均匀抽帧（在线程池中运行，避免阻塞）
+            logger.info(f"正在对视频进行抽帧处理: {temp_file_path}")
             try:
-                base64_frames = await asyncio.to_thread(_extract_frames, temp_file_path)
+                base64_frames = await asyncio.to_thread(extract_video_frames, temp_file_path)
             except ImportError:
                 return {"success": False, "error": "未安装 opencv-python-headless，无法进行视频抽帧。请运行 `pip install opencv-python-headless`"}
             except Exception as e:
@@ -1091,46 +1114,29 @@ class AIService:
             logger.info(f"抽帧完成，共提取 {len(base64_frames)} 帧")
 
             # 3. 调用 OpenAI 兼容接口
-            client = AsyncOpenAI(
-                api_key=settings.LLM_API_KEY,
-                base_url=settings.LLM_API_BASE
-            )
-            
-            if not prompt:
-                prompt = self._get_default_video_prompt()
-
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        *map(lambda x: {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{x}"}}, base64_frames),
-                    ],
-                }
-            ]
-
-            model_name = settings.LLM_MODEL_NAME or "gpt-4o-mini" # 确保模型支持 Vision
-            logger.info(f"正在调用 LLM ({model_name}) 分析视频帧...")
-
-            response = await client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                max_tokens=2000,
-                temperature=0.7
-            )
-            
-            result_text = response.choices[0].message.content
-            return self._parse_video_analysis_result(result_text, f"OpenAI-Compatible ({model_name})")
+            return await self.analyze_video_frames(base64_frames, prompt, use_cache)
 
         except Exception as e:
             logger.error(f"OpenAI兼容模式视频分析失败: {e}")
             return {"success": False, "error": str(e)}
         finally:
-            if temp_file_path and video_source.startswith(('http://', 'https://')):
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+            self._discard_downloaded_video(video_source, temp_file_path, download_path)
+
+    def _get_default_image_prompt(self) -> str:
+        return """
+        请详细分析这一系列图片的内容（这是一篇图文笔记的图片）。包含以下几个方面：
+        1. 图片的主要画面描述（发生了什么，场景，人物等）。
+        2. 图片中的文字信息（如果可见，非常重要）。
+        3. 整体的情感倾向和氛围。
+        4. 总结内容的核心主题。
+        
+        请以 JSON 格式输出，包含以下字段：
+        - summary: 内容综述
+        - visual_description: 视觉画面描述
+        - text_content: 图片中的文字内容提取
+        - sentiment: 情感分析
+        - key_information: 关键信息提取
+        """
 
     def _get_default_video_prompt(self) -> str:
         return """
@@ -0,0 +1,484 @@
+"""
+品牌分析可合并聚合状态
+把计数、情感计数、按日统计、互动总量、词频等保存为可合并的聚合值，
+增量分析时只需处理新爬取的数据并合并到上次的聚合状态中
+"""
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from collections import Counter
+from datetime import datetime, timedelta
+import heapq
+import random
+
+import jieba.analyse
+import numpy as np
+
+from config import settings
+from app.services.topic_engine import TopicModel
+from app.services.sentiment_engine import (
+    sentiment_engine,
+    normalize_date_key,
+    POSITIVE_THRESHOLD,
+    NEGATIVE_THRESHOLD
+)
+
+
+def _empty_tally() -> Dict[str, float]:
+    """情感计数"""
+    return {"total": 0, "positive": 0, "negative": 0, "score_sum": 0.0}
+
+
+def _merge_tally(target: Dict[str, float], source: Dict[str, float]):
+    for key in ("total", "positive", "negative", "score_sum"):
+        target[key] = target.get(key, 0) + source.get(key, 0)
+
+
+def _tally_scores(scores: np.ndarray) -> Dict[str, float]:
+    return {
+        "total": int(scores.size),
+        "positive": int(np.count_nonzero(scores > POSITIVE_THRESHOLD)),
+        "negative": int(np.count_nonzero(scores < NEGATIVE_THRESHOLD)),
+        "score_sum": float(scores.sum())
+    }
+
+
+def _tally_summary(tally: Dict[str, float]) -> Dict[str, Any]:
+    return sentiment_engine.summarize_counts(
+        total=int(tally["total"]),
+        positive_count=int(tally["positive"]),
+        negative_count=int(tally["negative"]),
+        score_sum=float(tally["score_sum"])
+    )
+
+
+def _post_score(item: Dict[str, Any]) -> int:
+    """互动分数（与 AIService.analyze_top_posts 一致）"""
+    likes = item.get("likes", 0) or 0
+    comments = item.get("comments_count", 0) or 0
+    shares = item.get("shares", 0) or 0
+    return likes + comments * 2 + shares * 5
+
+
+class BrandAnalysisAggregate:
+    """品牌分析聚合状态"""
+
+    # 聚合结构版本，结构变化时旧的聚合状态不再用于增量合并
+    VERSION = 2
+
+    # 热门内容候选数量
+    TOP_POSTS_K = 20
+
+    # 热门内容候选保留的正文字符数（结果中只展示前100个字符）
+    TOP_POST_CONTENT_CHARS = 1000
+
+    def __init__(
+        self,
+        include_sentiment: bool = True,
+        max_terms: Optional[int] = None,
+        sample_size: Optional[int] = None,
+        topic_model: Optional[TopicModel] = None,
+        sample_text_chars: Optional[int] = None
+    ):
+        """
+        Args:
+            include_sentiment: 是否统计情感
+            max_terms: 保存时保留的最大词数
+            sample_size: 主题提取使用的文本样本数
+            topic_model: 主题模型，每批数据都会用于增量训练（单独保存，不包含在 to_document 中）
+            sample_text_chars: 文本样本中每条文本保留的最大字符数
+        """
+        self.include_sentiment = include_sentiment
+        self.topic_model = topic_model
+        self.max_terms = max_terms or settings.ANALYSIS_AGGREGATE_MAX_TERMS
+        self.sample_size = sample_size or settings.ANALYSIS_TOPIC_SAMPLE_SIZE
+        self.sample_text_chars = sample_text_chars or settings.ANALYSIS_SAMPLE_TEXT_MAX_CHARS
+
+        self.item_count = 0
+        self.text_count = 0
+        self.char_count = 0
+        # 已处理数据的最大服务端写入时间 ingested_at（增量分析的水位线）
+        self.watermark: Optional[datetime] = None
+        # 水位线前 overlap 秒内写入的已处理数据 {_id: [ingested_at, updated_at]}，
+        # 增量分析重新读取这段时间的数据时按 _id 跳过，并检查其是否被更新
+        self.recent: Dict[Any, List[Optional[datetime]]] = {}
+        # 最近一次全量分析的时间
+        self.full_built_at: Optional[datetime] = None
+
+        self.sentiment = _empty_tally()
+        self.by_day: Dict[str, Dict[str, float]] = {}
+        # {platform: {items, texts, chars, likes, comments, shares, sentiment}}
+        self.platforms: Dict[str, Dict[str, Any]] = {}
+        self.interactions = {"likes": 0, "comments": 0, "shares": 0}
+
+        # 词频（长度>=2的词）及去除停用词后的总词数（用于TF-IDF归一化）
+        self.term_freq: Counter = Counter()
+        self.keyword_total = 0
+
+        # 热门内容候选
+        self.top_candidates: List[Dict[str, Any]] = []
+        # 文本样本 [随机键, 文本, 平台]：保留随机键最小的 sample_size 条文本，合并后仍是均匀样本，
+        # 用于主题提取和LLM洞察的代表性文本选择
+        self.text_sample: List[List[Any]] = []
+
+    def _platform_entry(self, platform: str) -> Dict[str, Any]:
+        if platform not in self.platforms:
+            self.platforms[platform] = {
+                "items": 0,
+                "texts": 0,
+                "chars": 0,
+                "likes": 0,
+                "comments": 0,
+                "shares": 0,
+                "sentiment": _empty_tally()
+            }
+        return self.platforms[platform]
+
+    def add_items(self, items: Iterable[Dict[str, Any]]):
+        """
+        将一批原始数据合并到聚合状态（recent 中已处理过的数据跳过）
+
+        Args:
+            items: MongoDB raw_data 文档
+        """
+        from app.services.data_processor import data_processor
+        from app.services.ai_service import ai_service
+
+        texts = []
+        text_platforms = []
+        text_dates = []
+        processed_items = []
+
+        for item in items:
+            object_id = item.get("_id")
+            if object_id is not None and object_id in self.recent:
+                continue
+            ingested_at = item.get("ingested_at")
+            if ingested_at is not None:
+                if self.watermark is None or ingested_at > self.watermark:
+                    self.watermark = ingested_at
+                if object_id is not None:
+                    self.recent[object_id] = [ingested_at, item.get("updated_at")]
+
+            platform = item.get("platform", "unknown")
+            processed_item = data_processor.extract_text_from_item(item, platform)
+            processed_items.append(processed_item)
+
+            text_items = []
+            if processed_item["title"]:
+                text_items.append(processed_item["title"])
+            if processed_item["content"]:
+                text_items.append(processed_item["content"])
+            if processed_item["comments"]:
+                text_items.extend(processed_item["comments"])
+
+            texts.extend(text_items)
+            text_platforms.extend([platform] * len(text_items))
+            text_dates.extend([processed_item.get("date")] * len(text_items))
+
+            likes = processed_item.get("likes", 0) or 0
+            comments = processed_item.get("comments_count", 0) or 0
+            shares = processed_item.get("shares", 0) or 0
+            entry = self._platform_entry(platform)
+            entry["items"] += 1
+            entry["texts"] += len(text_items)
+            entry["chars"] += sum(len(t) for t in text_items)
+            entry["likes"] += likes
+            entry["comments"] += comments
+            entry["shares"] += shares
+            self.interactions["likes"] += likes
+            self.interactions["comments"] += comments
+            self.interactions["shares"] += shares
+
+        self.item_count += len(processed_items)
+        self.text_count += len(texts)
+        self.char_count += sum(len(t) for t in texts)
+
+        self._merge_top_candidates(processed_items)
+        self._merge_sample([[random.random(), text, platform] for text, platform in zip(texts, text_platforms)])
+
+        # 词频（一次分词构建文档-词矩阵）
+        if texts:
+            term_matrix = ai_service.build_term_matrix(texts)
+            counts = term_matrix.term_counts()
+            self.term_freq.update(dict(zip(term_matrix.terms, counts.tolist())))
+            self.keyword_total += int(counts[term_matrix.keyword_mask()].sum())
+            if self.topic_model is not None:
+                self.topic_model.partial_fit(term_matrix)
+
+        # 情感计数（整体、按平台、按日期共用一次打分）
+        if self.include_sentiment and texts:
+            scores = sentiment_engine.score_texts(texts)
+            _merge_tally(self.sentiment, _tally_scores(scores))
+
+            platform_array = np.array(text_platforms, dtype=object)
+            for platform in set(text_platforms):
+                _merge_tally(
+                    self._platform_entry(platform)["sentiment"],
+                    _tally_scores(scores[platform_array == platform])
+                )
+
+            date_keys = np.array([normalize_date_key(d) or "" for d in text_dates], dtype=object)
+            for date_key in set(date_keys.tolist()):
+                if not date_key:
+                    continue
+                _merge_tally(
+                    self.by_day.setdefault(date_key, _empty_tally()),
+                    _tally_scores(scores[date_keys == date_key])
+                )
+
+    def _merge_top_candidates(self, items: List[Dict[str, Any]]):
+        candidates = self.top_candidates + [
+            {
+                "title": item.get("title", ""),
+                "content": (item.get("content") or "")[:self.TOP_POST_CONTENT_CHARS],
+                "platform": item.get("platform", ""),
+                "author": item.get("author", ""),
+                "likes": item.get("likes", 0),
+                "comments_count": item.get("comments_count", 0),
+                "shares": item.get("shares", 0),
+                "url": item.get("url", "")
+            }
+            for item in heapq.nlargest(self.TOP_POSTS_K, items, key=_post_score)
+        ]
+        self.top_candidates = heapq.nlargest(self.TOP_POSTS_K, candidates, key=_post_score)
+
+    def _merge_sample(self, keyed_texts: List[List[Any]]):
+        # 长文本截断后保存，聚合文档大小与原文长度无关
+        self.text_sample = [
+            [entry[0], entry[1][:self.sample_text_chars], *entry[2:]]
+            for entry in heapq.nsmallest(
+                self.sample_size,
+                self.text_sample + keyed_texts,
+                key=lambda pair: pair[0]
+            )
+        ]
+
+    def merge(self, other: "BrandAnalysisAggregate"):
+        """
+        合并另一个聚合状态（主题模型无法合并，保留当前的主题模型）
+
+        Args:
+            other: 另一批数据的聚合状态
+        """
+        self.include_sentiment = self.include_sentiment and other.include_sentiment
+        self.item_count += other.item_count
+        self.text_count += other.text_count
+        self.char_count += other.char_count
+        if other.watermark is not None and (self.watermark is None or other.watermark > self.watermark):
+            self.watermark = other.watermark
+        self.recent.update(other.recent)
+        if self.full_built_at is None or (
+            other.full_built_at is not None and other.full_built_at < self.full_built_at
+        ):
+            self.full_built_at = other.full_built_at
+
+        _merge_tally(self.sentiment, other.sentiment)
+        for date_key, tally in other.by_day.items():
+            _merge_tally(self.by_day.setdefault(date_key, _empty_tally()), tally)
+
+        for platform, other_entry in other.platforms.items():
+            entry = self._platform_entry(platform)
+            for key in ("items", "texts", "chars", "likes", "comments", "shares"):
+                entry[key] += other_entry.get(key, 0)
+            _merge_tally(entry["sentiment"], other_entry.get("sentiment", {}))
+
+        for key in self.interactions:
+            self.interactions[key] += other.interactions.get(key, 0)
+
+        self.term_freq.update(other.term_freq)
+        self.keyword_total += other.keyword_total
+
+        self.top_candidates = heapq.nlargest(
+            self.TOP_POSTS_K,
+            self.top_candidates + other.top_candidates,
+            key=_post_score
+        )
+        self._merge_sample(other.text_sample)
+
+    def incremental_cutoff(self, overlap: Optional[float] = None) -> Optional[datetime]:
+        """
+        增量分析读取 ingested_at 晚于该时间的数据（水位线减去重叠时间），没有水位线时返回None
+
+        Args:
+            overlap: 重叠时间（秒），默认使用配置
+        """
+        if self.watermark is None:
+            return None
+        overlap = settings.ANALYSIS_INCREMENTAL_OVERLAP if overlap is None else overlap
+        return self.watermark - timedelta(seconds=overlap)
+
+    def prune_recent(self, overlap: Optional[float] = None):
+        """只保留写入时间晚于 incremental_cutoff 的已处理数据"""
+        cutoff = self.incremental_cutoff(overlap)
+        self.recent = {
+            object_id: times for object_id, times in self.recent.items()
+            if cutoff is None or times[0] > cutoff
+        }
+
+    def to_document(self) -> Dict[str, Any]:
+        """
+        导出为可保存到MongoDB的文档
+
+        词频只保留出现次数最多的 max_terms 个词（以列表保存，避免词中包含"."等字符作为字段名），
+        文本样本和热门内容的文本已截断，文档大小不随原文长度和数据量增长
+        """
+        self.prune_recent()
+        return {
+            "version": self.VERSION,
+            "include_sentiment": self.include_sentiment,
+            "item_count": self.item_count,
+            "text_count": self.text_count,
+            "char_count": self.char_count,
+            "watermark": self.watermark,
+            "recent": [[object_id, *times] for object_id, times in self.recent.items()],
+            "full_built_at": self.full_built_at,
+            "sentiment": self.sentiment,
+            "by_day": [[date_key, tally] for date_key, tally in sorted(self.by_day.items())],
+            "platforms": [[platform, entry] for platform, entry in self.platforms.items()],
+            "interactions": self.interactions,
+            "term_freq": [[word, count] for word, count in self.term_freq.most_common(self.max_terms)],
+            "keyword_total": self.keyword_total,
+            "top_candidates": self.top_candidates,
+            "text_sample": self.text_sample
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> Optional["BrandAnalysisAggregate"]:
+        """
+        从MongoDB文档恢复聚合状态
+
+        Args:
+            doc: to_document 导出的文档
+
+        Returns:
+            聚合状态，版本不一致时返回None
+        """
+        if not doc or doc.get("version") != cls.VERSION:
+            return None
+
+        aggregate = cls(include_sentiment=doc.get("include_sentiment", False))
+        aggregate.item_count = doc.get("item_count", 0)
+        aggregate.text_count = doc.get("text_count", 0)
+        aggregate.char_count = doc.get("char_count", 0)
+        aggregate.watermark = doc.get("watermark")
+        aggregate.recent = {entry[0]: list(entry[1:]) for entry in doc.get("recent", [])}
+        aggregate.full_built_at = doc.get("full_built_at")
+        aggregate.sentiment = doc.get("sentiment") or _empty_tally()
+        aggregate.by_day = {date_key: tally for date_key, tally in doc.get("by_day", [])}
+        aggregate.platforms = {platform: entry for platform, entry in doc.get("platforms", [])}
+        aggregate.interactions = doc.get("interactions") or {"likes": 0, "comments": 0, "shares": 0}
+        aggregate.term_freq = Counter({word: count for word, count in doc.get("term_freq", [])})
+        aggregate.keyword_total = doc.get("keyword_total", 0)
+        aggregate.top_candidates = doc.get("top_candidates", [])
+        aggregate.text_sample = [list(pair) for pair in doc.get("text_sample", [])]
+        return aggregate
+
+    def build_sentiment(self) -> Dict[str, Any]:
+        """情感分析结果（与 SentimentEngine.analyze 结构一致）"""
+        result = _tally_summary(self.sentiment)
+        result["by_platform"] = {
+            platform: _tally_summary(entry["sentiment"])
+            for platform, entry in self.platforms.items()
+            if entry["texts"] > 0
+        }
+
+        time_distribution = []
+        for date_key in sorted(self.by_day):
+            summary = _tally_summary(self.by_day[date_key])
+            time_distribution.append({
+                "date": date_key,
+                "positive": summary["distribution"]["positive"],
+                "negative": summary["distribution"]["negative"],
+                "neutral": summary["distribution"]["neutral"],
+                "total": summary["total"]
+            })
+        result["by_time"] = {
+            "distribution": time_distribution,
+            "total_days": len(time_distribution)
+        }
+        return result
+
+    def build_keywords(self, top_k: int = 30) -> List[Dict[str, Any]]:
+        """
+        基于累计词频计算TF-IDF关键词（与 jieba.analyse.extract_tags 的计算方式一致）
+
+        Args:
+            top_k: 返回前k个关键词
+        """
+        tfidf = jieba.analyse.default_tfidf
+        if self.keyword_total <= 0:
+            return []
+
+        weights = {}
+        for word, count in self.term_freq.items():
+            if word.lower() in tfidf.stop_words:
+                continue
+            weights[word] = count * tfidf.idf_freq.get(word, tfidf.median_idf) / self.keyword_total
+
+        return [
+            {"keyword": word, "weight": round(weight, 4)}
+            for word, weight in heapq.nlargest(top_k, weights.items(), key=lambda pair: pair[1])
+        ]
+
+    def build_topics(self, num_topics: int = 5) -> List[Dict[str, Any]]:
+        """
+        主题提取：优先使用增量训练的主题模型，
+        没有主题模型时基于文本样本提取，样本数按全量文本数折算
+        """
+        from app.services.ai_service import ai_service
+
+        if self.topic_model is not None and self.topic_model.fitted:
+            return self.topic_model.topics()
+
+        sample_texts = [entry[1] for entry in self.text_sample]
+        topics = ai_service.extract_topics(sample_texts, num_topics=num_topics)
+        if sample_texts and len(sample_texts) < self.text_count:
+            scale = self.text_count / len(sample_texts)
+            for topic in topics:
+                topic["sample_count"] = int(round(topic["sample_count"] * scale))
+        return topics
+
+    def sample_texts_by_platform(self) -> List[Tuple[str, str]]:
+        """文本样本 [(平台, 文本)]（早期版本的样本没有平台，记为 unknown）"""
+        return [
+            (entry[2] if len(entry) > 2 else "unknown", entry[1])
+            for entry in self.text_sample
+        ]
+
+    def build_text_statistics(self) -> Dict[str, Any]:
+        """文本统计结果（与 AIService.analyze_text_statistics 结构一致）"""
+        return {
+            "total_count": self.text_count,
+            "total_length": self.char_count,
+            "avg_length": round(self.char_count / self.text_count, 2) if self.text_count else 0,
+            "word_frequency": [
+                {"word": word, "count": count}
+                for word, count in self.term_freq.most_common(20)
+            ]
+        }
+
+    def build_platform_statistics(self) -> Dict[str, Any]:
+        return {
+            platform: {"total_texts": entry["texts"], "total_chars": entry["chars"]}
+            for platform, entry in self.platforms.items()
+        }
+
+    def build_interaction_statistics(self) -> Dict[str, Any]:
+        return {
+            "total_likes": self.interactions["likes"],
+            "total_comments": self.interactions["comments"],
+            "total_shares": self.interactions["shares"],
+            "by_platform": {
+                platform: {
+                    "likes": entry["likes"],
+                    "comments": entry["comments"],
+                    "shares": entry["shares"],
+                    "count": entry["items"]
+                }
+                for platform, entry in self.platforms.items()
+            }
+        }
+
+    def build_top_posts(self, top_k: int = 20) -> List[Dict[str, Any]]:
+        from app.services.ai_service import ai_service
+        return ai_service.analyze_top_posts(self.top_candidates, top_k=top_k)
+
@@ -0,0 +1,379 @@
+"""
+品牌数据统计（物化）
+brand_stats 集合按 (brand_id, platform) 保存数据条数、最近爬取时间、互动和情感累计值，
+写入、重新爬取（互动数变化）和删除 raw_data 时用 $inc 原子更新，统计接口只需按品牌读取几条文档；
+累计值出现偏差时用 rebuild_brand_stats 从 raw_data 重新统计
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from config import settings
+from app.services.sentiment_engine import POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+
+
+# 累加字段
+COUNTER_FIELDS = (
+    "count", "likes", "comments", "shares",
+    "sentiment_count", "sentiment_sum", "positive", "negative"
+)
+
+# 重新统计时每批回填 stats 的文档数
+REBUILD_BATCH_SIZE = 1000
+
+
+# 互动统计字段（raw_data.stats 中的字段名, brand_stats 中的字段名）
+INTERACTION_FIELDS = (("likes", "likes"), ("comments", "comments"), ("shares", "shares"))
+
+
+def interaction_metrics(doc: Dict[str, Any]) -> Dict[str, int]:
+    """从 raw_data 文档的原始数据中提取互动数"""
+    from app.services.data_processor import data_processor
+
+    raw = doc.get("raw_data")
+    extracted = data_processor.extract_text_from_item(raw if isinstance(raw, dict) else {}, doc.get("platform"))
+    return {
+        "likes": extracted.get("likes", 0) or 0,
+        "comments": extracted.get("comments_count", 0) or 0,
+        "shares": extracted.get("shares", 0) or 0
+    }
+
+
+def _score_sentiment(docs: List[Dict[str, Any]]):
+    """为 stats.sentiment 为空的文档计算情感分数（标题和正文分别打分后取平均）"""
+    if not settings.BRAND_STATS_SENTIMENT:
+        return
+
+    texts = []
+    text_owner = []
+    for index, doc in enumerate(docs):
+        if doc["stats"].get("sentiment") is not None:
+            continue
+        # 标题和正文分别打分（与品牌分析相同，后续分析可直接命中情感缓存）
+        for text in (doc.get("title"), doc.get("content")):
+            if text:
+                texts.append(text)
+                text_owner.append(index)
+    if not texts:
+        return
+
+    from app.services.sentiment_engine import sentiment_engine
+
+    totals: Dict[int, List[float]] = {}
+    for index, score in zip(text_owner, sentiment_engine.score_texts(texts).tolist()):
+        totals.setdefault(index, []).append(score)
+    for index, scores in totals.items():
+        docs[index]["stats"]["sentiment"] = sum(scores) / len(scores)
+
+
+def attach_metrics(docs: List[Dict[str, Any]], include_sentiment: bool = True):
+    """
+    计算每条 raw_data 文档的互动数和情感分数，保存在文档的 stats 字段
+
+    删除数据时按 stats 扣减统计，保证写入和删除使用同一份数值。
+    写入新数据时只在写入前计算互动数（include_sentiment=False），情感分数由 record_inserted
+    只为实际写入的文档计算，被唯一索引拒绝的重复数据不打分
+
+    Args:
+        docs: 待写入的 raw_data 文档（包含 platform、title、content、raw_data）
+        include_sentiment: 是否同时计算情感分数
+    """
+    for doc in docs:
+        doc["stats"] = {**interaction_metrics(doc), "sentiment": None}
+    if include_sentiment:
+        _score_sentiment(docs)
+
+
+def _accumulate(docs: Iterable[Dict[str, Any]]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+    """按 (brand_id, platform) 汇总文档的 stats"""
+    groups: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for doc in docs:
+        key = (doc["brand_id"], doc.get("platform") or "unknown")
+        group = groups.setdefault(key, {**{field: 0 for field in COUNTER_FIELDS}, "latest_crawl": None})
+        stats = doc.get("stats") or {}
+        group["count"] += 1
+        group["likes"] += stats.get("likes", 0)
+        group["comments"] += stats.get("comments", 0)
+        group["shares"] += stats.get("shares", 0)
+        score = stats.get("sentiment")
+        if score is not None:
+            group["sentiment_count"] += 1
+            group["sentiment_sum"] += score
+            group["positive"] += int(score > POSITIVE_THRESHOLD)
+            group["negative"] += int(score < NEGATIVE_THRESHOLD)
+        crawled_at = doc.get("crawled_at")
+        if crawled_at and (group["latest_crawl"] is None or crawled_at > group["latest_crawl"]):
+            group["latest_crawl"] = crawled_at
+    return groups
+
+
+def _stats_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """在 MongoDB 中按 (brand_id, platform) 汇总 raw_data 的 stats（与 _accumulate 结果一致）"""
+    score = "$stats.sentiment"
+    is_scored = {"$isNumber": score}
+    return [
+        {"$match": query},
+        {"$group": {
+            "_id": {"brand_id": "$brand_id", "platform": {"$ifNull": ["$platform", "unknown"]}},
+            "count": {"$sum": 1},
+            "likes": {"$sum": {"$ifNull": ["$stats.likes", 0]}},
+            "comments": {"$sum": {"$ifNull": ["$stats.comments", 0]}},
+            "shares": {"$sum": {"$ifNull": ["$stats.shares", 0]}},
+            "sentiment_count": {"$sum": {"$cond": [is_scored, 1, 0]}},
+            "sentiment_sum": {"$sum": {"$cond": [is_scored, score, 0]}},
+            "positive": {"$sum": {"$cond": [{"$and": [is_scored, {"$gt": [score, POSITIVE_THRESHOLD]}]}, 1, 0]}},
+            "negative": {"$sum": {"$cond": [{"$and": [is_scored, {"$lt": [score, NEGATIVE_THRESHOLD]}]}, 1, 0]}},
+            "latest_crawl": {"$max": "$crawled_at"}
+        }}
+    ]
+
+
+def _aggregate(db, query: Dict[str, Any]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+    groups = {}
+    for row in db.raw_data.aggregate(_stats_pipeline(query), allowDiskUse=True):
+        key = (row["_id"]["brand_id"], row["_id"]["platform"])
+        groups[key] = {field: row.get(field, 0) for field in COUNTER_FIELDS}
+        groups[key]["latest_crawl"] = row.get("latest_crawl")
+    return groups
+
+
+def _apply(db, groups: Dict[Tuple[int, str], Dict[str, Any]], sign: int):
+    """把汇总值原子累加到 brand_stats"""
+    now = datetime.now()
+    operations = []
+    for (brand_id, platform), group in groups.items():
+        update = {
+            "$inc": {field: sign * group[field] for field in COUNTER_FIELDS},
+            "$set": {"updated_at": now}
+        }
+        if sign > 0 and group.get("latest_crawl"):
+            update["$max"] = {"latest_crawl": group["latest_crawl"]}
+        operations.append(UpdateOne({"brand_id": brand_id, "platform": platform}, update, upsert=sign > 0))
+    if operations:
+        db.brand_stats.bulk_write(operations, ordered=False)
+
+
+def record_inserted(db, docs: List[Dict[str, Any]]):
+    """
+    为新写入的 raw_data 文档计算情感分数并写回 stats.sentiment，再累加到品牌统计
+
+    Args:
+        db: MongoDB数据库
+        docs: 已写入的文档（包含 _id、brand_id、platform、crawled_at 和 attach_metrics 计算的 stats）
+    """
+    if not docs:
+        return
+    try:
+        _score_sentiment(docs)
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"stats.sentiment": doc["stats"]["sentiment"]}})
+            for doc in docs
+            if doc.get("_id") is not None and doc["stats"].get("sentiment") is not None
+        ]
+        if operations:
+            db.raw_data.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.warning(f"计算新数据情感分数失败（可执行 scripts/rebuild_brand_stats.py 重新统计）: {e}")
+        for doc in docs:
+            doc["stats"]["sentiment"] = None
+    try:
+        _apply(db, _accumulate(docs), 1)
+    except Exception as e:
+        logger.warning(f"更新品牌统计失败（可执行 scripts/rebuild_brand_stats.py 重新统计）: {e}")
+
+
+def record_updated(db, docs: List[Dict[str, Any]], previous: Dict[Any, Dict[str, Any]]):
+    """
+    重新写入已存在的 raw_data 文档后，把互动数的变化累加到品牌统计
+
+    标题和正文不随重新爬取更新，情感分数保持不变
+
+    Args:
+        db: MongoDB数据库
+        docs: 重新写入的文档（包含 brand_id、platform、content_id 和新的 stats）
+        previous: 写入前的 stats {content_id: stats}
+    """
+    groups: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for doc in docs:
+        old = previous.get(doc["content_id"])
+        if old is None:
+            continue
+        key = (doc["brand_id"], doc.get("platform") or "unknown")
+        group = groups.setdefault(key, {field: 0 for field in COUNTER_FIELDS})
+        for stats_field, counter_field in INTERACTION_FIELDS:
+            group[counter_field] += doc["stats"].get(stats_field, 0) - (old.get(stats_field) or 0)
+    groups = {
+        key: group for key, group in groups.items()
+        if any(group[field] for field in COUNTER_FIELDS)
+    }
+    try:
+        _apply(db, groups, 1)
+    except Exception as e:
+        logger.warning(f"更新品牌统计失败（可执行 scripts/rebuild_brand_stats.py 重新统计）: {e}")
+
+
+def touch_latest_crawl(db, brand_id: int, platform: str, crawled_at: datetime):
+    """重新爬取已存在的数据时更新最近爬取时间"""
+    try:
+        db.brand_stats.update_one(
+            {"brand_id": brand_id, "platform": platform},
+            {"$max": {"latest_crawl": crawled_at}}
+        )
+    except Exception as e:
+        logger.warning(f"更新品牌最近爬取时间失败: {e}")
+
+
+def _refresh_latest_crawl(db, keys: Iterable[Tuple[int, str]]):
+    """删除数据后重新读取最近爬取时间，并移除已没有数据的统计"""
+    db.brand_stats.delete_many({"count": {"$lte": 0}})
+    for brand_id, platform in keys:
+        latest = db.raw_data.find_one(
+            {"brand_id": brand_id, "platform": platform},
+            {"crawled_at": 1},
+            sort=[("crawled_at", -1)]
+        )
+        db.brand_stats.update_one(
+            {"brand_id": brand_id, "platform": platform},
+            {"$set": {"latest_crawl": latest.get("crawled_at") if latest else None}}
+        )
+
+
+def delete_raw_data(db, query: Dict[str, Any]) -> int:
+    """
+    删除 raw_data 并扣减品牌统计
+
+    删除前按同一条件汇总待删除数据的 stats；汇总与实际删除的条数不一致时（并发写入），
+    对涉及的品牌重新统计
+
+    Args:
+        db: MongoDB数据库
+        query: 删除条件
+
+    Returns:
+        删除的条数
+    """
+    groups = _aggregate(db, query)
+    deleted_count = db.raw_data.delete_many(query).deleted_count
+
+    try:
+        if deleted_count == sum(group["count"] for group in groups.values()):
+            _apply(db, groups, -1)
+            _refresh_latest_crawl(db, groups.keys())
+        else:
+            for brand_id in {brand_id for brand_id, _ in groups}:
+                rebuild_brand_stats(db, brand_id)
+    except Exception as e:
+        logger.warning(f"更新品牌统计失败（可执行 scripts/rebuild_brand_stats.py 重新统计）: {e}")
+    return deleted_count
+
+
+def backfill_metrics(db, query: Dict[str, Any], batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    为没有 stats 字段的 raw_data 文档（统计功能上线前写入的数据）计算 stats
+
+    Returns:
+        回填的文档数
+    """
+    cursor = db.raw_data.find(
+        {**query, "stats": {"$exists": False}},
+        {"platform": 1, "title": 1, "content": 1, "raw_data": 1}
+    )
+    filled = 0
+    batch: List[Dict[str, Any]] = []
+
+    def _flush():
+        attach_metrics(batch)
+        db.raw_data.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": {"stats": doc["stats"]}}) for doc in batch],
+            ordered=False
+        )
+
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                _flush()
+                filled += len(batch)
+                batch = []
+        if batch:
+            _flush()
+            filled += len(batch)
+    finally:
+        cursor.close()
+    return filled
+
+
+def rebuild_brand_stats(db, brand_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    从 raw_data 重新统计 brand_stats（修复累计值偏差）
+
+    Args:
+        db: MongoDB数据库
+        brand_id: 品牌ID，为空时重新统计所有品牌
+
+    Returns:
+        {"backfilled": 回填 stats 的文档数, "groups": 统计的 (品牌, 平台) 数}
+    """
+    query = {"brand_id": brand_id} if brand_id is not None else {}
+    started_at = datetime.now()
+
+    backfilled = backfill_metrics(db, query)
+    groups = _aggregate(db, query)
+
+    operations = [
+        UpdateOne(
+            {"brand_id": key_brand_id, "platform": platform},
+            {"$set": {**group, "updated_at": started_at}},
+            upsert=True
+        )
+        for (key_brand_id, platform), group in groups.items()
+    ]
+    if operations:
+        db.brand_stats.bulk_write(operations, ordered=False)
+    # 没有数据的 (品牌, 平台)
+    db.brand_stats.delete_many({**query, "updated_at": {"$lt": started_at}})
+
+    logger.info(f"品牌统计已重新生成: brand_id={brand_id}, 回填 {backfilled} 条, {len(groups)} 组")
+    return {"backfilled": backfilled, "groups": len(groups)}
+
+
+async def get_brand_stats(db, brand_id: int) -> List[Dict[str, Any]]:
+    """
+    读取品牌各平台的统计
+
+    Args:
+        db: MongoDB数据库（异步客户端）
+        brand_id: 品牌ID
+
+    Returns:
+        按数据量倒序的平台统计
+    """
+    platforms = []
+    for row in await db.brand_stats.find({"brand_id": brand_id}).sort("count", -1).to_list():
+        scored = row.get("sentiment_count", 0)
+        latest_crawl = row.get("latest_crawl")
+        platforms.append({
+            "_id": row["platform"],
+            "count": row.get("count", 0),
+            "latest_crawl": latest_crawl.isoformat() if hasattr(latest_crawl, "isoformat") else latest_crawl,
+            "likes": row.get("likes", 0),
+            "comments": row.get("comments", 0),
+            "shares": row.get("shares", 0),
+            "sentiment": {
+                "scored": scored,
+                "positive": row.get("positive", 0),
+                "negative": row.get("negative", 0),
+                "avg_score": row.get("sentiment_sum", 0) / scored if scored else None
+            }
+        })
+    return platforms
+
+
+async def count_items(db, brand_id: int, platform: Optional[str] = None) -> int:
+    """品牌（平台）的数据条数（db 为异步客户端）"""
+    query = {"brand_id": brand_id}
+    if platform:
+        query["platform"] = platform
+    return sum(row.get("count", 0) for row in await db.brand_stats.find(query, {"count": 1}).to_list())
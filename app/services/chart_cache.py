@@ -0,0 +1,139 @@
+"""
+分析图表缓存
+已完成分析任务的结果不再变化，图表按 analysis_task_id + 图表样式版本 + 图片格式只绘制一次，
+PNG/SVG文件保存在磁盘上，通过URL（带ETag、长期缓存）提供，报表直接读取缓存的图片
+"""
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import base64
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+
+from loguru import logger
+
+from config import settings
+from app.services.report_service import report_service, CHART_STYLE_VERSION
+from app.services.chart_renderer import IMAGE_FORMATS
+
+
+# 图表名称（只允许小写字母和下划线，避免路径穿越）
+CHART_NAME_PATTERN = re.compile(r"[a-z_]+")
+
+# 图表索引文件（记录该分析任务生成了哪些图表）
+INDEX_FILE = "index.json"
+
+
+class ChartCache:
+    """已完成分析任务的图表缓存"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        初始化图表缓存
+
+        Args:
+            cache_dir: 缓存目录，默认使用配置
+        """
+        self.cache_dir = Path(cache_dir or settings.CHART_CACHE_DIR)
+        self._lock = threading.Lock()
+
+    def _task_dir(self, analysis_task_id: int, fmt: str = "png") -> Path:
+        """分析任务的图表目录"""
+        return self.cache_dir / f"{analysis_task_id}-v{CHART_STYLE_VERSION}" / fmt
+
+    def load_index(self, analysis_task_id: int, fmt: str = "png") -> Optional[List[str]]:
+        """读取已缓存的图表名称，没有缓存时返回None"""
+        try:
+            with open(self._task_dir(analysis_task_id, fmt) / INDEX_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ensure(self, analysis_task_id: int, analysis_result: Dict[str, Any], fmt: str = "png") -> List[str]:
+        """
+        获取分析任务的图表名称，没有缓存时绘制并保存
+
+        Args:
+            analysis_task_id: 分析任务ID
+            analysis_result: 分析结果
+            fmt: 图片格式，png 或 svg
+
+        Returns:
+            图表名称列表
+        """
+        names = self.load_index(analysis_task_id, fmt)
+        if names is not None:
+            return names
+
+        with self._lock:
+            names = self.load_index(analysis_task_id, fmt)
+            if names is not None:
+                return names
+
+            images = report_service.render_chart_images(analysis_result, fmt)
+            names = sorted(images)
+
+            # 先写入临时目录再整体替换，其他进程不会读到写了一半的图表
+            task_dir = self._task_dir(analysis_task_id, fmt)
+            tmp_dir = task_dir.parent / f".{fmt}.{uuid.uuid4().hex}"
+            tmp_dir.mkdir(parents=True)
+            try:
+                for name, image in images.items():
+                    (tmp_dir / f"{name}.{fmt}").write_bytes(image)
+                with open(tmp_dir / INDEX_FILE, "w", encoding="utf-8") as f:
+                    json.dump(names, f)
+                os.replace(tmp_dir, task_dir)
+                logger.info(f"分析任务 {analysis_task_id} 的图表已缓存: {names}")
+            except OSError as e:
+                # 其他进程已经写入了同一目录
+                logger.debug(f"保存图表缓存失败: {e}")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return names
+
+    def chart_path(self, analysis_task_id: int, name: str, fmt: str = "png") -> Optional[Path]:
+        """已缓存图表的文件路径，不存在时返回None"""
+        if not CHART_NAME_PATTERN.fullmatch(name) or fmt not in IMAGE_FORMATS:
+            return None
+        path = self._task_dir(analysis_task_id, fmt) / f"{name}.{fmt}"
+        return path if path.exists() else None
+
+    @staticmethod
+    def etag(analysis_task_id: int, name: str, fmt: str = "png") -> str:
+        """图表的ETag（同一分析任务和样式版本的图表内容不变）"""
+        return f'"{analysis_task_id}-v{CHART_STYLE_VERSION}-{name}.{fmt}"'
+
+    @staticmethod
+    def chart_urls(analysis_task_id: int, names: List[str], fmt: str = "png") -> Dict[str, str]:
+        """图表名称到访问URL的映射"""
+        return {
+            name: f"/api/v1/analysis-tasks/{analysis_task_id}/charts/{name}.{fmt}?v={CHART_STYLE_VERSION}"
+            for name in names
+        }
+
+    def get_base64(self, analysis_task_id: int, analysis_result: Dict[str, Any]) -> Dict[str, str]:
+        """
+        获取base64编码的图表（用于HTML/PDF报表内嵌图片）
+
+        Args:
+            analysis_task_id: 分析任务ID
+            analysis_result: 分析结果
+
+        Returns:
+            图表字典，key为图表名称，value为base64编码的图片
+        """
+        charts = {}
+        for name in self.ensure(analysis_task_id, analysis_result):
+            path = self.chart_path(analysis_task_id, name)
+            if path is None:
+                # 缓存写入失败或被清理，直接绘制
+                return report_service.generate_charts(analysis_result)
+            charts[name] = base64.b64encode(path.read_bytes()).decode("utf-8")
+        return charts
+
+
+# 创建全局实例
+chart_cache = ChartCache()
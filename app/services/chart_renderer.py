@@ -0,0 +1,312 @@
+"""
+图表绘制
+先把分析结果整理成与绘图库无关的图表描述，再按需绘制为 PNG/SVG（matplotlib 面向对象的 Agg 接口，
+不使用 pyplot 全局状态，可在多个进程/线程中并行绘制），或转换为 ECharts 配置交给前端渲染。
+本模块的函数都定义在顶层，可以直接提交到进程池
+"""
+from typing import Any, Dict
+import io
+
+from loguru import logger
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
+
+# 配置中文字体
+try:
+    # 尝试使用系统中文字体
+    rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS', 'DejaVu Sans']
+    rcParams['axes.unicode_minus'] = False
+except:
+    pass
+
+
+# 支持的图片格式
+IMAGE_FORMATS = ("png", "svg")
+
+PLATFORM_NAMES = {
+    "xhs": "小红书",
+    "douyin": "抖音",
+    "weibo": "微博",
+    "zhihu": "知乎",
+    "bilibili": "B站"
+}
+
+SENTIMENT_SERIES = [("positive", "正面", "#4CAF50"), ("neutral", "中性", "#FFC107"), ("negative", "负面", "#F44336")]
+INTERACTION_SERIES = [("likes", "点赞", "#FF7043"), ("comments", "评论", "#42A5F5"), ("shares", "分享", "#66BB6A")]
+
+
+def chart_specs(analysis_result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    从分析结果中整理各图表的数据（只包含有数据的图表）
+
+    Args:
+        analysis_result: 分析结果
+
+    Returns:
+        图表描述字典，key为图表名称，value包括 kind（pie/bar/grouped_bar/line/hbar）、标题、分类和数据序列
+    """
+    specs = {}
+
+    # 1. 情感分析饼图
+    sentiment = analysis_result.get("sentiment", {}) or {}
+    distribution = sentiment.get("distribution", {})
+    if distribution:
+        values = [distribution.get("positive", 0), distribution.get("negative", 0), distribution.get("neutral", 0)]
+        if sum(values) > 0:
+            specs["sentiment_pie"] = {
+                "kind": "pie",
+                "title": "情感分析分布",
+                "labels": ["正面", "负面", "中性"],
+                "values": values,
+                "colors": ['#4CAF50', '#F44336', '#FFC107'],
+                "size": (8, 8)
+            }
+
+    # 2. 按平台情感分析柱状图
+    sentiment_by_platform = sentiment.get("by_platform", {})
+    if sentiment_by_platform:
+        platforms = list(sentiment_by_platform)
+        specs["sentiment_by_platform"] = {
+            "kind": "grouped_bar",
+            "title": "各平台情感分析对比",
+            "categories": [PLATFORM_NAMES.get(p, p) for p in platforms],
+            "series": [
+                {
+                    "name": label,
+                    "color": color,
+                    "values": [sentiment_by_platform[p].get("distribution", {}).get(key, 0) for p in platforms]
+                }
+                for key, label, color in SENTIMENT_SERIES
+            ],
+            "xlabel": "平台",
+            "ylabel": "比例 (%)",
+            "size": (12, 6)
+        }
+
+    # 3. 时间趋势图
+    trend = (sentiment.get("by_time", {}) or {}).get("distribution", [])
+    if trend:
+        markers = {"positive": "o", "negative": "s", "neutral": "^"}
+        specs["sentiment_trend"] = {
+            "kind": "line",
+            "title": "情感趋势分析",
+            "categories": [item["date"] for item in trend],
+            "series": [
+                {"name": label, "color": color, "marker": markers[key], "values": [item[key] for item in trend]}
+                for key, label, color in (SENTIMENT_SERIES[0], SENTIMENT_SERIES[2], SENTIMENT_SERIES[1])
+            ],
+            "xlabel": "日期",
+            "ylabel": "比例 (%)",
+            "size": (14, 6)
+        }
+
+    # 4. 关键词权重图
+    keywords = analysis_result.get("keywords", [])[:15]
+    if keywords:
+        specs["keywords_bar"] = {
+            "kind": "hbar",
+            "title": "关键词权重分析（Top 15）",
+            "categories": [kw.get("keyword", "") for kw in keywords],
+            "values": [kw.get("weight", 0) for kw in keywords],
+            "color": "#2196F3",
+            "xlabel": "权重",
+            "size": (12, 8)
+        }
+
+    # 5. 平台数据分布图
+    platform_stats = analysis_result.get("platform_statistics", {})
+    if platform_stats:
+        platforms = list(platform_stats)
+        specs["platform_distribution"] = {
+            "kind": "bar",
+            "title": "各平台数据分布",
+            "categories": [PLATFORM_NAMES.get(p, p) for p in platforms],
+            "values": [platform_stats[p].get("total_texts", 0) for p in platforms],
+            "colors": ['#2196F3', '#4CAF50', '#FF9800', '#9C27B0', '#F44336'][:len(platforms)],
+            "xlabel": "平台",
+            "ylabel": "文本数量",
+            "size": (10, 6)
+        }
+
+    # 6. 互动构成饼图
+    interaction_stats = analysis_result.get("interaction_statistics", {}) or {}
+    totals = [
+        interaction_stats.get("total_likes", 0),
+        interaction_stats.get("total_comments", 0),
+        interaction_stats.get("total_shares", 0)
+    ]
+    if sum(totals) > 0:
+        specs["interaction_pie"] = {
+            "kind": "pie",
+            "title": "互动量构成分析",
+            "labels": ["点赞", "评论", "分享"],
+            "values": totals,
+            "colors": ['#FF7043', '#42A5F5', '#66BB6A'],
+            "size": (8, 8)
+        }
+
+    # 7. 平台互动对比图
+    interaction_by_platform = interaction_stats.get("by_platform", {})
+    if interaction_by_platform:
+        platforms = list(interaction_by_platform)
+        specs["platform_interaction"] = {
+            "kind": "grouped_bar",
+            "title": "各平台互动量对比",
+            "categories": [PLATFORM_NAMES.get(p, p) for p in platforms],
+            "series": [
+                {"name": label, "color": color, "values": [interaction_by_platform[p].get(key, 0) for p in platforms]}
+                for key, label, color in INTERACTION_SERIES
+            ],
+            "xlabel": "平台",
+            "ylabel": "数量",
+            "size": (12, 6)
+        }
+
+    return specs
+
+
+def render_chart(spec: Dict[str, Any], fmt: str = "png") -> bytes:
+    """
+    绘制单个图表
+
+    Args:
+        spec: 图表描述（chart_specs 的返回值之一）
+        fmt: 图片格式，png 或 svg
+
+    Returns:
+        图片内容，绘制失败时返回空字节串
+    """
+    try:
+        fig = Figure(figsize=spec["size"])
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        kind = spec["kind"]
+
+        if kind == "pie":
+            ax.pie(spec["values"], labels=spec["labels"], colors=spec["colors"], autopct='%1.1f%%', startangle=90)
+            ax.set_title(spec["title"], fontsize=16, fontweight='bold', pad=20)
+        else:
+            ax.set_title(spec["title"], fontsize=16, fontweight='bold')
+
+        if kind == "grouped_bar":
+            x = np.arange(len(spec["categories"]))
+            width = 0.25
+            for i, series in enumerate(spec["series"]):
+                ax.bar(x + (i - 1) * width, series["values"], width, label=series["name"], color=series["color"])
+            ax.set_xticks(x)
+            ax.set_xticklabels(spec["categories"])
+            ax.legend()
+            ax.grid(axis='y', alpha=0.3)
+
+        elif kind == "line":
+            for series in spec["series"]:
+                ax.plot(
+                    spec["categories"], series["values"],
+                    marker=series["marker"], label=series["name"], color=series["color"], linewidth=2
+                )
+            ax.legend()
+            ax.grid(alpha=0.3)
+            # 旋转x轴标签
+            for label in ax.get_xticklabels():
+                label.set_rotation(45)
+                label.set_horizontalalignment('right')
+
+        elif kind == "hbar":
+            y_pos = np.arange(len(spec["categories"]))
+            ax.barh(y_pos, spec["values"], color=spec["color"])
+            ax.set_yticks(y_pos)
+            ax.set_yticklabels(spec["categories"])
+            ax.grid(axis='x', alpha=0.3)
+
+        elif kind == "bar":
+            ax.bar(spec["categories"], spec["values"], color=spec["colors"])
+            ax.grid(axis='y', alpha=0.3)
+            # 添加数值标签
+            for i, v in enumerate(spec["values"]):
+                ax.text(i, v, str(v), ha='center', va='bottom')
+
+        if spec.get("xlabel"):
+            ax.set_xlabel(spec["xlabel"], fontsize=12)
+        if spec.get("ylabel"):
+            ax.set_ylabel(spec["ylabel"], fontsize=12)
+        if kind != "pie":
+            fig.tight_layout()
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=100, bbox_inches='tight')
+        return buf.getvalue()
+    except Exception as e:
+        logger.error(f"生成图表失败 {spec.get('title')}: {e}")
+        return b""
+
+
+def echarts_option(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把图表描述转换为 ECharts 配置（前端直接 setOption 渲染）
+
+    Args:
+        spec: 图表描述
+
+    Returns:
+        ECharts option
+    """
+    kind = spec["kind"]
+    option: Dict[str, Any] = {"title": {"text": spec["title"], "left": "center"}, "tooltip": {}}
+
+    if kind == "pie":
+        option["tooltip"] = {"trigger": "item", "formatter": "{b}: {c} ({d}%)"}
+        option["series"] = [{
+            "type": "pie",
+            "radius": "60%",
+            "data": [
+                {"name": label, "value": value, "itemStyle": {"color": color}}
+                for label, value, color in zip(spec["labels"], spec["values"], spec["colors"])
+            ]
+        }]
+        return option
+
+    category_axis = {"type": "category", "data": spec["categories"], "name": spec.get("xlabel", "")}
+    value_axis = {"type": "value", "name": spec.get("ylabel", "")}
+    option["tooltip"] = {"trigger": "axis"}
+
+    if kind in ("grouped_bar", "line"):
+        option["legend"] = {"top": "bottom", "data": [s["name"] for s in spec["series"]]}
+        option["xAxis"] = category_axis
+        option["yAxis"] = value_axis
+        option["series"] = [
+            {
+                "type": "bar" if kind == "grouped_bar" else "line",
+                "name": s["name"],
+                "data": s["values"],
+                "itemStyle": {"color": s["color"]}
+            }
+            for s in spec["series"]
+        ]
+    elif kind == "hbar":
+        option["xAxis"] = {"type": "value", "name": spec.get("xlabel", "")}
+        option["yAxis"] = {"type": "category", "data": spec["categories"]}
+        option["series"] = [{
+            "type": "bar",
+            "data": spec["values"],
+            "itemStyle": {"color": spec["color"]}
+        }]
+    elif kind == "bar":
+        option["xAxis"] = category_axis
+        option["yAxis"] = value_axis
+        option["series"] = [{
+            "type": "bar",
+            "label": {"show": True, "position": "top"},
+            "data": [
+                {"value": value, "itemStyle": {"color": color}}
+                for value, color in zip(spec["values"], spec["colors"])
+            ]
+        }]
+
+    return option
+
+
+def echarts_options(analysis_result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """分析结果中所有图表的 ECharts 配置"""
+    return {name: echarts_option(spec) for name, spec in chart_specs(analysis_result).items()}
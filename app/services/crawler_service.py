@@ -2,16 +2,17 @@
 爬虫服务 - 封装MediaCrawler调用
 """
 import subprocess
-import json
 import os
 import hashlib
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from loguru import logger
 from datetime import datetime
 
 from config import settings
 from app.services.login_checker import LoginChecker
+from app.services.json_stream import iter_json_items
+from app.services import brand_stats
 
 
 class CrawlerService:
@@ -150,8 +151,9 @@ class CrawlerService:
         target_url: Optional[str] = None,
         enable_media_download: bool = True
     ) -> Dict:
-        """使用MediaCrawler进行实际爬取"""
-        results = []
+        """使用MediaCrawler进行实际爬取（只记录数据文件和条数，数据由 iter_crawled_items 逐条读取）"""
+        data_files: List[Path] = []
+        total_items = 0
         
         # 确定Python解释器
         python_cmd = self.mediacrawler_python or "python"
@@ -288,7 +290,7 @@ class CrawlerService:
                     data_dir = self.mediacrawler_path / "data"
                     if data_dir.exists():
                         time.sleep(5)
-                        all_json_files = list(data_dir.rglob("*.json"))
+                        all_json_files = list(data_dir.rglob("*.json")) + list(data_dir.rglob("*.jsonl"))
                         
                         # 查找新生成的文件
                         json_files = [
@@ -303,20 +305,12 @@ class CrawlerService:
                             logger.info(f"未找到确切的新文件，尝试读取最新的 {len(json_files)} 个文件")
                         
                         for data_file in json_files:
+                            if data_file in data_files:
+                                continue
                             try:
-                                with open(data_file, 'r', encoding='utf-8') as f:
-                                    data = json.load(f)
-                                    # ... (数据读取逻辑同上，省略部分代码以复用) ...
-                                    if isinstance(data, list):
-                                        real_data = [item for item in data if not item.get("is_mock", False)]
-                                        results.extend(real_data)
-                                    elif isinstance(data, dict):
-                                        if not data.get("is_mock", False):
-                                            if "items" in data:
-                                                items = data.get("items", [])
-                                                results.extend([i for i in items if not i.get("is_mock", False)])
-                                            else:
-                                                results.append(data)
+                                # 逐条读取计数，不在内存中保留数据
+                                total_items += sum(1 for _ in self._iter_file_items(data_file))
+                                data_files.append(data_file)
                             except Exception as e:
                                 logger.warning(f"读取数据文件失败 {data_file}: {e}")
                     
@@ -344,21 +338,43 @@ class CrawlerService:
             except Exception as e:
                  logger.warning(f"恢复配置时发生错误: {e}")
         
-        # 结果处理
-        is_real_crawl = bool(results and not any(item.get("is_mock", False) for item in results))
-        
         return {
             "platform": platform,
             "keywords": keywords,
             "target_url": target_url,
             "crawl_type": crawl_type,
-            "total_items": len(results),
-            "items": results,
+            "total_items": total_items,
+            "data_files": [str(data_file) for data_file in data_files],
             "output_dir": str(output_dir),
             "is_real_crawl": True, # 假设只要有结果就是真实的，因为我们没有 mock 模式了
             "crawl_method": "real"
         }
 
+    def _iter_file_items(self, data_file: Path) -> Iterator[Dict]:
+        """逐条读取MediaCrawler数据文件中的有效数据（跳过非字典和模拟数据）"""
+        for item in iter_json_items(data_file):
+            if isinstance(item, dict) and not item.get("is_mock", False):
+                yield item
+    
+    def iter_crawled_items(self, data: Dict) -> Iterator[Dict]:
+        """
+        逐条返回爬取结果中的数据
+        
+        Args:
+            data: 爬取结果（crawl_platform 的返回值，数据在 data_files 中；也支持直接传入 items 列表）
+            
+        Yields:
+            单条爬取数据
+        """
+        for item in data.get("items", []):
+            if isinstance(item, dict):
+                yield item
+        for data_file in data.get("data_files", []):
+            try:
+                yield from self._iter_file_items(Path(data_file))
+            except Exception as e:
+                logger.warning(f"读取数据文件失败 {data_file}: {e}")
+    
     def _update_mediacrawler_media_config(self, enable: bool) -> bool:
         """
         临时修改 MediaCrawler 配置文件中的 ENABLE_GET_MEIDAS
@@ -525,6 +541,368 @@ class CrawlerService:
         except Exception as e:
             logger.error(f"更新 MediaCrawler URL 配置失败: {e}")
 
+    def _sync_local_media(self, platform: str, content_id: str):
+        """
+        将MediaCrawler下载的视频/图片复制到项目数据目录
+        
+        MediaCrawler 存储结构:
+        - data/crawled_data/douyin/{content_id}/video.mp4
+        - data/crawled_data/douyin/{content_id}/{index}.jpeg
+        
+        Args:
+            platform: 平台名称
+            content_id: 内容ID
+            
+        Returns:
+            (视频相对路径, 封面图片相对路径)，相对于 data/crawled_data
+        """
+        video_path = None
+        image_path = None
+        
+        if not content_id or not self.mediacrawler_path:
+            return video_path, image_path
+        
+        # 平台名可能是简写，store 通常用全称
+        platform_code = self.PLATFORM_MAP.get(platform.lower(), platform.lower())
+        if platform_code == "dy": platform_code = "douyin"
+        
+        # MediaCrawler 的数据源目录
+        mc_data_path = self.mediacrawler_path / "data/crawled_data" / platform_code / str(content_id)
+        
+        # 目标数据目录 (项目的数据目录)
+        target_base_path = self.data_dir / platform_code / str(content_id)
+        
+        if not mc_data_path.exists():
+            return video_path, image_path
+        
+        import shutil
+        
+        # 确保目标目录存在
+        target_base_path.mkdir(parents=True, exist_ok=True)
+        
+        # 处理视频
+        mc_video = mc_data_path / "video.mp4"
+        if mc_video.exists():
+            target_video = target_base_path / "video.mp4"
+            # 如果目标文件不存在或大小不同，则复制
+            if not target_video.exists() or target_video.stat().st_size != mc_video.stat().st_size:
+                try:
+                    shutil.copy2(mc_video, target_video)
+                    logger.info(f"已复制视频文件到项目目录: {target_video}")
+                except Exception as e:
+                    logger.warning(f"复制视频文件失败: {e}")
+            
+            if target_video.exists():
+                video_path = f"{platform_code}/{content_id}/video.mp4"
+        
+        # 处理图片 (复制所有图片)
+        # MediaCrawler 可能有多张图片: 0.jpg, 1.jpg ... 或者 000.jpeg
+        for img_file in mc_data_path.glob("*.jpeg"):
+            target_img = target_base_path / img_file.name
+            if not target_img.exists() or target_img.stat().st_size != img_file.stat().st_size:
+                try:
+                    shutil.copy2(img_file, target_img)
+                except Exception as e:
+                    logger.warning(f"复制图片文件失败: {e}")
+        
+        # 记录第一张图片作为封面
+        if (target_base_path / "000.jpeg").exists():
+            image_path = f"{platform_code}/{content_id}/000.jpeg"
+        else:
+            first_img = next(iter(sorted(target_base_path.glob("*.jpeg"))), None)
+            if first_img:
+                image_path = f"{platform_code}/{content_id}/{first_img.name}"
+        
+        return video_path, image_path
+    
+    def _parse_publish_time(self, item: Dict) -> datetime:
+        """解析发布时间（秒/毫秒时间戳或ISO字符串），解析失败时使用当前时间"""
+        create_time = item.get("create_time") or item.get("publish_time")
+        if create_time:
+            try:
+                # 如果是数字 (秒或毫秒)
+                if isinstance(create_time, (int, float)):
+                    ts = int(create_time)
+                    if ts > 1000000000000: # 毫秒
+                        return datetime.fromtimestamp(ts / 1000)
+                    return datetime.fromtimestamp(ts)
+                elif isinstance(create_time, str):
+                    # 尝试解析 ISO 格式
+                    return datetime.fromisoformat(create_time)
+            except:
+                pass
+        return datetime.now()
+    
+    def _build_doc(
+        self,
+        brand_id: int,
+        task_id: int,
+        platform: str,
+        item: Dict,
+        content_id: str,
+        video_path: Optional[str],
+        image_path: Optional[str]
+    ) -> Dict:
+        """
+        构建单条数据的MongoDB文档
+        
+        Returns:
+            raw_data 文档
+        """
+        doc = {
+            "brand_id": brand_id,
+            "platform": platform,
+            "task_id": task_id,
+            "content_type": "post",
+            "content_id": str(content_id),
+            "title": item.get("title", ""),
+            "content": item.get("content", "") or item.get("desc", ""),
+            "author": {
+                "id": item.get("author", {}).get("id", "") if isinstance(item.get("author"), dict) else "",
+                "name": item.get("author", "") if isinstance(item.get("author"), str) else item.get("author", {}).get("name", ""),
+                "avatar": item.get("author", {}).get("avatar", "") if isinstance(item.get("author"), dict) else ""
+            },
+            "publish_time": self._parse_publish_time(item),
+            "engagement": item.get("engagement", {}),
+            "media": {
+                "images": item.get("images", []),
+                "videos": item.get("videos", [])
+            },
+            "video_path": video_path, # 本地视频路径
+            "image_path": image_path, # 本地图片路径
+            "raw_data": item,
+            "crawled_at": datetime.now()
+        }
+        
+        # 没有内容ID时用标题和内容生成
+        if not doc["content_id"]:
+            unique_str = f"{doc['title']}{doc['content'][:100]}"
+            doc["content_id"] = hashlib.md5(unique_str.encode()).hexdigest()
+        
+        return doc
+    
+    def _build_upsert(self, doc: Dict):
+        """
+        构建单条数据的upsert操作
+        
+        新数据插入完整文档；已存在的数据只更新 raw_data、crawled_at、task_id、本地媒体路径和互动数 stats，
+        并更新服务端写入时间 updated_at（新数据的 ingested_at 在写入后由 mark_raw_data_ingested 记录，
+        情感分数 stats.sentiment 由 brand_stats.record_inserted 写入）
+        
+        Args:
+            doc: _build_doc 构建的文档
+            
+        Returns:
+            UpdateOne操作
+        """
+        from pymongo import UpdateOne
+        from app.core.database import RAW_DATA_TOUCH
+        
+        key = {
+            "brand_id": doc["brand_id"],
+            "platform": doc["platform"],
+            "content_id": doc["content_id"]
+        }
+        
+        update_fields = {
+            "raw_data": doc["raw_data"],
+            "crawled_at": doc["crawled_at"],
+            "task_id": doc["task_id"]
+        }
+        if doc["video_path"]: update_fields["video_path"] = doc["video_path"]
+        if doc["image_path"]: update_fields["image_path"] = doc["image_path"]
+        for field, _ in brand_stats.INTERACTION_FIELDS:
+            update_fields[f"stats.{field}"] = doc["stats"][field]
+        
+        insert_fields = {
+            field: value for field, value in doc.items()
+            if field not in update_fields and field not in key and field != "stats"
+        }
+        
+        return UpdateOne(
+            key,
+            {"$set": update_fields, "$setOnInsert": insert_fields, **RAW_DATA_TOUCH},
+            upsert=True
+        )
+    
+    def _bulk_upsert(self, collection, operations: List, retry: bool = True) -> Dict[str, int]:
+        """
+        批量执行upsert（无序），并发写入导致的唯一索引冲突会重试一次
+        
+        Args:
+            collection: MongoDB集合
+            operations: UpdateOne 列表
+            retry: 是否重试唯一索引冲突的操作（重试时为False）
+        
+        Returns:
+            {"inserted": 新增条数, "updated": 已存在并更新的条数,
+             "upserted_indexes": 新增数据在 operations 中的下标, "upserted_ids": 新增数据的 _id}
+        
+        Raises:
+            BulkWriteError: 存在唯一索引冲突以外的错误，或重试后仍然冲突
+        """
+        from pymongo.errors import BulkWriteError
+        
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            return {
+                "inserted": result.upserted_count,
+                "updated": result.matched_count,
+                "upserted_indexes": list(result.upserted_ids),
+                "upserted_ids": list(result.upserted_ids.values())
+            }
+        except BulkWriteError as e:
+            details = e.details
+            counts = {
+                "inserted": details.get("nUpserted", 0),
+                "updated": details.get("nMatched", 0),
+                "upserted_indexes": [upserted["index"] for upserted in details.get("upserted", [])],
+                "upserted_ids": [upserted["_id"] for upserted in details.get("upserted", [])]
+            }
+            errors = details.get("writeErrors", [])
+            retry_indexes = [err["index"] for err in errors if err.get("code") == 11000]
+            if not retry or len(retry_indexes) != len(errors):
+                raise
+            # 重复键冲突说明数据已被其他写入方插入，重试时会匹配到已存在的文档
+            retry_counts = self._bulk_upsert(collection, [operations[i] for i in retry_indexes], retry=False)
+            counts["inserted"] += retry_counts["inserted"]
+            counts["updated"] += retry_counts["updated"]
+            counts["upserted_indexes"] += [retry_indexes[i] for i in retry_counts["upserted_indexes"]]
+            counts["upserted_ids"] += retry_counts["upserted_ids"]
+            return counts
+    
+    def bulk_save_crawled_data(
+        self,
+        brand_id: int,
+        task_id: int,
+        platform: str,
+        data: Dict,
+        mongodb
+    ) -> Dict[str, int]:
+        """
+        批量保存爬取的数据到MongoDB（按 brand_id + platform + content_id 去重upsert）
+        
+        数据逐条读取，每 CRAWL_BULK_WRITE_SIZE 条写入一次，内存占用与数据文件大小无关
+        
+        Args:
+            brand_id: 品牌ID
+            task_id: 任务ID
+            platform: 平台名称
+            data: 爬取的数据（crawl_platform 的返回值）
+            mongodb: MongoDB数据库对象
+            
+        Returns:
+            {"inserted": 新增条数, "updated": 更新条数, "total": 写入条数}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from app.core.database import ensure_raw_data_unique_index
+        
+        ensure_raw_data_unique_index(mongodb)
+        
+        counts = {"inserted": 0, "updated": 0, "total": 0}
+        latest_crawled_at = None
+        batch_size = settings.CRAWL_BULK_WRITE_SIZE
+        # 本地媒体文件复制是IO操作，使用线程池并行处理
+        with ThreadPoolExecutor(max_workers=settings.CRAWL_MEDIA_SYNC_WORKERS) as executor:
+            items = []
+            for item in self.iter_crawled_items(data):
+                items.append(item)
+                if len(items) >= batch_size:
+                    latest_crawled_at = self._save_crawled_batch(
+                        mongodb, executor, brand_id, task_id, platform, items, counts
+                    )
+                    items = []
+            if items:
+                latest_crawled_at = self._save_crawled_batch(
+                    mongodb, executor, brand_id, task_id, platform, items, counts
+                )
+        if counts["updated"] and latest_crawled_at:
+            brand_stats.touch_latest_crawl(mongodb, brand_id, platform, latest_crawled_at)
+        
+        logger.info(
+            f"保存爬取数据到MongoDB: 新增 {counts['inserted']} 条, 更新 {counts['updated']} 条"
+        )
+        return counts
+    
+    def _save_crawled_batch(
+        self,
+        mongodb,
+        executor,
+        brand_id: int,
+        task_id: int,
+        platform: str,
+        items: List[Dict],
+        counts: Dict[str, int]
+    ) -> Optional[datetime]:
+        """
+        写入一批爬取数据并更新品牌统计
+        
+        Args:
+            mongodb: MongoDB数据库对象
+            executor: 同步本地媒体文件的线程池
+            brand_id: 品牌ID
+            task_id: 任务ID
+            platform: 平台名称
+            items: 本批爬取数据
+            counts: 累计的写入条数（原地更新）
+            
+        Returns:
+            本批最后一条数据的采集时间
+        """
+        from app.core.database import mark_raw_data_ingested
+        
+        collection = mongodb.raw_data
+        content_ids = [
+            str(item.get("id", "") or item.get("aweme_id", "") or item.get("note_id", ""))
+            for item in items
+        ]
+        media_paths = list(executor.map(
+            lambda content_id: self._sync_local_media(platform, content_id),
+            content_ids
+        ))
+        
+        # 同一批数据中重复的内容只保留最后一条（不同批次的重复内容由upsert按更新处理）
+        docs = {}
+        for item, content_id, (video_path, image_path) in zip(items, content_ids, media_paths):
+            doc = self._build_doc(brand_id, task_id, platform, item, content_id, video_path, image_path)
+            docs[doc["content_id"]] = doc
+        docs = list(docs.values())
+        if not docs:
+            return None
+        # 互动数随文档写入（重新爬取时更新），情感分数只为新写入的文档计算
+        brand_stats.attach_metrics(docs, include_sentiment=False)
+        
+        # 已存在数据写入前的 stats，用于把互动数的变化累加到品牌统计
+        previous = {
+            existing["content_id"]: existing.get("stats")
+            for existing in collection.find(
+                {
+                    "brand_id": brand_id,
+                    "platform": platform,
+                    "content_id": {"$in": [doc["content_id"] for doc in docs]}
+                },
+                {"content_id": 1, "stats": 1}
+            )
+        }
+        batch_counts = self._bulk_upsert(collection, [self._build_upsert(doc) for doc in docs])
+        counts["inserted"] += batch_counts["inserted"]
+        counts["updated"] += batch_counts["updated"]
+        counts["total"] += len(docs)
+        mark_raw_data_ingested(collection, batch_counts["upserted_ids"])
+        
+        inserted = []
+        for index, object_id in zip(batch_counts["upserted_indexes"], batch_counts["upserted_ids"]):
+            docs[index]["_id"] = object_id
+            inserted.append(docs[index])
+        brand_stats.record_inserted(mongodb, inserted)
+        inserted_indexes = set(batch_counts["upserted_indexes"])
+        brand_stats.record_updated(
+            mongodb,
+            [doc for index, doc in enumerate(docs) if index not in inserted_indexes],
+            {content_id: stats for content_id, stats in previous.items() if stats}
+        )
+        return docs[-1]["crawled_at"]
+    
     def save_crawled_data(
         self,
         brand_id: int,
@@ -544,181 +922,11 @@ class CrawlerService:
             mongodb: MongoDB数据库对象
             
         Returns:
-            保存的数据条数
+            保存的新数据条数
         """
         try:
-            collection = mongodb.raw_data
-            saved_count = 0
-            
-            items = data.get("items", [])
-            for item in items:
-                # 1. 尝试查找本地视频/图片文件 (新增)
-                # MediaCrawler 存储结构: 
-                # - data/crawled_data/douyin/{content_id}/video.mp4
-                # - data/crawled_data/douyin/{content_id}/{index}.jpeg
-                
-                content_id = item.get("id", "")
-                if not content_id: # 某些平台可能使用其他字段
-                     content_id = item.get("aweme_id", "") or item.get("note_id", "")
-                
-                video_path = None
-                image_path = None
-                
-                if content_id and self.mediacrawler_path:
-                    # 推断可能的视频路径
-                    # 这里需要根据 MediaCrawler 的 store 逻辑来判断
-                    # 对于抖音: data/crawled_data/douyin/{content_id}/video.mp4
-                    # 平台名可能是简写
-                    platform_code = self.PLATFORM_MAP.get(platform.lower(), platform.lower())
-                    if platform_code == "dy": platform_code = "douyin" # store 通常用全称
-                    if platform_code == "xhs": platform_code = "xhs"
-                    
-                    # MediaCrawler 的数据源目录
-                    mc_data_path = self.mediacrawler_path / "data/crawled_data" / platform_code / str(content_id)
-                    
-                    # 目标数据目录 (项目的数据目录)
-                    target_base_path = self.data_dir / platform_code / str(content_id)
-                    
-                    if mc_data_path.exists():
-                        # 确保目标目录存在
-                        target_base_path.mkdir(parents=True, exist_ok=True)
-                        
-                        # 处理视频
-                        mc_video = mc_data_path / "video.mp4"
-                        if mc_video.exists():
-                            target_video = target_base_path / "video.mp4"
-                            # 如果目标文件不存在或大小不同，则复制
-                            import shutil
-                            if not target_video.exists() or target_video.stat().st_size != mc_video.stat().st_size:
-                                try:
-                                    shutil.copy2(mc_video, target_video)
-                                    logger.info(f"已复制视频文件到项目目录: {target_video}")
-                                except Exception as e:
-                                    logger.warning(f"复制视频文件失败: {e}")
-                            
-                            # 记录相对路径 (相对于 data/crawled_data)
-                            if target_video.exists():
-                                video_path = f"{platform_code}/{content_id}/video.mp4"
-                        
-                        # 处理图片 (复制所有图片)
-                        # MediaCrawler 可能有多张图片: 0.jpg, 1.jpg ... 或者 000.jpeg
-                        for img_file in mc_data_path.glob("*.jpeg"):
-                             target_img = target_base_path / img_file.name
-                             if not target_img.exists() or target_img.stat().st_size != img_file.stat().st_size:
-                                 try:
-                                     shutil.copy2(img_file, target_img)
-                                 except Exception as e:
-                                     logger.warning(f"复制图片文件失败: {e}")
-                        
-                        # 记录第一张图片作为封面
-                        if (target_base_path / "000.jpeg").exists():
-                             image_path = f"{platform_code}/{content_id}/000.jpeg"
-                        elif list(target_base_path.glob("*.jpeg")):
-                             # 如果没有 000.jpeg，取第一张
-                             first_img = list(target_base_path.glob("*.jpeg"))[0]
-                             image_path = f"{platform_code}/{content_id}/{first_img.name}"
-
-                # 2. 处理发布时间 (优化)
-                publish_time = None
-                create_time = item.get("create_time") or item.get("publish_time")
-                
-                if create_time:
-                    try:
-                        # 如果是数字 (秒或毫秒)
-                        if isinstance(create_time, (int, float)):
-                            ts = int(create_time)
-                            if ts > 1000000000000: # 毫秒
-                                publish_time = datetime.fromtimestamp(ts / 1000)
-                            else:
-                                publish_time = datetime.fromtimestamp(ts)
-                        elif isinstance(create_time, str):
-                            # 尝试解析 ISO 格式
-                            publish_time = datetime.fromisoformat(create_time)
-                    except:
-                        # 解析失败，保留 None 或当前时间
-                        pass
-                
-                if not publish_time:
-                    publish_time = datetime.now()
-
-                # 构建文档
-                doc = {
-                    "brand_id": brand_id,
-                    "platform": platform,
-                    "task_id": task_id,
-                    "content_type": "post",
-                    "content_id": str(content_id),
-                    "title": item.get("title", ""),
-                    "content": item.get("content", "") or item.get("desc", ""),
-                    "author": {
-                        "id": item.get("author", {}).get("id", "") if isinstance(item.get("author"), dict) else "",
-                        "name": item.get("author", "") if isinstance(item.get("author"), str) else item.get("author", {}).get("name", ""),
-                        "avatar": item.get("author", {}).get("avatar", "") if isinstance(item.get("author"), dict) else ""
-                    },
-                    "publish_time": publish_time,
-                    "engagement": item.get("engagement", {}),
-                    "media": {
-                        "images": item.get("images", []),
-                        "videos": item.get("videos", [])
-                    },
-                    "video_path": video_path, # 本地视频路径
-                    "image_path": image_path, # 本地图片路径
-                    "raw_data": item,
-                    "crawled_at": datetime.now()
-                }
-                
-                # 去重：检查是否已存在（基于content_id和platform）
-                if not doc["content_id"]:
-                    unique_str = f"{doc['title']}{doc['content'][:100]}"
-                    doc["content_id"] = hashlib.md5(unique_str.encode()).hexdigest()
-                
-                existing = collection.find_one({
-                    "brand_id": brand_id,
-                    "content_id": doc["content_id"],
-                    "platform": platform
-                })
-                
-                if not existing:
-                    try:
-                        collection.insert_one(doc)
-                        saved_count += 1
-                    except Exception as e:
-                        # 如果插入失败（可能是唯一索引冲突），尝试更新
-                        logger.warning(f"插入数据失败，尝试更新: {e}")
-                        existing = collection.find_one({
-                            "brand_id": brand_id,
-                            "content_id": doc["content_id"],
-                            "platform": platform
-                        })
-                        if existing:
-                            collection.update_one(
-                                {"_id": existing["_id"]},
-                                {"$set": {
-                                    "raw_data": item,
-                                    "video_path": video_path,
-                                    "image_path": image_path,
-                                    "crawled_at": datetime.now()
-                                }}
-                            )
-                else:
-                    # 更新现有数据（不增加计数）
-                    update_fields = {
-                        "raw_data": item,
-                        "crawled_at": datetime.now(),
-                        "task_id": task_id
-                    }
-                    if video_path: update_fields["video_path"] = video_path
-                    if image_path: update_fields["image_path"] = image_path
-                    
-                    collection.update_one(
-                        {"_id": existing["_id"]},
-                        {"$set": update_fields}
-                    )
-                    logger.debug(f"数据已存在，已更新: {doc['content_id']}")
-            
-            logger.info(f"保存了 {saved_count} 条新数据到MongoDB")
-            return saved_count
-            
+            counts = self.bulk_save_crawled_data(brand_id, task_id, platform, data, mongodb)
+            return counts["inserted"]
         except Exception as e:
             logger.error(f"保存数据失败: {e}", exc_info=True)
             raise
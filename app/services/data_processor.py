@@ -2,21 +2,58 @@
 数据整理服务
 将MediaCrawler的JSON数据整理为结构化格式，用于AI分析
 """
-import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime
 from loguru import logger
 
 from app.services.data_cleaner import DataCleaner
+from app.services.json_stream import iter_json_items
+from app.services.normalized_store import NormalizedItemWriter, normalized_store
 
 
 class DataProcessor:
     """数据整理处理器"""
     
+    # extract_text_from_item 读取的字段（用于MongoDB查询投影，避免读取 raw_data 等大字段）
+    EXTRACT_FIELDS = (
+        "platform", "url", "detail_url",
+        "liked_count", "digg_count", "likes", "like_count",
+        "comment_count", "comments_count",
+        "share_count", "collected_count", "collect_count",
+        "create_time", "publish_time", "created_at", "date",
+        "title", "note_title", "content", "desc", "note_desc", "description", "text", "excerpt",
+        "author", "user_name", "nickname", "user",
+        "comments"
+    )
+    
     def __init__(self):
         self.cleaner = DataCleaner()
     
+    def iter_json_items(self, file_path: Path) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取JSON/JSONL文件中的数据项（逐条解码，不一次性加载整个文件）
+        
+        Args:
+            file_path: JSON文件路径（MediaCrawler json 或 jsonl 输出）
+            
+        Yields:
+            数据项
+        """
+        try:
+            yield from self._iter_dict_items(file_path)
+        except Exception as e:
+            logger.error(f"加载JSON文件失败: {e}")
+    
+    @staticmethod
+    def _iter_dict_items(file_path: Path) -> Iterator[Dict[str, Any]]:
+        """逐条返回文件中的字典数据项，文件读取或解析失败时抛出异常"""
+        for item in iter_json_items(file_path):
+            if isinstance(item, dict):
+                yield item
+            else:
+                logger.warning(f"未知的数据格式: {type(item)}")
+    
     def load_json_file(self, file_path: Path) -> List[Dict[str, Any]]:
         """
         加载JSON文件
@@ -27,27 +64,7 @@ class DataProcessor:
         Returns:
             数据列表
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 确保返回列表格式
-            if isinstance(data, list):
-                return data
-            elif isinstance(data, dict):
-                # 如果是字典，尝试提取items字段
-                if "items" in data:
-                    return data["items"]
-                elif "data" in data:
-                    return data["data"]
-                else:
-                    return [data]
-            else:
-                logger.warning(f"未知的数据格式: {type(data)}")
-                return []
-        except Exception as e:
-            logger.error(f"加载JSON文件失败: {e}")
-            return []
+        return list(self.iter_json_items(file_path))
     
     def extract_text_from_item(self, item: Dict[str, Any], platform: str) -> Dict[str, Any]:
         """
@@ -197,6 +214,130 @@ class DataProcessor:
         
         return text_info
     
+    def iter_processed_items(self, file_path: Path, platform: str) -> Iterator[Dict[str, Any]]:
+        """
+        流式处理JSON文件，逐条返回提取后的文本信息
+        
+        文件已有标准化列式存储且未变化时直接读取，跳过JSON解析和文本清洗；
+        否则解析文件，并在完整处理后写入标准化存储供下次使用
+        
+        Args:
+            file_path: JSON文件路径
+            platform: 平台代码
+            
+        Yields:
+            extract_text_from_item 的结果
+        """
+        cached_items = normalized_store.iter_items(file_path, platform)
+        if cached_items is not None:
+            yield from cached_items
+            return
+        
+        writer = normalized_store.open_writer(file_path, platform)
+        completed = False
+        try:
+            for item in self._iter_dict_items(file_path):
+                text_info = self.extract_text_from_item(item, platform)
+                if writer is not None:
+                    try:
+                        writer.add(text_info)
+                    except Exception as e:
+                        logger.warning(f"写入标准化数据失败 {file_path}: {e}")
+                        writer.abort()
+                        writer = None
+                yield text_info
+            completed = True
+        except Exception as e:
+            logger.error(f"加载JSON文件失败: {e}")
+        finally:
+            # 只保存完整处理的文件，解析失败或中途停止读取时丢弃
+            if writer is not None:
+                self._finish_normalized_writer(writer, completed)
+    
+    @staticmethod
+    def _finish_normalized_writer(writer: NormalizedItemWriter, completed: bool):
+        try:
+            if completed:
+                writer.commit()
+            else:
+                writer.abort()
+        except Exception as e:
+            logger.warning(f"写入标准化数据失败 {writer.source_path}: {e}")
+            writer.abort()
+    
+    @staticmethod
+    def new_interaction_stats() -> Dict[str, Any]:
+        """互动数据统计（总计和按平台）的初始值"""
+        return {
+            "total_likes": 0,
+            "total_comments": 0,
+            "total_shares": 0,
+            "by_platform": {}
+        }
+    
+    @staticmethod
+    def _add_interaction(interaction_stats: Dict[str, Any], text_info: Dict[str, Any]):
+        """累加一条数据的互动数"""
+        likes = text_info.get("likes", 0) or 0
+        comments = text_info.get("comments_count", 0) or 0
+        shares = text_info.get("shares", 0) or 0
+        
+        # 总计
+        interaction_stats["total_likes"] += likes
+        interaction_stats["total_comments"] += comments
+        interaction_stats["total_shares"] += shares
+        
+        # 按平台
+        p_stats = interaction_stats["by_platform"].setdefault(
+            text_info.get("platform") or "unknown", {"likes": 0, "comments": 0, "shares": 0, "count": 0}
+        )
+        p_stats["likes"] += likes
+        p_stats["comments"] += comments
+        p_stats["shares"] += shares
+        p_stats["count"] += 1
+    
+    def _collect_items(
+        self,
+        items: Iterator[Dict[str, Any]],
+        texts: Dict[str, str],
+        comments: Dict[str, str],
+        interaction_stats: Dict[str, Any],
+        include_comments: bool = True
+    ) -> int:
+        """
+        消费文本信息生成器，文本和评论写入去重字典（文本 -> 首次出现的平台，保持首次出现的顺序），
+        互动数累加到 interaction_stats；不保留逐条数据，内存占用只与去重后的文本量有关
+        
+        Returns:
+            处理的数据条数
+        """
+        count = 0
+        for text_info in items:
+            platform = text_info.get("platform") or "unknown"
+            # 添加标题和内容
+            if text_info["title"]:
+                texts.setdefault(text_info["title"], platform)
+            if text_info["content"]:
+                texts.setdefault(text_info["content"], platform)
+            
+            # 添加评论
+            if include_comments:
+                for comment in text_info["comments"]:
+                    comments.setdefault(comment, platform)
+            
+            self._add_interaction(interaction_stats, text_info)
+            count += 1
+        return count
+    
+    @staticmethod
+    def _text_platforms(texts: Dict[str, str], comments: Dict[str, str], include_comments: bool) -> Dict[str, str]:
+        """all_texts 中每条文本首次出现的平台"""
+        if not include_comments:
+            return texts
+        text_platforms = dict(comments)
+        text_platforms.update(texts)
+        return text_platforms
+    
     def process_json_file(
         self,
         file_path: Path,
@@ -212,54 +353,40 @@ class DataProcessor:
             include_comments: 是否包含评论
             
         Returns:
-            处理后的数据
+            处理后的数据（texts/comments 为去重后的文本，interaction_stats 为互动数统计，
+            text_platforms 为每条文本所属的平台）
         """
-        # 加载数据
-        items = self.load_json_file(file_path)
+        texts: Dict[str, str] = {}
+        comments: Dict[str, str] = {}
+        interaction_stats = self.new_interaction_stats()
+        total_items = self._collect_items(
+            self.iter_processed_items(file_path, platform), texts, comments, interaction_stats, include_comments
+        )
         
-        if not items:
+        if not total_items:
             logger.warning(f"文件 {file_path} 没有数据")
             return {
                 "platform": platform,
                 "total_items": 0,
                 "texts": [],
                 "comments": [],
-                "raw_items": []
+                "interaction_stats": interaction_stats,
+                "text_platforms": {}
             }
         
-        # 提取文本
-        all_texts = []
-        all_comments = []
-        processed_items = []
+        unique_texts = list(texts)
+        unique_comments = list(comments)
         
-        for item in items:
-            text_info = self.extract_text_from_item(item, platform)
-            
-            # 添加标题和内容
-            if text_info["title"]:
-                all_texts.append(text_info["title"])
-            if text_info["content"]:
-                all_texts.append(text_info["content"])
-            
-            # 添加评论
-            if include_comments and text_info["comments"]:
-                all_comments.extend(text_info["comments"])
-                
-            processed_items.append(text_info)
-        
-        # 去重
-        unique_texts = list(set(all_texts))
-        unique_comments = list(set(all_comments))
-        
-        logger.info(f"处理完成: {len(items)}条数据, {len(unique_texts)}条文本, {len(unique_comments)}条评论")
+        logger.info(f"处理完成: {total_items}条数据, {len(unique_texts)}条文本, {len(unique_comments)}条评论")
         
         return {
             "platform": platform,
-            "total_items": len(items),
+            "total_items": total_items,
             "texts": unique_texts,
             "comments": unique_comments,
             "all_texts": unique_texts + unique_comments if include_comments else unique_texts,
-            "raw_items": processed_items,
+            "interaction_stats": interaction_stats,
+            "text_platforms": self._text_platforms(texts, comments, include_comments),
             "file_path": str(file_path),
             "processed_at": datetime.now().isoformat()
         }
@@ -281,21 +408,18 @@ class DataProcessor:
         Returns:
             合并后的数据
         """
-        all_texts = []
-        all_comments = []
-        all_raw_items = []
+        texts: Dict[str, str] = {}
+        comments: Dict[str, str] = {}
+        interaction_stats = self.new_interaction_stats()
         total_items = 0
         
         for file_path in file_paths:
-            result = self.process_json_file(file_path, platform, include_comments)
-            all_texts.extend(result["texts"])
-            all_comments.extend(result["comments"])
-            all_raw_items.extend(result.get("raw_items", []))
-            total_items += result["total_items"]
+            total_items += self._collect_items(
+                self.iter_processed_items(file_path, platform), texts, comments, interaction_stats, include_comments
+            )
         
-        # 去重
-        unique_texts = list(set(all_texts))
-        unique_comments = list(set(all_comments))
+        unique_texts = list(texts)
+        unique_comments = list(comments)
         
         return {
             "platform": platform,
@@ -303,7 +427,8 @@ class DataProcessor:
             "texts": unique_texts,
             "comments": unique_comments,
             "all_texts": unique_texts + unique_comments if include_comments else unique_texts,
-            "raw_items": all_raw_items,
+            "interaction_stats": interaction_stats,
+            "text_platforms": self._text_platforms(texts, comments, include_comments),
             "file_count": len(file_paths),
             "processed_at": datetime.now().isoformat()
         }
@@ -323,44 +448,39 @@ class DataProcessor:
         Returns:
             合并后的跨平台数据
         """
-        all_texts = []
-        all_comments = []
-        all_raw_items = []
+        texts: Dict[str, str] = {}
+        comments: Dict[str, str] = {}
+        interaction_stats = self.new_interaction_stats()
         total_items = 0
         platform_stats = {}
         
         for platform, file_paths in files_by_platform.items():
-            platform_texts = []
-            platform_comments = []
-            platform_raw_items = []
+            platform_texts: Dict[str, str] = {}
+            platform_comments: Dict[str, str] = {}
             platform_items = 0
             
             for file_path in file_paths:
-                result = self.process_json_file(file_path, platform, include_comments)
-                platform_texts.extend(result["texts"])
-                platform_comments.extend(result["comments"])
-                platform_raw_items.extend(result.get("raw_items", []))
-                platform_items += result["total_items"]
-            
-            # 去重
-            unique_p_texts = list(set(platform_texts))
-            unique_p_comments = list(set(platform_comments))
+                platform_items += self._collect_items(
+                    self.iter_processed_items(file_path, platform),
+                    platform_texts, platform_comments, interaction_stats, include_comments
+                )
             
             platform_stats[platform] = {
                 "total_items": platform_items,
-                "texts_count": len(unique_p_texts),
-                "comments_count": len(unique_p_comments),
+                "texts_count": len(platform_texts),
+                "comments_count": len(platform_comments),
                 "file_count": len(file_paths)
             }
             
-            all_texts.extend(platform_texts)
-            all_comments.extend(platform_comments)
-            all_raw_items.extend(platform_raw_items)
+            # 多个平台出现相同文本时保留首次出现的平台
+            for text, text_platform in platform_texts.items():
+                texts.setdefault(text, text_platform)
+            for comment, comment_platform in platform_comments.items():
+                comments.setdefault(comment, comment_platform)
             total_items += platform_items
         
-        # 最终去重
-        unique_texts = list(set(all_texts))
-        unique_comments = list(set(all_comments))
+        unique_texts = list(texts)
+        unique_comments = list(comments)
         
         return {
             "platforms": list(files_by_platform.keys()),
@@ -368,15 +488,12 @@ class DataProcessor:
             "texts": unique_texts,
             "comments": unique_comments,
             "all_texts": unique_texts + unique_comments if include_comments else unique_texts,
-            "raw_items": all_raw_items,
+            "interaction_stats": interaction_stats,
+            "text_platforms": self._text_platforms(texts, comments, include_comments),
             "platform_stats": platform_stats,
             "file_count": sum(len(files) for files in files_by_platform.values()),
             "processed_at": datetime.now().isoformat()
         }
 
-
 # 创建全局实例
 data_processor = DataProcessor()
-
-
-
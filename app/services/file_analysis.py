@@ -0,0 +1,303 @@
+"""
+数据文件分析作业
+/data-analysis/process 提交的分析在Celery分析worker（Redis不可用时在本地进程池）中执行，
+进度和结果保存在 MongoDB data_analysis_results 集合中，接口只负责提交和查询
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import multiprocessing
+
+from bson import ObjectId
+from loguru import logger
+
+from config import settings
+from app.services.llm_client import run_async
+
+
+# 作业状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# 未完成的作业状态（结果列表中不显示）
+UNFINISHED_STATUSES = [JOB_PENDING, JOB_RUNNING, JOB_FAILED]
+
+# Redis不可用时执行作业的本地进程池
+_local_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def analyze_files(
+    params: Dict[str, Any],
+    progress: Callable[[str, int], None] = lambda stage, percent: None
+) -> Dict[str, Any]:
+    """
+    处理数据文件并执行AI分析（支持单平台和跨平台）
+
+    Args:
+        params: 作业参数，包括 cross_platform、platform、file_paths（单平台）、
+            file_paths_by_platform（跨平台）、include_comments、analysis_type、use_cache、
+            brand_name、platform_names
+        progress: 进度回调 (阶段说明, 百分比)
+
+    Returns:
+        分析结果（与原 /data-analysis/process 返回的 result 结构一致）
+
+    Raises:
+        ValueError: 没有提取到可分析的文本数据
+    """
+    from app.services.ai_service import ai_service
+    from app.services.data_processor import data_processor
+    from app.services.insight_pipeline import insight_pipeline
+
+    cross_platform = params["cross_platform"]
+    platform = params.get("platform")
+    include_comments = params["include_comments"]
+    analysis_type = params["analysis_type"]
+    use_cache = params["use_cache"]
+    brand_name = params["brand_name"]
+    platform_names = params.get("platform_names", {})
+
+    progress("正在读取数据文件", 5)
+    if cross_platform:
+        processed_data = data_processor.process_cross_platform_files(
+            {p: [Path(f) for f in files] for p, files in params["file_paths_by_platform"].items()},
+            include_comments
+        )
+    else:
+        processed_data = data_processor.process_multiple_files(
+            [Path(f) for f in params["file_paths"]],
+            platform,
+            include_comments
+        )
+
+    if not processed_data["all_texts"]:
+        raise ValueError("没有提取到可分析的文本数据")
+
+    logger.info(f"开始AI分析: {len(processed_data['all_texts'])}条文本")
+
+    # 1. 情感分析
+    progress("正在进行情感分析", 30)
+    sentiment_result = ai_service.batch_analyze_sentiment(processed_data["all_texts"])
+
+    # 2. 关键词提取（关键词和文本统计共用一次分词）
+    progress("正在提取关键信息", 50)
+    term_matrix = ai_service.build_term_matrix(processed_data["all_texts"])
+    keywords = term_matrix.keywords(top_k=20)
+
+    # 3. 文本统计
+    text_stats = ai_service.analyze_text_statistics(processed_data["all_texts"], term_matrix=term_matrix)
+
+    # 3.5 互动数据统计（读取文件时已累计）
+    interaction_stats = processed_data["interaction_stats"]
+
+    # 4. LLM深度分析
+    progress("AI 正在生成深度洞察", 65)
+    data_summary = {
+        "total_count": len(processed_data["all_texts"]),
+        "sentiment_distribution": sentiment_result.get("distribution", {}),
+        "avg_sentiment_score": sentiment_result.get("avg_score", 0.5),
+        "keywords": keywords
+    }
+
+    # 如果是跨平台分析，添加平台统计信息
+    if cross_platform and "platform_stats" in processed_data:
+        data_summary["platform_stats"] = processed_data["platform_stats"]
+
+    # 调用LLM分析（启用Map-Reduce洞察时先分块总结按平台和主题选出的代表性文本）
+    if settings.LLM_INSIGHT_ENABLED:
+        platform_texts = [
+            (text_platform, text) for text, text_platform in processed_data["text_platforms"].items() if text
+        ]
+        llm_result = await insight_pipeline.run(
+            brand_name=brand_name,
+            data_summary=data_summary,
+            texts=platform_texts,
+            analysis_type=analysis_type,
+            total_texts=len(processed_data["all_texts"]),
+            use_cache=use_cache
+        )
+    else:
+        llm_result = await ai_service.analyze_with_llm(
+            brand_name=brand_name,
+            data_summary=data_summary,
+            analysis_type=analysis_type,
+            use_cache=use_cache
+        )
+
+    # 组装分析结果
+    if cross_platform:
+        return {
+            "platforms": processed_data["platforms"],
+            "platform_names": [platform_names.get(p, p) for p in processed_data["platforms"]],
+            "is_cross_platform": True,
+            "processed_data": {
+                "total_items": processed_data["total_items"],
+                "total_texts": len(processed_data["texts"]),
+                "total_comments": len(processed_data["comments"]),
+                "file_count": processed_data["file_count"],
+                "platform_stats": processed_data.get("platform_stats", {})
+            },
+            "sentiment_analysis": sentiment_result,
+            "keywords": keywords,
+            "text_statistics": text_stats,
+            "interaction_statistics": interaction_stats,
+            "llm_insights": llm_result,
+            "processed_at": processed_data["processed_at"]
+        }
+    return {
+        "platform": platform,
+        "platform_name": platform_names.get(platform, platform),
+        "is_cross_platform": False,
+        "processed_data": {
+            "total_items": processed_data["total_items"],
+            "total_texts": len(processed_data["texts"]),
+            "total_comments": len(processed_data["comments"]),
+            "file_count": processed_data["file_count"]
+        },
+        "sentiment_analysis": sentiment_result,
+        "keywords": keywords,
+        "text_statistics": text_stats,
+        "interaction_statistics": interaction_stats,
+        "llm_insights": llm_result,
+        "processed_at": processed_data["processed_at"]
+    }
+
+
+async def create_job(mongodb, params: Dict[str, Any]) -> str:
+    """
+    创建分析作业记录
+
+    Args:
+        mongodb: MongoDB数据库（异步客户端）
+        params: 作业参数
+
+    Returns:
+        作业ID（同时也是分析结果ID）
+    """
+    now = datetime.now().isoformat()
+    doc = {
+        "status": JOB_PENDING,
+        "stage": "等待执行",
+        "progress": 0,
+        "platform": params.get("platform") if not params["cross_platform"] else "cross_platform",
+        "platforms": list(params["file_paths_by_platform"]) if params["cross_platform"] else [params.get("platform")],
+        "is_cross_platform": params["cross_platform"],
+        "analysis_type": params["analysis_type"],
+        "params": params,
+        "created_at": now,
+        "updated_at": now
+    }
+    result = await mongodb.data_analysis_results.insert_one(doc)
+    return str(result.inserted_id)
+
+
+async def fail_job(mongodb, job_id: str, error: str):
+    """
+    把未能开始执行的作业标记为失败（提交失败时使用，避免轮询一直等待）
+
+    Args:
+        mongodb: MongoDB数据库（异步客户端）
+        job_id: 作业ID
+        error: 错误信息
+    """
+    now = datetime.now().isoformat()
+    await mongodb.data_analysis_results.update_one(
+        {"_id": ObjectId(job_id), "status": JOB_PENDING},
+        {"$set": {"status": JOB_FAILED, "error": error, "completed_at": now, "updated_at": now}}
+    )
+
+
+def job_payload(doc: Dict[str, Any], include_result: bool = True) -> Dict[str, Any]:
+    """作业状态（接口返回格式）"""
+    payload = {
+        "job_id": str(doc["_id"]),
+        "status": doc.get("status", JOB_COMPLETED),
+        "stage": doc.get("stage"),
+        "progress": doc.get("progress", 100),
+        "error": doc.get("error"),
+        "created_at": doc.get("created_at"),
+        "completed_at": doc.get("completed_at")
+    }
+    if include_result and payload["status"] == JOB_COMPLETED:
+        payload["result"] = doc.get("result")
+        payload["result_id"] = payload["job_id"]
+    return payload
+
+
+def run_file_analysis_job(job_id: str) -> Dict[str, Any]:
+    """
+    执行分析作业（Celery任务和本地进程池共用，必须定义在模块顶层以便序列化）
+
+    Args:
+        job_id: 作业ID
+
+    Returns:
+        {"status": 作业状态, "error": 错误信息}
+    """
+    from pymongo import MongoClient
+
+    mongo_client = MongoClient(
+        host=settings.MONGODB_HOST,
+        port=settings.MONGODB_PORT,
+        serverSelectionTimeoutMS=2000
+    )
+    collection = mongo_client[settings.MONGODB_DATABASE].data_analysis_results
+    job_filter = {"_id": ObjectId(job_id)}
+
+    def _update(fields: Dict[str, Any]):
+        collection.update_one(job_filter, {"$set": {**fields, "updated_at": datetime.now().isoformat()}})
+
+    try:
+        job = collection.find_one(job_filter)
+        if not job:
+            logger.error(f"分析作业不存在: {job_id}")
+            return {"status": JOB_FAILED, "error": "分析作业不存在"}
+
+        _update({"status": JOB_RUNNING, "stage": "开始分析", "progress": 1})
+        result = run_async(analyze_files(
+            job["params"],
+            lambda stage, percent: _update({"stage": stage, "progress": percent})
+        ))
+        _update({
+            "status": JOB_COMPLETED,
+            "stage": "分析完成",
+            "progress": 100,
+            "result": result,
+            "completed_at": datetime.now().isoformat()
+        })
+        logger.info(f"分析作业完成: {job_id}")
+        return {"status": JOB_COMPLETED, "error": None}
+
+    except Exception as e:
+        logger.error(f"分析作业失败 {job_id}: {e}", exc_info=True)
+        try:
+            _update({"status": JOB_FAILED, "error": str(e), "completed_at": datetime.now().isoformat()})
+        except Exception as update_error:
+            logger.error(f"更新分析作业状态失败: {update_error}")
+        return {"status": JOB_FAILED, "error": str(e)}
+
+    finally:
+        mongo_client.close()
+
+
+def submit_local_job(job_id: str):
+    """在本地进程池中执行分析作业（Redis不可用、无法提交Celery任务时使用）"""
+    global _local_pool
+    if _local_pool is None:
+        # 使用 spawn 避免从多线程的API进程 fork
+        _local_pool = ProcessPoolExecutor(
+            max_workers=settings.DATA_ANALYSIS_LOCAL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    _local_pool.submit(run_file_analysis_job, job_id)
+
+
+def shutdown_local_jobs():
+    """关闭本地作业进程池（不等待进行中的作业）"""
+    global _local_pool
+    if _local_pool is not None:
+        _local_pool.shutdown(wait=False, cancel_futures=True)
+        _local_pool = None
@@ -0,0 +1,365 @@
+"""
+Map-Reduce LLM洞察
+按平台和主题从全部文本中选取代表性文本，按Token预算打包成分块，
+在LLM客户端并发限制下并行总结各分块（map），再把分块总结交给LLM
+生成各 analysis_type 既有的JSON结构（reduce）。
+map 阶段的分块数和总耗时都有上限，总耗时取决于并发数而不是文本总量
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import defaultdict
+import asyncio
+import time
+
+import numpy as np
+from loguru import logger
+
+from config import settings
+from app.services.ai_service import ai_service
+from app.services.llm_cache import LLMResponseCache, llm_cache
+from app.services.llm_client import estimate_tokens
+from app.services.topic_engine import TopicModel, create_topic_model
+
+
+# 少于该字数的文本信息量太低（如"好"、"赞"），不作为代表性文本
+MIN_TEXT_CHARS = 5
+
+# map 阶段提示词的固定开销（Token）
+CHUNK_PROMPT_OVERHEAD = 400
+
+# 每个分块总结的最大输出Token数
+CHUNK_SUMMARY_TOKENS = 800
+
+# 分块总结的字段
+SUMMARY_FIELDS = (
+    ("viewpoints", "主要观点"),
+    ("positive_points", "正面评价"),
+    ("pain_points", "负面/痛点"),
+    ("representative_quotes", "典型原话"),
+)
+
+
+class InsightPipeline:
+    """Map-Reduce LLM洞察流程"""
+
+    def __init__(
+        self,
+        sample_size: Optional[int] = None,
+        chunk_tokens: Optional[int] = None,
+        max_chunks: Optional[int] = None,
+        text_chars: Optional[int] = None,
+        map_timeout: Optional[float] = None,
+        reduce_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            sample_size: 代表性文本数上限
+            chunk_tokens: 每个分块提示词的Token预算（包含 CHUNK_PROMPT_OVERHEAD 固定开销）
+            max_chunks: 分块数上限
+            text_chars: 每条文本保留的最大字数
+            map_timeout: map 阶段总超时（秒），超时未完成的分块被丢弃
+            reduce_tokens: reduce 提示词中分块总结的Token预算
+        """
+        self.sample_size = sample_size or settings.LLM_INSIGHT_SAMPLE_SIZE
+        self.chunk_tokens = chunk_tokens or settings.LLM_INSIGHT_CHUNK_TOKENS
+        self.max_chunks = max_chunks or settings.LLM_INSIGHT_MAX_CHUNKS
+        self.text_chars = text_chars or settings.LLM_INSIGHT_TEXT_CHARS
+        self.map_timeout = map_timeout or settings.LLM_INSIGHT_MAP_TIMEOUT
+        self.reduce_tokens = reduce_tokens or settings.LLM_INSIGHT_REDUCE_TOKENS
+
+    # ---------- 代表性文本选择 ----------
+
+    def _assign_clusters(
+        self,
+        texts: List[str],
+        topic_model: Optional[TopicModel]
+    ) -> Tuple[np.ndarray, np.ndarray, Optional[TopicModel]]:
+        """计算文本所属主题，没有训练好的主题模型时在候选文本上训练一个临时模型"""
+        term_matrix = ai_service.build_term_matrix(texts)
+        if topic_model is None or not topic_model.fitted:
+            topic_model = None
+            if len(texts) >= TopicModel.MIN_DOCS:
+                topic_model = create_topic_model(num_topics=settings.LLM_INSIGHT_NUM_TOPICS)
+                if topic_model is not None:
+                    topic_model.fit(term_matrix)
+        if topic_model is None or not topic_model.fitted:
+            return np.full(len(texts), -1), np.zeros(len(texts)), None
+        assignments, strengths = topic_model.assign(term_matrix)
+        return assignments, strengths, topic_model
+
+    def select_representatives(
+        self,
+        texts: Sequence[Tuple[str, str]],
+        topic_model: Optional[TopicModel] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按 (平台, 主题) 分层选取代表性文本
+
+        每层的名额按该层文本数比例分配（至少1条），层内优先选择主题权重高的文本；
+        结果在各层之间轮流排列，分块预算不足时各层被均匀截断
+
+        Args:
+            texts: [(平台, 文本)]
+            topic_model: 已训练的主题模型（可选）
+
+        Returns:
+            [{"platform", "topic", "text"}]
+        """
+        seen = set()
+        candidates = []
+        for platform, text in texts:
+            text = (text or "").strip()
+            if len(text) < MIN_TEXT_CHARS or text in seen:
+                continue
+            seen.add(text)
+            candidates.append((platform or "unknown", text))
+        if not candidates:
+            return []
+
+        assignments, strengths, topic_model = self._assign_clusters(
+            [text for _, text in candidates], topic_model
+        )
+
+        strata: Dict[Tuple[str, int], List[Tuple[float, str]]] = defaultdict(list)
+        for (platform, text), topic_id, strength in zip(candidates, assignments.tolist(), strengths.tolist()):
+            strata[(platform, topic_id)].append((strength, text))
+
+        # 按比例分配名额（最大余数法），每层至少1条
+        budget = min(self.sample_size, len(candidates))
+        total = len(candidates)
+        quotas = {key: max(1, int(budget * len(items) / total)) for key, items in strata.items()}
+        remainders = sorted(
+            strata, key=lambda key: budget * len(strata[key]) / total - quotas[key], reverse=True
+        )
+        for key in remainders[:max(0, budget - sum(quotas.values()))]:
+            quotas[key] += 1
+
+        ordered_strata = []
+        for key in sorted(strata, key=lambda key: len(strata[key]), reverse=True):
+            items = sorted(strata[key], key=lambda pair: (pair[0], len(pair[1])), reverse=True)
+            platform, topic_id = key
+            label = topic_model.topic_label(topic_id) if topic_model is not None else ""
+            ordered_strata.append([
+                {"platform": platform, "topic": label, "text": text}
+                for _, text in items[:min(quotas[key], len(items))]
+            ])
+
+        # 各层轮流排列
+        representatives = []
+        for i in range(max(len(stratum) for stratum in ordered_strata)):
+            for stratum in ordered_strata:
+                if i < len(stratum):
+                    representatives.append(stratum[i])
+        return representatives[:budget]
+
+    # ---------- 分块 ----------
+
+    def pack_chunks(self, representatives: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        按Token预算把代表性文本打包成分块（超过分块数上限的文本被丢弃），
+        每块文本的预算为 chunk_tokens 减去提示词固定开销
+
+        Returns:
+            分块列表，每块为带 [平台·主题] 标记的文本行
+        """
+        text_budget = max(1, self.chunk_tokens - CHUNK_PROMPT_OVERHEAD)
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for rep in representatives:
+            text = rep["text"]
+            if len(text) > self.text_chars:
+                text = text[:self.text_chars] + "…"
+            tag = rep["platform"] + (f"·{rep['topic']}" if rep["topic"] else "")
+            line = f"- [{tag}] {text}"
+            tokens = estimate_tokens(line)
+            if current and current_tokens + tokens > text_budget:
+                chunks.append(current)
+                if len(chunks) >= self.max_chunks:
+                    return chunks
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks[:self.max_chunks]
+
+    # ---------- map ----------
+
+    @staticmethod
+    def _build_chunk_prompt(brand_name: str, analysis_type: str, lines: List[str], index: int, total: int) -> str:
+        fields = "\n".join(f'    "{field}": ["{label}1", "{label}2"],' for field, label in SUMMARY_FIELDS)
+        return f"""以下是品牌"{brand_name}"的用户内容样本（第{index}/{total}块，每行前的方括号为平台和主题）。
+请为后续的{analysis_type}类型品牌分析提炼这些内容中的信息，只依据给出的内容，不要编造。
+
+{chr(10).join(lines)}
+
+请以 JSON 格式输出（每个列表不超过5条，每条不超过40字）：
+{{
+{fields.rstrip(",")}
+}}
+"""
+
+    async def _summarize_chunk(
+        self,
+        prompt: str,
+        model: Optional[str],
+        use_cache: bool
+    ) -> Optional[Dict[str, Any]]:
+        """总结一个分块，失败时返回None"""
+        cache_key = llm_cache.make_key(
+            LLMResponseCache.INSIGHT_CHUNKS, model=model, prompt=prompt, max_tokens=CHUNK_SUMMARY_TOKENS
+        )
+        if use_cache:
+            cached = llm_cache.get(LLMResponseCache.INSIGHT_CHUNKS, cache_key)
+            if cached is not None:
+                return cached
+        else:
+            llm_cache.record_bypass(LLMResponseCache.INSIGHT_CHUNKS)
+
+        try:
+            raw_result = await ai_service.complete(prompt, max_tokens=CHUNK_SUMMARY_TOKENS)
+            summary = ai_service.extract_json(raw_result)
+        except Exception as e:
+            logger.warning(f"分块总结失败: {e}")
+            return None
+        if not isinstance(summary, dict):
+            return None
+
+        summary = {
+            field: [str(point) for point in summary.get(field, []) if point][:5]
+            for field, _ in SUMMARY_FIELDS
+            if isinstance(summary.get(field, []), list)
+        }
+        if model:
+            llm_cache.set(LLMResponseCache.INSIGHT_CHUNKS, cache_key, summary)
+        return summary
+
+    async def summarize_chunks(
+        self,
+        brand_name: str,
+        chunks: List[List[str]],
+        analysis_type: str,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        并行总结所有分块（并发数由LLM客户端注册表限制），超过 map_timeout 的分块被丢弃
+
+        Returns:
+            与分块一一对应的总结列表，失败或超时的分块为None
+        """
+        if not chunks:
+            return []
+        model = ai_service.llm_model
+        tasks = [
+            asyncio.ensure_future(self._summarize_chunk(
+                self._build_chunk_prompt(brand_name, analysis_type, lines, i + 1, len(chunks)),
+                model,
+                use_cache
+            ))
+            for i, lines in enumerate(chunks)
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=self.map_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"分块总结超时，丢弃 {len(pending)}/{len(tasks)} 个分块")
+
+        return [
+            task.result() if task in done and not task.cancelled() and task.exception() is None else None
+            for task in tasks
+        ]
+
+    # ---------- reduce ----------
+
+    def format_summaries(self, summaries: List[Dict[str, Any]]) -> str:
+        """
+        将分块总结格式化为 reduce 提示词，超出Token预算时逐步减少每个列表保留的条数，
+        仍然超出时丢弃靠后的分块
+        """
+        def _render(limit: int, count: int) -> str:
+            blocks = []
+            for i, summary in enumerate(summaries[:count]):
+                lines = [f"### 分块{i + 1}"]
+                for field, label in SUMMARY_FIELDS:
+                    points = summary.get(field, [])[:limit]
+                    if points:
+                        lines.append(f"- {label}: " + "；".join(points))
+                blocks.append("\n".join(lines))
+            return "\n".join(blocks)
+
+        for limit in (5, 3, 2, 1):
+            text = _render(limit, len(summaries))
+            if estimate_tokens(text) <= self.reduce_tokens:
+                return text
+        count = len(summaries)
+        while count > 1 and estimate_tokens(text) > self.reduce_tokens:
+            count -= 1
+            text = _render(1, count)
+        return text
+
+    async def run(
+        self,
+        brand_name: str,
+        data_summary: Dict[str, Any],
+        texts: Sequence[Tuple[str, str]],
+        analysis_type: str = "comprehensive",
+        topic_model: Optional[TopicModel] = None,
+        total_texts: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        执行 map-reduce 洞察
+
+        Args:
+            brand_name: 品牌名称
+            data_summary: 聚合数据摘要（与 analyze_with_llm 一致）
+            texts: 候选文本 [(平台, 文本)]，可以是全部文本或均匀样本
+            analysis_type: 分析类型
+            topic_model: 已训练的主题模型（可选）
+            total_texts: 文本总数（texts 为样本时用于说明覆盖范围）
+            use_cache: 是否读取LLM响应缓存
+
+        Returns:
+            analyze_with_llm 的结果，附加 map_reduce 统计
+        """
+        started_at = time.monotonic()
+        representatives = self.select_representatives(texts, topic_model)
+        chunks = self.pack_chunks(representatives)
+        chunk_summaries = await self.summarize_chunks(brand_name, chunks, analysis_type, use_cache)
+        summaries = [summary for summary in chunk_summaries if summary]
+
+        summarized_texts = sum(
+            len(lines) for lines, summary in zip(chunks, chunk_summaries) if summary
+        )
+        coverage = {
+            "total_texts": total_texts or len(texts),
+            "summarized_texts": summarized_texts,
+            "chunks": len(summaries)
+        }
+        enriched_summary = dict(data_summary)
+        if summaries:
+            enriched_summary["corpus_insights"] = self.format_summaries(summaries)
+            enriched_summary["corpus_coverage"] = coverage
+
+        result = await ai_service.analyze_with_llm(
+            brand_name=brand_name,
+            data_summary=enriched_summary,
+            analysis_type=analysis_type,
+            use_cache=use_cache
+        )
+        result["map_reduce"] = {
+            **coverage,
+            "representative_texts": len(representatives),
+            "planned_chunks": len(chunks),
+            "elapsed_seconds": round(time.monotonic() - started_at, 2)
+        }
+        logger.info(
+            f"Map-Reduce洞察完成: {brand_name}, 代表性文本 {len(representatives)} 条, "
+            f"分块 {len(summaries)}/{len(chunks)}, 耗时 {result['map_reduce']['elapsed_seconds']} 秒"
+        )
+        return result
+
+
+# 创建全局实例
+insight_pipeline = InsightPipeline()
@@ -0,0 +1,172 @@
+"""
+流式JSON读取
+按块读取文件并逐个解码数组元素或 JSON Lines 中的每一行，
+内存占用只与单条数据大小有关，与文件大小无关
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+
+# 每次读取的字符数
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+
+# 顶层对象中按数组展开的字段
+LIST_KEYS = ("items", "data")
+
+
+class _ChunkReader:
+    """带缓冲区的分块读取器"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """读取下一块，已到文件末尾时返回False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白字符并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode(self, decoder: json.JSONDecoder) -> Any:
+        """从当前位置（跳过空白字符后）解码一个完整的JSON值"""
+        # raw_decode 不会跳过开头的空白字符
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # 当前缓冲区中的值不完整，继续读取
+                if self.fill():
+                    continue
+                raise
+            # 值恰好在缓冲区末尾结束时，数字等值可能被截断，读取更多内容后重新解码
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_array(reader: _ChunkReader, decoder: json.JSONDecoder) -> Iterator[Any]:
+    """逐个解码数组的元素"""
+    reader.pos += 1
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.decode(decoder)
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+
+
+def _expect(reader: _ChunkReader, char: str, message: str):
+    """跳过空白字符后要求下一个字符为 char"""
+    if reader.peek() != char:
+        raise json.JSONDecodeError(message, reader.buffer, reader.pos)
+    reader.pos += 1
+
+
+def _iter_object(reader: _ChunkReader, decoder: json.JSONDecoder) -> Iterator[Any]:
+    """
+    逐个解码顶层对象的成员
+
+    遇到第一个值为数组的 items/data 字段时，与顶层数组相同逐个返回其中的元素，
+    其余字段逐个解码后丢弃；没有这些字段时返回对象本身
+    """
+    obj = {}
+    expanded = False
+    reader.pos += 1
+    if reader.peek() == "}":
+        reader.pos += 1
+        yield obj
+        return
+    while True:
+        if reader.peek() != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", reader.buffer, reader.pos)
+        key = reader.decode(decoder)
+        _expect(reader, ":", "Expecting ':' delimiter")
+        if not expanded and key in LIST_KEYS and reader.peek() == "[":
+            expanded = True
+            yield from _iter_array(reader, decoder)
+        else:
+            value = reader.decode(decoder)
+            if not expanded:
+                if key == "items" and value is None:
+                    expanded = True
+                else:
+                    obj[key] = value
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            break
+        if separator != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", reader.buffer, reader.pos - 1)
+    if not expanded:
+        yield obj
+
+
+def _iter_values(reader: _ChunkReader, decoder: json.JSONDecoder) -> Iterator[Any]:
+    """逐个解码连续的顶层JSON值（JSON Lines）"""
+    while reader.peek():
+        yield reader.decode(decoder)
+
+
+def iter_json_items(file_path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    流式读取数据文件中的数据项
+
+    - .jsonl 文件（MediaCrawler jsonl 输出）逐个返回每一行的值
+    - 顶层为数组时（MediaCrawler json 输出），逐个返回数组元素
+    - 顶层为对象时，逐个返回其 items/data 字段中的列表元素，没有这些字段时返回对象本身；
+      对象之后还有其他JSON值时（无 .jsonl 后缀的 JSON Lines），其余的值原样返回
+
+    Args:
+        file_path: 文件路径（.json / .jsonl）
+        chunk_size: 每次读取的字符数
+
+    Raises:
+        json.JSONDecodeError: JSON格式错误（在读取到出错位置时抛出）
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        reader = _ChunkReader(f, chunk_size)
+        first_char = reader.peek()
+        if not first_char:
+            return
+
+        if Path(file_path).suffix.lower() == ".jsonl":
+            yield from _iter_values(reader, decoder)
+            return
+
+        if first_char == "[":
+            yield from _iter_array(reader, decoder)
+        elif first_char == "{":
+            yield from _iter_object(reader, decoder)
+        else:
+            yield reader.decode(decoder)
+        yield from _iter_values(reader, decoder)
@@ -0,0 +1,297 @@
+"""
+LLM响应缓存
+以 (模型, 提示词或图片/视频帧哈希, 温度, 分析类型) 的规范化哈希为键，
+把LLM分析结果保存在本地SQLite文件中，支持过期时间、条数上限、跳过缓存和命中率统计
+命中时的访问时间和统计计数先记录在内存中，定期批量写入，读取缓存不会每次都提交事务
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+from pathlib import Path
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+from config import settings
+
+
+class LLMResponseCache:
+    """LLM响应缓存"""
+
+    # 缓存类型：品牌洞察、洞察分块总结、图片序列分析、视频分析
+    INSIGHTS = "insights"
+    INSIGHT_CHUNKS = "insight_chunks"
+    IMAGES = "images"
+    VIDEO = "video"
+
+    # 超出上限时淘汰到上限的90%，避免每次写入都触发淘汰
+    EVICT_RATIO = 0.9
+
+    # 访问时间比该秒数更早时才更新（淘汰只需要大致的最近访问顺序）
+    ACCESS_UPDATE_INTERVAL = 60.0
+
+    # 访问时间和统计计数批量写入的间隔（秒）
+    FLUSH_INTERVAL = 30.0
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            path: SQLite文件路径
+            ttl: 过期时间（秒），0表示不过期
+            max_entries: 最大缓存条数，超出后按最近访问时间淘汰
+            enabled: 是否启用
+        """
+        self.path = Path(path or settings.LLM_CACHE_PATH)
+        self.ttl = settings.LLM_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.enabled = settings.LLM_CACHE_ENABLED if enabled is None else enabled
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # 当前进程内的统计
+        self.counters: Dict[str, Dict[str, int]] = {}
+        # 尚未写入的访问时间 {key: accessed_at} 和统计计数 {(kind, counter): 次数}
+        self._pending_access: Dict[str, float] = {}
+        self._pending_counts: Dict[Tuple[str, str], int] = {}
+        self._last_flush = time.time()
+        atexit.register(self.flush)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # fork出的子进程不能复用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache_stats ("
+                "kind TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, "
+                "misses INTEGER NOT NULL DEFAULT 0, bypasses INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(kind: str, **parts: Any) -> str:
+        """
+        计算缓存键（参数按键名排序后序列化再哈希，顺序无关）
+
+        Args:
+            kind: 缓存类型
+            parts: 影响结果的参数，如 model、prompt、frames、temperature、analysis_type
+        """
+        canonical = json.dumps({"kind": kind, **parts}, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def hash_bytes(chunks: Iterable[bytes]) -> str:
+        """计算图片/视频内容的哈希（用作缓存键的一部分）"""
+        digest = hashlib.sha1()
+        for chunk in chunks:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _count(self, kind: str, counter: str):
+        kind_counters = self.counters.setdefault(kind, {"hits": 0, "misses": 0, "bypasses": 0})
+        kind_counters[counter] += 1
+        with self._lock:
+            self._pending_counts[(kind, counter)] = self._pending_counts.get((kind, counter), 0) + 1
+            if self._flush_locked(force=False):
+                self._commit_locked()
+
+    def _flush_locked(self, force: bool) -> bool:
+        """
+        写入积累的访问时间和统计计数（调用方需持有 self._lock）
+
+        Args:
+            force: 是否忽略写入间隔立即写入
+
+        Returns:
+            是否执行了写入（由调用方提交）
+        """
+        now = time.time()
+        if not force and now - self._last_flush < self.FLUSH_INTERVAL:
+            return False
+        self._last_flush = now
+        if not self._pending_access and not self._pending_counts:
+            return False
+        access, counts = self._pending_access, self._pending_counts
+        self._pending_access, self._pending_counts = {}, {}
+        try:
+            conn = self._get_conn()
+            conn.executemany(
+                "UPDATE llm_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in access.items()]
+            )
+            for (kind, counter), count in counts.items():
+                conn.execute(
+                    f"INSERT INTO llm_cache_stats (kind, {counter}) VALUES (?, ?) "
+                    f"ON CONFLICT(kind) DO UPDATE SET {counter} = {counter} + excluded.{counter}",
+                    (kind, count)
+                )
+        except Exception as e:
+            logger.debug(f"更新LLM缓存访问时间和统计失败: {e}")
+            return False
+        return True
+
+    def _commit_locked(self):
+        try:
+            self._get_conn().commit()
+        except Exception as e:
+            logger.debug(f"更新LLM缓存访问时间和统计失败: {e}")
+
+    def flush(self):
+        """立即写入积累的访问时间和统计计数"""
+        with self._lock:
+            if self._flush_locked(force=True):
+                self._commit_locked()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Returns:
+            缓存的结果，未命中或已过期时返回None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                row = conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] is not None and row[1] <= now:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    row = None
+                elif row and now - row[2] >= self.ACCESS_UPDATE_INTERVAL:
+                    self._pending_access[key] = now
+        except Exception as e:
+            logger.warning(f"读取LLM缓存失败: {e}")
+            return None
+
+        self._count(kind, "hits" if row else "misses")
+        return json.loads(row[0]) if row else None
+
+    def set(self, kind: str, key: str, value: Any, ttl: Optional[int] = None):
+        """
+        写入缓存
+
+        Args:
+            kind: 缓存类型
+            key: make_key 计算的缓存键
+            value: 可JSON序列化的结果
+            ttl: 过期时间（秒），默认使用配置
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl > 0 else None
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, kind, value, created_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, json.dumps(value, ensure_ascii=False), now, expires_at, now)
+                )
+                # 淘汰前写入积累的访问时间
+                self._pending_access.pop(key, None)
+                self._flush_locked(force=True)
+                self._evict(conn, now)
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"写入LLM缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """删除过期条目，超出条数上限时按最近访问时间淘汰"""
+        conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        size = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if size > self.max_entries:
+            evict_count = size - int(self.max_entries * self.EVICT_RATIO)
+            conn.execute(
+                "DELETE FROM llm_cache WHERE rowid IN "
+                "(SELECT rowid FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (evict_count,)
+            )
+            logger.info(f"LLM缓存淘汰 {evict_count} 条")
+
+    def record_bypass(self, kind: str):
+        """记录一次跳过缓存的请求"""
+        if self.enabled:
+            self._count(kind, "bypasses")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存统计
+
+        Returns:
+            {"enabled", "ttl", "max_entries", "size", "kinds": {kind: {hits, misses, bypasses, hit_rate}}, "process"}
+        """
+        result: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "process": self.counters
+        }
+        if not self.enabled:
+            return result
+        self.flush()
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                sizes = dict(conn.execute("SELECT kind, COUNT(*) FROM llm_cache GROUP BY kind").fetchall())
+                rows = conn.execute("SELECT kind, hits, misses, bypasses FROM llm_cache_stats").fetchall()
+        except Exception as e:
+            logger.warning(f"读取LLM缓存统计失败: {e}")
+            return result
+
+        result["size"] = sum(sizes.values())
+        result["kinds"] = {
+            kind: {
+                "size": sizes.get(kind, 0),
+                "hits": hits,
+                "misses": misses,
+                "bypasses": bypasses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0
+            }
+            for kind, hits, misses, bypasses in rows
+        }
+        return result
+
+    def clear(self):
+        """清空缓存和统计"""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM llm_cache")
+            conn.execute("DELETE FROM llm_cache_stats")
+            conn.commit()
+            self._pending_access.clear()
+            self._pending_counts.clear()
+        self.counters.clear()
+
+
+# 创建全局实例
+llm_cache = LLMResponseCache()
@@ -0,0 +1,456 @@
+"""
+LLM客户端注册表
+每个LLM服务复用一个长连接（HTTP/2 keep-alive）客户端，
+并统一做并发限制、每分钟Token限流、429/5xx 抖动重试和熔断，
+按 网关 → OpenAI → Gemini → Claude → 本地LLM 的顺序自动故障转移
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+import asyncio
+import atexit
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+from loguru import logger
+
+from config import settings
+
+
+T = TypeVar("T")
+
+# 服务名称（按故障转移顺序）
+PROVIDER_GATEWAY = "gateway"
+PROVIDER_OPENAI = "openai"
+PROVIDER_GEMINI = "gemini"
+PROVIDER_CLAUDE = "claude"
+PROVIDER_LOCAL = "local"
+
+PROVIDER_ORDER = (PROVIDER_GATEWAY, PROVIDER_OPENAI, PROVIDER_GEMINI, PROVIDER_CLAUDE, PROVIDER_LOCAL)
+
+# 需要重试的HTTP状态码
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# 每张图片按该Token数估算（用于限流）
+IMAGE_TOKENS = 800
+
+
+def estimate_tokens(text: str, max_output_tokens: int = 0) -> int:
+    """
+    估算请求消耗的Token数（中文约每字1个Token，英文约每4个字符1个Token）
+
+    Args:
+        text: 输入文本
+        max_output_tokens: 最大输出Token数
+    """
+    if not text:
+        return max_output_tokens
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + max_output_tokens
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """429、5xx、超时和连接错误可以重试"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    # openai / anthropic / google SDK 的超时和连接错误
+    name = type(error).__name__
+    return any(keyword in name for keyword in ("Timeout", "Connection", "ResourceExhausted", "ServiceUnavailable"))
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """响应头中的 Retry-After（秒）"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败达到阈值后打开，打开期间直接跳过该服务；
+    超过恢复时间后允许一个探测请求（半开），成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """请求被取消时释放半开探测名额（不计为成功或失败），下一个请求可以重新探测"""
+        with self._lock:
+            self._probing = False
+
+
+class TokenRateLimiter:
+    """
+    每分钟Token限流（令牌桶）
+
+    令牌不足时预占并等待补充，不依赖事件循环，可在多个事件循环（Celery任务）间共享
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """
+        预占Token
+
+        Returns:
+            需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # 单次请求超过桶容量时按容量计算，避免永远等待
+            tokens = min(float(tokens), self.capacity)
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    async def acquire(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"LLM Token限流，等待 {wait:.1f} 秒")
+            await asyncio.sleep(wait)
+
+
+class LLMClientRegistry:
+    """
+    LLM客户端注册表
+
+    HTTP客户端和并发信号量绑定事件循环，按事件循环分别创建并复用；
+    熔断状态和Token限流在进程内共享
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._limiters: Dict[str, Optional[TokenRateLimiter]] = {}
+        self._loop_state: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._gemini_configured = False
+
+    # ---------- 服务配置 ----------
+
+    @staticmethod
+    def configured_providers() -> List[str]:
+        """已配置的服务（按故障转移顺序）"""
+        configured = {
+            PROVIDER_GATEWAY: bool(settings.LLM_API_KEY and settings.LLM_API_BASE),
+            PROVIDER_OPENAI: bool(settings.OPENAI_API_KEY),
+            PROVIDER_GEMINI: bool(settings.GEMINI_API_KEY),
+            PROVIDER_CLAUDE: bool(settings.ANTHROPIC_API_KEY),
+            PROVIDER_LOCAL: bool(settings.LOCAL_LLM_URL),
+        }
+        return [provider for provider in PROVIDER_ORDER if configured[provider]]
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.LLM_CIRCUIT_RESET_TIMEOUT
+                )
+            return self._breakers[provider]
+
+    def limiter(self, provider: str) -> Optional[TokenRateLimiter]:
+        with self._lock:
+            if provider not in self._limiters:
+                tpm = settings.LLM_TOKENS_PER_MINUTE
+                self._limiters[provider] = TokenRateLimiter(tpm) if tpm > 0 else None
+            return self._limiters[provider]
+
+    # ---------- 客户端 ----------
+
+    def _state(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_state.get(loop)
+            if state is None:
+                state = {"clients": {}, "semaphores": {}}
+                self._loop_state[loop] = state
+            return state
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphores = self._state()["semaphores"]
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+        return semaphores[provider]
+
+    @staticmethod
+    def _create_http_client(**kwargs) -> httpx.AsyncClient:
+        """创建长连接HTTP客户端，安装了 h2 时启用 HTTP/2"""
+        http2 = settings.LLM_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                keepalive_expiry=60.0
+            ),
+            **kwargs
+        )
+
+    def _client(self, provider: str, factory: Callable[[], Any]) -> Any:
+        clients = self._state()["clients"]
+        if provider not in clients:
+            clients[provider] = factory()
+        return clients[provider]
+
+    def openai_client(self, provider: str = PROVIDER_GATEWAY):
+        """OpenAI兼容客户端（网关或OpenAI），重试由注册表统一处理"""
+        def _create():
+            from openai import AsyncOpenAI
+
+            if provider == PROVIDER_GATEWAY:
+                api_key, base_url = settings.LLM_API_KEY, settings.LLM_API_BASE
+            else:
+                api_key, base_url = settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL
+            return AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=self._create_http_client()
+            )
+        return self._client(provider, _create)
+
+    def anthropic_client(self):
+        """Claude客户端（SDK自带连接池，复用客户端实例即复用连接）"""
+        def _create():
+            from anthropic import AsyncAnthropic
+
+            return AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                max_retries=0,
+                timeout=settings.LLM_REQUEST_TIMEOUT
+            )
+        return self._client(PROVIDER_CLAUDE, _create)
+
+    def http_client(self, provider: str = PROVIDER_LOCAL) -> httpx.AsyncClient:
+        """普通HTTP客户端（本地LLM）"""
+        return self._client(provider, self._create_http_client)
+
+    def configure_gemini(self):
+        """配置Gemini SDK（全局配置，只需一次）"""
+        import google.generativeai as genai
+
+        if not self._gemini_configured:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            self._gemini_configured = True
+        return genai
+
+    async def aclose(self):
+        """关闭当前事件循环中创建的客户端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_state.pop(loop, None)
+        if not state:
+            return
+        for provider, client in state["clients"].items():
+            try:
+                close = getattr(client, "aclose", None) or getattr(client, "close")
+                await close()
+            except Exception as e:
+                logger.warning(f"关闭LLM客户端失败 {provider}: {e}")
+
+    # ---------- 调用 ----------
+
+    async def execute(
+        self,
+        provider: str,
+        request: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0
+    ) -> T:
+        """
+        在并发限制、Token限流、重试和熔断保护下执行一次LLM请求
+
+        Args:
+            provider: 服务名称
+            request: 发起请求的协程函数（每次重试重新调用）
+            estimated_tokens: 估算的Token数
+
+        Raises:
+            RuntimeError: 服务处于熔断状态
+            Exception: 重试用尽后的最后一次错误
+        """
+        breaker = self.breaker(provider)
+        if not breaker.allow_request():
+            raise RuntimeError(f"LLM服务 {provider} 熔断中，暂不可用")
+
+        limiter = self.limiter(provider)
+        max_retries = max(0, settings.LLM_MAX_RETRIES)
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                try:
+                    if limiter and estimated_tokens:
+                        await limiter.acquire(estimated_tokens)
+                    async with self._semaphore(provider):
+                        result = await request()
+                    settled = True
+                    breaker.record_success()
+                    return result
+                except Exception as e:
+                    if attempt >= max_retries or not is_retryable_error(e):
+                        settled = True
+                        breaker.record_failure()
+                        raise
+                    # 指数退避 + 全抖动，优先使用服务端返回的 Retry-After
+                    delay = _retry_after(e)
+                    if delay is None:
+                        ceiling = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+                        delay = random.uniform(0, ceiling)
+                    attempt += 1
+                    logger.warning(f"LLM服务 {provider} 请求失败（{e}），{delay:.1f} 秒后第 {attempt} 次重试")
+                    await asyncio.sleep(delay)
+        finally:
+            # 被取消（asyncio.CancelledError，如 map 阶段超时）时既不是成功也不是失败，
+            # 释放半开探测名额，避免服务一直处于熔断状态
+            if not settled:
+                breaker.release_probe()
+
+    async def execute_with_failover(
+        self,
+        requests: Dict[str, Callable[[], Awaitable[T]]],
+        estimated_tokens: int = 0
+    ) -> T:
+        """
+        按故障转移顺序依次尝试各服务，跳过处于熔断状态的服务
+
+        Args:
+            requests: {服务名称: 请求协程函数}，按 PROVIDER_ORDER 排序尝试
+
+        Raises:
+            Exception: 所有服务都失败时抛出最后一次错误
+        """
+        last_error: Optional[Exception] = None
+        for provider in sorted(requests, key=PROVIDER_ORDER.index):
+            try:
+                return await self.execute(provider, requests[provider], estimated_tokens)
+            except Exception as e:
+                logger.error(f"LLM服务 {provider} 调用失败: {e}")
+                last_error = e
+        if last_error is None:
+            raise RuntimeError("未配置可用的LLM服务")
+        raise last_error
+
+    def status(self) -> Dict[str, Any]:
+        """各服务的熔断状态"""
+        return {
+            provider: {"state": breaker.state, "failures": breaker.failures}
+            for provider, breaker in self._breakers.items()
+        }
+
+
+# 创建全局实例
+llm_clients = LLMClientRegistry()
+
+
+# Celery任务和进程池工作进程中每个线程复用的事件循环
+_worker_loops = threading.local()
+
+
+def _close_worker_loop(loop: asyncio.AbstractEventLoop):
+    """关闭事件循环中创建的LLM客户端和事件循环（进程退出时执行）"""
+    if loop.is_closed():
+        return
+    try:
+        loop.run_until_complete(llm_clients.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.debug(f"关闭事件循环失败: {e}")
+    finally:
+        loop.close()
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    在当前线程的长期事件循环中执行协程（代替同步代码中的 asyncio.run）
+
+    LLM客户端按事件循环创建，asyncio.run 每次使用新的事件循环，每个任务都会重新建立连接，
+    且旧的客户端不会被关闭；同一线程的任务复用一个事件循环，客户端和连接在任务之间复用，
+    进程退出时关闭
+
+    Args:
+        coro: 协程
+
+    Returns:
+        协程的返回值
+    """
+    loop = getattr(_worker_loops, "loop", None)
+    # fork出的子进程不能复用父进程的事件循环
+    if loop is None or loop.is_closed() or _worker_loops.pid != os.getpid():
+        loop = asyncio.new_event_loop()
+        _worker_loops.loop = loop
+        _worker_loops.pid = os.getpid()
+        atexit.register(_close_worker_loop, loop)
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
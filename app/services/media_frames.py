@@ -0,0 +1,341 @@
+"""
+视频抽帧和图片压缩
+函数定义在模块顶层并只使用可序列化的参数，可以在线程或进程池中执行
+"""
+from typing import Any, List, Optional, Tuple
+from pathlib import Path
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from loguru import logger
+
+from config import settings
+from app.core.disk_cache import prune_cache_dir, touch
+
+
+# 视频最多抽取的帧数（过多会导致 Error code: 500 - too many images）
+VIDEO_MAX_FRAMES = 8
+
+# 视频帧最大边长
+VIDEO_FRAME_MAX_SIZE = 512
+
+# 视频帧采样方式：均匀采样、按画面变化（镜头切换）采样
+SAMPLING_UNIFORM = "uniform"
+SAMPLING_SCENE = "scene"
+
+# scene 采样时每段检查的候选帧数
+SCENE_CANDIDATES = 8
+
+# 视频帧缓存格式版本，采样算法变化后旧缓存不再使用
+FRAME_CACHE_VERSION = 1
+
+# 图文笔记最多分析的图片数（例如接口限制 max allowed 16，这里降低到 5 张）
+IMAGE_LIMIT = 5
+
+# 图片最大边长
+IMAGE_MAX_SIZE = 1024
+
+# 图片JPEG压缩质量
+IMAGE_JPEG_QUALITY = 80
+
+
+def _resize(frame, max_size: int):
+    """等比缩小到最大边长 max_size，减少 Token 消耗"""
+    import cv2
+
+    h, w = frame.shape[:2]
+    if max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)))
+    return frame
+
+
+def _frame_signature(frame):
+    """帧的颜色直方图（缩小后的HSV色调/饱和度），用于计算画面变化"""
+    import cv2
+
+    small = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+
+def _count_frames(video_path: str) -> int:
+    """顺序读取统计帧数（视频元数据没有帧数时使用）"""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    count = 0
+    try:
+        while cap.grab():
+            count += 1
+    finally:
+        cap.release()
+    return count
+
+
+def sample_video_frames(
+    video_path: str,
+    max_frames: int = VIDEO_MAX_FRAMES,
+    max_size: int = VIDEO_FRAME_MAX_SIZE,
+    mode: str = SAMPLING_SCENE
+) -> List[bytes]:
+    """
+    一次顺序解码抽取视频帧（不逐帧跳转，避免每帧都从最近的关键帧重新解码）
+
+    视频按时长均分为 max_frames 段，每段取一帧：
+    - uniform: 取每段的第一帧
+    - scene: 每段检查 SCENE_CANDIDATES 个候选帧，取与前一候选帧画面差异最大的帧（镜头切换处）
+
+    Args:
+        video_path: 本地视频路径
+        max_frames: 最多抽取的帧数
+        max_size: 帧的最大边长
+        mode: 采样方式 uniform / scene
+
+    Returns:
+        JPEG编码的帧列表（按时间顺序）
+
+    Raises:
+        ImportError: 未安装 opencv-python-headless
+        Exception: 无法打开视频文件
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("无法打开视频文件")
+
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            total_frames = _count_frames(video_path)
+        if total_frames <= 0:
+            return []
+
+        segment_length = total_frames / max_frames
+        if mode == SAMPLING_SCENE:
+            stride = max(1, int(segment_length / SCENE_CANDIDATES))
+            last_candidate = total_frames - 1
+        else:
+            targets = {int(i * segment_length) for i in range(max_frames)}
+            last_candidate = max(targets)
+
+        # 每段当前最佳帧 (变化分数, 缩小后的帧)
+        best: List[Optional[Tuple[float, Any]]] = [None] * max_frames
+        previous_signature = None
+        frame_idx = 0
+        while frame_idx <= last_candidate and cap.grab():
+            is_candidate = frame_idx % stride == 0 if mode == SAMPLING_SCENE else frame_idx in targets
+            if is_candidate:
+                ret, frame = cap.retrieve()
+                if ret:
+                    segment = min(int(frame_idx / segment_length), max_frames - 1)
+                    score = 0.0
+                    if mode == SAMPLING_SCENE:
+                        signature = _frame_signature(frame)
+                        if previous_signature is not None:
+                            score = float(cv2.compareHist(previous_signature, signature, cv2.HISTCMP_BHATTACHARYYA))
+                        previous_signature = signature
+                    # 分数相同时保留较早的帧
+                    if best[segment] is None or score > best[segment][0]:
+                        best[segment] = (score, _resize(frame, max_size))
+            frame_idx += 1
+
+        frames = []
+        for entry in best:
+            if entry is not None:
+                _, buffer = cv2.imencode(".jpg", entry[1])
+                frames.append(buffer.tobytes())
+        return frames
+    finally:
+        cap.release()
+
+
+def _hash_file(file_path: str) -> str:
+    """按块计算文件内容哈希"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_cache_root(video_path: str) -> Path:
+    """
+    视频帧缓存目录：
+    data/crawled_data 下的视频缓存在所在内容目录的 frames/ 下，其他视频（包括按URL下载到
+    VIDEO_DOWNLOAD_DIR 的视频）缓存在 VIDEO_FRAME_CACHE_DIR，由 VIDEO_FRAME_CACHE_MAX_BYTES/VIDEO_FRAME_CACHE_TTL 限制
+    """
+    video = Path(video_path).resolve()
+    crawled_data = (Path(settings.DATA_DIR) / "crawled_data").resolve()
+    downloads = Path(settings.VIDEO_DOWNLOAD_DIR).resolve()
+    if crawled_data in video.parents and downloads not in video.parents:
+        return video.parent / "frames"
+    return Path(settings.VIDEO_FRAME_CACHE_DIR)
+
+
+def _read_cached_frames(cache_dir: Path, count: int) -> Optional[List[bytes]]:
+    try:
+        return [(cache_dir / f"{i:03d}.jpg").read_bytes() for i in range(count)]
+    except OSError:
+        return None
+
+
+def extract_video_frames(
+    video_path: str,
+    max_frames: int = VIDEO_MAX_FRAMES,
+    max_size: int = VIDEO_FRAME_MAX_SIZE,
+    mode: Optional[str] = None,
+    use_cache: Optional[bool] = None
+) -> List[str]:
+    """
+    抽取视频帧，结果按视频内容哈希和采样参数缓存在磁盘上，
+    同一视频换提示词重新分析时不再解码
+
+    缓存目录下的 sources/ 记录每个视频文件的大小、修改时间和哈希，文件未变化时不需要重新计算哈希
+
+    Args:
+        video_path: 本地视频路径
+        max_frames: 最多抽取的帧数
+        max_size: 帧的最大边长
+        mode: 采样方式 uniform / scene，默认使用配置
+        use_cache: 是否使用帧缓存，默认使用配置
+
+    Returns:
+        base64编码的JPEG帧列表
+
+    Raises:
+        ImportError: 未安装 opencv-python-headless
+        Exception: 无法打开视频文件
+    """
+    mode = mode or settings.VIDEO_FRAME_SAMPLING
+    use_cache = settings.VIDEO_FRAME_CACHE_ENABLED if use_cache is None else use_cache
+    if not use_cache:
+        frames = sample_video_frames(video_path, max_frames, max_size, mode)
+        return [base64.b64encode(frame).decode("utf-8") for frame in frames]
+
+    stat = os.stat(video_path)
+    source = str(Path(video_path).resolve())
+    params = {"version": FRAME_CACHE_VERSION, "max_frames": max_frames, "max_size": max_size, "mode": mode}
+    cache_root = frame_cache_root(video_path)
+
+    # 视频大小和修改时间与上次记录一致时沿用记录的哈希（避免对大文件重复计算）
+    source_index = cache_root / "sources" / f"{hashlib.sha1(source.encode('utf-8')).hexdigest()[:20]}.json"
+    video_hash = None
+    try:
+        record = json.loads(source_index.read_text(encoding="utf-8"))
+        if record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+            video_hash = record.get("video_hash")
+    except (OSError, ValueError):
+        pass
+    # 临时下载的视频文件名每次不同，不记录
+    if video_hash is None:
+        video_hash = _hash_file(video_path)
+        if not source.startswith(tempfile.gettempdir()):
+            try:
+                source_index.parent.mkdir(parents=True, exist_ok=True)
+                source_index.write_text(json.dumps({
+                    "source": source, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "video_hash": video_hash
+                }), encoding="utf-8")
+            except OSError as e:
+                logger.debug(f"写入视频哈希记录失败: {e}")
+
+    params_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    cache_dir = cache_root / f"{video_hash[:20]}-{params_hash}"
+    meta_path = cache_dir / "meta.json"
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            frames = _read_cached_frames(cache_dir, meta["count"])
+            if frames is not None:
+                logger.debug(f"命中视频帧缓存: {cache_dir}")
+                touch(cache_dir)
+                return [base64.b64encode(frame).decode("utf-8") for frame in frames]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    frames = sample_video_frames(video_path, max_frames, max_size, mode)
+    if frames:
+        tmp_dir = None
+        try:
+            # 先写入临时目录再重命名，并发抽取同一视频时不会读到不完整的缓存
+            cache_root.mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(prefix=".tmp-", dir=cache_root))
+            for i, frame in enumerate(frames):
+                (tmp_dir / f"{i:03d}.jpg").write_bytes(frame)
+            (tmp_dir / "meta.json").write_text(json.dumps({
+                **params, "video_hash": video_hash, "count": len(frames)
+            }), encoding="utf-8")
+            if cache_dir.exists():
+                shutil.rmtree(cache_dir, ignore_errors=True)
+            os.replace(tmp_dir, cache_dir)
+        except OSError as e:
+            logger.warning(f"写入视频帧缓存失败: {e}")
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        if cache_root == Path(settings.VIDEO_FRAME_CACHE_DIR):
+            prune_cache_dir(
+                cache_root,
+                max_bytes=settings.VIDEO_FRAME_CACHE_MAX_BYTES,
+                ttl=settings.VIDEO_FRAME_CACHE_TTL,
+                keep=[cache_dir],
+                exclude=["sources"]
+            )
+    return [base64.b64encode(frame).decode("utf-8") for frame in frames]
+
+
+def select_images(image_paths: List[str], limit: int = IMAGE_LIMIT) -> List[str]:
+    """均匀选取最多 limit 张图片（总是保留第一张和最后一张）"""
+    if len(image_paths) <= limit:
+        return list(image_paths)
+    step = (len(image_paths) - 1) / (limit - 1)
+    selected_indices = sorted({int(i * step) for i in range(limit)})
+    return [image_paths[i] for i in selected_indices]
+
+
+def load_image_frames(
+    image_paths: List[str],
+    limit: int = IMAGE_LIMIT,
+    max_size: int = IMAGE_MAX_SIZE
+) -> List[str]:
+    """
+    读取并压缩图片序列
+
+    Args:
+        image_paths: 本地图片路径列表
+        limit: 最多读取的图片数
+        max_size: 图片最大边长
+
+    Returns:
+        base64编码的JPEG图片列表（无法读取的图片被跳过）
+
+    Raises:
+        ImportError: 未安装 opencv-python-headless
+    """
+    import cv2
+    import numpy as np
+
+    frames = []
+    for img_path in select_images(image_paths, limit):
+        if not os.path.exists(img_path):
+            continue
+        try:
+            # Windows路径包含中文时 cv2.imread 可能失败，使用 imdecode
+            img = cv2.imdecode(np.fromfile(img_path, np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                logger.warning(f"无法读取图片: {img_path}")
+                continue
+            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), IMAGE_JPEG_QUALITY]
+            _, buffer = cv2.imencode(".jpg", _resize(img, max_size), encode_param)
+            frames.append(base64.b64encode(buffer).decode("utf-8"))
+        except Exception as img_err:
+            logger.warning(f"处理图片失败 {img_path}: {img_err}")
+            # 压缩失败时直接使用原图
+            with open(img_path, "rb") as f:
+                frames.append(base64.b64encode(f.read()).decode("utf-8"))
+    return frames
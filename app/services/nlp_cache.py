@@ -0,0 +1,361 @@
+"""
+文本分析结果缓存
+以清洗后文本的哈希为键，缓存SnowNLP情感分数和jieba分词结果，跨分析任务复用。
+默认存储在本地SQLite文件中，配置了独立的 NLP_CACHE_REDIS_URL 时可存储在Redis中（条目带过期时间），
+按最近访问时间做LRU淘汰
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from pathlib import Path
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+from config import settings
+
+
+class _SQLiteBackend:
+    """SQLite缓存后端"""
+
+    # 超出上限时淘汰到上限的90%，避免每次写入都触发淘汰
+    EVICT_RATIO = 0.9
+
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # 条数上界：上次统计的条数加上之后写入的条数（覆盖写入也计入），超过上限时才重新统计
+        self._size_bound = None
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # fork出的子进程不能复用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nlp_cache ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "accessed_at REAL NOT NULL, PRIMARY KEY (kind, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_nlp_cache_accessed ON nlp_cache (accessed_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nlp_cache_stats ("
+                "kind TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+            self._size_bound = None
+        return self._conn
+
+    def get_many(self, kind: str, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM nlp_cache WHERE kind = ? AND key IN ({placeholders})",
+                    [kind, *chunk]
+                ).fetchall()
+                found.update(rows)
+            if found:
+                conn.executemany(
+                    "UPDATE nlp_cache SET accessed_at = ? WHERE kind = ? AND key = ?",
+                    [(now, kind, key) for key in found]
+                )
+                conn.commit()
+        return found
+
+    def set_many(self, kind: str, items: Dict[str, str]):
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO nlp_cache (kind, key, value, accessed_at) VALUES (?, ?, ?, ?)",
+                [(kind, key, value, now) for key, value in items.items()]
+            )
+            if self._size_bound is None:
+                self._size_bound = conn.execute("SELECT COUNT(*) FROM nlp_cache").fetchone()[0]
+            else:
+                self._size_bound += len(items)
+            # 上界超过上限时才统计实际条数（COUNT(*) 需要扫描整个表）
+            if self._size_bound > self.max_entries:
+                size = conn.execute("SELECT COUNT(*) FROM nlp_cache").fetchone()[0]
+                self._size_bound = size
+                if size > self.max_entries:
+                    evict_count = size - int(self.max_entries * self.EVICT_RATIO)
+                    conn.execute(
+                        "DELETE FROM nlp_cache WHERE rowid IN "
+                        "(SELECT rowid FROM nlp_cache ORDER BY accessed_at LIMIT ?)",
+                        (evict_count,)
+                    )
+                    self._size_bound = size - evict_count
+                    logger.info(f"文本分析缓存淘汰 {evict_count} 条")
+            conn.commit()
+
+    def incr_stats(self, kind: str, hits: int, misses: int):
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT INTO nlp_cache_stats (kind, hits, misses) VALUES (?, ?, ?) "
+                "ON CONFLICT(kind) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                (kind, hits, misses)
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._get_conn()
+            size = conn.execute("SELECT COUNT(*) FROM nlp_cache").fetchone()[0]
+            rows = conn.execute("SELECT kind, hits, misses FROM nlp_cache_stats").fetchall()
+        return {
+            "size": size,
+            "kinds": {kind: {"hits": hits, "misses": misses} for kind, hits, misses in rows}
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM nlp_cache")
+            conn.execute("DELETE FROM nlp_cache_stats")
+            conn.commit()
+            self._size_bound = 0
+
+
+class _RedisBackend:
+    """Redis缓存后端"""
+
+    EVICT_RATIO = 0.9
+
+    def __init__(self, client, max_entries: int, ttl: int = 0, prefix: str = "nlp_cache"):
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+        # 有序集合记录最近访问时间，用于LRU淘汰（不依赖Redis全局的maxmemory策略，避免影响Celery队列）
+        self.lru_key = f"{prefix}:lru"
+        self.stats_key = f"{prefix}:stats"
+
+    def _value_key(self, kind: str, key: str) -> str:
+        return f"{self.prefix}:{kind}:{key}"
+
+    def get_many(self, kind: str, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        now = time.time()
+        for i in range(0, len(keys), 1000):
+            chunk = keys[i:i + 1000]
+            values = self.client.mget([self._value_key(kind, key) for key in chunk])
+            hits = {key: value for key, value in zip(chunk, values) if value is not None}
+            if hits:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.zadd(self.lru_key, {f"{kind}:{key}": now for key in hits})
+                if self.ttl:
+                    for key in hits:
+                        pipe.expire(self._value_key(kind, key), self.ttl)
+                pipe.execute()
+            found.update(hits)
+        return found
+
+    def set_many(self, kind: str, items: Dict[str, str]):
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(self._value_key(kind, key), value, ex=self.ttl or None)
+        pipe.zadd(self.lru_key, {f"{kind}:{key}": now for key in items})
+        if self.ttl:
+            # 已过期的条目
+            pipe.zremrangebyscore(self.lru_key, 0, now - self.ttl)
+        pipe.execute()
+
+        size = self.client.zcard(self.lru_key)
+        if size > self.max_entries:
+            evict_count = size - int(self.max_entries * self.EVICT_RATIO)
+            members = self.client.zrange(self.lru_key, 0, evict_count - 1)
+            pipe = self.client.pipeline(transaction=False)
+            for i in range(0, len(members), 1000):
+                chunk = members[i:i + 1000]
+                pipe.delete(*[f"{self.prefix}:{member}" for member in chunk])
+                pipe.zrem(self.lru_key, *chunk)
+            pipe.execute()
+            logger.info(f"文本分析缓存淘汰 {len(members)} 条")
+
+    def incr_stats(self, kind: str, hits: int, misses: int):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self.stats_key, f"{kind}:hits", hits)
+        pipe.hincrby(self.stats_key, f"{kind}:misses", misses)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        kinds = {}
+        for field, value in (self.client.hgetall(self.stats_key) or {}).items():
+            kind, counter = field.rsplit(":", 1)
+            kinds.setdefault(kind, {"hits": 0, "misses": 0})[counter] = int(value)
+        return {"size": self.client.zcard(self.lru_key), "kinds": kinds}
+
+    def clear(self):
+        members = self.client.zrange(self.lru_key, 0, -1)
+        for i in range(0, len(members), 1000):
+            self.client.delete(*[f"{self.prefix}:{member}" for member in members[i:i + 1000]])
+        self.client.delete(self.lru_key, self.stats_key)
+
+
+class NLPResultCache:
+    """文本分析结果缓存"""
+
+    # 缓存类型：情感分数、分词结果
+    SENTIMENT = "sentiment"
+    TOKENS = "tokens"
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        path: Optional[Path] = None
+    ):
+        """
+        Args:
+            backend: 后端类型 sqlite/redis/auto/none
+            max_entries: 最大缓存条数
+            path: SQLite文件路径
+        """
+        self.backend_name = (backend or settings.NLP_CACHE_BACKEND).lower()
+        self.max_entries = max_entries or settings.NLP_CACHE_MAX_ENTRIES
+        self.path = path or settings.NLP_CACHE_PATH
+        self._backend = None
+        self._backend_ready = False
+        self.backend_type: Optional[str] = None
+        # 当前进程内的命中统计
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend_name != "none"
+
+    def _get_backend(self):
+        """延迟初始化后端（避免导入时连接Redis）"""
+        if self._backend_ready:
+            return self._backend
+        self._backend_ready = True
+
+        if not self.enabled:
+            return None
+
+        # 不使用Celery消息队列所在的Redis，避免大量缓存条目挤占队列内存
+        if self.backend_name in ("auto", "redis") and settings.NLP_CACHE_REDIS_URL:
+            try:
+                from redis import Redis
+                client = Redis.from_url(
+                    settings.NLP_CACHE_REDIS_URL, decode_responses=True, socket_connect_timeout=2
+                )
+                client.ping()
+                self._backend = _RedisBackend(client, self.max_entries, ttl=settings.NLP_CACHE_REDIS_TTL)
+                self.backend_type = "redis"
+                logger.info("文本分析缓存使用Redis后端")
+                return self._backend
+            except Exception as e:
+                logger.warning(f"文本分析缓存无法使用Redis: {e}")
+        if self.backend_name == "redis":
+            logger.warning("文本分析缓存的Redis不可用或未配置 NLP_CACHE_REDIS_URL，回退到SQLite")
+
+        self._backend = _SQLiteBackend(self.path, self.max_entries)
+        self.backend_type = "sqlite"
+        logger.info(f"文本分析缓存使用SQLite后端: {self.path}")
+        return self._backend
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        """计算文本哈希键"""
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, kind: str, texts: Iterable[str]) -> Dict[str, Any]:
+        """
+        批量读取缓存
+
+        Args:
+            kind: 缓存类型
+            texts: 文本列表（应为去重后的清洗文本）
+
+        Returns:
+            命中的结果字典 {text: value}
+        """
+        texts = list(texts)
+        backend = self._get_backend()
+        if backend is None or not texts:
+            return {}
+
+        keys = {self.text_key(text): text for text in texts}
+        try:
+            found = backend.get_many(kind, list(keys))
+        except Exception as e:
+            logger.warning(f"读取文本分析缓存失败: {e}")
+            return {}
+
+        result = {keys[key]: json.loads(value) for key, value in found.items()}
+        hit_count = len(result)
+        miss_count = len(texts) - hit_count
+        self.hits[kind] = self.hits.get(kind, 0) + hit_count
+        self.misses[kind] = self.misses.get(kind, 0) + miss_count
+        try:
+            backend.incr_stats(kind, hit_count, miss_count)
+        except Exception as e:
+            logger.debug(f"更新缓存统计失败: {e}")
+        return result
+
+    def set_many(self, kind: str, values: Dict[str, Any]):
+        """
+        批量写入缓存
+
+        Args:
+            kind: 缓存类型
+            values: 结果字典 {text: value}
+        """
+        backend = self._get_backend()
+        if backend is None or not values:
+            return
+        try:
+            backend.set_many(kind, {
+                self.text_key(text): json.dumps(value, ensure_ascii=False)
+                for text, value in values.items()
+            })
+        except Exception as e:
+            logger.warning(f"写入文本分析缓存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计（包含全局累计和当前进程的命中数）"""
+        backend = self._get_backend()
+        result = {
+            "backend": self.backend_type,
+            "max_entries": self.max_entries,
+            "process": {
+                kind: {"hits": self.hits.get(kind, 0), "misses": self.misses.get(kind, 0)}
+                for kind in set(self.hits) | set(self.misses)
+            }
+        }
+        if backend is not None:
+            try:
+                result.update(backend.stats())
+            except Exception as e:
+                logger.warning(f"读取缓存统计失败: {e}")
+        return result
+
+    def clear(self):
+        """清空缓存"""
+        backend = self._get_backend()
+        if backend is not None:
+            backend.clear()
+
+
+# 创建全局实例
+nlp_cache = NLPResultCache()
@@ -0,0 +1,333 @@
+"""
+标准化数据列式存储
+将 extract_text_from_item 提取并清洗后的数据按 platform/date 分区写入 Parquet 文件，
+同一个爬取文件再次分析时直接读取列式数据，跳过JSON解析和文本清洗。
+未安装 pyarrow 时不启用
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+
+from loguru import logger
+
+from config import settings
+
+
+# extract_text_from_item 的输出字段（platform 由分区目录表示，不写入文件）
+ITEM_FIELDS = (
+    "content", "title", "author", "url",
+    "likes", "comments_count", "shares", "date", "comments"
+)
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+UNKNOWN_DATE = "unknown"
+
+
+def partition_date(date_value: Any) -> str:
+    """
+    将数据的日期值转换为分区日期 YYYY-MM-DD
+
+    支持ISO格式字符串和秒/毫秒时间戳，无法解析时返回 unknown
+    """
+    if date_value in (None, ""):
+        return UNKNOWN_DATE
+    text = str(date_value).strip()
+    try:
+        if text.isdigit():
+            timestamp = int(text)
+            # 毫秒时间戳
+            if timestamp > 10 ** 11:
+                timestamp //= 1000
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        date_key = datetime.fromisoformat(text.replace("Z", "+00:00")).strftime("%Y-%m-%d")
+    except (ValueError, OverflowError, OSError):
+        date_key = text[:10]
+    return date_key if _DATE_PATTERN.match(date_key) else UNKNOWN_DATE
+
+
+class NormalizedItemWriter:
+    """单个源文件的标准化数据写入器，数据按日期分区缓冲，commit 后才对读取可见"""
+
+    def __init__(self, store: "NormalizedStore", source_path: Path, platform: str):
+        self.store = store
+        self.source_path = source_path
+        self.platform = platform
+        self.stem = store.source_key(source_path, platform)
+        self.item_count = 0
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._writers: Dict[str, Any] = {}
+        self._tmp_paths: Dict[str, Path] = {}
+
+    def add(self, text_info: Dict[str, Any]):
+        """添加一条 extract_text_from_item 的结果"""
+        date_key = partition_date(text_info.get("date"))
+        buffer = self._buffers.setdefault(date_key, [])
+        buffer.append(text_info)
+        self.item_count += 1
+        if len(buffer) >= self.store.batch_size:
+            self._flush(date_key)
+
+    def _flush(self, date_key: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = self._buffers.pop(date_key, None)
+        if not rows:
+            return
+        table = pa.Table.from_pylist(
+            [{field: row.get(field) for field in ITEM_FIELDS} for row in rows],
+            schema=self.store.schema
+        )
+        writer = self._writers.get(date_key)
+        if writer is None:
+            path = self.store.partition_path(self.platform, date_key, self.stem)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            writer = pq.ParquetWriter(str(tmp_path), self.store.schema, compression="zstd")
+            self._writers[date_key] = writer
+            self._tmp_paths[date_key] = tmp_path
+        writer.write_table(table)
+
+    def commit(self):
+        """写入剩余数据，替换旧的分区文件并写入清单"""
+        for date_key in list(self._buffers):
+            self._flush(date_key)
+        for writer in self._writers.values():
+            writer.close()
+
+        self.store.remove_source(self.source_path, self.platform)
+        partitions = []
+        for date_key, tmp_path in self._tmp_paths.items():
+            path = self.store.partition_path(self.platform, date_key, self.stem)
+            os.replace(tmp_path, path)
+            partitions.append(date_key)
+
+        stat = self.source_path.stat()
+        self.store.write_manifest(self.stem, {
+            "version": self.store.VERSION,
+            "source": str(self.source_path.resolve()),
+            "platform": self.platform,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "item_count": self.item_count,
+            "partitions": sorted(partitions),
+            "created_at": datetime.now().isoformat()
+        })
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except Exception:
+                pass
+        for tmp_path in self._tmp_paths.values():
+            tmp_path.unlink(missing_ok=True)
+        self._buffers.clear()
+
+
+class NormalizedStore:
+    """
+    标准化数据存储
+
+    目录结构: {root}/platform={platform}/day={YYYY-MM-DD}/{source_key}.parquet，
+    每个源文件在 {root}/_manifests/{source_key}.json 中记录文件大小、修改时间和分区，
+    源文件变化后缓存失效并在下次处理时重新生成
+    """
+
+    # 存储格式版本，变化后旧数据不再读取
+    VERSION = 1
+
+    def __init__(self, root: Optional[Path] = None, batch_size: int = 5000, enabled: Optional[bool] = None):
+        self.root = Path(root or settings.NORMALIZED_STORE_DIR)
+        self.batch_size = batch_size
+        self.enabled = settings.NORMALIZED_STORE_ENABLED if enabled is None else enabled
+        self._schema = None
+        self._available: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        """是否启用且已安装 pyarrow"""
+        if not self.enabled:
+            return False
+        if self._available is None:
+            try:
+                import pyarrow.parquet  # noqa: F401
+                self._available = True
+            except ImportError:
+                logger.warning("未安装pyarrow，不使用标准化数据列式存储")
+                self._available = False
+        return self._available
+
+    @property
+    def schema(self):
+        if self._schema is None:
+            import pyarrow as pa
+            self._schema = pa.schema([
+                ("content", pa.string()),
+                ("title", pa.string()),
+                ("author", pa.string()),
+                ("url", pa.string()),
+                ("likes", pa.int64()),
+                ("comments_count", pa.int64()),
+                ("shares", pa.int64()),
+                ("date", pa.string()),
+                ("comments", pa.list_(pa.string()))
+            ])
+        return self._schema
+
+    @staticmethod
+    def source_key(source_path: Path, platform: str) -> str:
+        """源文件（及解析使用的平台）对应的存储文件名"""
+        raw = f"{Path(source_path).resolve()}|{platform}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def partition_path(self, platform: str, date_key: str, stem: str) -> Path:
+        return self.root / f"platform={platform}" / f"day={date_key}" / f"{stem}.parquet"
+
+    def _manifest_path(self, stem: str) -> Path:
+        return self.root / "_manifests" / f"{stem}.json"
+
+    def write_manifest(self, stem: str, manifest: Dict[str, Any]):
+        path = self._manifest_path(stem)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _read_manifest(self, stem: str) -> Optional[Dict[str, Any]]:
+        path = self._manifest_path(stem)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, source_path: Path, platform: str) -> Optional[Dict[str, Any]]:
+        """
+        查找源文件的有效缓存清单
+
+        Returns:
+            清单，未缓存、源文件已变化或分区文件缺失时返回None
+        """
+        if not self.available:
+            return None
+        source_path = Path(source_path)
+        stem = self.source_key(source_path, platform)
+        manifest = self._read_manifest(stem)
+        if not manifest or manifest.get("version") != self.VERSION:
+            return None
+        try:
+            stat = source_path.stat()
+        except OSError:
+            return None
+        if manifest.get("size") != stat.st_size or manifest.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        for date_key in manifest.get("partitions", []):
+            if not self.partition_path(platform, date_key, stem).exists():
+                return None
+        return manifest
+
+    def iter_items(
+        self,
+        source_path: Path,
+        platform: str,
+        columns: Optional[Iterable[str]] = None
+    ) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        读取源文件的标准化数据
+
+        数据按分区日期顺序返回（同一日期内保持文件中的顺序），与源文件中的顺序不一定相同
+
+        Args:
+            source_path: 源JSON文件路径
+            platform: 平台代码
+            columns: 只读取的字段，默认读取全部字段
+
+        Returns:
+            数据迭代器，没有有效缓存时返回None
+        """
+        manifest = self.lookup(source_path, platform)
+        if manifest is None:
+            return None
+        stem = self.source_key(Path(source_path), platform)
+        paths = [self.partition_path(platform, date_key, stem) for date_key in manifest["partitions"]]
+        columns = list(columns) if columns else ["platform", *ITEM_FIELDS]
+        return self._iter_partition_rows(paths, platform, columns)
+
+    def _iter_partition_rows(self, paths: List[Path], platform: str, columns: List[str]) -> Iterator[Dict[str, Any]]:
+        import pyarrow.parquet as pq
+
+        file_columns = [column for column in columns if column != "platform"]
+        for path in paths:
+            parquet_file = pq.ParquetFile(str(path))
+            for batch in parquet_file.iter_batches(batch_size=self.batch_size, columns=file_columns):
+                for row in batch.to_pylist():
+                    if "platform" in columns:
+                        row["platform"] = platform
+                    yield row
+
+    def open_writer(self, source_path: Path, platform: str) -> Optional[NormalizedItemWriter]:
+        """创建源文件的写入器，存储不可用时返回None"""
+        if not self.available:
+            return None
+        return NormalizedItemWriter(self, Path(source_path), platform)
+
+    def remove_source(self, source_path: Path, platform: str):
+        """删除源文件已有的分区文件和清单"""
+        stem = self.source_key(Path(source_path), platform)
+        for path in (self.root / f"platform={platform}").glob(f"day=*/{stem}.parquet"):
+            path.unlink(missing_ok=True)
+        self._manifest_path(stem).unlink(missing_ok=True)
+
+    def read_table(
+        self,
+        platforms: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ):
+        """
+        以 Arrow 表读取标准化数据（按分区裁剪，只读取需要的列）
+
+        Args:
+            platforms: 平台列表，默认全部平台
+            columns: 字段列表，默认全部字段
+            start_date: 开始日期 YYYY-MM-DD（含，按分区日期 day 过滤）
+            end_date: 结束日期 YYYY-MM-DD（含）
+
+        Returns:
+            pyarrow.Table（包含分区字段 platform、day），可通过 to_pandas() 转换为 DataFrame；存储不可用或没有数据时返回None
+        """
+        if not self.available or not self.root.exists():
+            return None
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(
+            pa.schema([("platform", pa.string()), ("day", pa.string())]), flavor="hive"
+        )
+        dataset = ds.dataset(str(self.root), format="parquet", partitioning=partitioning)
+
+        expression = None
+        conditions = []
+        if platforms:
+            conditions.append(ds.field("platform").isin(platforms))
+        if start_date:
+            conditions.append(ds.field("day") >= start_date)
+        if end_date:
+            conditions.append(ds.field("day") <= end_date)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        return dataset.to_table(columns=columns, filter=expression)
+
+
+# 创建全局实例
+normalized_store = NormalizedStore()
@@ -0,0 +1,117 @@
+"""
+报告文件缓存
+已完成分析任务的报告内容不再变化，HTML/PDF/Markdown 报告按 (analysis_task_id, 格式, 模板版本, 图表样式版本) 保存在磁盘上，
+分析完成后预先生成，导出时直接返回文件
+"""
+from typing import Any, Dict, Optional
+from pathlib import Path
+import os
+import uuid
+
+from loguru import logger
+
+from config import settings
+from app.services.report_service import report_service, REPORT_TEMPLATE_VERSION, CHART_STYLE_VERSION
+from app.services.chart_cache import chart_cache
+
+
+# 报告格式对应的文件扩展名
+FORMAT_EXTENSIONS = {
+    "pdf": "pdf",
+    "html": "html",
+    "md": "md",
+    "markdown": "md"
+}
+
+
+class ReportArtifacts:
+    """已完成分析任务的报告文件缓存"""
+
+    def __init__(self, artifact_dir: Optional[Path] = None):
+        """
+        初始化报告文件缓存
+
+        Args:
+            artifact_dir: 缓存目录，默认使用配置
+        """
+        self.artifact_dir = Path(artifact_dir or settings.REPORT_ARTIFACT_DIR)
+
+    def path(self, analysis_task_id: int, fmt: str) -> Path:
+        """报告文件路径（HTML/PDF内嵌图表，图表样式版本变化后重新生成）"""
+        return self.artifact_dir / (
+            f"{analysis_task_id}-v{REPORT_TEMPLATE_VERSION}-c{CHART_STYLE_VERSION}.{FORMAT_EXTENSIONS[fmt]}"
+        )
+
+    def get(self, analysis_task_id: int, fmt: str) -> Optional[Path]:
+        """已生成的报告文件，不存在时返回None"""
+        path = self.path(analysis_task_id, fmt)
+        return path if path.exists() else None
+
+    def ensure(
+        self,
+        analysis_task_id: int,
+        fmt: str,
+        brand_info: Dict[str, Any],
+        analysis_result: Dict[str, Any]
+    ) -> Optional[Path]:
+        """
+        获取报告文件，没有缓存时生成并保存
+
+        Args:
+            analysis_task_id: 分析任务ID
+            fmt: 报告格式（pdf/html/md）
+            brand_info: 品牌信息（id、name、description）
+            analysis_result: 分析结果
+
+        Returns:
+            报告文件路径，PDF生成失败时返回None
+        """
+        path = self.get(analysis_task_id, fmt)
+        if path:
+            return path
+
+        report_data = report_service.prepare_report_data(
+            brand_name=brand_info["name"],
+            analysis_result=analysis_result,
+            brand_info=brand_info
+        )
+        path = self.path(analysis_task_id, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写入临时文件再替换，并发导出时不会读到写了一半的文件
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+
+        try:
+            if FORMAT_EXTENSIONS[fmt] == "md":
+                tmp_path.write_text(report_service.generate_markdown_report(report_data), encoding="utf-8")
+            else:
+                html_path = self.get(analysis_task_id, "html")
+                if html_path:
+                    html_content = html_path.read_text(encoding="utf-8")
+                else:
+                    html_content = report_service.render_html_report(
+                        report_data=report_data,
+                        charts=chart_cache.get_base64(analysis_task_id, analysis_result)
+                    )
+                if fmt == "html":
+                    tmp_path.write_text(html_content, encoding="utf-8")
+                elif not report_service.html_to_pdf(html_content, tmp_path):
+                    return None
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        logger.info(f"报告已生成: {path}")
+        return path
+
+    def prebuild(self, analysis_task_id: int, brand_info: Dict[str, Any], analysis_result: Dict[str, Any]):
+        """预先生成配置的各格式报告（HTML最先生成，PDF直接复用）"""
+        formats = sorted(set(settings.REPORT_PREBUILD_FORMATS), key=lambda fmt: fmt != "html")
+        for fmt in formats:
+            try:
+                self.ensure(analysis_task_id, fmt, brand_info, analysis_result)
+            except Exception as e:
+                logger.warning(f"预生成 {fmt} 报告失败 (分析任务 {analysis_task_id}): {e}")
+
+
+# 创建全局实例
+report_artifacts = ReportArtifacts()
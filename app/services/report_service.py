@@ -6,26 +6,22 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 from datetime import datetime
 import base64
-import io
+import multiprocessing
+import threading
+import time
 from loguru import logger
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
-import matplotlib
-matplotlib.use('Agg')  # 使用非交互式后端
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-from matplotlib import rcParams
-import numpy as np
 
 from config import settings
+from app.core.process_pool import create_process_pool, resolve_workers
+from app.services.chart_renderer import chart_specs, render_chart, echarts_options
 
-# 配置中文字体
-try:
-    # 尝试使用系统中文字体
-    plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS', 'DejaVu Sans']
-    plt.rcParams['axes.unicode_minus'] = False
-except:
-    pass
+# 图表样式版本，修改图表样式后递增，使已缓存的图表失效
+CHART_STYLE_VERSION = 1
+
+# 报告模板版本，修改报告模板或Markdown格式后递增，使已生成的报告文件失效
+REPORT_TEMPLATE_VERSION = 1
 
 
 class ReportService:
@@ -45,6 +41,10 @@ class ReportService:
         # 确保输出目录存在
         settings.REPORT_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         
+        # 绘图进程池（首次生成图表时创建）
+        self._chart_pool = None
+        self._chart_pool_lock = threading.Lock()
+        
         logger.info("报表生成服务初始化完成")
     
     def prepare_report_data(
@@ -121,289 +121,78 @@ class ReportService:
         Returns:
             图表字典，key为图表名称，value为base64编码的图片
         """
-        charts = {}
+        return {
+            name: base64.b64encode(image).decode('utf-8')
+            for name, image in self.render_chart_images(analysis_result).items()
+        }
+    
+    def render_chart_images(self, analysis_result: Dict[str, Any], fmt: str = "png") -> Dict[str, bytes]:
+        """
+        绘制图表（各图表相互独立，在进程池中并行绘制）
         
-        try:
-            # 1. 情感分析饼图
-            sentiment = analysis_result.get("sentiment", {})
-            if sentiment and sentiment.get("distribution"):
-                charts["sentiment_pie"] = self._generate_sentiment_pie_chart(sentiment)
-            
-            # 2. 按平台情感分析柱状图
-            sentiment_by_platform = sentiment.get("by_platform", {})
-            if sentiment_by_platform:
-                charts["sentiment_by_platform"] = self._generate_platform_sentiment_chart(sentiment_by_platform)
-            
-            # 3. 时间趋势图
-            sentiment_by_time = sentiment.get("by_time", {})
-            if sentiment_by_time and sentiment_by_time.get("distribution"):
-                charts["sentiment_trend"] = self._generate_sentiment_trend_chart(sentiment_by_time)
-            
-            # 4. 关键词权重图
-            keywords = analysis_result.get("keywords", [])
-            if keywords:
-                charts["keywords_bar"] = self._generate_keywords_chart(keywords[:15])
-            
-            # 5. 平台数据分布图
-            platform_stats = analysis_result.get("platform_statistics", {})
-            if platform_stats:
-                charts["platform_distribution"] = self._generate_platform_distribution_chart(platform_stats)
-            
-            # 6. 互动构成饼图
-            interaction_stats = analysis_result.get("interaction_statistics", {})
-            if interaction_stats and (interaction_stats.get("total_likes", 0) + interaction_stats.get("total_comments", 0) + interaction_stats.get("total_shares", 0) > 0):
-                charts["interaction_pie"] = self._generate_interaction_pie_chart(interaction_stats)
-
-            # 7. 平台互动对比图
-            if interaction_stats and interaction_stats.get("by_platform"):
-                charts["platform_interaction"] = self._generate_platform_interaction_bar_chart(interaction_stats["by_platform"])
+        Args:
+            analysis_result: 分析结果
+            fmt: 图片格式，png 或 svg
             
-        except Exception as e:
-            logger.error(f"图表生成失败: {e}", exc_info=True)
+        Returns:
+            图表字典，key为图表名称，value为图片内容（跳过没有数据或绘制失败的图表）
+        """
+        specs = chart_specs(analysis_result)
+        pool = self._get_chart_pool() if len(specs) > 1 else None
         
-        return charts
-    
-    def _generate_sentiment_pie_chart(self, sentiment: Dict[str, Any]) -> str:
-        """生成情感分析饼图"""
-        try:
-            distribution = sentiment.get("distribution", {})
-            if not distribution:
-                return ""
-            
-            labels = ["正面", "负面", "中性"]
-            sizes = [
-                distribution.get("positive", 0),
-                distribution.get("negative", 0),
-                distribution.get("neutral", 0)
-            ]
-            
-            # 如果所有值都为0，返回空字符串
-            if sum(sizes) == 0:
-                return ""
-            
-            colors = ['#4CAF50', '#F44336', '#FFC107']
-            
-            fig, ax = plt.subplots(figsize=(8, 8))
-            ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-            ax.set_title('情感分析分布', fontsize=16, fontweight='bold', pad=20)
-            
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成情感分析饼图失败: {e}")
-            return ""
-    
-    def _generate_platform_sentiment_chart(self, sentiment_by_platform: Dict[str, Any]) -> str:
-        """生成按平台情感分析柱状图"""
-        try:
-            platforms = list(sentiment_by_platform.keys())
-            platform_names = {
-                "xhs": "小红书",
-                "douyin": "抖音",
-                "weibo": "微博",
-                "zhihu": "知乎",
-                "bilibili": "B站"
-            }
-            
-            positive_data = []
-            negative_data = []
-            neutral_data = []
-            
-            for platform in platforms:
-                dist = sentiment_by_platform[platform].get("distribution", {})
-                positive_data.append(dist.get("positive", 0))
-                negative_data.append(dist.get("negative", 0))
-                neutral_data.append(dist.get("neutral", 0))
-            
-            x = np.arange(len(platforms))
-            width = 0.25
-            
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(x - width, positive_data, width, label='正面', color='#4CAF50')
-            ax.bar(x, neutral_data, width, label='中性', color='#FFC107')
-            ax.bar(x + width, negative_data, width, label='负面', color='#F44336')
-            
-            ax.set_xlabel('平台', fontsize=12)
-            ax.set_ylabel('比例 (%)', fontsize=12)
-            ax.set_title('各平台情感分析对比', fontsize=16, fontweight='bold')
-            ax.set_xticks(x)
-            ax.set_xticklabels([platform_names.get(p, p) for p in platforms])
-            ax.legend()
-            ax.grid(axis='y', alpha=0.3)
-            
-            plt.tight_layout()
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成平台情感分析图失败: {e}")
-            return ""
-    
-    def _generate_sentiment_trend_chart(self, sentiment_by_time: Dict[str, Any]) -> str:
-        """生成情感趋势图"""
-        try:
-            distribution = sentiment_by_time.get("distribution", [])
-            if not distribution:
-                return ""
-            
-            dates = [item["date"] for item in distribution]
-            positive = [item["positive"] for item in distribution]
-            negative = [item["negative"] for item in distribution]
-            neutral = [item["neutral"] for item in distribution]
-            
-            fig, ax = plt.subplots(figsize=(14, 6))
-            ax.plot(dates, positive, marker='o', label='正面', color='#4CAF50', linewidth=2)
-            ax.plot(dates, negative, marker='s', label='负面', color='#F44336', linewidth=2)
-            ax.plot(dates, neutral, marker='^', label='中性', color='#FFC107', linewidth=2)
-            
-            ax.set_xlabel('日期', fontsize=12)
-            ax.set_ylabel('比例 (%)', fontsize=12)
-            ax.set_title('情感趋势分析', fontsize=16, fontweight='bold')
-            ax.legend()
-            ax.grid(alpha=0.3)
-            
-            # 旋转x轴标签
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成情感趋势图失败: {e}")
-            return ""
+        if pool is None:
+            charts = {name: render_chart(spec, fmt) for name, spec in specs.items()}
+        else:
+            pending = {name: pool.apply_async(render_chart, (spec, fmt)) for name, spec in specs.items()}
+            charts = {}
+            # 整批图表共用一个截止时间；卡住的工作进程由进程池按 CHART_RENDER_TIMEOUT 终止并替换
+            deadline = time.monotonic() + settings.CHART_RENDER_TIMEOUT
+            for name, async_result in pending.items():
+                try:
+                    charts[name] = async_result.get(timeout=max(deadline - time.monotonic(), 0))
+                except multiprocessing.TimeoutError:
+                    logger.error(f"图表生成超时 {name}")
+                except Exception as e:
+                    logger.error(f"图表生成失败 {name}: {e}")
+        
+        return {name: image for name, image in charts.items() if image}
     
-    def _generate_keywords_chart(self, keywords: List[Dict[str, Any]]) -> str:
-        """生成关键词权重柱状图"""
-        try:
-            if not keywords:
-                return ""
-            
-            words = [kw.get("keyword", "") for kw in keywords]
-            weights = [kw.get("weight", 0) for kw in keywords]
-            
-            fig, ax = plt.subplots(figsize=(12, 8))
-            y_pos = np.arange(len(words))
-            ax.barh(y_pos, weights, color='#2196F3')
-            
-            ax.set_yticks(y_pos)
-            ax.set_yticklabels(words)
-            ax.set_xlabel('权重', fontsize=12)
-            ax.set_title('关键词权重分析（Top 15）', fontsize=16, fontweight='bold')
-            ax.grid(axis='x', alpha=0.3)
+    def chart_options(self, analysis_result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        生成图表的 ECharts 配置（由前端渲染，不需要服务端绘图）
+        
+        Args:
+            analysis_result: 分析结果
             
-            plt.tight_layout()
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成关键词图失败: {e}")
-            return ""
+        Returns:
+            图表字典，key为图表名称，value为 ECharts option
+        """
+        return echarts_options(analysis_result)
     
-    def _generate_platform_distribution_chart(self, platform_stats: Dict[str, Any]) -> str:
-        """生成平台数据分布图"""
-        try:
-            platforms = list(platform_stats.keys())
-            platform_names = {
-                "xhs": "小红书",
-                "douyin": "抖音",
-                "weibo": "微博",
-                "zhihu": "知乎",
-                "bilibili": "B站"
-            }
-            
-            counts = [platform_stats[p].get("total_texts", 0) for p in platforms]
-            
-            fig, ax = plt.subplots(figsize=(10, 6))
-            colors = ['#2196F3', '#4CAF50', '#FF9800', '#9C27B0', '#F44336']
-            ax.bar([platform_names.get(p, p) for p in platforms], counts, color=colors[:len(platforms)])
-            
-            ax.set_xlabel('平台', fontsize=12)
-            ax.set_ylabel('文本数量', fontsize=12)
-            ax.set_title('各平台数据分布', fontsize=16, fontweight='bold')
-            ax.grid(axis='y', alpha=0.3)
-            
-            # 添加数值标签
-            for i, v in enumerate(counts):
-                ax.text(i, v, str(v), ha='center', va='bottom')
-            
-            plt.tight_layout()
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成平台分布图失败: {e}")
-            return ""
-
-    def _generate_interaction_pie_chart(self, interaction_stats: Dict[str, Any]) -> str:
-        """生成互动构成饼图"""
-        try:
-            labels = ["点赞", "评论", "分享"]
-            sizes = [
-                interaction_stats.get("total_likes", 0),
-                interaction_stats.get("total_comments", 0),
-                interaction_stats.get("total_shares", 0)
-            ]
-            
-            # 如果所有值都为0，返回空字符串
-            if sum(sizes) == 0:
-                return ""
-            
-            colors = ['#FF7043', '#42A5F5', '#66BB6A']
-            
-            fig, ax = plt.subplots(figsize=(8, 8))
-            ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-            ax.set_title('互动量构成分析', fontsize=16, fontweight='bold', pad=20)
-            
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成互动构成饼图失败: {e}")
-            return ""
+    def _get_chart_pool(self):
+        """
+        绘图进程池（首次使用时创建，进程数为1时在当前进程内绘制）
 
-    def _generate_platform_interaction_bar_chart(self, platform_stats: Dict[str, Any]) -> str:
-        """生成各平台互动量对比图"""
-        try:
-            platforms = list(platform_stats.keys())
-            if not platforms:
-                return ""
-                
-            platform_names = {
-                "xhs": "小红书",
-                "douyin": "抖音",
-                "weibo": "微博",
-                "zhihu": "知乎",
-                "bilibili": "B站"
-            }
-            
-            likes = [platform_stats[p].get("likes", 0) for p in platforms]
-            comments = [platform_stats[p].get("comments", 0) for p in platforms]
-            shares = [platform_stats[p].get("shares", 0) for p in platforms]
-            
-            x = np.arange(len(platforms))
-            width = 0.25
-            
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.bar(x - width, likes, width, label='点赞', color='#FF7043')
-            ax.bar(x, comments, width, label='评论', color='#42A5F5')
-            ax.bar(x + width, shares, width, label='分享', color='#66BB6A')
-            
-            ax.set_xlabel('平台', fontsize=12)
-            ax.set_ylabel('数量', fontsize=12)
-            ax.set_title('各平台互动量对比', fontsize=16, fontweight='bold')
-            ax.set_xticks(x)
-            ax.set_xticklabels([platform_names.get(p, p) for p in platforms])
-            ax.legend()
-            ax.grid(axis='y', alpha=0.3)
-            
-            plt.tight_layout()
-            return self._fig_to_base64(fig)
-        except Exception as e:
-            logger.error(f"生成平台互动对比图失败: {e}")
-            return ""
+        可能在API进程的工作线程中创建，使用 spawn 启动工作进程；
+        单个图表超过 CHART_RENDER_TIMEOUT 时终止并替换对应的工作进程
+        """
+        processes = resolve_workers(settings.CHART_RENDER_WORKERS)
+        if processes <= 1:
+            return None
+        with self._chart_pool_lock:
+            if self._chart_pool is None:
+                self._chart_pool = create_process_pool(
+                    processes, start_method="spawn", task_timeout=settings.CHART_RENDER_TIMEOUT
+                )
+        return self._chart_pool
     
-    def _fig_to_base64(self, fig) -> str:
-        """将matplotlib图形转换为base64编码的字符串"""
-        try:
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-            buf.seek(0)
-            img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-            plt.close(fig)
-            return img_base64
-        except Exception as e:
-            logger.error(f"图形转base64失败: {e}")
-            plt.close(fig)
-            return ""
+    def close(self):
+        """关闭绘图进程池"""
+        with self._chart_pool_lock:
+            pool, self._chart_pool = self._chart_pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
     
     def render_html_report(
         self,
@@ -0,0 +1,275 @@
+"""
+批量情感分析引擎
+对文本去重后只打分一次，大批量文本拆分到进程池并行计算，
+并基于同一份分数数组生成整体、按平台、按日期的情感统计
+"""
+from typing import List, Dict, Any, Optional, Sequence
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from loguru import logger
+
+from config import settings
+from app.core.process_pool import create_process_pool, resolve_workers
+from app.services.nlp_cache import NLPResultCache, nlp_cache
+
+
+# 情感判定阈值（与 AIService.analyze_sentiment 保持一致）
+POSITIVE_THRESHOLD = 0.6
+NEGATIVE_THRESHOLD = 0.4
+
+
+def _score_chunk(texts: List[str]) -> List[float]:
+    """
+    对一批文本打分（进程池工作函数，必须定义在模块顶层以便序列化）
+
+    Args:
+        texts: 文本列表
+
+    Returns:
+        与输入顺序一致的情感分数列表
+    """
+    from snownlp import SnowNLP
+
+    scores = []
+    for text in texts:
+        try:
+            scores.append(SnowNLP(text).sentiments if text else 0.5)
+        except Exception:
+            scores.append(0.5)
+    return scores
+
+
+def normalize_date_key(date_value: Any) -> Optional[str]:
+    """
+    将日期值标准化为 YYYY-MM-DD
+
+    Args:
+        date_value: 日期字符串或其他类型的日期值
+
+    Returns:
+        日期键，空值返回None
+    """
+    if not date_value:
+        return None
+    try:
+        if isinstance(date_value, str):
+            dt = datetime.fromisoformat(date_value.replace("Z", "+00:00"))
+            return dt.strftime("%Y-%m-%d")
+        return str(date_value)[:10]
+    except Exception:
+        # 如果日期解析失败，使用原始字符串的前10个字符
+        return str(date_value)[:10]
+
+
+def empty_sentiment_summary() -> Dict[str, Any]:
+    """空文本集合的情感统计"""
+    return {
+        "total": 0,
+        "positive_count": 0,
+        "negative_count": 0,
+        "neutral_count": 0,
+        "avg_score": 0.5,
+        "distribution": {"positive": 0, "negative": 0, "neutral": 0}
+    }
+
+
+class SentimentEngine:
+    """批量情感分析引擎"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        parallel_threshold: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        cache: Optional[NLPResultCache] = None
+    ):
+        """
+        Args:
+            workers: 进程数，0或None表示使用CPU核数
+            parallel_threshold: 去重后文本数超过该值才启用进程池
+            chunk_size: 每个进程任务的文本数
+            cache: 分数缓存，默认使用全局文本分析缓存
+        """
+        workers = workers if workers is not None else settings.SENTIMENT_WORKERS
+        self.workers = resolve_workers(workers)
+        self.parallel_threshold = parallel_threshold or settings.SENTIMENT_PARALLEL_THRESHOLD
+        self.chunk_size = chunk_size or settings.SENTIMENT_CHUNK_SIZE
+        self.cache = cache if cache is not None else nlp_cache
+
+    def _create_pool(self, processes: int):
+        """创建进程池"""
+        return create_process_pool(processes)
+
+    def score_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        计算文本情感分数，相同文本只计算一次，已缓存的文本不再计算
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            与输入顺序一致的分数数组
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float64)
+
+        unique_texts = list(dict.fromkeys(texts))
+        score_map = self.cache.get_many(NLPResultCache.SENTIMENT, unique_texts)
+
+        missing_texts = [t for t in unique_texts if t not in score_map]
+        if missing_texts:
+            new_scores = dict(zip(missing_texts, self._score_unique(missing_texts)))
+            self.cache.set_many(NLPResultCache.SENTIMENT, new_scores)
+            score_map.update(new_scores)
+
+        if len(unique_texts) >= self.parallel_threshold:
+            logger.info(
+                f"情感分析: {len(texts)}条文本, 去重后{len(unique_texts)}条, "
+                f"缓存命中{len(unique_texts) - len(missing_texts)}条"
+            )
+
+        return np.fromiter((score_map[t] for t in texts), dtype=np.float64, count=len(texts))
+
+    def _score_unique(self, unique_texts: List[str]) -> List[float]:
+        """对去重后的文本打分，必要时使用进程池"""
+        total = len(unique_texts)
+        processes = min(self.workers, (total + self.chunk_size - 1) // self.chunk_size)
+
+        if total < self.parallel_threshold or processes <= 1:
+            return _score_chunk(unique_texts)
+
+        chunks = [
+            unique_texts[i:i + self.chunk_size]
+            for i in range(0, total, self.chunk_size)
+        ]
+        logger.info(f"并行情感分析: {total}条文本, {len(chunks)}个分块, {processes}个进程")
+
+        try:
+            pool = self._create_pool(processes)
+            try:
+                results = pool.map(_score_chunk, chunks)
+            finally:
+                pool.close()
+                pool.join()
+        except Exception as e:
+            logger.warning(f"进程池情感分析失败，回退到单进程: {e}")
+            return _score_chunk(unique_texts)
+
+        scores = []
+        for chunk_scores in results:
+            scores.extend(chunk_scores)
+        return scores
+
+    @staticmethod
+    def summarize(scores: np.ndarray) -> Dict[str, Any]:
+        """
+        根据分数数组生成情感统计
+
+        Args:
+            scores: 情感分数数组
+
+        Returns:
+            与 AIService.batch_analyze_sentiment 相同结构的统计结果
+        """
+        return SentimentEngine.summarize_counts(
+            total=int(scores.size),
+            positive_count=int(np.count_nonzero(scores > POSITIVE_THRESHOLD)),
+            negative_count=int(np.count_nonzero(scores < NEGATIVE_THRESHOLD)),
+            score_sum=float(scores.sum())
+        )
+
+    @staticmethod
+    def summarize_counts(
+        total: int,
+        positive_count: int,
+        negative_count: int,
+        score_sum: float
+    ) -> Dict[str, Any]:
+        """
+        根据计数生成情感统计（用于合并后的增量统计结果）
+
+        Args:
+            total: 文本总数
+            positive_count: 正面文本数
+            negative_count: 负面文本数
+            score_sum: 情感分数之和
+
+        Returns:
+            与 summarize 相同结构的统计结果
+        """
+        if total == 0:
+            return empty_sentiment_summary()
+
+        neutral_count = total - positive_count - negative_count
+
+        return {
+            "total": total,
+            "positive_count": positive_count,
+            "negative_count": negative_count,
+            "neutral_count": neutral_count,
+            "avg_score": round(score_sum / total, 4),
+            "distribution": {
+                "positive": round(positive_count / total * 100, 2),
+                "negative": round(negative_count / total * 100, 2),
+                "neutral": round(neutral_count / total * 100, 2)
+            }
+        }
+
+    def analyze(
+        self,
+        texts: Sequence[str],
+        platforms: Optional[Sequence[str]] = None,
+        dates: Optional[Sequence[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        一次打分，生成整体、按平台、按日期的情感分析结果
+
+        Args:
+            texts: 文本列表
+            platforms: 与texts对齐的平台列表（可选）
+            dates: 与texts对齐的日期列表（可选）
+
+        Returns:
+            整体情感统计，附带 by_platform 和 by_time 字段
+        """
+        scores = self.score_texts(texts)
+        result = self.summarize(scores)
+
+        if platforms is not None:
+            indices_by_platform = defaultdict(list)
+            for i, platform in enumerate(platforms):
+                indices_by_platform[platform].append(i)
+            result["by_platform"] = {
+                platform: self.summarize(scores[indices])
+                for platform, indices in indices_by_platform.items()
+            }
+
+        if dates is not None:
+            indices_by_date = defaultdict(list)
+            for i, date_value in enumerate(dates):
+                date_key = normalize_date_key(date_value)
+                if date_key:
+                    indices_by_date[date_key].append(i)
+
+            time_distribution = []
+            for date_key in sorted(indices_by_date.keys()):
+                summary = self.summarize(scores[indices_by_date[date_key]])
+                time_distribution.append({
+                    "date": date_key,
+                    "positive": summary["distribution"]["positive"],
+                    "negative": summary["distribution"]["negative"],
+                    "neutral": summary["distribution"]["neutral"],
+                    "total": summary["total"]
+                })
+            result["by_time"] = {
+                "distribution": time_distribution,
+                "total_days": len(time_distribution)
+            }
+
+        return result
+
+
+# 创建全局实例
+sentiment_engine = SentimentEngine()
@@ -0,0 +1,185 @@
+"""
+文档-词矩阵
+一次分词生成稀疏文档-词矩阵（scipy CSR），关键词、词频、主题共现和样本数
+都基于同一个矩阵做向量化计算，不再对同一批文本重复分词
+"""
+from typing import List, Dict, Any, Iterable, Optional
+
+import jieba.analyse
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TermMatrix:
+    """文档-词矩阵（行为文档，列为词，值为词在文档中出现的次数）"""
+
+    def __init__(self, matrix: csr_matrix, terms: List[str]):
+        """
+        Args:
+            matrix: 文档-词计数矩阵
+            terms: 列索引对应的词
+        """
+        self.matrix = matrix
+        self.terms = terms
+        self._keyword_mask: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_tokens(cls, tokenized_texts: Iterable[List[str]]) -> "TermMatrix":
+        """
+        根据分词结果构建矩阵（只保留长度>=2的词，与 jieba.analyse.extract_tags 一致）
+
+        Args:
+            tokenized_texts: 每个文本的分词结果
+
+        Returns:
+            文档-词矩阵，词按首次出现的顺序编号
+        """
+        vocabulary: Dict[str, int] = {}
+        indices = []
+        indptr = [0]
+        for words in tokenized_texts:
+            for word in words:
+                if len(word.strip()) > 1:
+                    indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            indptr.append(len(indices))
+
+        matrix = csr_matrix(
+            (
+                np.ones(len(indices), dtype=np.int32),
+                np.array(indices, dtype=np.int32),
+                np.array(indptr, dtype=np.int64)
+            ),
+            shape=(len(indptr) - 1, len(vocabulary))
+        )
+        # 合并同一文档中重复出现的词
+        matrix.sum_duplicates()
+        return cls(matrix, list(vocabulary))
+
+    @property
+    def n_docs(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def n_terms(self) -> int:
+        return self.matrix.shape[1]
+
+    def term_counts(self) -> np.ndarray:
+        """每个词的总出现次数"""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def doc_counts(self) -> np.ndarray:
+        """包含每个词的文档数"""
+        return np.bincount(self.matrix.indices, minlength=self.n_terms)
+
+    def keyword_mask(self) -> np.ndarray:
+        """非停用词的列"""
+        if self._keyword_mask is None:
+            stop_words = jieba.analyse.default_tfidf.stop_words
+            self._keyword_mask = np.fromiter(
+                (term.lower() not in stop_words for term in self.terms),
+                dtype=bool,
+                count=self.n_terms
+            )
+        return self._keyword_mask
+
+    def idf(self) -> np.ndarray:
+        """jieba 内置的IDF值，未收录的词使用中位数"""
+        if self._idf is None:
+            tfidf = jieba.analyse.default_tfidf
+            self._idf = np.fromiter(
+                (tfidf.idf_freq.get(term, tfidf.median_idf) for term in self.terms),
+                dtype=np.float64,
+                count=self.n_terms
+            )
+        return self._idf
+
+    def keyword_weights(self, counts: np.ndarray) -> np.ndarray:
+        """
+        计算TF-IDF权重（与 jieba.analyse.extract_tags 的计算方式一致）
+
+        Args:
+            counts: 每个词的出现次数
+
+        Returns:
+            权重数组，停用词权重为0
+        """
+        counts = np.where(self.keyword_mask(), counts, 0).astype(np.float64)
+        total = counts.sum()
+        if total <= 0:
+            return counts
+        return counts * self.idf() / total
+
+    @staticmethod
+    def _top_indices(values: np.ndarray, top_k: int) -> np.ndarray:
+        """值最大的前k个列（值相同时按词首次出现的顺序），忽略值为0的列"""
+        order = np.argsort(-values, kind="stable")[:top_k]
+        return order[values[order] > 0]
+
+    def keywords(self, top_k: int = 20) -> List[Dict[str, Any]]:
+        """
+        TF-IDF关键词
+
+        Args:
+            top_k: 返回前k个关键词
+
+        Returns:
+            关键词列表 [{"keyword", "weight"}]
+        """
+        weights = self.keyword_weights(self.term_counts())
+        return [
+            {"keyword": self.terms[i], "weight": round(float(weights[i]), 4)}
+            for i in self._top_indices(weights, top_k)
+        ]
+
+    def word_frequency(self, top_k: int = 20) -> List[Dict[str, Any]]:
+        """
+        高频词
+
+        Args:
+            top_k: 返回前k个词
+
+        Returns:
+            词频列表 [{"word", "count"}]
+        """
+        counts = self.term_counts()
+        return [
+            {"word": self.terms[i], "count": int(counts[i])}
+            for i in self._top_indices(counts, top_k)
+        ]
+
+    def topics(self, num_topics: int = 5, related_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        以TF-IDF最高的词作为主题，统计包含该词的文档数和共现关键词
+
+        Args:
+            num_topics: 主题数量
+            related_k: 每个主题的相关关键词数量
+
+        Returns:
+            主题列表 [{"topic", "weight", "keywords", "sample_count"}]
+        """
+        if self.n_terms == 0:
+            return []
+
+        weights = self.keyword_weights(self.term_counts())
+        topic_ids = self._top_indices(weights, num_topics)
+        if topic_ids.size == 0:
+            return []
+
+        # 文档是否包含主题词 (文档数 × 主题数)，与矩阵相乘得到每个主题的共现词频 (主题数 × 词数)
+        presence = (self.matrix[:, topic_ids] > 0).astype(np.int32)
+        sample_counts = np.asarray(presence.sum(axis=0)).ravel()
+        cooccurrence = np.asarray((presence.T @ self.matrix).todense())
+
+        topics = []
+        for row, term_id in enumerate(topic_ids):
+            related_weights = self.keyword_weights(cooccurrence[row])
+            related_ids = self._top_indices(related_weights, related_k)
+            topics.append({
+                "topic": self.terms[term_id],
+                "weight": round(float(weights[term_id]), 4),
+                "keywords": [self.terms[i] for i in related_ids if i != term_id][:related_k],
+                "sample_count": int(sample_counts[row])
+            })
+        return topics
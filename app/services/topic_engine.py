@@ -0,0 +1,299 @@
+"""
+主题模型
+基于哈希词矩阵的 MiniBatchNMF 主题模型，支持按批次 partial_fit 增量更新，
+模型按品牌保存到本地文件，增量分析时在上次的模型上继续训练
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from scipy.sparse import csr_matrix
+
+from config import settings
+from app.services.term_matrix import TermMatrix
+
+
+class TopicModel:
+    """可增量更新的主题模型"""
+
+    # 模型结构版本，变化后旧模型文件不再加载
+    VERSION = 1
+
+    # 文本数少于该值时主题模型不稳定，使用关键词共现提取主题
+    MIN_DOCS = 50
+
+    # 模型更新次数少于该值时重复训练当前批次（少量数据时单次更新不足以收敛）
+    WARMUP_STEPS = 20
+
+    def __init__(
+        self,
+        num_topics: int = 5,
+        n_features: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        random_state: int = 0
+    ):
+        """
+        Args:
+            num_topics: 主题数量
+            n_features: 哈希特征维度
+            batch_size: 每次 partial_fit 的文本数
+
+        Raises:
+            ImportError: 未安装 scikit-learn
+        """
+        from sklearn.decomposition import MiniBatchNMF
+
+        self.num_topics = num_topics
+        self.n_features = n_features or settings.TOPIC_HASH_FEATURES
+        self.batch_size = batch_size or settings.TOPIC_BATCH_SIZE
+        self.model = MiniBatchNMF(
+            n_components=num_topics,
+            init="nndsvda",
+            batch_size=self.batch_size,
+            random_state=random_state
+        )
+        self.version = self.VERSION
+        self.n_docs = 0
+        # 每个主题分配到的文本数、文本-主题权重之和
+        self.doc_counts = np.zeros(num_topics, dtype=np.int64)
+        self.topic_mass = np.zeros(num_topics, dtype=np.float64)
+        # 哈希桶对应的词 {bucket: [term, count]}，同一桶保留出现次数最多的词
+        self.bucket_terms: Dict[int, List[Any]] = {}
+
+    @property
+    def fitted(self) -> bool:
+        return hasattr(self.model, "components_")
+
+    def _vectorize(self, term_matrix: TermMatrix, record_terms: bool = True) -> csr_matrix:
+        """
+        将文档-词矩阵转换为哈希特征矩阵（1+log(tf) × IDF，去停用词，按行L2归一化）
+
+        Args:
+            term_matrix: 文档-词矩阵
+            record_terms: 是否记录哈希桶对应的词（只推断主题时不记录）
+        """
+        from sklearn.preprocessing import normalize
+        from sklearn.utils import murmurhash3_32
+
+        buckets = np.fromiter(
+            (murmurhash3_32(term, positive=True) % self.n_features for term in term_matrix.terms),
+            dtype=np.int32,
+            count=term_matrix.n_terms
+        )
+        column_weights = term_matrix.idf() * term_matrix.keyword_mask()
+
+        counts = term_matrix.term_counts()
+        for term_id in (np.flatnonzero(column_weights) if record_terms else ()):
+            bucket = int(buckets[term_id])
+            count = int(counts[term_id])
+            term = term_matrix.terms[term_id]
+            entry = self.bucket_terms.get(bucket)
+            if entry is not None and entry[0] == term:
+                entry[1] += count
+            elif entry is None or count > entry[1]:
+                self.bucket_terms[bucket] = [term, count]
+
+        source = term_matrix.matrix
+        data = (1 + np.log(source.data.astype(np.float32))) * column_weights[source.indices]
+        hashed = csr_matrix(
+            (data.astype(np.float32), buckets[source.indices], source.indptr),
+            shape=(term_matrix.n_docs, self.n_features)
+        )
+        hashed.sum_duplicates()
+        hashed.eliminate_zeros()
+        return normalize(hashed)
+
+    def _record_assignments(self, X: csr_matrix) -> np.ndarray:
+        """计算文本所属主题并累计统计，没有有效词的文本返回-1"""
+        weights = self.model.transform(X)
+        assignments = np.where(weights.sum(axis=1) > 0, weights.argmax(axis=1), -1)
+        self.doc_counts += np.bincount(assignments[assignments >= 0], minlength=self.num_topics)
+        self.topic_mass += weights.sum(axis=0)
+        self.n_docs += X.shape[0]
+        return assignments
+
+    def partial_fit(self, term_matrix: TermMatrix) -> np.ndarray:
+        """
+        用一批文本更新模型
+
+        Args:
+            term_matrix: 本批文本的文档-词矩阵
+
+        Returns:
+            本批每个文本所属的主题编号（没有有效词的文本为-1）
+        """
+        X = self._vectorize(term_matrix)
+        rows = np.flatnonzero(np.diff(X.indptr))
+        if rows.size == 0:
+            self.n_docs += X.shape[0]
+            return np.full(X.shape[0], -1)
+
+        valid = X[rows]
+        while True:
+            for start in range(0, valid.shape[0], self.batch_size):
+                chunk = valid[start:start + self.batch_size]
+                # nndsvda 初始化要求首批文本数不少于主题数
+                if not self.fitted and chunk.shape[0] < self.num_topics:
+                    continue
+                self.model.partial_fit(chunk)
+            if not self.fitted or self.model.n_steps_ >= self.WARMUP_STEPS:
+                break
+
+        if not self.fitted:
+            self.n_docs += X.shape[0]
+            return np.full(X.shape[0], -1)
+        return self._record_assignments(X)
+
+    def fit(self, term_matrix: TermMatrix) -> np.ndarray:
+        """
+        在全部文本上训练模型
+
+        Args:
+            term_matrix: 文档-词矩阵
+
+        Returns:
+            每个文本所属的主题编号（没有有效词的文本为-1）
+        """
+        X = self._vectorize(term_matrix)
+        if np.count_nonzero(np.diff(X.indptr)) < self.num_topics:
+            self.n_docs += X.shape[0]
+            return np.full(X.shape[0], -1)
+        self.model.fit(X)
+        return self._record_assignments(X)
+
+    def assign(self, term_matrix: TermMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        推断文本所属主题（不更新模型和统计）
+
+        Args:
+            term_matrix: 文档-词矩阵
+
+        Returns:
+            (每个文本所属的主题编号, 文本在该主题上的权重)，没有有效词或模型未训练时主题编号为-1
+        """
+        if not self.fitted:
+            return np.full(term_matrix.n_docs, -1), np.zeros(term_matrix.n_docs)
+        weights = self.model.transform(self._vectorize(term_matrix, record_terms=False))
+        strengths = weights.max(axis=1)
+        assignments = np.where(strengths > 0, weights.argmax(axis=1), -1)
+        return assignments, strengths
+
+    def _topic_terms(self, topic_id: int, num_terms: int) -> List[Tuple[str, float]]:
+        """主题权重最高的词 [(词, 权重)]"""
+        component = self.model.components_[topic_id]
+        terms = []
+        for bucket in np.argsort(-component):
+            if component[bucket] <= 0 or len(terms) >= num_terms:
+                break
+            entry = self.bucket_terms.get(int(bucket))
+            if entry:
+                terms.append((entry[0], float(component[bucket])))
+        return terms
+
+    def topic_label(self, topic_id: int, num_terms: int = 3) -> str:
+        """主题的简短标签（权重最高的几个词）"""
+        if not self.fitted or topic_id < 0:
+            return ""
+        return "/".join(term for term, _ in self._topic_terms(topic_id, num_terms))
+
+    def topics(self, num_keywords: int = 5) -> List[Dict[str, Any]]:
+        """
+        主题列表（按权重降序）
+
+        Args:
+            num_keywords: 每个主题的关键词数量（不含主题词）
+
+        Returns:
+            主题列表 [{"topic", "weight", "keywords", "keyword_weights", "sample_count"}]
+        """
+        if not self.fitted:
+            return []
+
+        total_mass = self.topic_mass.sum()
+        topics = []
+        for topic_id in range(self.num_topics):
+            terms = self._topic_terms(topic_id, num_keywords + 1)
+            if not terms:
+                continue
+
+            norm = sum(weight for _, weight in terms)
+            topics.append({
+                "topic": terms[0][0],
+                "weight": round(float(self.topic_mass[topic_id] / total_mass), 4) if total_mass > 0 else 0,
+                "keywords": [term for term, _ in terms[1:]],
+                "keyword_weights": [
+                    {"keyword": term, "weight": round(weight / norm, 4)}
+                    for term, weight in terms
+                ],
+                "sample_count": int(self.doc_counts[topic_id])
+            })
+
+        topics.sort(key=lambda topic: topic["weight"], reverse=True)
+        return topics
+
+    def save(self, path: Path):
+        """保存模型"""
+        import joblib
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path: Path, num_topics: Optional[int] = None) -> Optional["TopicModel"]:
+        """
+        加载模型
+
+        Args:
+            path: 模型文件路径
+            num_topics: 期望的主题数量，不一致时返回None
+
+        Returns:
+            主题模型，文件不存在或不兼容时返回None
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            import joblib
+            model = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"加载主题模型失败: {path}, {e}")
+            return None
+
+        if not isinstance(model, cls) or getattr(model, "version", None) != cls.VERSION:
+            return None
+        if num_topics is not None and model.num_topics != num_topics:
+            return None
+        return model
+
+
+def create_topic_model(num_topics: int = 5) -> Optional[TopicModel]:
+    """
+    创建主题模型
+
+    Returns:
+        主题模型，未安装 scikit-learn 时返回None
+    """
+    try:
+        return TopicModel(num_topics=num_topics)
+    except ImportError:
+        logger.warning("未安装scikit-learn，使用关键词共现提取主题")
+        return None
+
+
+def topic_model_path(brand_id: int, analysis_task_id: int) -> Path:
+    """品牌主题模型文件路径（按分析任务保存，增量分析时加载上次任务的模型）"""
+    return Path(settings.TOPIC_MODEL_DIR) / f"brand_{brand_id}" / f"task_{analysis_task_id}.joblib"
+
+
+def prune_topic_models(brand_id: int, keep_analysis_task_id: int):
+    """删除品牌的旧主题模型文件，只保留指定分析任务的模型"""
+    keep_path = topic_model_path(brand_id, keep_analysis_task_id)
+    for path in keep_path.parent.glob("task_*.joblib"):
+        if path != keep_path:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"删除旧主题模型失败: {path}, {e}")
@@ -0,0 +1,153 @@
+"""
+远程视频下载
+按块流式写入磁盘（内存占用与视频大小无关），限制最大文件大小，
+中断后通过 HTTP Range 从已下载的位置继续，已下载完成的文件直接复用
+"""
+from typing import Dict, Optional
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import re
+import weakref
+
+import httpx
+from loguru import logger
+
+from config import settings
+from app.core.disk_cache import prune_cache_dir, touch
+
+
+# 每次读取和写入的块大小
+CHUNK_SIZE = 1 << 20
+
+# 同一进程内对同一目标文件的下载串行执行，避免同时写入 .part 文件
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+class VideoFetchError(Exception):
+    """视频下载失败"""
+
+
+class VideoTooLargeError(VideoFetchError):
+    """视频超过大小上限"""
+
+
+def default_download_path(url: str) -> Path:
+    """没有指定保存位置时的下载路径（按URL哈希命名，相同URL复用）"""
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+    return Path(settings.VIDEO_DOWNLOAD_DIR) / f"{name}.mp4"
+
+
+def _prune_download_dir(dest: Path):
+    """下载到默认目录时按总大小和保留时间清理其他下载的视频"""
+    root = Path(settings.VIDEO_DOWNLOAD_DIR)
+    if dest.parent.resolve() != root.resolve():
+        return
+    prune_cache_dir(
+        root,
+        max_bytes=settings.VIDEO_DOWNLOAD_CACHE_MAX_BYTES,
+        ttl=settings.VIDEO_DOWNLOAD_CACHE_TTL,
+        keep=[dest]
+    )
+
+
+def _total_size(response: httpx.Response, offset: int) -> Optional[int]:
+    """视频总大小（206 响应取 Content-Range 中的总长度）"""
+    if response.status_code == 206:
+        match = re.search(r"/(\d+)\s*$", response.headers.get("content-range", ""))
+        return int(match.group(1)) if match else None
+    length = response.headers.get("content-length")
+    return int(length) + offset if length and length.isdigit() else None
+
+
+async def fetch_video(
+    url: str,
+    dest: Optional[Path] = None,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: Optional[int] = None
+) -> Path:
+    """
+    下载视频到本地文件
+
+    Args:
+        url: 视频地址
+        dest: 保存路径，默认保存到 VIDEO_DOWNLOAD_DIR（按 VIDEO_DOWNLOAD_CACHE_MAX_BYTES/VIDEO_DOWNLOAD_CACHE_TTL 清理）
+        headers: 请求头
+        max_bytes: 最大文件大小，默认使用配置
+
+    Returns:
+        本地文件路径
+
+    Raises:
+        VideoTooLargeError: 视频超过大小上限
+        VideoFetchError: HTTP错误或重试后仍然失败
+    """
+    dest = Path(dest) if dest else default_download_path(url)
+    max_bytes = max_bytes or settings.VIDEO_DOWNLOAD_MAX_BYTES
+
+    lock = _locks.get(str(dest))
+    if lock is None:
+        lock = asyncio.Lock()
+        _locks[str(dest)] = lock
+
+    async with lock:
+        if dest.exists() and dest.stat().st_size > 0:
+            logger.info(f"复用已下载的视频: {dest}")
+            touch(dest)
+            return dest
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        failures = 0
+        timeout = httpx.Timeout(settings.VIDEO_DOWNLOAD_TIMEOUT, connect=10.0)
+
+        async with httpx.AsyncClient(verify=False, follow_redirects=True, timeout=timeout) as client:
+            while True:
+                offset = part.stat().st_size if part.exists() else 0
+                request_headers = dict(headers or {})
+                if offset:
+                    request_headers["Range"] = f"bytes={offset}-"
+
+                try:
+                    async with client.stream("GET", url, headers=request_headers) as response:
+                        if response.status_code == 416 and offset:
+                            # 已下载部分与服务器文件不一致，重新下载
+                            part.unlink()
+                            continue
+                        if response.status_code not in (200, 206):
+                            raise VideoFetchError(f"HTTP {response.status_code}")
+                        if response.status_code == 200 and offset:
+                            # 服务器不支持 Range，从头下载
+                            offset = 0
+
+                        total = _total_size(response, offset)
+                        if total and total > max_bytes:
+                            raise VideoTooLargeError(f"视频大小 {total} 字节超过上限 {max_bytes} 字节")
+
+                        written = offset
+                        with open(part, "ab" if offset else "wb") as f:
+                            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                                written += len(chunk)
+                                if written > max_bytes:
+                                    raise VideoTooLargeError(f"视频大小超过上限 {max_bytes} 字节")
+                                await asyncio.to_thread(f.write, chunk)
+
+                        if total and written < total:
+                            raise httpx.ReadError(f"下载不完整: {written}/{total} 字节")
+
+                    os.replace(part, dest)
+                    logger.info(f"视频下载完成: {dest} ({written} 字节)")
+                    await asyncio.to_thread(_prune_download_dir, dest)
+                    return dest
+
+                except VideoTooLargeError:
+                    part.unlink(missing_ok=True)
+                    raise
+                except httpx.TransportError as e:
+                    failures += 1
+                    if failures > settings.VIDEO_DOWNLOAD_RETRIES:
+                        raise VideoFetchError(f"下载中断: {e}") from e
+                    downloaded = part.stat().st_size if part.exists() else 0
+                    logger.warning(f"视频下载中断，已下载 {downloaded} 字节，第 {failures} 次重试: {e}")
+                    await asyncio.sleep(min(2 ** failures, 10))
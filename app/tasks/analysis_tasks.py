@@ -4,22 +4,177 @@
 from celery import Task
 from loguru import logger
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.tasks.celery_app import celery_app
 from app.core.database import SessionLocal, get_mongodb
 from app.models.analysis_task import AnalysisTask
 from app.models.crawl_task import TaskStatus
 from app.services.ai_service import ai_service
+from app.services.analysis_aggregator import BrandAnalysisAggregate
+from app.services.data_processor import data_processor
+from app.services.file_analysis import run_file_analysis_job
+from app.services.insight_pipeline import insight_pipeline
+from app.services.llm_client import run_async
+from app.services.topic_engine import TopicModel, create_topic_model, topic_model_path, prune_topic_models
+from config import settings
+
+
+# 主题数量
+ANALYSIS_NUM_TOPICS = 5
+
+
+def _load_base_aggregate(db: Session, mongodb, task: AnalysisTask, data_query: dict):
+    """
+    加载同一品牌上次完成的分析任务保存的聚合状态
+    
+    Args:
+        db: 数据库会话
+        mongodb: MongoDB数据库
+        task: 当前分析任务
+        data_query: 品牌数据查询条件
+        
+    Returns:
+        (聚合状态, 基准分析任务ID)，不能增量分析时返回 (None, None)
+    """
+    base_task = db.query(AnalysisTask).filter(
+        AnalysisTask.brand_id == task.brand_id,
+        AnalysisTask.status == TaskStatus.COMPLETED,
+        AnalysisTask.id != task.id
+    ).order_by(AnalysisTask.completed_at.desc()).first()
+    if not base_task:
+        return None, None
+    
+    base_doc = mongodb.analysis_aggregates.find_one({"analysis_task_id": base_task.id})
+    if base_doc is None:
+        # 早期版本把聚合状态保存在分析结果文档中
+        base_doc = mongodb.analysis_results.find_one(
+            {"analysis_task_id": base_task.id},
+            {"aggregates": 1}
+        )
+    aggregate = BrandAnalysisAggregate.from_document((base_doc or {}).get("aggregates"))
+    if aggregate is None:
+        logger.info(f"分析任务 {base_task.id} 没有可用的聚合状态，执行全量分析")
+        return None, None
+    
+    if task.include_sentiment and not aggregate.include_sentiment:
+        logger.info(f"分析任务 {base_task.id} 未包含情感统计，执行全量分析")
+        return None, None
+    
+    # 定期全量分析，修正增量判断无法发现的变化（如同时删除和补写了水位线之前的数据）
+    if settings.ANALYSIS_FULL_REBUILD_DAYS and (
+        aggregate.full_built_at is None
+        or datetime.now() - aggregate.full_built_at > timedelta(days=settings.ANALYSIS_FULL_REBUILD_DAYS)
+    ):
+        logger.info(f"距离品牌 {task.brand_id} 上次全量分析已超过 {settings.ANALYSIS_FULL_REBUILD_DAYS} 天，执行全量分析")
+        return None, None
+    
+    if _has_changed_since(mongodb, data_query, aggregate):
+        logger.info(f"品牌 {task.brand_id} 已分析的数据被删除、更新或有延迟写入的数据，执行全量分析")
+        return None, None
+    
+    # 主题模型与聚合状态一起增量更新
+    if task.include_topics:
+        aggregate.topic_model = TopicModel.load(
+            topic_model_path(task.brand_id, base_task.id),
+            num_topics=ANALYSIS_NUM_TOPICS
+        )
+        if aggregate.topic_model is None and create_topic_model(ANALYSIS_NUM_TOPICS) is not None:
+            logger.info(f"分析任务 {base_task.id} 没有可用的主题模型，执行全量分析")
+            return None, None
+    
+    aggregate.include_sentiment = task.include_sentiment
+    return aggregate, base_task.id
+
+
+def _save_aggregate(mongodb, brand_id: int, analysis_task_id: int, aggregate: BrandAnalysisAggregate):
+    """
+    保存聚合状态到 analysis_aggregates（每个分析任务一条），并删除同一品牌更早的聚合状态
+    
+    Args:
+        mongodb: MongoDB数据库
+        brand_id: 品牌ID
+        analysis_task_id: 分析任务ID
+        aggregate: 聚合状态
+    """
+    try:
+        mongodb.analysis_aggregates.replace_one(
+            {"analysis_task_id": analysis_task_id},
+            {
+                "analysis_task_id": analysis_task_id,
+                "brand_id": brand_id,
+                "aggregates": aggregate.to_document(),
+                "created_at": datetime.now()
+            },
+            upsert=True
+        )
+        # 增量分析只使用最近一次完成的分析任务的聚合状态
+        mongodb.analysis_aggregates.delete_many({
+            "brand_id": brand_id,
+            "analysis_task_id": {"$ne": analysis_task_id}
+        })
+    except Exception as e:
+        logger.warning(f"保存聚合状态失败 (分析任务 {analysis_task_id})，下次将执行全量分析: {e}")
+
+
+def _incremental_filter(aggregate: BrandAnalysisAggregate) -> dict:
+    """增量分析读取的数据：ingested_at 晚于水位线减去重叠时间（重叠部分中已分析的数据由 add_items 跳过）"""
+    cutoff = aggregate.incremental_cutoff()
+    return {"ingested_at": {"$gt": cutoff} if cutoff else {"$exists": True}}
+
+
+def _has_changed_since(mongodb, data_query: dict, aggregate: BrandAnalysisAggregate) -> bool:
+    """
+    聚合状态之后已分析的数据是否有变化（聚合值无法扣减，有变化时需要全量分析）
+    
+    - 写入时间早于增量读取范围的数据条数与已分析的条数不一致：有数据被删除，或有数据在上次分析读取之后
+      才提交（写入时间已落在增量读取范围之前，增量分析读取不到）
+    - 写入时间早于增量读取范围的数据在之后被重新写入（重新爬取更新了评论、互动数）
+    - 增量读取范围内已分析的数据被删除或重新写入
+    
+    Args:
+        mongodb: MongoDB数据库
+        data_query: 品牌数据查询条件
+        aggregate: 上次的聚合状态
+        
+    Returns:
+        是否有变化
+    """
+    cutoff = aggregate.incremental_cutoff()
+    aggregate.prune_recent()
+    older = {"$not": {"$gt": cutoff}} if cutoff else {"$exists": False}
+    
+    existing_count = mongodb.raw_data.count_documents({**data_query, "ingested_at": older})
+    if existing_count != aggregate.item_count - len(aggregate.recent):
+        return True
+    
+    updated_query = {**data_query, "ingested_at": older, "updated_at": {"$gt": cutoff} if cutoff else {"$exists": True}}
+    if mongodb.raw_data.find_one(updated_query, {"_id": 1}) is not None:
+        return True
+    
+    if aggregate.recent:
+        current = {
+            doc["_id"]: doc.get("updated_at")
+            for doc in mongodb.raw_data.find({"_id": {"$in": list(aggregate.recent)}}, {"updated_at": 1})
+        }
+        for object_id, (_, updated_at) in aggregate.recent.items():
+            if object_id not in current or current[object_id] != updated_at:
+                return True
+    return False
 
 
 @celery_app.task(bind=True, name="analyze_brand_task")
-def analyze_brand_task(self: Task, analysis_task_id: int):
+def analyze_brand_task(self: Task, analysis_task_id: int, rebuild: bool = False):
     """
     分析品牌任务
     
+    默认增量分析：只处理上次完成的分析任务之后新写入 raw_data 的数据（按服务端写入时间 ingested_at），
+    合并到上次保存的聚合状态；没有可用的聚合状态、已分析的数据被删除或更新、超过 ANALYSIS_FULL_REBUILD_DAYS
+    没有全量分析或 rebuild=True 时全量重新分析
+    
     Args:
         analysis_task_id: 分析任务ID
+        rebuild: 是否全量重新分析
     """
     db: Session = SessionLocal()
     
@@ -41,72 +196,91 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
         
         # 从MongoDB获取爬取的数据
         mongodb = get_mongodb()
-        crawl_data = list(mongodb.raw_data.find({
+        data_query = {
             "brand_id": task.brand_id,
             "platform": {"$exists": True}
-        }))
+        }
+        
+        # 增量分析：只读取上次完成的分析任务之后新写入的数据，合并到上次的聚合状态
+        aggregate, base_task_id = None, None
+        if settings.ANALYSIS_INCREMENTAL and not rebuild:
+            aggregate, base_task_id = _load_base_aggregate(db, mongodb, task, data_query)
+        
+        if aggregate is not None:
+            mode = "incremental"
+            data_query.update(_incremental_filter(aggregate))
+        else:
+            mode = "full"
+            aggregate = BrandAnalysisAggregate(
+                include_sentiment=task.include_sentiment,
+                topic_model=create_topic_model(ANALYSIS_NUM_TOPICS) if task.include_topics else None
+            )
+            aggregate.full_built_at = datetime.now()
+        
+        # 分批读取数据（只投影分析需要的字段），每批合并到聚合状态后即释放
+        pending_count = mongodb.raw_data.count_documents(data_query)
+        logger.info(
+            f"分析模式: {mode}" + (f"（基于分析任务 {base_task_id}）" if base_task_id else "") +
+            f", 待分析 {pending_count} 条新数据"
+        )
+        
+        # 更新进度：数据准备完成 (10%)
+        task.progress = 10
+        db.commit()
         
-        if not crawl_data:
+        batch_size = settings.ANALYSIS_BATCH_SIZE
+        # 每批聚合（情感、主题模型）可能超过服务端10分钟的游标空闲超时，关闭超时并在 finally 中关闭游标
+        cursor = mongodb.raw_data.find(
+            data_query,
+            {field: 1 for field in (*data_processor.EXTRACT_FIELDS, "ingested_at", "updated_at")},
+            batch_size=batch_size,
+            no_cursor_timeout=True
+        )
+        read_items = 0
+        base_item_count = aggregate.item_count
+        batch = []
+        try:
+            for item in cursor:
+                batch.append(item)
+                if len(batch) < batch_size:
+                    continue
+                aggregate.add_items(batch)
+                read_items += len(batch)
+                batch = []
+                
+                # 数据聚合占 10% - 60%
+                task.progress = 10 + int(50 * min(read_items / max(pending_count, 1), 1))
+                db.commit()
+                logger.info(f"已聚合 {read_items}/{pending_count} 条数据")
+            
+            if batch:
+                aggregate.add_items(batch)
+                batch = []
+        finally:
+            cursor.close()
+        # 重叠时间内已分析过的数据不计入新数据
+        new_items = aggregate.item_count - base_item_count
+        
+        if aggregate.item_count == 0:
             logger.warning(f"品牌 {task.brand_id} 没有爬取数据")
             task.status = TaskStatus.FAILED
             task.error_message = "没有可分析的数据"
             db.commit()
             return {"error": "没有可分析的数据"}
         
-        # 提取文本数据（按平台和时间分组）
-        texts = []
-        texts_by_platform = {}
-        texts_with_dates = []
-        raw_items_for_analysis = []  # 用于热门内容分析的原始数据
-        
-        from app.services.data_processor import data_processor
-        
-        for item in crawl_data:
-            platform = item.get("platform", "unknown")
-            
-            # 使用 data_processor 统一提取数据（包含互动数据）
-            processed_item = data_processor.extract_text_from_item(item, platform)
-            
-            # 收集原始项用于热门分析
-            raw_items_for_analysis.append(processed_item)
-            
-            # 收集文本用于NLP分析
-            text_items = []
-            if processed_item["title"]:
-                text_items.append(processed_item["title"])
-            if processed_item["content"]:
-                text_items.append(processed_item["content"])
-            if processed_item["comments"]:
-                text_items.extend(processed_item["comments"])
-            
-            # 添加到总文本列表
-            texts.extend(text_items)
-            
-            # 按平台分组
-            if platform not in texts_by_platform:
-                texts_by_platform[platform] = []
-            texts_by_platform[platform].extend(text_items)
-            
-            # 添加带日期的文本
-            publish_time = processed_item.get("date")
-            for text_item in text_items:
-                texts_with_dates.append({
-                    "text": text_item,
-                    "date": publish_time,
-                    "platform": platform
-                })
-        
-        if not texts:
+        if aggregate.text_count == 0:
             logger.warning(f"品牌 {task.brand_id} 没有可分析的文本数据")
             task.status = TaskStatus.FAILED
             task.error_message = "没有可分析的文本数据"
             db.commit()
             return {"error": "没有可分析的文本数据"}
         
-        logger.info(f"提取到 {len(texts)} 条文本数据，涉及 {len(texts_by_platform)} 个平台")
+        logger.info(
+            f"累计 {aggregate.text_count} 条文本数据，涉及 {len(aggregate.platforms)} 个平台"
+        )
         
-        # 更新进度：数据准备完成 (10%)
-        task.progress = 10
+        # 更新进度：数据聚合完成 (60%)
+        task.progress = 60
         db.commit()
         
         # 执行分析
@@ -125,28 +299,16 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
         total_steps += 2  # 文本统计和平台统计
         
         current_step = 0
-        base_progress = 10  # 从10%开始
-        step_progress = 70 // total_steps if total_steps > 0 else 10  # 70%分配给各个步骤
+        base_progress = 60  # 从60%开始
+        step_progress = 30 // total_steps if total_steps > 0 else 10  # 30%分配给各个步骤
         
-        # 1. 情感分析（整体）
+        # 1. 情感分析（整体、按平台、按时间）
         if task.include_sentiment:
-            logger.info("执行整体情感分析...")
+            logger.info("执行情感分析（整体/按平台/按时间）...")
             task.progress = base_progress + int(current_step * step_progress)
             db.commit()
             
-            sentiment_result = ai_service.batch_analyze_sentiment(texts)
-            analysis_result["sentiment"] = sentiment_result
-            
-            # 按平台的情感分析
-            logger.info("执行按平台情感分析...")
-            sentiment_by_platform = ai_service.analyze_sentiment_by_platform(texts_by_platform)
-            analysis_result["sentiment"]["by_platform"] = sentiment_by_platform
-            
-            # 按时间的情感分析
-            if texts_with_dates:
-                logger.info("执行按时间情感分析...")
-                sentiment_by_time = ai_service.analyze_sentiment_by_time(texts_with_dates)
-                analysis_result["sentiment"]["by_time"] = sentiment_by_time
+            analysis_result["sentiment"] = aggregate.build_sentiment()
             
             current_step += 1
         
@@ -156,10 +318,7 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
             task.progress = base_progress + int(current_step * step_progress)
             db.commit()
             
-            # 合并所有文本
-            all_text = " ".join(texts)
-            keywords = ai_service.extract_keywords(all_text, top_k=30, with_weight=True)
-            analysis_result["keywords"] = keywords
+            analysis_result["keywords"] = aggregate.build_keywords(top_k=30)
             
             current_step += 1
         
@@ -169,8 +328,7 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
             task.progress = base_progress + int(current_step * step_progress)
             db.commit()
             
-            topics = ai_service.extract_topics(texts, num_topics=5)
-            analysis_result["topics"] = topics
+            analysis_result["topics"] = aggregate.build_topics(num_topics=ANALYSIS_NUM_TOPICS)
             
             current_step += 1
         
@@ -179,8 +337,7 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
         task.progress = base_progress + int(current_step * step_progress)
         db.commit()
         
-        text_stats = ai_service.analyze_text_statistics(texts)
-        analysis_result["text_statistics"] = text_stats
+        analysis_result["text_statistics"] = aggregate.build_text_statistics()
         
         current_step += 1
         
@@ -188,57 +345,17 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
         task.progress = base_progress + int(current_step * step_progress)
         db.commit()
         
-        platform_stats = {}
-        for platform, platform_texts in texts_by_platform.items():
-            platform_stats[platform] = {
-                "total_texts": len(platform_texts),
-                "total_chars": sum(len(t) for t in platform_texts)
-            }
-        analysis_result["platform_statistics"] = platform_stats
+        analysis_result["platform_statistics"] = aggregate.build_platform_statistics()
         
         current_step += 1
         
-        # 6. 互动数据统计 (新增加)
+        # 6. 互动数据统计
         logger.info("执行互动数据统计...")
-        interaction_stats = {
-            "total_likes": 0,
-            "total_comments": 0,
-            "total_shares": 0,
-            "by_platform": {}
-        }
-        
-        for item in raw_items_for_analysis:
-            platform = item.get("platform", "unknown")
-            likes = item.get("likes", 0) or 0
-            comments = item.get("comments_count", 0) or 0
-            shares = item.get("shares", 0) or 0
-            
-            # 总计
-            interaction_stats["total_likes"] += likes
-            interaction_stats["total_comments"] += comments
-            interaction_stats["total_shares"] += shares
-            
-            # 按平台
-            if platform not in interaction_stats["by_platform"]:
-                interaction_stats["by_platform"][platform] = {
-                    "likes": 0,
-                    "comments": 0,
-                    "shares": 0,
-                    "count": 0
-                }
-            
-            p_stats = interaction_stats["by_platform"][platform]
-            p_stats["likes"] += likes
-            p_stats["comments"] += comments
-            p_stats["shares"] += shares
-            p_stats["count"] += 1
-            
-        analysis_result["interaction_statistics"] = interaction_stats
+        analysis_result["interaction_statistics"] = aggregate.build_interaction_statistics()
 
-        # 7. 热门内容分析 (新增加)
+        # 7. 热门内容分析
         logger.info("执行热门内容分析...")
-        top_posts = ai_service.analyze_top_posts(raw_items_for_analysis, top_k=20)
-        analysis_result["top_posts"] = top_posts
+        analysis_result["top_posts"] = aggregate.build_top_posts(top_k=20)
         
         # 7. LLM深度分析
         if task.include_insights:
@@ -249,7 +366,7 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
             try:
                 # 准备数据摘要
                 data_summary = {
-                    "total_count": len(texts),
+                    "total_count": aggregate.text_count,
                     "sentiment_distribution": analysis_result.get("sentiment", {}).get("distribution", {}),
                     "avg_sentiment_score": analysis_result.get("sentiment", {}).get("avg_score", 0.5),
                     "keywords": analysis_result.get("keywords", []),
@@ -261,15 +378,26 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
                 brand = db.query(Brand).filter(Brand.id == task.brand_id).first()
                 brand_name = brand.name if brand else f"品牌{task.brand_id}"
                 
-                # 调用LLM分析
-                import asyncio
-                llm_result = asyncio.run(
-                    ai_service.analyze_with_llm(
-                        brand_name=brand_name,
-                        data_summary=data_summary,
-                        analysis_type=task.analysis_type
+                # 调用LLM分析（启用Map-Reduce洞察时先分块总结代表性文本）
+                if settings.LLM_INSIGHT_ENABLED:
+                    llm_result = run_async(
+                        insight_pipeline.run(
+                            brand_name=brand_name,
+                            data_summary=data_summary,
+                            texts=aggregate.sample_texts_by_platform(),
+                            analysis_type=task.analysis_type,
+                            topic_model=aggregate.topic_model,
+                            total_texts=aggregate.text_count
+                        )
+                    )
+                else:
+                    llm_result = run_async(
+                        ai_service.analyze_with_llm(
+                            brand_name=brand_name,
+                            data_summary=data_summary,
+                            analysis_type=task.analysis_type
+                        )
                     )
-                )
                 analysis_result["llm_insights"] = llm_result
             except Exception as e:
                 logger.error(f"LLM分析失败: {e}")
@@ -280,8 +408,8 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
             
             current_step += 1
         
-        # 更新进度：分析完成，保存结果 (90%)
-        task.progress = 90
+        # 更新进度：分析完成，保存结果 (95%)
+        task.progress = 95
         db.commit()
         
         # 保存分析结果到MongoDB
@@ -290,12 +418,26 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
             "brand_id": task.brand_id,
             "analysis_type": task.analysis_type,
             "result": analysis_result,
+            "mode": mode,
+            "base_analysis_task_id": base_task_id,
+            "new_items": new_items,
             "created_at": task.created_at.isoformat() if task.created_at else None
         }
         
         mongodb.analysis_results.insert_one(result_doc)
         logger.info(f"分析结果已保存到MongoDB: {analysis_task_id}")
         
+        # 聚合状态单独保存，供下次增量分析合并；保存失败时下次执行全量分析，不影响本次结果
+        _save_aggregate(mongodb, task.brand_id, analysis_task_id, aggregate)
+        
+        # 保存主题模型，供下次增量分析继续训练
+        if aggregate.topic_model is not None and aggregate.topic_model.fitted:
+            try:
+                aggregate.topic_model.save(topic_model_path(task.brand_id, analysis_task_id))
+                prune_topic_models(task.brand_id, analysis_task_id)
+            except Exception as e:
+                logger.warning(f"保存主题模型失败: {e}")
+        
         # 更新任务状态为完成
         task.status = TaskStatus.COMPLETED
         task.completed_at = datetime.now()
@@ -307,11 +449,20 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
         
         logger.info(f"分析任务完成: {analysis_task_id}")
         
+        # 预先生成图表和报告文件，导出时不再现场生成
+        try:
+            from app.tasks.report_tasks import prebuild_report_artifacts_task
+            prebuild_report_artifacts_task.delay(analysis_task_id)
+        except Exception as e:
+            logger.warning(f"提交报告预生成任务失败: {e}")
+        
         return {
             "analysis_task_id": analysis_task_id,
             "status": "completed",
+            "mode": mode,
             "result_summary": {
-                "total_texts": len(texts),
+                "new_items": new_items,
+                "total_texts": aggregate.text_count,
                 "has_sentiment": "sentiment" in analysis_result,
                 "has_keywords": "keywords" in analysis_result,
                 "has_insights": "llm_insights" in analysis_result
@@ -336,3 +487,14 @@ def analyze_brand_task(self: Task, analysis_task_id: int):
     finally:
         db.close()
 
+
+@celery_app.task(bind=True, name="process_data_files_task")
+def process_data_files_task(self: Task, job_id: str):
+    """
+    数据文件分析任务（/data-analysis/process 提交的作业）
+    
+    Args:
+        job_id: 作业ID（data_analysis_results 中的文档ID）
+    """
+    logger.info(f"开始数据文件分析作业: {job_id}")
+    return run_file_analysis_job(job_id)
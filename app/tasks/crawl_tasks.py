@@ -77,18 +77,21 @@ def crawl_brand_task(self, task_id: int):
         task.crawled_items = total_items
         task.progress = 100
         
-        # 保存数据到MongoDB
-        if crawl_result.get("items"):
-            saved_count = crawler_service.save_crawled_data(
+        # 保存数据到MongoDB（从数据文件逐批读取写入）
+        if total_items:
+            save_counts = crawler_service.bulk_save_crawled_data(
                 brand_id=task.brand_id,
                 task_id=task_id,
                 platform=task.platform,
                 data=crawl_result,
                 mongodb=mongodb
             )
+            saved_count = save_counts["inserted"]
+            updated_count = save_counts["updated"]
             task.crawled_items = saved_count
         else:
             saved_count = 0
+            updated_count = 0
         
         # 更新任务状态为完成
         task.status = TaskStatus.COMPLETED
@@ -98,13 +101,16 @@ def crawl_brand_task(self, task_id: int):
         
         db.commit()
         
-        logger.info(f"爬虫任务 {task_id} 完成: 采集 {total_items} 条，保存 {saved_count} 条")
+        logger.info(
+            f"爬虫任务 {task_id} 完成: 采集 {total_items} 条，新增 {saved_count} 条，更新 {updated_count} 条"
+        )
         
         return {
             "status": "completed",
             "task_id": task_id,
             "total_items": total_items,
-            "saved_items": saved_count
+            "saved_items": saved_count,
+            "updated_items": updated_count
         }
         
     except Exception as e:
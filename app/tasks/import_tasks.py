@@ -1,26 +1,279 @@
 """
 数据导入Celery任务
 """
-import json
 import hashlib
+import time
+from functools import partial
 from pathlib import Path
 from datetime import datetime
+from typing import List, Dict, Any, Iterator
 from celery import Task
 from loguru import logger
 from sqlalchemy.orm import Session
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 
 from app.tasks.celery_app import celery_app
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, ensure_raw_data_unique_index, mark_raw_data_ingested
+from app.core.process_pool import create_process_pool, resolve_workers
+from app.services.json_stream import iter_json_items
+from app.services import brand_stats
 from app.models.data_import_task import DataImportTask
 from app.models.crawl_task import TaskStatus
 from config import settings
 
+def detect_platform(filename: str) -> str:
+    """根据文件名判断平台"""
+    filename = filename.lower()
+    if "xhs" in filename: return "xhs"
+    elif "douyin" in filename or "dy" in filename: return "douyin"
+    elif "bili" in filename: return "bilibili"
+    elif "weibo" in filename or "wb" in filename: return "weibo"
+    elif "tieba" in filename: return "tieba"
+    elif "zhihu" in filename: return "zhihu"
+    elif "kuaishou" in filename or "ks" in filename: return "kuaishou"
+    return "unknown"
+
+
+def iter_import_docs(file_path: Path, brand_id: int) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取导入文件并逐条构建MongoDB文档
+    
+    Args:
+        file_path: 文件路径（json / jsonl）
+        brand_id: 品牌ID
+        
+    Raises:
+        json.JSONDecodeError: 文件格式错误
+    """
+    platform = detect_platform(file_path.name)
+    
+    for item in iter_json_items(file_path):
+        # 过滤有效数据
+        if not (isinstance(item, dict) and (item.get("id") or item.get("aweme_id") or item.get("title") or item.get("content") or item.get("desc"))):
+            continue
+        
+        content_id = item.get("id") or item.get("aweme_id") or item.get("note_id") or ""
+        title = item.get("title") or item.get("desc") or ""
+        content = item.get("content") or item.get("desc") or item.get("text") or ""
+        
+        if not content_id:
+            unique_str = f"{title}{content[:100]}"
+            content_id = hashlib.md5(unique_str.encode()).hexdigest()
+        
+        yield {
+            "brand_id": brand_id,
+            "platform": platform,
+            "content_id": str(content_id),
+            "title": title,
+            "content": content,
+            "raw_data": item,
+            "crawled_at": datetime.now(),
+            "source_file": str(file_path.name)
+        }
+
+
+def stream_import_file(file_str: str, brand_id: int, batch_size: int) -> Iterator[Dict[str, Any]]:
+    """
+    在当前进程中流式解析导入文件，每 batch_size 条文档返回一次，内存占用与文件大小无关
+    
+    Args:
+        file_str: 文件路径
+        brand_id: 品牌ID
+        batch_size: 每批文档数
+        
+    Yields:
+        {"file": 文件路径, "docs": 文档列表, "error": 错误信息, "done": 文件是否处理结束}
+        （文件中途出错时，出错前的批次已经返回）
+    """
+    file_path = Path(file_str)
+    if not file_path.exists():
+        yield {"file": file_str, "docs": [], "error": "文件不存在", "done": True}
+        return
+    
+    docs = []
+    try:
+        for doc in iter_import_docs(file_path, brand_id):
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                yield {"file": file_str, "docs": docs, "error": None, "done": False}
+                docs = []
+    except Exception as e:
+        yield {"file": file_str, "docs": docs, "error": str(e), "done": True}
+        return
+    yield {"file": file_str, "docs": docs, "error": None, "done": True}
+
+
+class BulkImporter:
+    """
+    批量写入 raw_data
+    
+    有唯一索引时使用无序 insert_many，重复数据由唯一索引拒绝并从批量错误中计数；
+    唯一索引不可用时每批先查询已存在的 content_id 再写入
+    """
+    
+    def __init__(self, collection, unique_index: bool, batch_size: int):
+        self.collection = collection
+        self.mongodb = collection.database
+        self.unique_index = unique_index
+        self.batch_size = batch_size
+        self.imported_count = 0
+        self.skipped_count = 0
+        self._buffer: List[Dict[str, Any]] = []
+    
+    def add(self, docs: List[Dict[str, Any]]):
+        self._buffer.extend(docs)
+        while len(self._buffer) >= self.batch_size:
+            batch = self._buffer[:self.batch_size]
+            self._buffer = self._buffer[self.batch_size:]
+            self._write(batch)
+    
+    def flush(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._write(batch)
+    
+    def _write(self, batch: List[Dict[str, Any]]):
+        if not self.unique_index:
+            batch = self._filter_existing(batch)
+            if not batch:
+                return
+        
+        # 情感分数由 record_inserted 只为实际写入的文档计算
+        brand_stats.attach_metrics(batch, include_sentiment=False)
+        try:
+            result = self.collection.insert_many(batch, ordered=False)
+            self.imported_count += len(result.inserted_ids)
+            mark_raw_data_ingested(self.collection, result.inserted_ids)
+            brand_stats.record_inserted(self.mongodb, batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = sum(1 for err in errors if err.get("code") == 11000)
+            self.imported_count += e.details.get("nInserted", 0)
+            self.skipped_count += duplicates
+            # 被拒绝的文档不计入品牌统计
+            failed = {err["index"] for err in errors}
+            inserted = [doc for index, doc in enumerate(batch) if index not in failed]
+            mark_raw_data_ingested(self.collection, [doc["_id"] for doc in inserted])
+            brand_stats.record_inserted(self.mongodb, inserted)
+            if duplicates != len(errors):
+                raise
+    
+    def _filter_existing(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """没有唯一索引时，过滤已存在及本批内重复的数据"""
+        existing = self.collection.find(
+            {
+                "brand_id": batch[0]["brand_id"],
+                "content_id": {"$in": list({doc["content_id"] for doc in batch})}
+            },
+            {"platform": 1, "content_id": 1}
+        )
+        existing_keys = {(doc.get("platform"), doc.get("content_id")) for doc in existing}
+        
+        new_docs = []
+        for doc in batch:
+            key = (doc["platform"], doc["content_id"])
+            if key in existing_keys:
+                self.skipped_count += 1
+                continue
+            existing_keys.add(key)
+            new_docs.append(doc)
+        return new_docs
+
+
+# 进程池工作进程复用的MongoDB连接
+_worker_mongo_client = None
+
+
+def _worker_collection():
+    global _worker_mongo_client
+    if _worker_mongo_client is None:
+        _worker_mongo_client = MongoClient(
+            host=settings.MONGODB_HOST,
+            port=settings.MONGODB_PORT,
+            serverSelectionTimeoutMS=2000
+        )
+    return _worker_mongo_client[settings.MONGODB_DATABASE].raw_data
+
+
+def import_file_worker(file_str: str, brand_id: int, unique_index: bool, batch_size: int) -> Dict[str, Any]:
+    """
+    流式解析导入文件并在工作进程中按批写入MongoDB（进程池工作函数，必须定义在模块顶层以便序列化）
+    
+    只把计数返回主进程，内存占用与文件大小无关
+    
+    Args:
+        file_str: 文件路径
+        brand_id: 品牌ID
+        unique_index: raw_data 是否有唯一索引
+        batch_size: 每批文档数
+        
+    Returns:
+        {"file": 文件路径, "imported": 导入条数, "skipped": 跳过条数, "error": 错误信息}
+    """
+    importer = BulkImporter(_worker_collection(), unique_index, batch_size)
+    error = None
+    for parsed in stream_import_file(file_str, brand_id, batch_size):
+        importer.add(parsed["docs"])
+        error = parsed["error"]
+    importer.flush()
+    return {
+        "file": file_str,
+        "imported": importer.imported_count,
+        "skipped": importer.skipped_count,
+        "error": error
+    }
+
+
+def iter_imported_files(files: List[str], brand_id: int, importer: BulkImporter) -> Iterator[Dict[str, Any]]:
+    """
+    按顺序导入文件，导入条数累计在 importer 中
+    
+    多个文件时在进程池中并行解析并写入，每个文件完成后返回一次；
+    单进程时逐批流式解析并由 importer 写入，每批返回一次
+    
+    Args:
+        files: 文件路径列表
+        brand_id: 品牌ID
+        importer: 主进程的批量写入器
+        
+    Yields:
+        {"file": 文件路径, "error": 错误信息, "done": 文件是否处理结束}
+    """
+    processes = min(resolve_workers(settings.IMPORT_WORKERS), len(files))
+    if processes <= 1:
+        for file_str in files:
+            for parsed in stream_import_file(file_str, brand_id, importer.batch_size):
+                importer.add(parsed["docs"])
+                yield {"file": file_str, "error": parsed["error"], "done": parsed["done"]}
+        importer.flush()
+        return
+    
+    pool = create_process_pool(processes)
+    worker = partial(
+        import_file_worker,
+        brand_id=brand_id,
+        unique_index=importer.unique_index,
+        batch_size=importer.batch_size
+    )
+    try:
+        for result in pool.imap(worker, files):
+            importer.imported_count += result["imported"]
+            importer.skipped_count += result["skipped"]
+            yield {"file": result["file"], "error": result["error"], "done": True}
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 @celery_app.task(bind=True, name="import_brand_data_task")
 def import_brand_data_task(self: Task, import_task_id: int):
     """
     导入品牌数据任务
     
+    文件在进程池中并行解析，数据由各工作进程按批无序写入MongoDB，
+    依靠 (brand_id, platform, content_id) 唯一索引去重
+    
     Args:
         import_task_id: 导入任务ID
     """
@@ -49,111 +302,51 @@ def import_brand_data_task(self: Task, import_task_id: int):
             serverSelectionTimeoutMS=2000
         )
         mongodb = mongo_client[settings.MONGODB_DATABASE]
-        collection = mongodb.raw_data
         
         files = task.file_list or []
         task.total_files = len(files)
         db.commit()
         
-        imported_count = 0
-        skipped_count = 0
+        importer = BulkImporter(
+            mongodb.raw_data,
+            unique_index=ensure_raw_data_unique_index(mongodb),
+            batch_size=settings.IMPORT_BATCH_SIZE
+        )
         processed_files = 0
+        last_progress_at = time.monotonic()
         
-        for file_str in files:
-            file_path = Path(file_str)
-            if not file_path.exists():
-                logger.warning(f"文件不存在: {file_path}")
-                processed_files += 1
-                task.processed_files = processed_files
-                db.commit()
-                continue
-                
-            try:
-                # 确定平台
-                filename = file_path.name.lower()
-                platform = "unknown"
-                if "xhs" in filename: platform = "xhs"
-                elif "douyin" in filename or "dy" in filename: platform = "douyin"
-                elif "bili" in filename: platform = "bilibili"
-                elif "weibo" in filename or "wb" in filename: platform = "weibo"
-                elif "tieba" in filename: platform = "tieba"
-                elif "zhihu" in filename: platform = "zhihu"
-                elif "kuaishou" in filename or "ks" in filename: platform = "kuaishou"
-                
-                # 读取文件
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                items = []
-                if isinstance(data, list):
-                    items = data
-                elif isinstance(data, dict):
-                    if "items" in data:
-                        items = data["items"]
-                    elif "data" in data and isinstance(data["data"], list):
-                        items = data["data"]
-                    else:
-                        items = [data]
-                
-                # 过滤有效数据
-                real_items = [item for item in items if isinstance(item, dict) and (item.get("id") or item.get("aweme_id") or item.get("title") or item.get("content") or item.get("desc"))]
-                
-                for item in real_items:
-                    content_id = item.get("id") or item.get("aweme_id") or item.get("note_id") or ""
-                    title = item.get("title") or item.get("desc") or ""
-                    content = item.get("content") or item.get("desc") or item.get("text") or ""
-                    
-                    if not content_id:
-                        unique_str = f"{title}{content[:100]}"
-                        content_id = hashlib.md5(unique_str.encode()).hexdigest()
-                    
-                    doc = {
-                        "brand_id": task.brand_id,
-                        "platform": platform,
-                        "content_id": str(content_id),
-                        "title": title,
-                        "content": content,
-                        "raw_data": item,
-                        "crawled_at": datetime.now(),
-                        "source_file": str(file_path.name)
-                    }
-                    
-                    # 查重
-                    existing = collection.find_one({
-                        "brand_id": task.brand_id,
-                        "content_id": str(content_id),
-                        "platform": platform
-                    })
-                    
-                    if not existing:
-                        collection.insert_one(doc)
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-                
-                # 更新文件进度
-                processed_files += 1
-                task.processed_files = processed_files
-                task.imported_items = imported_count
-                task.skipped_items = skipped_count
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"处理文件失败 {file_path}: {e}")
+        for parsed in iter_imported_files(files, task.brand_id, importer):
+            if parsed["error"]:
                 # 继续处理下一个文件
+                logger.error(f"处理文件失败 {parsed['file']}: {parsed['error']}")
+            if parsed["done"]:
                 processed_files += 1
+            
+            # 限制进度写入频率
+            if time.monotonic() - last_progress_at >= settings.IMPORT_PROGRESS_INTERVAL:
                 task.processed_files = processed_files
+                task.imported_items = importer.imported_count
+                task.skipped_items = importer.skipped_count
                 db.commit()
+                last_progress_at = time.monotonic()
         
         # 任务完成
+        task.processed_files = processed_files
+        task.imported_items = importer.imported_count
+        task.skipped_items = importer.skipped_count
         task.status = TaskStatus.COMPLETED
         task.completed_at = datetime.now()
         db.commit()
         
+        logger.info(
+            f"导入任务完成: {import_task_id}, 导入 {importer.imported_count} 条, "
+            f"跳过重复 {importer.skipped_count} 条"
+        )
+        
         return {
             "status": "completed",
-            "imported_count": imported_count,
-            "skipped_count": skipped_count,
+            "imported_count": importer.imported_count,
+            "skipped_count": importer.skipped_count,
             "processed_files": processed_files
         }
         
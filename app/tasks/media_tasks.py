@@ -0,0 +1,377 @@
+"""
+批量视频/图片分析Celery任务
+"""
+import asyncio
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+from celery import Task
+from loguru import logger
+from sqlalchemy.orm import Session
+from pymongo import MongoClient, UpdateOne
+
+from app.tasks.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.core.process_pool import create_process_pool, resolve_workers
+from app.services.ai_service import ai_service
+from app.services.llm_client import run_async
+from app.services.media_downloader import media_downloader
+from app.services.media_frames import extract_video_frames, load_image_frames
+from app.models.media_analysis_task import MediaAnalysisTask
+from app.models.crawl_task import TaskStatus
+from config import settings
+
+
+# 平台名称到媒体目录名的映射（data/crawled_data/{目录名}/{content_id}/）
+MEDIA_DIR_MAP = {
+    "dy": "douyin",
+    "ks": "kuaishou",
+    "wb": "weibo",
+    "bilibili": "bili",
+}
+
+IMAGE_SUFFIXES = (".jpeg", ".jpg", ".png")
+
+
+def media_roots() -> List[Path]:
+    """本地媒体根目录：项目数据目录，其次是 MediaCrawler 数据目录"""
+    roots = [settings.DATA_DIR / "crawled_data"]
+    mediacrawler_path = media_downloader.crawler_service.mediacrawler_path
+    if mediacrawler_path:
+        roots.append(Path(mediacrawler_path) / "data" / "crawled_data")
+    return roots
+
+
+def resolve_item_media(doc: Dict[str, Any], roots: List[Path]) -> Optional[Dict[str, Any]]:
+    """
+    查找数据对应的媒体：本地视频、本地图片序列或视频下载地址
+
+    Args:
+        doc: raw_data 文档
+        roots: 本地媒体根目录
+
+    Returns:
+        {"id": 文档ID, "kind": "video"/"images"/"url", "sources": [路径或URL], "download_path": 视频下载路径}，
+        没有媒体时返回None
+    """
+    entry = {"id": doc["_id"], "platform": doc.get("platform")}
+
+    if doc.get("video_path"):
+        video = roots[0] / doc["video_path"]
+        if video.exists():
+            return {**entry, "kind": "video", "sources": [str(video)]}
+
+    platform = (doc.get("platform") or "").lower()
+    content_id = str(doc.get("content_id") or "")
+    media_dir = MEDIA_DIR_MAP.get(platform, platform)
+    if content_id:
+        for root in roots:
+            folder = root / media_dir / content_id
+            if not folder.is_dir():
+                continue
+            video = folder / "video.mp4"
+            if video.exists():
+                return {**entry, "kind": "video", "sources": [str(video)]}
+            images = sorted(
+                (path for path in folder.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES),
+                key=lambda path: path.name
+            )
+            if images:
+                return {**entry, "kind": "images", "sources": [str(path) for path in images]}
+
+    raw = doc.get("raw_data") or {}
+    video_url = raw.get("video_download_url")
+    if not video_url and isinstance(raw.get("video"), dict):
+        video_url = media_downloader.douyin._extract_video_url(raw["video"])
+    if video_url:
+        # 下载到内容目录，重新分析时直接复用
+        download_path = str(roots[0] / media_dir / content_id / "video.mp4") if content_id else None
+        return {**entry, "kind": "url", "sources": [video_url], "download_path": download_path}
+    return None
+
+
+def extract_item_frames(kind: str, sources: List[str]) -> Dict[str, Any]:
+    """
+    抽取视频帧或读取图片（进程池工作函数，必须定义在模块顶层以便序列化）
+
+    Returns:
+        {"frames": base64帧列表, "error": 错误信息}
+    """
+    try:
+        if kind == "video":
+            frames = extract_video_frames(sources[0])
+        else:
+            frames = load_image_frames(sources)
+        return {"frames": frames, "error": None}
+    except Exception as e:
+        return {"frames": [], "error": str(e)}
+
+
+async def analyze_media_batch(
+    entries: List[Dict[str, Any]],
+    on_result: Callable[[Dict[str, Any], Dict[str, Any]], None],
+    prompt: Optional[str] = None,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    concurrency: Optional[int] = None
+):
+    """
+    批量分析视频/图片
+
+    抽帧在进程池中并行执行，超过 MEDIA_FRAME_EXTRACT_TIMEOUT 的抽帧按失败处理；
+    模型调用受LLM客户端注册表的并发和限流控制；
+    同时进行中的数据不超过 concurrency 条，已抽帧等待模型调用的数据不会无限堆积
+
+    Args:
+        entries: resolve_item_media 的结果
+        on_result: 每条数据分析完成后的回调 (entry, result)，在线程中依次执行（不会并发），
+            可以直接进行同步的数据库写入而不阻塞事件循环
+        prompt: 分析提示词
+        use_cache: 是否读取LLM响应缓存
+        workers: 抽帧进程数，0或None表示使用配置
+        concurrency: 同时进行中的数据条数
+    """
+    if not entries:
+        return
+    concurrency = max(1, concurrency or settings.MEDIA_BATCH_CONCURRENCY)
+    frame_entries = [entry for entry in entries if entry["kind"] != "url"]
+    processes = min(resolve_workers(workers or settings.MEDIA_BATCH_WORKERS), len(frame_entries))
+    extract_timeout = settings.MEDIA_FRAME_EXTRACT_TIMEOUT
+    # 卡住的抽帧进程（例如损坏的视频）由进程池按超时终止并替换
+    pool = create_process_pool(processes, task_timeout=extract_timeout) if processes > 1 else None
+    loop = asyncio.get_running_loop()
+    video_mode = ai_service.video_mode()
+    result_lock = asyncio.Lock()
+
+    async def _extract(entry: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(_submit_extract(entry), timeout=extract_timeout)
+        except asyncio.TimeoutError:
+            return {"frames": [], "error": f"超过 {extract_timeout:.0f} 秒"}
+
+    async def _submit_extract(entry: Dict[str, Any]) -> Dict[str, Any]:
+        if pool is None:
+            return await asyncio.to_thread(extract_item_frames, entry["kind"], entry["sources"])
+        future = loop.create_future()
+
+        def _set_result(result):
+            if not future.done():
+                future.set_result(result)
+
+        pool.apply_async(
+            extract_item_frames,
+            (entry["kind"], entry["sources"]),
+            callback=lambda result: loop.call_soon_threadsafe(_set_result, result),
+            error_callback=lambda e: loop.call_soon_threadsafe(_set_result, {"frames": [], "error": str(e)})
+        )
+        return await future
+
+    async def _analyze(entry: Dict[str, Any]) -> Dict[str, Any]:
+        # Gemini 模式直接上传视频，视频地址由原有流程下载
+        if entry["kind"] == "url" or (entry["kind"] == "video" and video_mode == "gemini"):
+            return await ai_service.analyze_video_content(
+                entry["sources"][0], prompt, use_cache, entry.get("download_path")
+            )
+
+        extracted = await _extract(entry)
+        if extracted["error"]:
+            return {"success": False, "error": f"抽帧失败: {extracted['error']}"}
+        if entry["kind"] == "video":
+            return await ai_service.analyze_video_frames(extracted["frames"], prompt, use_cache)
+        return await ai_service.analyze_image_frames(extracted["frames"], prompt, use_cache)
+
+    async def _run(entry: Dict[str, Any]):
+        try:
+            result = await _analyze(entry)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        # 回调中有同步的数据库写入，放到线程中依次执行，避免阻塞其他数据的模型调用和抽帧回调
+        async with result_lock:
+            await asyncio.to_thread(on_result, entry, result)
+
+    pending = set()
+    try:
+        for entry in entries:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # 结果写回失败时中止批量分析
+                for future in done:
+                    future.result()
+            pending.add(asyncio.ensure_future(_run(entry)))
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        for future in pending:
+            future.cancel()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+class MediaResultWriter:
+    """分析结果按批写回 raw_data 文档的 media_analysis 字段"""
+
+    def __init__(self, collection, batch_size: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.processed_count = 0
+        self.succeeded_count = 0
+        self.failed_count = 0
+        self._buffer: List[UpdateOne] = []
+
+    def add(self, entry: Dict[str, Any], result: Dict[str, Any]):
+        self.processed_count += 1
+        if result.get("success"):
+            self.succeeded_count += 1
+        else:
+            self.failed_count += 1
+            logger.warning(f"媒体分析失败 {entry['id']}: {result.get('error')}")
+
+        self._buffer.append(UpdateOne(
+            {"_id": entry["id"]},
+            {"$set": {"media_analysis": {
+                **result,
+                "media_type": "images" if entry["kind"] == "images" else "video",
+                "analyzed_at": datetime.now()
+            }}}
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self.collection.bulk_write(batch, ordered=False)
+
+
+def build_media_query(task: MediaAnalysisTask) -> Dict[str, Any]:
+    """批量分析任务选择数据的查询条件（默认跳过已分析成功的数据）"""
+    query: Dict[str, Any] = {}
+    if task.brand_id:
+        query["brand_id"] = task.brand_id
+    if task.platform:
+        query["platform"] = task.platform
+    if task.item_ids:
+        query["content_id"] = {"$in": [str(item_id) for item_id in task.item_ids]}
+    if not task.reanalyze:
+        query["media_analysis.success"] = {"$ne": True}
+    return query
+
+
+@celery_app.task(
+    bind=True,
+    name="analyze_media_batch_task",
+    soft_time_limit=settings.MEDIA_BATCH_TIME_LIMIT,
+    time_limit=settings.MEDIA_BATCH_TIME_LIMIT + 300
+)
+def analyze_media_batch_task(self: Task, media_task_id: int):
+    """
+    批量视频/图片分析任务
+
+    结果逐批写回 raw_data，任务中断后重新提交只会分析尚未成功的数据
+
+    Args:
+        media_task_id: 批量分析任务ID
+    """
+    db: Session = SessionLocal()
+    mongo_client = None
+    task = None
+    writer = None
+
+    try:
+        task = db.query(MediaAnalysisTask).filter(MediaAnalysisTask.id == media_task_id).first()
+        if not task:
+            logger.error(f"批量媒体分析任务不存在: {media_task_id}")
+            return {"error": "批量媒体分析任务不存在"}
+
+        task.status = TaskStatus.RUNNING
+        task.celery_task_id = self.request.id
+        task.started_at = datetime.now()
+        db.commit()
+
+        if ai_service.video_mode() is None:
+            raise Exception("未配置 AI API Key。请配置 GEMINI_API_KEY 或 LLM_API_KEY/LLM_API_BASE。")
+
+        mongo_client = MongoClient(
+            host=settings.MONGODB_HOST,
+            port=settings.MONGODB_PORT,
+            serverSelectionTimeoutMS=2000
+        )
+        collection = mongo_client[settings.MONGODB_DATABASE].raw_data
+
+        # 先读取全部待分析数据的媒体信息，避免长时间分析期间游标超时
+        roots = media_roots()
+        entries = []
+        for doc in collection.find(
+            build_media_query(task),
+            {"platform": 1, "content_id": 1, "video_path": 1,
+             "raw_data.video_download_url": 1, "raw_data.video": 1}
+        ):
+            entry = resolve_item_media(doc, roots)
+            if entry:
+                entries.append(entry)
+
+        task.total_items = len(entries)
+        db.commit()
+        logger.info(f"开始批量媒体分析任务: {media_task_id}, 共 {len(entries)} 条")
+
+        writer = MediaResultWriter(collection, settings.MEDIA_BATCH_WRITE_SIZE)
+        last_progress_at = time.monotonic()
+
+        def _on_result(entry: Dict[str, Any], result: Dict[str, Any]):
+            nonlocal last_progress_at
+            writer.add(entry, result)
+            # 限制进度写入频率
+            if time.monotonic() - last_progress_at >= settings.MEDIA_BATCH_PROGRESS_INTERVAL:
+                writer.flush()
+                task.processed_items = writer.processed_count
+                task.succeeded_items = writer.succeeded_count
+                task.failed_items = writer.failed_count
+                db.commit()
+                last_progress_at = time.monotonic()
+
+        run_async(analyze_media_batch(entries, _on_result, task.prompt, task.use_cache is not False))
+        writer.flush()
+
+        task.processed_items = writer.processed_count
+        task.succeeded_items = writer.succeeded_count
+        task.failed_items = writer.failed_count
+        task.status = TaskStatus.COMPLETED
+        task.completed_at = datetime.now()
+        db.commit()
+
+        logger.info(
+            f"批量媒体分析任务完成: {media_task_id}, 成功 {writer.succeeded_count} 条, "
+            f"失败 {writer.failed_count} 条"
+        )
+
+        return {
+            "status": "completed",
+            "processed_items": writer.processed_count,
+            "succeeded_items": writer.succeeded_count,
+            "failed_items": writer.failed_count
+        }
+
+    except Exception as e:
+        logger.error(f"批量媒体分析任务异常: {e}", exc_info=True)
+        if task:
+            # 保存已完成的分析结果，重新提交时跳过
+            if writer:
+                try:
+                    writer.flush()
+                    task.processed_items = writer.processed_count
+                    task.succeeded_items = writer.succeeded_count
+                    task.failed_items = writer.failed_count
+                except Exception as flush_error:
+                    logger.error(f"写回媒体分析结果失败: {flush_error}")
+            task.status = TaskStatus.FAILED
+            task.error_message = str(e)
+            task.completed_at = datetime.now()
+            db.commit()
+        return {"error": str(e)}
+
+    finally:
+        if mongo_client:
+            mongo_client.close()
+        db.close()
@@ -14,6 +14,8 @@ from app.models.brand import Brand
 from app.models.analysis_task import AnalysisTask
 from app.models.crawl_task import TaskStatus
 from app.services.report_service import report_service
+from app.services.chart_cache import chart_cache
+from app.services.report_artifacts import report_artifacts
 from config import settings
 
 
@@ -65,7 +67,7 @@ def generate_report_task(self: Task, report_id: int):
         mongodb = get_mongodb()
         analysis_result_doc = mongodb.analysis_results.find_one({
             "analysis_task_id": analysis_task.id
-        })
+        }, {"aggregates": 0})
         
         if not analysis_result_doc:
             report.status = ReportStatus.FAILED
@@ -90,7 +92,7 @@ def generate_report_task(self: Task, report_id: int):
         
         # 生成图表
         logger.info("生成图表...")
-        charts = report_service.generate_charts(analysis_result)
+        charts = chart_cache.get_base64(analysis_task.id, analysis_result)
         
         # 渲染HTML报表
         logger.info("渲染HTML报表...")
@@ -157,3 +159,44 @@ def generate_report_task(self: Task, report_id: int):
         db.close()
 
 
+@celery_app.task(bind=True, name="prebuild_report_artifacts_task")
+def prebuild_report_artifacts_task(self: Task, analysis_task_id: int):
+    """
+    分析完成后预先生成图表和各格式报告文件，导出时直接返回
+    
+    Args:
+        analysis_task_id: 分析任务ID
+    """
+    db: Session = SessionLocal()
+    
+    try:
+        analysis_task = db.query(AnalysisTask).filter(AnalysisTask.id == analysis_task_id).first()
+        if not analysis_task or analysis_task.status != TaskStatus.COMPLETED:
+            return {"error": "分析任务不存在或未完成"}
+        
+        brand = db.query(Brand).filter(Brand.id == analysis_task.brand_id).first()
+        if not brand:
+            return {"error": "品牌不存在"}
+        
+        mongodb = get_mongodb()
+        analysis_result_doc = mongodb.analysis_results.find_one({
+            "analysis_task_id": analysis_task_id
+        }, {"aggregates": 0})
+        if not analysis_result_doc:
+            return {"error": "分析结果不存在"}
+        
+        brand_info = {
+            "id": brand.id,
+            "name": brand.name,
+            "description": brand.description
+        }
+        report_artifacts.prebuild(analysis_task_id, brand_info, analysis_result_doc.get("result", {}))
+        logger.info(f"分析任务 {analysis_task_id} 的报告已预生成")
+        return {"analysis_task_id": analysis_task_id, "status": "completed"}
+    
+    except Exception as e:
+        logger.error(f"预生成报告失败: {e}", exc_info=True)
+        return {"error": str(e)}
+    
+    finally:
+        db.close()
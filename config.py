@@ -29,11 +29,19 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "root"
     MYSQL_PASSWORD: str = "root123456"
     MYSQL_DATABASE: str = "brand_analysis"
+    MYSQL_ECHO: bool = False  # 打印SQL语句（独立于DEBUG，逐条输出SQL会拖慢请求）
+    MYSQL_ASYNC_POOL_SIZE: int = 20  # 异步连接池大小（FastAPI接口）
+    MYSQL_ASYNC_MAX_OVERFLOW: int = 20  # 异步连接池允许超出的连接数
     
     # MongoDB配置
     MONGODB_HOST: str = "localhost"
     MONGODB_PORT: int = 27017
     MONGODB_DATABASE: str = "brand_analysis"
+    MONGODB_PROFILE_SLOW_MS: int = 0  # 大于0时启动时开启慢查询记录（毫秒），在 /data/diagnostics 中查看
+    MONGODB_MAX_POOL_SIZE: int = 100  # 异步客户端（FastAPI接口）连接池上限
+    MONGODB_MIN_POOL_SIZE: int = 10  # 异步客户端保持的最少连接数，避免突发请求时临时建连
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 5000  # 连接池耗尽时等待可用连接的超时（毫秒）
+    BRAND_STATS_SENTIMENT: bool = True  # 写入数据时计算情感分数并累加到 brand_stats（关闭后只统计数量和互动）
     
     # Redis配置
     REDIS_HOST: str = "localhost"
@@ -69,6 +77,35 @@ class Settings(BaseSettings):
     LOCAL_LLM_URL: Optional[str] = None
     LOCAL_LLM_MODEL: Optional[str] = None
     
+    # LLM客户端配置（每个服务复用长连接客户端，统一限流、重试和熔断）
+    LLM_MAX_CONCURRENCY: int = 4  # 每个服务的最大并发请求数
+    LLM_TOKENS_PER_MINUTE: int = 0  # 每个服务每分钟的Token上限，0表示不限制
+    LLM_MAX_RETRIES: int = 3  # 429/5xx/超时的最大重试次数
+    LLM_RETRY_BASE_DELAY: float = 1.0  # 重试基础等待时间（秒），按指数退避并加随机抖动
+    LLM_RETRY_MAX_DELAY: float = 30.0  # 单次重试最长等待时间（秒）
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # 连续失败该次数后熔断，切换到下一个服务
+    LLM_CIRCUIT_RESET_TIMEOUT: float = 60.0  # 熔断后多久允许重新尝试（秒）
+    LLM_HTTP2: bool = True  # 是否启用HTTP/2（需要安装 h2）
+    LLM_MAX_CONNECTIONS: int = 20  # 每个服务的最大连接数
+    LLM_REQUEST_TIMEOUT: float = 60.0  # 文本请求超时时间（秒）
+    LLM_VISION_TIMEOUT: float = 300.0  # 图片/视频帧分析请求超时时间（秒）
+    
+    # LLM响应缓存（按模型、提示词/图片哈希、温度、分析类型缓存分析结果）
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL: int = 7 * 24 * 3600  # 过期时间（秒），0表示不过期
+    LLM_CACHE_MAX_ENTRIES: int = 10000  # 最大缓存条数，超出后按最近访问时间淘汰
+    LLM_CACHE_PATH: Path = Path(__file__).resolve().parent / "data" / "cache" / "llm_cache.sqlite3"
+    
+    # Map-Reduce洞察（按平台和主题选取代表性文本，分块并行总结后再生成品牌洞察）
+    LLM_INSIGHT_ENABLED: bool = True
+    LLM_INSIGHT_SAMPLE_SIZE: int = 3000  # 代表性文本数上限
+    LLM_INSIGHT_NUM_TOPICS: int = 8  # 没有训练好的主题模型时临时训练的主题数
+    LLM_INSIGHT_TEXT_CHARS: int = 200  # 每条文本保留的最大字数
+    LLM_INSIGHT_CHUNK_TOKENS: int = 3000  # 每个分块提示词的Token预算（含固定提示词开销）
+    LLM_INSIGHT_MAX_CHUNKS: int = 16  # 分块数上限
+    LLM_INSIGHT_MAP_TIMEOUT: float = 300.0  # 分块总结总超时（秒），超时的分块被丢弃
+    LLM_INSIGHT_REDUCE_TOKENS: int = 8000  # 汇总提示词中分块总结的Token预算
+    
     # 文件存储
     UPLOAD_DIR: Path = Path("uploads") if Path("uploads").is_absolute() else Path(__file__).resolve().parent / "uploads"
     REPORT_DIR: Path = Path("reports") if Path("reports").is_absolute() else Path(__file__).resolve().parent / "reports"
@@ -87,6 +124,41 @@ class Settings(BaseSettings):
     CRAWL_MAX_ITEMS: int = 100
     CRAWL_INCLUDE_COMMENTS: bool = True
     CRAWL_TIMEOUT: int = 300
+    CRAWL_BULK_WRITE_SIZE: int = 1000  # 保存爬取数据时每批写入MongoDB的条数
+    CRAWL_MEDIA_SYNC_WORKERS: int = 8  # 同步本地媒体文件的线程数
+    
+    # 数据导入配置
+    IMPORT_WORKERS: int = 0  # 解析文件的进程数，0表示使用CPU核数
+    IMPORT_BATCH_SIZE: int = 1000  # 每批写入MongoDB的条数
+    IMPORT_PROGRESS_INTERVAL: float = 2.0  # 进度写入数据库的最小间隔（秒）
+    
+    # 批量视频/图片分析配置
+    MEDIA_BATCH_WORKERS: int = 0  # 抽帧进程数，0表示使用CPU核数
+    MEDIA_BATCH_CONCURRENCY: int = 8  # 同时进行中的分析数（抽帧完成等待模型调用的数据不超过该值）
+    MEDIA_BATCH_WRITE_SIZE: int = 50  # 分析结果每批写回MongoDB的条数
+    MEDIA_BATCH_PROGRESS_INTERVAL: float = 5.0  # 进度写入数据库的最小间隔（秒）
+    MEDIA_FRAME_EXTRACT_TIMEOUT: float = 300.0  # 单条数据的抽帧超时时间（秒），超时的抽帧进程被替换
+    MEDIA_BATCH_TIME_LIMIT: int = 12 * 3600  # 批量分析任务的超时时间（秒），超时后重新提交只分析剩余数据
+    
+    # 数据文件分析作业配置（/data-analysis/process）
+    DATA_ANALYSIS_LOCAL_WORKERS: int = 2  # Redis不可用时本地执行分析作业的进程数
+    DATA_ANALYSIS_POLL_INTERVAL: float = 1.0  # SSE推送作业进度的查询间隔（秒）
+    
+    # 视频抽帧配置
+    VIDEO_FRAME_SAMPLING: str = "scene"  # uniform/scene，scene表示每段选取画面变化最大的帧
+    VIDEO_FRAME_CACHE_ENABLED: bool = True  # 缓存抽取的视频帧，同一视频重新分析时不再解码
+    VIDEO_FRAME_CACHE_DIR: Path = Path(__file__).resolve().parent / "data" / "cache" / "frames"  # data/crawled_data 以外的视频的帧缓存目录
+    VIDEO_FRAME_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 帧缓存目录总大小上限（字节），超过时删除最久未使用的缓存，0表示不限制
+    VIDEO_FRAME_CACHE_TTL: int = 30 * 86400  # 帧缓存保留时间（秒），超过该时间未使用的缓存被删除，0表示不限制
+    
+    # 远程视频下载配置（流式写入磁盘，中断后按 Range 继续）
+    VIDEO_DOWNLOAD_DIR: Path = Path(__file__).resolve().parent / "data" / "crawled_data" / "_downloads"  # 没有对应内容目录的视频的下载目录
+    VIDEO_DOWNLOAD_KEEP: bool = True  # 分析后保留下载的视频，相同URL再次分析时直接复用
+    VIDEO_DOWNLOAD_CACHE_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 下载目录总大小上限（字节），超过时删除最久未使用的视频，0表示不限制
+    VIDEO_DOWNLOAD_CACHE_TTL: int = 7 * 86400  # 下载的视频保留时间（秒），超过该时间未使用的视频被删除，0表示不限制
+    VIDEO_DOWNLOAD_MAX_BYTES: int = 500 * 1024 * 1024  # 单个视频的最大大小（字节）
+    VIDEO_DOWNLOAD_TIMEOUT: float = 60.0  # 读取超时时间（秒），按块计算，不限制总下载时长
+    VIDEO_DOWNLOAD_RETRIES: int = 3  # 下载中断后的重试次数
     
     # MediaCrawler配置
     # 如果MediaCrawler在项目目录中，使用相对路径: "./MediaCrawler"
@@ -102,10 +174,45 @@ class Settings(BaseSettings):
     ANALYSIS_KEYWORDS_ENABLED: bool = True
     ANALYSIS_INSIGHTS_ENABLED: bool = True
     
+    # 批量情感分析配置
+    SENTIMENT_WORKERS: int = 0  # 进程数，0表示使用CPU核数
+    SENTIMENT_PARALLEL_THRESHOLD: int = 5000  # 去重后文本数超过该值才启用进程池
+    SENTIMENT_CHUNK_SIZE: int = 1000  # 每个进程任务的文本数
+    
+    # 文本分析结果缓存（情感分数、分词结果，按清洗后文本哈希复用）
+    NLP_CACHE_BACKEND: str = "sqlite"  # sqlite/redis/auto/none，redis和auto需要配置 NLP_CACHE_REDIS_URL，不可用时使用SQLite
+    NLP_CACHE_REDIS_URL: Optional[str] = None  # 文本分析缓存使用的Redis（应与Celery消息队列分开），如 redis://localhost:6379/2
+    NLP_CACHE_REDIS_TTL: int = 30 * 86400  # Redis中缓存条目的过期时间（秒），命中时续期
+    NLP_CACHE_MAX_ENTRIES: int = 1000000  # 最大缓存条数，超出后按最近访问时间淘汰
+    NLP_CACHE_PATH: Path = Path(__file__).resolve().parent / "data" / "cache" / "nlp_cache.sqlite3"
+
+    # 增量分析配置（只分析上次完成的分析任务之后新爬取的数据，并合并到上次的聚合结果）
+    ANALYSIS_INCREMENTAL: bool = True  # 是否默认使用增量分析，False表示每次全量重新分析
+    ANALYSIS_INCREMENTAL_OVERLAP: int = 300  # 增量分析重新读取水位线之前该秒数内写入的数据（已分析的按 _id 跳过），覆盖并行写入的提交延迟
+    ANALYSIS_FULL_REBUILD_DAYS: int = 7  # 距离上次全量分析超过该天数时执行全量分析，0表示不限制
+    ANALYSIS_AGGREGATE_MAX_TERMS: int = 20000  # 聚合结果中保留的最大词数
+    ANALYSIS_TOPIC_SAMPLE_SIZE: int = 5000  # 主题提取使用的文本样本数
+    ANALYSIS_SAMPLE_TEXT_MAX_CHARS: int = 300  # 文本样本中每条文本保留的最大字符数（控制聚合文档大小）
+    ANALYSIS_BATCH_SIZE: int = 2000  # 分析任务每批读取并聚合的数据条数
+
+    # 主题模型配置（MiniBatchNMF，按品牌保存，增量分析时继续训练）
+    TOPIC_MODEL_DIR: Path = Path(__file__).resolve().parent / "data" / "topic_models"
+    TOPIC_HASH_FEATURES: int = 131072  # 哈希特征维度
+    TOPIC_BATCH_SIZE: int = 2048  # 每次模型更新使用的文本数
+
+    # 标准化数据列式存储（提取清洗后的数据按 platform/day 分区保存为Parquet，重复分析同一文件时直接读取）
+    NORMALIZED_STORE_ENABLED: bool = True
+    NORMALIZED_STORE_DIR: Path = Path(__file__).resolve().parent / "data" / "normalized"
+    
     # 报告配置
     REPORT_TEMPLATE_DIR: Path = Path("templates/reports") if Path("templates/reports").is_absolute() else Path(__file__).resolve().parent / "templates" / "reports"
     REPORT_OUTPUT_DIR: Path = Path("reports") if Path("reports").is_absolute() else Path(__file__).resolve().parent / "reports"
     REPORT_DEFAULT_FORMAT: str = "pdf"
+    REPORT_ARTIFACT_DIR: Path = Path(__file__).resolve().parent / "reports" / "artifacts"  # 已完成分析任务的报告文件缓存目录
+    REPORT_PREBUILD_FORMATS: List[str] = ["html", "pdf", "md"]  # 分析完成后预先生成的报告格式
+    CHART_CACHE_DIR: Path = Path(__file__).resolve().parent / "data" / "cache" / "charts"  # 已完成分析任务的图表缓存目录
+    CHART_RENDER_WORKERS: int = 4  # 并行绘制图表的进程数，0表示使用CPU核数，1表示在当前进程内绘制
+    CHART_RENDER_TIMEOUT: float = 60.0  # 单个图表的绘制超时时间（秒）
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,111 @@
+"""
+事件循环阻塞检测（并发压测）
+
+并发请求访问 MySQL/MongoDB 的接口，同时持续请求不访问数据库的 /health。
+接口中有阻塞事件循环的同步数据库调用时，/health 的延迟会随并发数明显升高；
+全部使用异步会话/客户端时 /health 的 p99 应保持在几毫秒。
+
+用法: python scripts/benchmark_event_loop.py --brand-id 1 --concurrency 50 --duration 20
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from config import settings
+
+
+# 压测的接口（{brand_id} 替换为品牌ID）
+ENDPOINTS = [
+    "/brands/{brand_id}/data?page_size=20",
+    "/brands/{brand_id}/data/stats",
+    "/brands/{brand_id}/analysis?include_charts=false",
+    "/analysis/recent",
+    "/crawl-tasks",
+    "/reports",
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summary(name, latencies, errors):
+    ms = [v * 1000 for v in latencies]
+    print(
+        f"{name:<12} 请求 {len(ms):>6}  失败 {errors:>4}  "
+        f"p50 {percentile(ms, 0.5):7.1f}ms  p99 {percentile(ms, 0.99):7.1f}ms  max {max(ms, default=0):7.1f}ms"
+    )
+
+
+async def load_worker(client, paths, deadline, latencies, errors, index):
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.monotonic()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.monotonic() - start)
+        except Exception:
+            errors[0] += 1
+
+
+async def probe(client, deadline, interval, latencies, errors):
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            (await client.get("/health")).raise_for_status()
+            latencies.append(time.monotonic() - start)
+        except Exception:
+            errors[0] += 1
+        await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="检测接口是否阻塞事件循环")
+    parser.add_argument("--base-url", default=f"http://127.0.0.1:{settings.PORT}", help="服务地址")
+    parser.add_argument("--brand-id", type=int, required=True, help="用于压测的品牌ID")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=20, help="压测时长（秒）")
+    args = parser.parse_args()
+
+    api_base = args.base_url.rstrip("/") + settings.API_V1_PREFIX
+    paths = [path.format(brand_id=args.brand_id) for path in ENDPOINTS]
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=api_base, limits=limits, timeout=60) as api_client, \
+            httpx.AsyncClient(base_url=args.base_url, timeout=60) as health_client:
+        # 空闲时的 /health 延迟作为基线
+        baseline, baseline_errors = [], [0]
+        await probe(health_client, time.monotonic() + 2, 0.05, baseline, baseline_errors)
+
+        deadline = time.monotonic() + args.duration
+        load_latencies, load_errors = [], [0]
+        probe_latencies, probe_errors = [], [0]
+        await asyncio.gather(
+            probe(health_client, deadline, 0.05, probe_latencies, probe_errors),
+            *[
+                load_worker(api_client, paths, deadline, load_latencies, load_errors, i)
+                for i in range(args.concurrency)
+            ]
+        )
+
+    print(f"并发 {args.concurrency}，时长 {args.duration}s")
+    summary("health空闲", baseline, baseline_errors[0])
+    summary("health压测", probe_latencies, probe_errors[0])
+    summary("数据接口", load_latencies, load_errors[0])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,6 +8,7 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.database import get_mongodb
+from app.services.brand_stats import delete_raw_data
 from config import settings
 
 def clean_invalid_data():
@@ -78,8 +79,8 @@ def clean_invalid_data():
     print("Proceed? (The script will proceed automatically in this environment)")
     
     # Delete from DB
-    result = collection.delete_many({"_id": {"$in": ids_to_delete}})
-    print(f"Deleted {result.deleted_count} records from MongoDB.")
+    deleted_count = delete_raw_data(mongodb, {"_id": {"$in": ids_to_delete}})
+    print(f"Deleted {deleted_count} records from MongoDB.")
     
     # Delete files
     deleted_files_count = 0
@@ -188,6 +188,11 @@ def import_brand_data(brand_id: int, platforms: list = None, keywords: list = No
         except Exception as e:
             print(f"处理文件 {file_path.name} 失败: {e}")
 
+    # 逐条写入的数据没有经过 brand_stats 累加，导入后重新统计该品牌
+    if imported_count:
+        from app.services.brand_stats import rebuild_brand_stats
+        rebuild_brand_stats(mongodb, brand_id)
+    
     print("\n" + "=" * 50)
     print(f"导入完成！")
     print(f"新增关联: {imported_count}")
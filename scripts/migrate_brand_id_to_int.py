@@ -0,0 +1,53 @@
+"""
+一次性迁移：把 raw_data 中字符串类型的 brand_id 统一转换为 int，并创建复合索引
+
+历史数据的 brand_id 有 int 和 str 两种类型，迁移后查询只需要按 int 匹配，
+可以直接使用 (brand_id, platform, crawled_at) 索引排序。可重复执行。
+
+先创建索引（包括 (brand_id, platform, content_id) 唯一索引）再转换，唯一索引不可用时中止迁移。
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from pymongo import MongoClient
+
+from config import settings
+from app.core.mongo_indexes import count_string_brand_ids, ensure_indexes, normalize_brand_ids
+from app.services.brand_stats import rebuild_brand_stats
+
+
+def main():
+    client = MongoClient(host=settings.MONGODB_HOST, port=settings.MONGODB_PORT, serverSelectionTimeoutMS=2000)
+    db = client[settings.MONGODB_DATABASE]
+
+    try:
+        report = ensure_indexes(db)
+        print(f"已创建索引: {', '.join(report['created'])}")
+        for name, error in report["failed"].items():
+            print(f"索引 {name} 创建失败: {error}")
+        if not report["unique_index"]:
+            # 没有唯一索引时转换后的数据无法去重
+            print("唯一索引不可用，请先清理重复数据，迁移中止")
+            sys.exit(1)
+
+        pending = count_string_brand_ids(db)
+        print(f"brand_id为字符串的数据: {pending} 条")
+
+        if pending:
+            stats = normalize_brand_ids(db)
+            print(f"已转换: {stats['converted']} 条")
+            print(f"删除重复数据: {stats['duplicates_removed']} 条")
+            print(f"无法转换: {stats['skipped']} 条")
+
+        # 统计按 int 类型的 brand_id 保存，迁移后重新生成
+        rebuild_brand_stats(db)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -55,7 +55,7 @@ async def re_crawl():
             max_items=1
         )
         
-        items = result.get("items", [])
+        items = list(service.iter_crawled_items(result))
         print(f"Got {len(items)} items")
         
         target_item = None
@@ -0,0 +1,40 @@
+"""
+从 raw_data 重新生成品牌统计 brand_stats
+
+brand_stats 在写入和删除数据时增量维护，以下情况需要重新统计：
+统计功能上线前已有的数据、直接操作 MongoDB 修改过 raw_data、累计值出现偏差。可重复执行。
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from pymongo import MongoClient
+
+from config import settings
+from app.core.mongo_indexes import ensure_indexes
+from app.services.brand_stats import rebuild_brand_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重新生成品牌统计")
+    parser.add_argument("--brand-id", type=int, help="只重新统计指定品牌（默认所有品牌）")
+    args = parser.parse_args()
+
+    client = MongoClient(host=settings.MONGODB_HOST, port=settings.MONGODB_PORT, serverSelectionTimeoutMS=2000)
+    db = client[settings.MONGODB_DATABASE]
+
+    try:
+        ensure_indexes(db)
+        result = rebuild_brand_stats(db, args.brand_id)
+        print(f"回填统计字段: {result['backfilled']} 条")
+        print(f"已生成统计: {result['groups']} 组（品牌/平台）")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -93,7 +93,7 @@ async def recover_videos():
                 max_items=1
             )
             
-            crawled_items = result.get("items", [])
+            crawled_items = list(service.iter_crawled_items(result))
             target_item = None
             
             if crawled_items:
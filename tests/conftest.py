@@ -0,0 +1,34 @@
+"""
+测试公共配置
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services.llm_cache import llm_cache
+from app.services.nlp_cache import nlp_cache
+from app.services.normalized_store import normalized_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """标准化数据、文本分析缓存和LLM缓存写入临时目录，测试不修改仓库中的 data 目录"""
+    storage = tmp_path / "storage"
+    monkeypatch.setattr(settings, "NORMALIZED_STORE_DIR", storage / "normalized")
+    monkeypatch.setattr(settings, "NLP_CACHE_PATH", storage / "cache" / "nlp_cache.sqlite3")
+    monkeypatch.setattr(settings, "LLM_CACHE_PATH", storage / "cache" / "llm_cache.sqlite3")
+
+    # 全局实例在导入时已读取配置
+    monkeypatch.setattr(normalized_store, "root", settings.NORMALIZED_STORE_DIR)
+    monkeypatch.setattr(nlp_cache, "path", settings.NLP_CACHE_PATH)
+    monkeypatch.setattr(nlp_cache, "_backend", None)
+    monkeypatch.setattr(nlp_cache, "_backend_ready", False)
+    monkeypatch.setattr(llm_cache, "path", settings.LLM_CACHE_PATH)
+    monkeypatch.setattr(llm_cache, "_conn", None)
+    return storage
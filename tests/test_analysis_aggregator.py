@@ -0,0 +1,102 @@
+"""
+品牌分析聚合状态测试
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import jieba.analyse
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.analysis_aggregator import BrandAnalysisAggregate
+from app.services.nlp_cache import nlp_cache
+
+
+ITEMS = [
+    {"_id": 1, "platform": "xhs", "title": "新款口红试色", "desc": "颜色非常好看，很滋润", "liked_count": 120,
+     "time": "2024-01-01T10:00:00", "ingested_at": datetime(2024, 1, 3, 10, 0, 0)},
+    {"_id": 2, "platform": "douyin", "desc": "口红质量太差了，掉色严重", "digg_count": 30,
+     "create_time": "2024-01-02T10:00:00", "ingested_at": datetime(2024, 1, 3, 10, 0, 30)},
+    # 并行写入时 _id 较小的数据可能更晚提交
+    {"_id": 0, "platform": "xhs", "title": "平价口红推荐", "desc": "性价比很高，推荐购买", "liked_count": 500,
+     "time": "2024-01-02T12:00:00", "ingested_at": datetime(2024, 1, 3, 10, 1, 0)},
+]
+
+
+@pytest.fixture(autouse=True)
+def disable_nlp_cache(monkeypatch):
+    """测试中不读写文本分析缓存"""
+    monkeypatch.setattr(nlp_cache, "backend_name", "none")
+    monkeypatch.setattr(nlp_cache, "_backend_ready", False)
+
+
+def test_incremental_merge_matches_full():
+    """测试分批合并的聚合结果与一次性聚合一致"""
+    full = BrandAnalysisAggregate()
+    full.add_items(ITEMS)
+
+    base = BrandAnalysisAggregate()
+    base.add_items(ITEMS[:2])
+    incremental = BrandAnalysisAggregate.from_document(base.to_document())
+    assert incremental.watermark == ITEMS[1]["ingested_at"]
+    # 重叠时间内已分析的数据再次读取时跳过
+    assert sorted(incremental.recent) == [1, 2]
+    incremental.add_items(ITEMS[1:])
+
+    assert incremental.item_count == full.item_count
+    assert incremental.watermark == ITEMS[2]["ingested_at"]
+    assert incremental.build_text_statistics() == full.build_text_statistics()
+    assert incremental.build_sentiment() == full.build_sentiment()
+    assert incremental.build_interaction_statistics() == full.build_interaction_statistics()
+    assert incremental.build_keywords() == full.build_keywords()
+    assert [p["score"] for p in incremental.build_top_posts()] == [p["score"] for p in full.build_top_posts()]
+
+
+def test_merge_combines_aggregates():
+    """测试两个聚合状态合并"""
+    first = BrandAnalysisAggregate()
+    first.add_items(ITEMS[:1])
+    second = BrandAnalysisAggregate()
+    second.add_items(ITEMS[1:])
+    first.merge(second)
+
+    assert first.item_count == 3
+    assert first.build_platform_statistics().keys() == {"xhs", "douyin"}
+
+
+def test_keywords_match_extract_tags():
+    """测试累计词频计算的关键词与 jieba.analyse.extract_tags 一致"""
+    aggregate = BrandAnalysisAggregate(include_sentiment=False)
+    aggregate.add_items(ITEMS)
+
+    texts = [entry[1] for entry in sorted(aggregate.text_sample, key=lambda entry: entry[0])]
+    expected = jieba.analyse.extract_tags(" ".join(texts), topK=10, withWeight=True)
+
+    assert {kw["keyword"]: kw["weight"] for kw in aggregate.build_keywords(top_k=10)} == \
+        {kw: round(weight, 4) for kw, weight in expected}
+
+
+def test_saved_aggregate_stays_under_document_limit():
+    """测试长文本品牌的聚合文档（满额文本样本、词频和热门内容）远小于MongoDB 16MB文档上限"""
+    import random
+    import bson
+    from collections import Counter
+
+    aggregate = BrandAnalysisAggregate()
+    long_text = "这款产品的使用体验非常详细的长篇测评" * 500
+    aggregate._merge_sample([[random.random(), long_text, "zhihu"] for _ in range(aggregate.sample_size * 2)])
+    aggregate._merge_top_candidates([
+        {"title": "长文测评", "content": long_text, "platform": "bilibili", "likes": i}
+        for i in range(100)
+    ])
+    aggregate.term_freq = Counter({f"词语{i}": i for i in range(aggregate.max_terms * 3)})
+
+    doc = {"analysis_task_id": 1, "brand_id": 1, "aggregates": aggregate.to_document()}
+    assert len(doc["aggregates"]["text_sample"]) == aggregate.sample_size
+    assert len(doc["aggregates"]["term_freq"]) == aggregate.max_terms
+    # 不超过上限的一半，留出余量
+    assert len(bson.encode(doc)) < 8 * 1024 * 1024
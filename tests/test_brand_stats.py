@@ -0,0 +1,100 @@
+"""
+品牌统计测试
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services.brand_stats import attach_metrics, record_inserted, record_updated, _accumulate
+
+
+def _doc(platform, raw, crawled_at, title="", content=""):
+    return {"brand_id": 1, "platform": platform, "title": title, "content": content,
+            "raw_data": raw, "crawled_at": crawled_at}
+
+
+def test_attach_metrics_and_accumulate(monkeypatch):
+    """测试单条数据的互动统计和按平台汇总"""
+    monkeypatch.setattr(settings, "BRAND_STATS_SENTIMENT", False)
+    docs = [
+        _doc("xhs", {"liked_count": "10", "comment_count": 2, "share_count": 1}, datetime(2024, 5, 1)),
+        _doc("xhs", {"liked_count": 5}, datetime(2024, 5, 3)),
+        _doc("douyin", {"digg_count": 7}, datetime(2024, 5, 2)),
+    ]
+    attach_metrics(docs)
+    assert docs[0]["stats"] == {"likes": 10, "comments": 2, "shares": 1, "sentiment": None}
+
+    # 模拟已打分的数据
+    docs[0]["stats"]["sentiment"] = 0.9
+    docs[1]["stats"]["sentiment"] = 0.1
+    groups = _accumulate(docs)
+    assert set(groups) == {(1, "xhs"), (1, "douyin")}
+
+    xhs = groups[(1, "xhs")]
+    assert (xhs["count"], xhs["likes"], xhs["comments"], xhs["shares"]) == (2, 15, 2, 1)
+    assert (xhs["sentiment_count"], xhs["positive"], xhs["negative"]) == (2, 1, 1)
+    assert xhs["sentiment_sum"] == 1.0
+    assert xhs["latest_crawl"] == datetime(2024, 5, 3)
+    assert groups[(1, "douyin")]["likes"] == 7
+
+
+def test_attach_metrics_scores_title_and_content():
+    """测试标题和正文的情感分数取平均"""
+    docs = [_doc("xhs", {}, datetime(2024, 5, 1), title="非常好用，很喜欢", content="质量很好")]
+    attach_metrics(docs)
+    assert 0.0 <= docs[0]["stats"]["sentiment"] <= 1.0
+
+
+class FakeCollection:
+    def __init__(self):
+        self.operations = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+class FakeDB:
+    def __init__(self):
+        self.raw_data = FakeCollection()
+        self.brand_stats = FakeCollection()
+
+
+def test_sentiment_is_scored_only_for_inserted_docs(monkeypatch):
+    """测试写入前只计算互动数，情感分数在写入后为实际写入的文档计算并写回"""
+    monkeypatch.setattr(settings, "BRAND_STATS_SENTIMENT", True)
+    docs = [_doc("xhs", {"liked_count": 3}, datetime(2024, 5, 1), title="非常好用，很喜欢") for _ in range(2)]
+    attach_metrics(docs, include_sentiment=False)
+    assert all(doc["stats"]["sentiment"] is None for doc in docs)
+
+    # 第二条被唯一索引拒绝
+    docs[0]["_id"] = "a"
+    db = FakeDB()
+    record_inserted(db, docs[:1])
+    assert docs[0]["stats"]["sentiment"] is not None
+    assert docs[1]["stats"]["sentiment"] is None
+    assert [op._filter for op in db.raw_data.operations] == [{"_id": "a"}]
+    assert db.brand_stats.operations[0]._doc["$inc"]["count"] == 1
+
+
+def test_recrawl_applies_interaction_delta(monkeypatch):
+    """测试重新爬取时按互动数的变化更新品牌统计，条数和情感不变"""
+    monkeypatch.setattr(settings, "BRAND_STATS_SENTIMENT", False)
+    docs = [
+        {**_doc("xhs", {"liked_count": 15, "comment_count": 4}, datetime(2024, 5, 2)), "content_id": "n1"},
+        {**_doc("xhs", {"liked_count": 5}, datetime(2024, 5, 2)), "content_id": "n2"},
+    ]
+    attach_metrics(docs)
+    db = FakeDB()
+    record_updated(db, docs, {
+        "n1": {"likes": 10, "comments": 4, "shares": 0, "sentiment": 0.9},
+        "n2": {"likes": 5, "comments": 0, "shares": 0, "sentiment": 0.2},
+    })
+    (operation,) = db.brand_stats.operations
+    assert operation._filter == {"brand_id": 1, "platform": "xhs"}
+    inc = operation._doc["$inc"]
+    assert (inc["count"], inc["likes"], inc["comments"], inc["sentiment_count"]) == (0, 5, 0, 0)
@@ -0,0 +1,53 @@
+"""
+分析图表缓存测试
+"""
+import base64
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services.chart_cache import ChartCache
+from app.services.chart_renderer import chart_specs, echarts_option
+from app.services.report_service import report_service
+
+
+ANALYSIS_RESULT = {
+    "sentiment": {"distribution": {"positive": 60, "negative": 10, "neutral": 30}},
+    "keywords": [{"keyword": "口红", "weight": 0.8}, {"keyword": "显白", "weight": 0.5}]
+}
+
+
+def test_charts_rendered_once_per_task(tmp_path, monkeypatch):
+    """测试同一分析任务的图表只绘制一次，之后直接读取缓存"""
+    monkeypatch.setattr(settings, "CHART_RENDER_WORKERS", 1)
+    cache = ChartCache(tmp_path)
+    names = cache.ensure(7, ANALYSIS_RESULT)
+    assert names == ["keywords_bar", "sentiment_pie"]
+    assert cache.chart_path(7, "sentiment_pie").read_bytes().startswith(b"\x89PNG")
+    assert cache.chart_path(7, "../7-v1/index") is None
+
+    def _fail(analysis_result):
+        raise AssertionError("不应重新绘制")
+
+    monkeypatch.setattr(report_service, "render_chart_images", _fail)
+    assert cache.ensure(7, ANALYSIS_RESULT) == names
+    charts = cache.get_base64(7, ANALYSIS_RESULT)
+    assert base64.b64decode(charts["keywords_bar"]) == cache.chart_path(7, "keywords_bar").read_bytes()
+    assert cache.chart_urls(7, names)["sentiment_pie"].startswith("/api/v1/analysis-tasks/7/charts/sentiment_pie.png")
+
+
+def test_svg_and_echarts_formats(tmp_path, monkeypatch):
+    """测试SVG图表单独缓存，ECharts配置与图表描述一致"""
+    monkeypatch.setattr(settings, "CHART_RENDER_WORKERS", 1)
+    cache = ChartCache(tmp_path)
+    assert cache.ensure(7, ANALYSIS_RESULT, "svg") == ["keywords_bar", "sentiment_pie"]
+    assert b"<svg" in cache.chart_path(7, "sentiment_pie", "svg").read_bytes()
+    assert cache.chart_path(7, "sentiment_pie") is None
+
+    option = echarts_option(chart_specs(ANALYSIS_RESULT)["keywords_bar"])
+    assert option["yAxis"]["data"] == ["口红", "显白"]
+    assert option["series"][0]["data"] == [0.8, 0.5]
@@ -0,0 +1,70 @@
+"""
+爬取数据批量写入测试（唯一索引冲突重试）
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.services.crawler_service import CrawlerService
+
+
+class ConflictingCollection:
+    """每次写入都有一条操作发生唯一索引冲突的集合"""
+
+    def __init__(self):
+        self.calls = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append(len(operations))
+        raise BulkWriteError({
+            "nUpserted": len(operations) - 1,
+            "nMatched": 0,
+            "upserted": [{"index": i, "_id": i} for i in range(1, len(operations))],
+            "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]
+        })
+
+
+def test_duplicate_key_is_retried_once_then_raised():
+    """测试唯一索引冲突只重试一次，重试后仍然冲突时抛出异常"""
+    collection = ConflictingCollection()
+    operations = [UpdateOne({"content_id": str(i)}, {"$set": {"n": i}}, upsert=True) for i in range(3)]
+
+    with pytest.raises(BulkWriteError):
+        CrawlerService.__new__(CrawlerService)._bulk_upsert(collection, operations)
+    assert collection.calls == [3, 1]
+
+
+def test_crawled_files_are_saved_in_batches(tmp_path, monkeypatch):
+    """测试爬取数据文件逐批读取写入，跳过模拟数据"""
+    import json
+    from app.core import database
+    from app.services import crawler_service as crawler_module
+
+    data_file = tmp_path / "search_contents.jsonl"
+    lines = [{"note_id": str(i), "title": f"t{i}"} for i in range(5)] + [{"note_id": "mock", "is_mock": True}]
+    data_file.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+
+    batches = []
+
+    def fake_save_batch(self, mongodb, executor, brand_id, task_id, platform, items, counts):
+        batches.append([item["note_id"] for item in items])
+        counts["inserted"] += len(items)
+        counts["total"] += len(items)
+        return None
+
+    monkeypatch.setattr(crawler_module.settings, "CRAWL_BULK_WRITE_SIZE", 2)
+    monkeypatch.setattr(database, "ensure_raw_data_unique_index", lambda db=None: True)
+    monkeypatch.setattr(CrawlerService, "_save_crawled_batch", fake_save_batch)
+
+    service = CrawlerService.__new__(CrawlerService)
+    counts = service.bulk_save_crawled_data(1, 1, "xhs", {"data_files": [str(data_file)]}, mongodb=None)
+
+    assert batches == [["0", "1"], ["2", "3"], ["4"]]
+    assert counts == {"inserted": 5, "updated": 0, "total": 5}
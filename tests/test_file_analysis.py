@@ -0,0 +1,66 @@
+"""
+数据文件分析作业测试
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services.ai_service import ai_service
+from app.services.file_analysis import analyze_files, job_payload
+
+
+ITEMS = [{"note_id": str(i), "desc": f"这款口红颜色很好看，第{i}次回购", "liked_count": i} for i in range(20)]
+
+
+def test_analyze_files_reports_progress(tmp_path, monkeypatch):
+    """测试分析作业按阶段上报进度，并返回与原接口一致的结果结构"""
+    data_file = tmp_path / "search_contents.json"
+    data_file.write_text(json.dumps(ITEMS, ensure_ascii=False), encoding="utf-8")
+
+    async def fake_llm(brand_name, data_summary, analysis_type="comprehensive", use_cache=True):
+        return {"insights": f"{brand_name}: {data_summary['total_count']}"}
+
+    monkeypatch.setattr(settings, "LLM_INSIGHT_ENABLED", False)
+    monkeypatch.setattr(ai_service, "analyze_with_llm", fake_llm)
+
+    stages = []
+    params = {
+        "cross_platform": False,
+        "platform": "xhs",
+        "file_paths": [str(data_file)],
+        "file_paths_by_platform": {},
+        "include_comments": True,
+        "analysis_type": "comprehensive",
+        "use_cache": True,
+        "brand_name": "小红书数据",
+        "platform_names": {"xhs": "小红书"}
+    }
+    result = asyncio.run(analyze_files(params, lambda stage, percent: stages.append(percent)))
+
+    assert stages == sorted(stages) and len(stages) == 4
+    assert result["platform_name"] == "小红书"
+    assert result["processed_data"]["total_items"] == 20
+    assert result["interaction_statistics"]["total_likes"] == sum(range(20))
+    assert result["llm_insights"] == {"insights": "小红书数据: 20"}
+
+    empty_file = tmp_path / "empty.json"
+    empty_file.write_text("[]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        asyncio.run(analyze_files(dict(params, file_paths=[str(empty_file)])))
+
+
+def test_job_payload_includes_result_only_when_completed():
+    """测试作业状态只在完成后包含分析结果"""
+    running = job_payload({"_id": "abc", "status": "running", "stage": "正在进行情感分析", "progress": 30})
+    assert running["progress"] == 30 and "result" not in running
+
+    completed = job_payload({"_id": "abc", "status": "completed", "progress": 100, "result": {"keywords": []}})
+    assert completed["result"] == {"keywords": []} and completed["result_id"] == "abc"
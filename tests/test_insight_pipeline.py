@@ -0,0 +1,68 @@
+"""
+Map-Reduce LLM洞察测试
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services import insight_pipeline as insight_pipeline_module
+from app.services.ai_service import ai_service
+from app.services.insight_pipeline import CHUNK_PROMPT_OVERHEAD, CHUNK_SUMMARY_TOKENS, InsightPipeline
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_client import estimate_tokens
+
+
+def test_representatives_cover_platforms_and_fit_chunk_budget():
+    """测试代表性文本覆盖各平台，分块不超过Token预算和分块数上限"""
+    pipeline = InsightPipeline(
+        sample_size=60, chunk_tokens=CHUNK_PROMPT_OVERHEAD + 200, max_chunks=3, text_chars=30
+    )
+    texts = [("xhs", f"小红书用户第{i}条笔记：这款口红颜色很好看，持久度一般") for i in range(80)]
+    texts += [("dy", f"抖音用户第{i}条评论：价格有点贵但是包装精致") for i in range(20)]
+    texts += [("dy", "好"), ("dy", texts[-1][1])]
+
+    representatives = pipeline.select_representatives(texts)
+    assert len(representatives) == 60
+    assert {rep["platform"] for rep in representatives[:2]} == {"xhs", "dy"}
+    assert len({rep["text"] for rep in representatives}) == len(representatives)
+
+    chunks = pipeline.pack_chunks(representatives)
+    assert len(chunks) == 3
+    for index, lines in enumerate(chunks):
+        assert sum(estimate_tokens(line) for line in lines) <= 200
+        # 整个提示词（含固定开销）不超过分块预算
+        prompt = pipeline._build_chunk_prompt("测试品牌", "comprehensive", lines, index + 1, len(chunks))
+        assert estimate_tokens(prompt) <= pipeline.chunk_tokens
+
+
+def test_run_passes_chunk_summaries_to_reduce(tmp_path, monkeypatch):
+    """测试分块总结写入汇总提示词，并附加覆盖统计"""
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", enabled=True)
+    monkeypatch.setattr(insight_pipeline_module, "llm_cache", cache)
+    monkeypatch.setattr(ai_service, "_get_llm_model", lambda: None)
+    prompts = []
+    chunk_max_tokens = []
+
+    async def fake_call_llm(prompt, max_tokens=None):
+        prompts.append(prompt)
+        if "用户内容样本" in prompt:
+            chunk_max_tokens.append(max_tokens)
+            return '{"viewpoints": ["颜色好看"], "pain_points": ["价格偏高"]}'
+        return '{"summary": "品牌口碑良好"}'
+
+    monkeypatch.setattr(ai_service, "_call_llm", fake_call_llm)
+    pipeline = InsightPipeline(chunk_tokens=CHUNK_PROMPT_OVERHEAD + 100, max_chunks=16)
+    texts = [("xhs", f"第{i}条：这款口红颜色很好看但价格偏高") for i in range(30)]
+
+    result = asyncio.run(pipeline.run("测试品牌", {"total_count": 30}, texts, use_cache=False))
+    reduce_prompt = prompts[-1]
+    assert "用户内容分块总结" in reduce_prompt
+    assert "价格偏高" in reduce_prompt
+    assert result["insights"] == {"summary": "品牌口碑良好"}
+    assert result["map_reduce"]["chunks"] == len(prompts) - 1 == result["map_reduce"]["planned_chunks"]
+    assert result["map_reduce"]["summarized_texts"] == 30
+    assert chunk_max_tokens == [CHUNK_SUMMARY_TOKENS] * result["map_reduce"]["chunks"]
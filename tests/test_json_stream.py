@@ -0,0 +1,73 @@
+"""
+流式JSON读取测试
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services import json_stream
+from app.services.json_stream import iter_json_items
+
+
+ITEMS = [{"note_id": str(i), "desc": "口红试色" * i, "liked_count": i} for i in range(50)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_array_and_jsonl_match_json_load(tmp_path, chunk_size):
+    """测试数组和 JSON Lines 文件在任意分块大小下都能完整读取"""
+    array_file = tmp_path / "search_contents.json"
+    array_file.write_text(json.dumps(ITEMS, ensure_ascii=False, indent=4), encoding="utf-8")
+    jsonl_file = tmp_path / "search_contents.jsonl"
+    jsonl_file.write_text("\n".join(json.dumps(item, ensure_ascii=False) for item in ITEMS), encoding="utf-8")
+
+    assert list(iter_json_items(array_file, chunk_size)) == ITEMS
+    assert list(iter_json_items(jsonl_file, chunk_size)) == ITEMS
+
+
+def test_single_object_and_errors(tmp_path):
+    """测试单个对象的 items 字段展开，以及格式错误时抛出异常"""
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(json.dumps({"items": ITEMS[:2]}), encoding="utf-8")
+    assert list(iter_json_items(wrapped, 3)) == ITEMS[:2]
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text(json.dumps(ITEMS[:2])[:-10], encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_items(truncated, 3))
+
+
+def test_large_wrapped_object_is_streamed(tmp_path, monkeypatch):
+    """测试 {"items": [...]} 文件逐个解码数组元素，缓冲区不会随文件增大"""
+    items = [{"note_id": str(i), "desc": "口红试色" * 20} for i in range(20000)]
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(
+        json.dumps({"total": len(items), "data": items, "has_more": False}, ensure_ascii=False),
+        encoding="utf-8"
+    )
+
+    max_buffer = [0]
+    original_fill = json_stream._ChunkReader.fill
+
+    def tracking_fill(self):
+        filled = original_fill(self)
+        max_buffer[0] = max(max_buffer[0], len(self.buffer))
+        return filled
+
+    monkeypatch.setattr(json_stream._ChunkReader, "fill", tracking_fill)
+    assert list(iter_json_items(wrapped, 4096)) == items
+    assert max_buffer[0] < 2 * 4096
+
+    # 格式错误在读取到出错位置时抛出，此前的数据已逐个返回
+    broken = tmp_path / "broken.json"
+    broken.write_text(json.dumps({"items": items[:100]})[:-200] + "}}", encoding="utf-8")
+    read = []
+    with pytest.raises(json.JSONDecodeError):
+        for item in iter_json_items(broken, 4096):
+            read.append(item)
+    assert read == items[:len(read)] and len(read) > 90
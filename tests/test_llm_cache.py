@@ -0,0 +1,85 @@
+"""
+LLM响应缓存测试
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.services.llm_cache import LLMResponseCache
+
+
+def test_ttl_size_bound_and_stats(tmp_path, monkeypatch):
+    """测试过期、条数上限淘汰和命中率统计"""
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", ttl=60, max_entries=10, enabled=True)
+    key = cache.make_key(cache.INSIGHTS, model="m", prompt="p", temperature=0.7, analysis_type="comprehensive")
+    assert key == cache.make_key(cache.INSIGHTS, analysis_type="comprehensive", temperature=0.7, prompt="p", model="m")
+
+    assert cache.get(cache.INSIGHTS, key) is None
+    cache.set(cache.INSIGHTS, key, {"summary": "ok"})
+    assert cache.get(cache.INSIGHTS, key) == {"summary": "ok"}
+
+    cache.set(cache.INSIGHTS, "expired", {"summary": "old"}, ttl=60)
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+    assert cache.get(cache.INSIGHTS, "expired") is None
+    monkeypatch.undo()
+
+    for i in range(20):
+        cache.set(cache.IMAGES, f"image-{i}", {"i": i})
+    stats = cache.stats()
+    assert stats["size"] <= 10
+    assert stats["kinds"]["insights"]["hits"] == 1
+    assert stats["kinds"]["insights"]["misses"] == 2
+    assert stats["kinds"]["insights"]["hit_rate"] == round(1 / 3, 4)
+
+
+def test_hits_do_not_write_on_every_read(tmp_path, monkeypatch):
+    """测试命中时访问时间和统计计数批量写入，不是每次读取都写数据库"""
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", enabled=True)
+    cache.set(cache.INSIGHTS, "k", {"summary": "ok"})
+    conn = cache._get_conn()
+    changes = conn.total_changes
+
+    for _ in range(100):
+        assert cache.get(cache.INSIGHTS, "k") == {"summary": "ok"}
+    assert conn.total_changes == changes
+    assert cache.stats()["kinds"]["insights"]["hits"] == 100
+
+    # 访问时间早于更新间隔时在下次写入时更新
+    monkeypatch.setattr(cache, "ACCESS_UPDATE_INTERVAL", 0.0)
+    before = conn.execute("SELECT accessed_at FROM llm_cache WHERE key = 'k'").fetchone()[0]
+    cache.get(cache.INSIGHTS, "k")
+    cache.flush()
+    assert conn.execute("SELECT accessed_at FROM llm_cache WHERE key = 'k'").fetchone()[0] > before
+
+
+def test_analyze_with_llm_uses_cache(tmp_path, monkeypatch):
+    """测试相同摘要再次分析时不调用LLM，跳过缓存时重新调用"""
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", enabled=True)
+    monkeypatch.setattr(ai_service_module, "llm_cache", cache)
+    service = AIService()
+    monkeypatch.setattr(service, "_get_llm_model", lambda: "Gateway-test")
+    calls = []
+
+    async def fake_call_llm(prompt):
+        calls.append(prompt)
+        return '{"summary": "品牌口碑良好"}'
+
+    monkeypatch.setattr(service, "_call_llm", fake_call_llm)
+    summary = {"total_count": 10, "keywords": [{"keyword": "口红", "weight": 1.0}]}
+
+    first = asyncio.run(service.analyze_with_llm("测试品牌", summary))
+    second = asyncio.run(service.analyze_with_llm("测试品牌", summary))
+    assert len(calls) == 1
+    assert second["cached"] is True
+    assert second["insights"] == first["insights"]
+
+    asyncio.run(service.analyze_with_llm("测试品牌", summary, use_cache=False))
+    assert len(calls) == 2
+    assert cache.stats()["kinds"]["insights"]["bypasses"] == 1
@@ -0,0 +1,112 @@
+"""
+LLM客户端注册表测试（重试、熔断、故障转移）
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services.llm_client import LLMClientRegistry, TokenRateLimiter, llm_clients, run_async
+
+
+class FakeStatusError(Exception):
+    """带状态码的接口错误"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    """测试中不等待重试"""
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "LLM_TOKENS_PER_MINUTE", 0)
+
+
+def test_retry_then_failover_and_circuit_open():
+    """测试429重试、重试用尽后切换到下一个服务，并熔断失败的服务"""
+    registry = LLMClientRegistry()
+    calls = {"gateway": 0, "openai": 0}
+
+    async def gateway():
+        calls["gateway"] += 1
+        raise FakeStatusError(429)
+
+    async def openai():
+        calls["openai"] += 1
+        return "ok"
+
+    async def run():
+        return await registry.execute_with_failover({"openai": openai, "gateway": gateway})
+
+    assert asyncio.run(run()) == "ok"
+    assert calls == {"gateway": 3, "openai": 1}
+    assert registry.breaker("gateway").state == "open"
+
+    # 熔断期间直接跳过网关
+    assert asyncio.run(run()) == "ok"
+    assert calls == {"gateway": 3, "openai": 2}
+
+
+def test_non_retryable_error_is_not_retried():
+    """测试400错误不重试"""
+    registry = LLMClientRegistry()
+    calls = []
+
+    async def bad_request():
+        calls.append(1)
+        raise FakeStatusError(400)
+
+    with pytest.raises(FakeStatusError):
+        asyncio.run(registry.execute("gateway", bad_request))
+    assert len(calls) == 1
+
+
+def test_cancelled_half_open_probe_is_released(monkeypatch):
+    """测试半开探测请求被取消后释放探测名额，服务不会一直熔断"""
+    monkeypatch.setattr(settings, "LLM_CIRCUIT_RESET_TIMEOUT", 0.0)
+    registry = LLMClientRegistry()
+    breaker = registry.breaker("gateway")
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(registry.execute("gateway", slow), timeout=0.01)
+        return await registry.execute("gateway", ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_token_rate_limiter_reserves_ahead():
+    """测试令牌不足时返回需要等待的时间"""
+    limiter = TokenRateLimiter(tokens_per_minute=600)
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(60) == pytest.approx(6.0, rel=0.05)
+
+
+def test_run_async_reuses_clients_across_calls():
+    """测试同一线程多次执行协程时复用事件循环和LLM客户端"""
+    async def get_client():
+        return llm_clients.http_client()
+
+    first = run_async(get_client())
+    second = run_async(get_client())
+    assert first is second
+    assert not first.is_closed
@@ -0,0 +1,57 @@
+"""
+视频抽帧测试（顺序解码采样、画面变化采样、帧缓存）
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services import media_frames
+
+
+@pytest.fixture
+def scene_video(tmp_path):
+    """40帧的测试视频，第27帧切换到另一个画面"""
+    cv2 = pytest.importorskip("cv2")
+    path = tmp_path / "video.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(40):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:, :] = (0, 0, 200) if i < 27 else (200, 120, 0)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_scene_sampling_picks_cut_frame(scene_video):
+    """测试画面变化采样选到镜头切换处的帧，均匀采样每段取第一帧"""
+    import cv2
+
+    uniform = media_frames.sample_video_frames(str(scene_video), max_frames=4, mode="uniform")
+    scene = media_frames.sample_video_frames(str(scene_video), max_frames=4, mode="scene")
+    assert len(uniform) == len(scene) == 4
+
+    def _blue(jpeg):
+        return int(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)[0, 0, 0])
+
+    # 第三段 [20, 30) 均匀采样取到第20帧（切换前），按画面变化采样取到切换后的帧
+    assert _blue(uniform[2]) < 100
+    assert _blue(scene[2]) > 100
+
+
+def test_frame_cache_skips_decoding(scene_video, tmp_path, monkeypatch):
+    """测试同一视频再次抽帧时直接读取缓存"""
+    monkeypatch.setattr(settings, "VIDEO_FRAME_CACHE_DIR", tmp_path / "frames")
+    first = media_frames.extract_video_frames(str(scene_video), max_frames=4, use_cache=True)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("不应重新解码")
+
+    monkeypatch.setattr(media_frames, "sample_video_frames", _fail)
+    assert media_frames.extract_video_frames(str(scene_video), max_frames=4, use_cache=True) == first
@@ -0,0 +1,89 @@
+"""
+批量视频/图片分析测试
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.ai_service import ai_service
+from app.tasks.media_tasks import analyze_media_batch, resolve_item_media
+
+
+def test_resolve_and_analyze_batch_with_bounded_concurrency(tmp_path, monkeypatch):
+    """测试查找本地图片和视频地址，并发数不超过上限且每条数据都有结果"""
+    import cv2
+
+    folder = tmp_path / "xhs" / "note1"
+    folder.mkdir(parents=True)
+    for i in range(3):
+        cv2.imwrite(str(folder / f"{i:03d}.jpeg"), np.full((32, 32, 3), i * 60, dtype=np.uint8))
+
+    image_entry = resolve_item_media({"_id": 1, "platform": "xhs", "content_id": "note1"}, [tmp_path])
+    assert image_entry["kind"] == "images" and len(image_entry["sources"]) == 3
+    url_entry = resolve_item_media(
+        {"_id": 2, "platform": "douyin", "content_id": "v1", "raw_data": {"video_download_url": "http://v/1.mp4"}},
+        [tmp_path]
+    )
+    assert url_entry["kind"] == "url" and url_entry["sources"] == ["http://v/1.mp4"]
+    assert url_entry["download_path"] == str(tmp_path / "douyin" / "v1" / "video.mp4")
+    assert resolve_item_media({"_id": 3, "platform": "xhs", "content_id": "none"}, [tmp_path]) is None
+
+    state = {"running": 0, "max_running": 0}
+
+    async def fake_analyze(frames, prompt=None, use_cache=True):
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return {"success": True, "data": {"frames": len(frames)}}
+
+    async def fake_video(video_source, prompt=None, use_cache=True, download_path=None):
+        return {"success": False, "error": "下载视频失败"}
+
+    monkeypatch.setattr(ai_service, "analyze_image_frames", fake_analyze)
+    monkeypatch.setattr(ai_service, "analyze_video_content", fake_video)
+
+    results = {}
+    entries = [dict(image_entry, id=i) for i in range(10, 20)] + [url_entry]
+    asyncio.run(analyze_media_batch(
+        entries, lambda entry, result: results.__setitem__(entry["id"], result), workers=1, concurrency=3
+    ))
+
+    assert len(results) == 11
+    assert state["max_running"] <= 3
+    assert results[10] == {"success": True, "data": {"frames": 3}}
+    assert results[2]["success"] is False
+
+
+def test_frame_extraction_timeout_and_callback_off_loop(monkeypatch):
+    """测试抽帧超时按失败处理，结果回调不在事件循环线程中执行"""
+    import threading
+    import time
+    from app.tasks import media_tasks
+
+    def slow_extract(kind, sources):
+        time.sleep(0.5)
+        return {"frames": ["frame"], "error": None}
+
+    monkeypatch.setattr(media_tasks, "extract_item_frames", slow_extract)
+    monkeypatch.setattr(media_tasks.settings, "MEDIA_FRAME_EXTRACT_TIMEOUT", 0.1)
+
+    loop_thread = threading.get_ident()
+    results = {}
+
+    def on_result(entry, result):
+        results[entry["id"]] = (result, threading.get_ident())
+
+    asyncio.run(analyze_media_batch(
+        [{"id": 1, "kind": "video", "sources": ["broken.mp4"]}], on_result, workers=1
+    ))
+
+    result, callback_thread = results[1]
+    assert result["success"] is False and "抽帧失败" in result["error"]
+    assert callback_thread != loop_thread
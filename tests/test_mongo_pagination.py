@@ -0,0 +1,51 @@
+"""
+MongoDB 游标分页测试
+"""
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pytest
+from bson import ObjectId
+
+from app.core.mongo_pagination import (
+    DEFAULT_LIST_FIELDS, build_projection, decode_cursor, encode_cursor, keyset_filter
+)
+
+
+def test_cursor_round_trip():
+    """测试游标编码后可以还原爬取时间和 _id"""
+    doc = {"_id": ObjectId(), "crawled_at": datetime(2024, 5, 1, 12, 30, 15, 123000)}
+    assert decode_cursor(encode_cursor(doc)) == (doc["crawled_at"], doc["_id"])
+    assert decode_cursor(encode_cursor({"_id": "custom-id"})) == (None, "custom-id")
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_filter():
+    """测试游标之后的查询条件"""
+    doc = {"_id": ObjectId(), "crawled_at": datetime(2024, 5, 1)}
+    query = keyset_filter({"brand_id": 1}, encode_cursor(doc))
+    assert query["brand_id"] == 1
+    assert query["$or"] == [
+        {"crawled_at": {"$lt": doc["crawled_at"]}},
+        {"crawled_at": doc["crawled_at"], "_id": {"$lt": doc["_id"]}},
+        {"crawled_at": None}
+    ]
+    assert keyset_filter({"brand_id": 1}, None) == {"brand_id": 1}
+
+
+def test_build_projection():
+    """测试默认精简字段和 fields 参数"""
+    projection = build_projection()
+    assert "raw_data" not in projection
+    assert set(projection) == set(DEFAULT_LIST_FIELDS)
+
+    assert build_projection("title, raw_data") == {"title": 1, "raw_data": 1, "crawled_at": 1}
+    with pytest.raises(ValueError):
+        build_projection("title,password")
@@ -0,0 +1,65 @@
+"""
+标准化数据列式存储测试
+"""
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services import data_processor as data_processor_module
+from app.services.data_processor import DataProcessor
+from app.services.normalized_store import NormalizedStore, partition_date
+
+
+# create_time 为 extract_text_from_item 读取的日期字段（毫秒时间戳），数据在3天之间交替
+ITEMS = [
+    {"note_id": str(i), "title": f"口红试色{i}", "desc": "颜色非常好看", "liked_count": i,
+     "create_time": 1704110400000 + (i % 3) * 86400000, "comments": [{"content": "很滋润"}]}
+    for i in range(6)
+]
+
+
+def test_repeated_processing_reads_store(tmp_path, monkeypatch):
+    """测试第二次处理同一文件时从Parquet读取，结果与解析JSON一致"""
+    store = NormalizedStore(root=tmp_path / "normalized", batch_size=2, enabled=True)
+    monkeypatch.setattr(data_processor_module, "normalized_store", store)
+    data_file = tmp_path / "search_contents.json"
+    data_file.write_text(json.dumps(ITEMS, ensure_ascii=False), encoding="utf-8")
+
+    processor = DataProcessor()
+    first = processor.process_json_file(data_file, "xhs")
+    manifest = store.lookup(data_file, "xhs")
+    assert manifest["item_count"] == len(ITEMS)
+
+    # 按日期分区
+    days = sorted({partition_date(item["create_time"]) for item in ITEMS})
+    assert len(days) == 3
+    assert manifest["partitions"] == days
+    for day in days:
+        assert store.partition_path("xhs", day, store.source_key(data_file, "xhs")).exists()
+
+    # 读取时按分区日期顺序返回，同一日期内保持文件中的顺序
+    expected_titles = [
+        item["title"] for day in days for item in ITEMS if partition_date(item["create_time"]) == day
+    ]
+    assert [row["title"] for row in store.iter_items(data_file, "xhs")] == expected_titles
+    assert expected_titles != [item["title"] for item in ITEMS]
+
+    def fail_extract(*args, **kwargs):
+        raise AssertionError("不应重新解析JSON")
+
+    monkeypatch.setattr(processor, "extract_text_from_item", fail_extract)
+    second = processor.process_json_file(data_file, "xhs")
+
+    assert second["total_items"] == first["total_items"]
+    assert sorted(second["all_texts"]) == sorted(first["all_texts"])
+    assert second["interaction_stats"] == first["interaction_stats"]
+    assert second["interaction_stats"]["total_likes"] == sum(item["liked_count"] for item in ITEMS)
+
+    table = store.read_table(platforms=["xhs"], columns=["title", "likes"])
+    assert table.num_rows == len(ITEMS)
+    table = store.read_table(platforms=["xhs"], columns=["title"], start_date=days[1], end_date=days[1])
+    assert table.num_rows == 2
@@ -0,0 +1,48 @@
+"""
+报告文件缓存测试
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.services import report_artifacts as report_artifacts_module
+from app.services.chart_cache import ChartCache
+from app.services.report_artifacts import ReportArtifacts
+from app.services.report_service import report_service
+
+
+BRAND_INFO = {"id": 1, "name": "测试品牌", "description": ""}
+ANALYSIS_RESULT = {
+    "sentiment": {"distribution": {"positive": 60, "negative": 10, "neutral": 30}},
+    "keywords": [{"keyword": "口红", "weight": 0.8}],
+    "llm_insights": {"insights": "整体口碑良好"}
+}
+
+
+def test_prebuild_then_serve_from_disk(tmp_path, monkeypatch):
+    """测试预生成的报告文件在之后的导出中直接复用"""
+    monkeypatch.setattr(settings, "CHART_RENDER_WORKERS", 1)
+    monkeypatch.setattr(settings, "REPORT_PREBUILD_FORMATS", ["md", "html"])
+    monkeypatch.setattr(report_artifacts_module, "chart_cache", ChartCache(tmp_path / "charts"))
+    artifacts = ReportArtifacts(tmp_path / "reports")
+
+    artifacts.prebuild(7, BRAND_INFO, ANALYSIS_RESULT)
+    md_path = artifacts.get(7, "markdown")
+    assert md_path == artifacts.get(7, "md")
+    assert "测试品牌" in md_path.read_text(encoding="utf-8")
+    assert "测试品牌" in artifacts.get(7, "html").read_text(encoding="utf-8")
+    assert sorted(p.name for p in (tmp_path / "reports").iterdir()) == ["7-v1-c1.html", "7-v1-c1.md"]
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("不应重新生成")
+
+    monkeypatch.setattr(report_service, "prepare_report_data", _fail)
+    assert artifacts.ensure(7, "md", BRAND_INFO, ANALYSIS_RESULT) == md_path
+
+    # 图表样式版本变化后不再使用旧文件
+    monkeypatch.setattr(report_artifacts_module, "CHART_STYLE_VERSION", 2)
+    assert artifacts.get(7, "html") is None
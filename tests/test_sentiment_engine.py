@@ -0,0 +1,83 @@
+"""
+批量情感分析引擎测试
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.sentiment_engine import SentimentEngine, normalize_date_key
+from app.services.nlp_cache import NLPResultCache
+
+
+def test_summarize_counts():
+    """测试分数数组统计"""
+    result = SentimentEngine.summarize(np.array([0.9, 0.1, 0.5, 0.7]))
+
+    assert result["total"] == 4
+    assert result["positive_count"] == 2
+    assert result["negative_count"] == 1
+    assert result["neutral_count"] == 1
+    assert result["distribution"]["positive"] == 50.0
+
+
+def test_analyze_breakdowns_share_scores():
+    """测试按平台、按日期统计与整体统计一致"""
+    engine = SentimentEngine(workers=1, cache=NLPResultCache(backend="none"))
+    texts = ["这个产品非常好用，我很满意！", "太差了，再也不买了", "这个产品非常好用，我很满意！"]
+    result = engine.analyze(
+        texts,
+        platforms=["xhs", "douyin", "xhs"],
+        dates=["2024-01-01T08:00:00", "2024-01-02", None]
+    )
+
+    assert result["total"] == 3
+    assert sum(p["total"] for p in result["by_platform"].values()) == 3
+    assert result["by_platform"]["xhs"]["total"] == 2
+    # 没有日期的文本不计入时间分布
+    assert [d["date"] for d in result["by_time"]["distribution"]] == ["2024-01-01", "2024-01-02"]
+
+
+def test_normalize_date_key():
+    """测试日期标准化"""
+    assert normalize_date_key("2024-03-05T12:00:00Z") == "2024-03-05"
+    assert normalize_date_key(1709600000) == "1709600000"
+    assert normalize_date_key("") is None
+
+
+def test_score_texts_uses_cache(tmp_path):
+    """测试缓存命中的文本不再重复打分"""
+    cache = NLPResultCache(backend="sqlite", path=tmp_path / "nlp_cache.sqlite3", max_entries=10)
+    engine = SentimentEngine(workers=1, cache=cache)
+    texts = ["这个产品非常好用", "太差了"]
+
+    first = engine.score_texts(texts)
+    second = engine.score_texts(texts)
+
+    assert np.allclose(first, second)
+    stats = cache.stats()
+    assert stats["kinds"]["sentiment"] == {"hits": 2, "misses": 2}
+    assert stats["size"] == 2
+
+
+def test_sqlite_cache_counts_rows_only_near_the_limit(tmp_path):
+    """测试SQLite缓存按条数上界判断是否需要统计条数，超出上限时按最近访问时间淘汰"""
+    cache = NLPResultCache(backend="sqlite", path=tmp_path / "nlp_cache.sqlite3", max_entries=10)
+    statements = []
+    backend = cache._get_backend()
+    backend._get_conn().set_trace_callback(statements.append)
+
+    for i in range(8):
+        cache.set_many("sentiment", {f"text-{i}": 0.5})
+    counts = [sql for sql in statements if "COUNT(*)" in sql]
+    assert len(counts) == 1
+
+    cache.get_many("sentiment", ["text-7"])
+    cache.set_many("sentiment", {f"more-{i}": 0.5 for i in range(5)})
+    assert cache.stats()["size"] == 9
+    assert cache.get_many("sentiment", ["text-7"]) == {"text-7": 0.5}
+    assert cache.get_many("sentiment", ["text-0"]) == {}
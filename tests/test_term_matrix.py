@@ -0,0 +1,42 @@
+"""
+文档-词矩阵测试
+"""
+import sys
+from pathlib import Path
+
+import jieba
+import jieba.analyse
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.term_matrix import TermMatrix
+
+
+TEXTS = [
+    "口红颜色非常好看，口红很滋润",
+    "这款口红掉色严重",
+    "粉底液遮瑕效果不错",
+    "粉底液和口红一起买了",
+]
+
+
+def test_keywords_match_extract_tags():
+    """测试关键词与 jieba.analyse.extract_tags 一致"""
+    matrix = TermMatrix.from_tokens(jieba.lcut(text) for text in TEXTS)
+    expected = jieba.analyse.extract_tags(" ".join(TEXTS), topK=8, withWeight=True)
+
+    assert [(kw["keyword"], kw["weight"]) for kw in matrix.keywords(top_k=8)] == \
+        [(kw, round(weight, 4)) for kw, weight in expected]
+
+
+def test_topics_sample_count_and_cooccurrence():
+    """测试主题样本数和共现关键词"""
+    matrix = TermMatrix.from_tokens(jieba.lcut(text) for text in TEXTS)
+    topics = {topic["topic"]: topic for topic in matrix.topics(num_topics=2)}
+
+    assert topics["口红"]["sample_count"] == 3
+    assert "口红" not in topics["口红"]["keywords"]
+    assert "粉底液" in topics["口红"]["keywords"]
+    assert matrix.word_frequency(top_k=1) == [{"word": "口红", "count": 4}]
@@ -0,0 +1,57 @@
+"""
+主题模型测试
+"""
+import random
+import sys
+from pathlib import Path
+
+import jieba
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.services.term_matrix import TermMatrix
+from app.services.topic_engine import TopicModel
+
+
+GROUPS = [
+    ["口红", "颜色", "滋润", "显白", "试色"],
+    ["物流", "快递", "包装", "发货", "客服"],
+]
+
+
+def _texts(count, seed):
+    rng = random.Random(seed)
+    return ["".join(rng.sample(rng.choice(GROUPS), 3)) for _ in range(count)]
+
+
+def _matrix(texts):
+    return TermMatrix.from_tokens(jieba.lcut(text) for text in texts)
+
+
+def test_partial_fit_separates_topics_and_persists(tmp_path):
+    """测试增量训练的主题划分及模型保存加载"""
+    model = TopicModel(num_topics=2, n_features=4096, batch_size=100)
+    assignments = model.partial_fit(_matrix(_texts(300, seed=1)))
+
+    assert assignments.shape == (300,)
+    assert model.n_docs == 300
+
+    path = tmp_path / "model.joblib"
+    model.save(path)
+    loaded = TopicModel.load(path, num_topics=2)
+    loaded.partial_fit(_matrix(_texts(300, seed=2)))
+
+    topics = loaded.topics()
+    assert loaded.n_docs == 600
+    assert sum(topic["sample_count"] for topic in topics) == 600
+    # 每个主题权重最高的词来自同一组
+    covered = []
+    for topic in topics:
+        top_terms = {topic["topic"], *topic["keywords"][:3]}
+        group = next(group for group in GROUPS if topic["topic"] in group)
+        assert top_terms <= set(group)
+        covered.append(GROUPS.index(group))
+    assert sorted(covered) == [0, 1]
+    assert TopicModel.load(path, num_topics=3) is None
@@ -0,0 +1,103 @@
+"""
+远程视频下载测试（中断续传、大小上限、复用已下载文件、下载目录清理）
+"""
+import asyncio
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings
+from app.core import disk_cache
+from app.services import video_fetcher
+from app.services.video_fetcher import VideoTooLargeError, fetch_video
+
+VIDEO = bytes(range(256)) * 8192  # 2MB
+
+
+@pytest.fixture
+def requests_seen(monkeypatch):
+    """模拟视频服务器：第一次请求传到一半断开，带 Range 的请求返回剩余部分"""
+    seen = []
+
+    async def _body(data, fail_after=None):
+        yield data[:fail_after] if fail_after else data
+        if fail_after:
+            raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        seen.append(request.headers.get("range"))
+        if request.headers.get("range"):
+            start = int(request.headers["range"][len("bytes="):-1])
+            return httpx.Response(206, headers={
+                "content-range": f"bytes {start}-{len(VIDEO) - 1}/{len(VIDEO)}",
+                "content-length": str(len(VIDEO) - start)
+            }, content=_body(VIDEO[start:]))
+        return httpx.Response(200, headers={"content-length": str(len(VIDEO))}, content=_body(VIDEO, 1 << 20))
+
+    async def _no_sleep(seconds):
+        return None
+
+    monkeypatch.setattr(
+        video_fetcher.httpx, "AsyncClient", partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(video_fetcher.asyncio, "sleep", _no_sleep)
+    return seen
+
+
+def test_resume_with_range_and_reuse(tmp_path, requests_seen):
+    """测试下载中断后按 Range 继续，再次下载同一文件时直接复用"""
+    dest = tmp_path / "douyin" / "v1" / "video.mp4"
+    assert asyncio.run(fetch_video("http://v/1.mp4", dest=dest)) == dest
+    assert dest.read_bytes() == VIDEO
+    assert requests_seen == [None, f"bytes={1 << 20}-"]
+    assert not dest.with_name("video.mp4.part").exists()
+
+    asyncio.run(fetch_video("http://v/1.mp4", dest=dest))
+    assert len(requests_seen) == 2
+
+
+def test_size_cap(tmp_path, requests_seen):
+    """测试超过大小上限时拒绝下载并删除临时文件"""
+    dest = tmp_path / "video.mp4"
+    with pytest.raises(VideoTooLargeError):
+        asyncio.run(fetch_video("http://v/1.mp4", dest=dest, max_bytes=1024))
+    assert not dest.exists()
+    assert not dest.with_name("video.mp4.part").exists()
+
+
+def test_download_dir_evicts_old_and_least_recently_used(tmp_path, requests_seen, monkeypatch):
+    """测试下载到默认目录后删除过期的视频，总大小超过上限时删除最久未使用的视频"""
+    downloads = tmp_path / "_downloads"
+    downloads.mkdir()
+    monkeypatch.setattr(settings, "VIDEO_DOWNLOAD_DIR", downloads)
+    monkeypatch.setattr(settings, "VIDEO_DOWNLOAD_CACHE_MAX_BYTES", len(VIDEO) + 2048)
+    monkeypatch.setattr(settings, "VIDEO_DOWNLOAD_CACHE_TTL", 86400)
+    monkeypatch.setattr(disk_cache, "PRUNE_INTERVAL", 0.0)
+    monkeypatch.setattr(disk_cache, "_last_pruned", {})
+
+    now = time.time()
+    for name, age in [("expired.mp4", 2 * 86400), ("older.mp4", 300), ("recent.mp4", 60)]:
+        path = downloads / name
+        path.write_bytes(b"x" * 1024)
+        os.utime(path, (now - age, now - age))
+
+    dest = asyncio.run(fetch_video("http://v/1.mp4"))
+    assert dest.parent == downloads
+    assert sorted(path.name for path in downloads.iterdir()) == sorted([dest.name, "recent.mp4", "older.mp4"])
+
+    # 复用时刷新使用时间，之后的清理先删除其他视频
+    (downloads / "new.mp4").write_bytes(b"x" * 1024)
+    os.utime(dest, (now - 600, now - 600))
+    asyncio.run(fetch_video("http://v/1.mp4"))
+    assert dest.stat().st_mtime >= now
+    disk_cache.prune_cache_dir(downloads, settings.VIDEO_DOWNLOAD_CACHE_MAX_BYTES, settings.VIDEO_DOWNLOAD_CACHE_TTL)
+    assert sorted(path.name for path in downloads.iterdir()) == sorted([dest.name, "new.mp4", "recent.mp4"])